@@ -5,21 +5,172 @@
 Complete Professional Accounting System - Python 3.13 Compatible
 """
 
+import io
 import os
-from datetime import datetime, date
-from decimal import Decimal
-from flask import Flask, render_template_string, request, redirect, url_for, flash, jsonify, session
+import sqlite3
+import tempfile
+import threading
+import re
+import csv
+import json
+import time
+import base64
+import click
+from datetime import datetime, date, timedelta
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from flask import (Flask, Response, abort, render_template, request, redirect, url_for, flash, jsonify, session, g,
+                   has_request_context, stream_with_context)
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import and_, or_, event
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.attributes import get_history
+from sqlalchemy.dialects import postgresql, sqlite
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
+from jinja2 import FileSystemBytecodeCache
+from spreadsheet_cells import safe_cell
+from full_text_search import SearchDocumentMixin, DocumentIndex
+
+# ===== إعدادات محرك قاعدة البيانات =====
+
+# SQLite: WAL يسمح للقراء بالعمل أثناء الكتابة، وbusy_timeout ينتظر القفل بدلاً من "database is locked"
+SQLITE_PRAGMAS = (
+    'journal_mode=WAL',
+    'synchronous=NORMAL',
+    f"busy_timeout={int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000))}",
+    f"mmap_size={int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))}",
+    f"cache_size={int(os.environ.get('SQLITE_CACHE_SIZE', -64000))}",  # سالب = كيلوبايت
+    'temp_store=MEMORY',
+)
+
+class PoolMetrics:
+    """عدادات مجمع الاتصالات: السحب والإرجاع وزمن الانتظار"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.checkins = 0
+            self.timeouts = 0
+            self.total_wait = 0.0
+            self.max_wait = 0.0
+            self.peak_checked_out = 0
+
+    def record_checkout(self, wait, checked_out):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            self.peak_checked_out = max(self.peak_checked_out, checked_out)
+
+    def record_checkin(self):
+        with self._lock:
+            self.checkins += 1
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self, pool=None):
+        with self._lock:
+            stats = {
+                'checkouts': self.checkouts,
+                'checkins': self.checkins,
+                'timeouts': self.timeouts,
+                'avg_wait_ms': round(self.total_wait / self.checkouts * 1000, 3) if self.checkouts else 0,
+                'max_wait_ms': round(self.max_wait * 1000, 3),
+                'peak_checked_out': self.peak_checked_out,
+            }
+        if isinstance(pool, QueuePool):
+            stats.update(size=pool.size(), checked_out=pool.checkedout(), overflow=pool.overflow())
+        return stats
+
+pool_metrics = PoolMetrics()
+
+class MonitoredQueuePool(QueuePool):
+    """QueuePool يقيس زمن انتظار الحصول على اتصال"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            pool_metrics.record_timeout()
+            raise
+        pool_metrics.record_checkout(time.perf_counter() - start, self.checkedout())
+        return connection
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        pool_metrics.record_checkin()
+
+def normalize_database_url(url):
+    # بعض المنصات تعطي postgres:// الذي لا يقبله SQLAlchemy 2
+    if url.startswith('postgres://'):
+        return 'postgresql://' + url[len('postgres://'):]
+    return url
+
+def engine_options(url):
+    """خيارات المحرك حسب نوع قاعدة البيانات (مجمع لكل عامل gunicorn)"""
+    if url.startswith('sqlite'):
+        if url in ('sqlite://', 'sqlite:///') or ':memory:' in url:
+            return {}
+        return {
+            'poolclass': MonitoredQueuePool,
+            'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+            'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+            'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        }
+    return {
+        'poolclass': MonitoredQueuePool,
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': True,
+    }
+
+@event.listens_for(Engine, 'connect')
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(f'PRAGMA {pragma}')
+    cursor.close()
 
 # إنشاء التطبيق
 app = Flask(__name__)
 
 # الإعدادات
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'accounting-system-complete-2024')
-app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///accounting_complete.db')
+app.config['SQLALCHEMY_DATABASE_URI'] = normalize_database_url(
+    os.environ.get('DATABASE_URL', 'sqlite:///accounting_complete.db'))
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['TEMPLATE_BYTECODE_CACHE_DIR'] = os.environ.get(
+    'TEMPLATE_BYTECODE_CACHE_DIR', os.path.join(app.instance_path, 'jinja_cache'))
+app.config['PRECOMPILE_TEMPLATES'] = os.environ.get('PRECOMPILE_TEMPLATES', 'true').lower() == 'true'
+# كشف استعلامات N+1: يتبع وضع التطوير ما لم يُحدد صراحة
+_n_plus_one_env = os.environ.get('N_PLUS_ONE_DETECTION')
+app.config['N_PLUS_ONE_DETECTION'] = None if not _n_plus_one_env else _n_plus_one_env.lower() in ('1', 'true')
+app.config['N_PLUS_ONE_THRESHOLD'] = int(os.environ.get('N_PLUS_ONE_THRESHOLD', 5))
+app.config['IMPORT_BATCH_SIZE'] = int(os.environ.get('IMPORT_BATCH_SIZE', 1000))
+
+# ذاكرة القوالب: الترجمة تُحفظ على القرص وتُشارك بين العمال وإعادات التشغيل
+# يجب ضبطها قبل أول وصول إلى app.jinja_env
+os.makedirs(app.config['TEMPLATE_BYTECODE_CACHE_DIR'], exist_ok=True)
+app.jinja_options = dict(
+    app.jinja_options,
+    bytecode_cache=FileSystemBytecodeCache(app.config['TEMPLATE_BYTECODE_CACHE_DIR'])
+)
 
 # قاعدة البيانات
 db = SQLAlchemy(app)
@@ -54,6 +205,10 @@ class Customer(db.Model):
     tax_number = db.Column(db.String(50))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('idx_customer_name_id', 'name', 'id'),
+    )
+
 class Supplier(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -63,6 +218,10 @@ class Supplier(db.Model):
     tax_number = db.Column(db.String(50))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('idx_supplier_name_id', 'name', 'id'),
+    )
+
 class Product(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -74,6 +233,11 @@ class Product(db.Model):
     category = db.Column(db.String(50))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('idx_product_name_id', 'name', 'id'),
+        db.Index('idx_product_price_id', 'price', 'id'),
+    )
+
 class SalesInvoice(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     invoice_number = db.Column(db.String(50), unique=True, nullable=False)
@@ -88,6 +252,11 @@ class SalesInvoice(db.Model):
     
     customer = db.relationship('Customer', backref='sales_invoices')
 
+    __table_args__ = (
+        db.Index('idx_sales_invoice_date_id', 'date', 'id'),
+        db.Index('idx_sales_invoice_total_id', 'total', 'id'),
+    )
+
 class PurchaseInvoice(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     invoice_number = db.Column(db.String(50), unique=True, nullable=False)
@@ -102,6 +271,11 @@ class PurchaseInvoice(db.Model):
     
     supplier = db.relationship('Supplier', backref='purchase_invoices')
 
+    __table_args__ = (
+        db.Index('idx_purchase_invoice_date_id', 'date', 'id'),
+        db.Index('idx_purchase_invoice_total_id', 'total', 'id'),
+    )
+
 class Expense(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     description = db.Column(db.String(200), nullable=False)
@@ -113,6 +287,11 @@ class Expense(db.Model):
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('idx_expense_date_id', 'date', 'id'),
+        db.Index('idx_expense_amount_id', 'amount', 'id'),
+    )
+
 class Employee(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -124,6 +303,11 @@ class Employee(db.Model):
     status = db.Column(db.String(20), default='active')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('idx_employee_name_id', 'name', 'id'),
+        db.Index('idx_employee_hire_date_id', 'hire_date', 'id'),
+    )
+
 class Payment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     type = db.Column(db.String(20), nullable=False)  # incoming/outgoing
@@ -139,6 +323,41 @@ class Payment(db.Model):
     customer = db.relationship('Customer', backref='payments')
     supplier = db.relationship('Supplier', backref='payments')
 
+class DashboardStats(db.Model):
+    __tablename__ = 'dashboard_stats'
+    # صف واحد (id=1) يُحدّث داخل نفس معاملة الإضافة أو الحذف
+    id = db.Column(db.Integer, primary_key=True)
+    total_customers = db.Column(db.Integer, nullable=False, default=0)
+    total_suppliers = db.Column(db.Integer, nullable=False, default=0)
+    total_products = db.Column(db.Integer, nullable=False, default=0)
+    total_employees = db.Column(db.Integer, nullable=False, default=0)
+    total_sales = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    total_purchases = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    total_expenses = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class MonthlyRollup(db.Model):
+    __tablename__ = 'monthly_rollup'
+    # صف لكل شهر (أول يوم في الشهر) يُحدّث تزايدياً عند الإضافة أو الحذف
+    month = db.Column(db.Date, primary_key=True)
+    sales_total = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    sales_tax = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    purchases_total = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    purchases_tax = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    expenses_total = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+
+    @property
+    def net_tax(self):
+        return (self.sales_tax or 0) - (self.purchases_tax or 0)
+
+    @property
+    def net_profit(self):
+        return (self.sales_total or 0) - (self.purchases_total or 0) - (self.expenses_total or 0)
+
+class SearchDocument(SearchDocumentMixin, db.Model):
+    # نص البحث الموحد للعملاء والموردين والمنتجات (FTS5 على SQLite وGIN على PostgreSQL)
+    pass
+
 @login_manager.user_loader
 def load_user(user_id):
     return User.query.get(int(user_id))
@@ -147,6 +366,7 @@ def load_user(user_id):
 def init_db():
     with app.app_context():
         db.create_all()
+        ensure_indexes()
         
         # إنشاء مستخدم افتراضي
         if not User.query.filter_by(username='admin').first():
@@ -185,6 +405,487 @@ def init_db():
             db.session.commit()
             print('✅ تم إنشاء البيانات التجريبية')
 
+        if db.session.get(DashboardStats, 1) is None:
+            rebuild_dashboard_stats()
+        if MonthlyRollup.query.first() is None:
+            rebuild_monthly_rollup()
+        # قاعدة بيانات أنشئت قبل فهرس البحث
+        if search_index.is_empty():
+            search_index.reindex()
+
+def ensure_indexes():
+    # create_all لا ينشئ الفهارس الجديدة على الجداول الموجودة مسبقاً
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+
+def precompile_templates():
+    # تحميل قوالب النظام مسبقاً حتى لا يدفع أول طلب تكلفة الترجمة
+    if not app.config['PRECOMPILE_TEMPLATES']:
+        return 0
+    names = app.jinja_env.list_templates(filter_func=lambda name: name.startswith('complete/'))
+    for name in names:
+        app.jinja_env.get_template(name)
+    return len(names)
+
+# ===== عدادات لوحة التحكم (Dashboard Stats) =====
+
+# لكل جدول: (عمود الإحصائية، الحقل المجمّع أو None للعدّ)
+DASHBOARD_COUNTERS = {
+    Customer: ('total_customers', None),
+    Supplier: ('total_suppliers', None),
+    Product: ('total_products', None),
+    Employee: ('total_employees', None),
+    SalesInvoice: ('total_sales', 'total'),
+    PurchaseInvoice: ('total_purchases', 'total'),
+    Expense: ('total_expenses', 'amount'),
+}
+
+def _apply_dashboard_delta(connection, stat, delta):
+    # تحديث ذري col = col + delta على نفس اتصال المعاملة الجارية
+    if not delta:
+        return
+    column = DashboardStats.__table__.c[stat]
+    connection.execute(
+        DashboardStats.__table__.update()
+        .where(DashboardStats.__table__.c.id == 1)
+        .values({column: column + delta, 'updated_at': datetime.utcnow()})
+    )
+
+def _as_decimal(value):
+    return Decimal(str(value or 0))
+
+def _track_previous_value(attribute):
+    # تحميل القيمة القديمة عند التعديل حتى لو كان الكائن منتهي الصلاحية بعد commit
+    @event.listens_for(attribute, 'set', active_history=True)
+    def keep_previous_value(target, value, oldvalue, initiator):
+        pass
+
+def _register_dashboard_counter(model, stat, field):
+    @event.listens_for(model, 'after_insert')
+    def after_insert(mapper, connection, target):
+        _apply_dashboard_delta(connection, stat, 1 if field is None else _as_decimal(getattr(target, field)))
+
+    @event.listens_for(model, 'after_delete')
+    def after_delete(mapper, connection, target):
+        _apply_dashboard_delta(connection, stat, -1 if field is None else -_as_decimal(getattr(target, field)))
+
+    if field is not None:
+        _track_previous_value(getattr(model, field))
+
+        @event.listens_for(model, 'after_update')
+        def after_update(mapper, connection, target):
+            history = get_history(target, field)
+            if history.deleted and history.added:
+                _apply_dashboard_delta(connection, stat,
+                                       _as_decimal(history.added[0]) - _as_decimal(history.deleted[0]))
+
+for _model, (_stat, _field) in DASHBOARD_COUNTERS.items():
+    _register_dashboard_counter(_model, _stat, _field)
+
+def rebuild_dashboard_stats():
+    """إعادة بناء صف الإحصائيات من الجداول مباشرة"""
+    values = {}
+    for model, (stat, field) in DASHBOARD_COUNTERS.items():
+        if field is None:
+            values[stat] = db.session.query(db.func.count(model.id)).scalar()
+        else:
+            values[stat] = db.session.query(
+                db.func.coalesce(db.func.sum(getattr(model, field)), 0)).scalar()
+    stats = db.session.get(DashboardStats, 1, with_for_update=True) or DashboardStats(id=1)
+    for stat, value in values.items():
+        setattr(stats, stat, value)
+    stats.updated_at = datetime.utcnow()
+    db.session.add(stats)
+    db.session.commit()
+    return stats
+
+def get_dashboard_stats():
+    # قراءة واحدة بالمفتاح الأساسي مهما كان حجم البيانات
+    return db.session.get(DashboardStats, 1) or rebuild_dashboard_stats()
+
+@app.cli.command('rebuild-dashboard-stats')
+def rebuild_dashboard_stats_command():
+    """إعادة بناء جدول dashboard_stats من الصفر"""
+    stats = rebuild_dashboard_stats()
+    print(f'✅ تمت إعادة بناء الإحصائيات: {stats.total_customers} عميل، '
+          f'مبيعات {stats.total_sales}، مشتريات {stats.total_purchases}، مصروفات {stats.total_expenses}')
+
+# ===== التجميع الشهري (Monthly Rollup) =====
+
+REPORT_MONTHS = 24
+MAX_REPORT_MONTHS = 120
+
+# لكل جدول: (عمود التجميع، الحقل المصدر)
+MONTHLY_ROLLUP_SOURCES = {
+    SalesInvoice: (('sales_total', 'total'), ('sales_tax', 'tax_amount')),
+    PurchaseInvoice: (('purchases_total', 'total'), ('purchases_tax', 'tax_amount')),
+    Expense: (('expenses_total', 'amount'),),
+}
+
+def month_start(value):
+    return value.replace(day=1)
+
+def add_months(value, months):
+    year, month = divmod(value.month - 1 + months, 12)
+    return date(value.year + year, month + 1, 1)
+
+def _apply_monthly_delta(connection, month, deltas):
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    table = MonthlyRollup.__table__
+    dialect = {'postgresql': postgresql, 'sqlite': sqlite}.get(connection.dialect.name)
+    if dialect is not None:
+        # upsert ذري لا يتعارض مع إضافة متزامنة لأول فاتورة في الشهر
+        statement = dialect.insert(table).values(month=month, **deltas)
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=[table.c.month],
+            set_={name: table.c[name] + statement.excluded[name] for name in deltas}
+        ))
+        return
+    result = connection.execute(
+        table.update().where(table.c.month == month)
+        .values({table.c[name]: table.c[name] + delta for name, delta in deltas.items()})
+    )
+    if result.rowcount == 0:
+        connection.execute(table.insert().values(month=month, **deltas))
+
+def _register_monthly_rollup(model, columns):
+    fields = [field for _, field in columns]
+    for field in ['date'] + fields:
+        _track_previous_value(getattr(model, field))
+
+    def deltas(values, sign):
+        return {name: sign * _as_decimal(values[field]) for name, field in columns}
+
+    @event.listens_for(model, 'after_insert')
+    def after_insert(mapper, connection, target):
+        values = {field: getattr(target, field) for field in fields}
+        _apply_monthly_delta(connection, month_start(target.date or date.today()), deltas(values, 1))
+
+    @event.listens_for(model, 'after_delete')
+    def after_delete(mapper, connection, target):
+        values = {field: getattr(target, field) for field in fields}
+        _apply_monthly_delta(connection, month_start(target.date), deltas(values, -1))
+
+    @event.listens_for(model, 'after_update')
+    def after_update(mapper, connection, target):
+        old, new, changed = {}, {}, False
+        for field in ['date'] + fields:
+            history = get_history(target, field)
+            new[field] = getattr(target, field)
+            old[field] = history.deleted[0] if history.deleted else new[field]
+            changed = changed or bool(history.deleted)
+        if changed:
+            _apply_monthly_delta(connection, month_start(old['date']), deltas(old, -1))
+            _apply_monthly_delta(connection, month_start(new['date']), deltas(new, 1))
+
+for _model, _columns in MONTHLY_ROLLUP_SOURCES.items():
+    _register_monthly_rollup(_model, _columns)
+
+def rebuild_monthly_rollup(start=None):
+    """إعادة بناء التجميع الشهري بدءاً من شهر معين (أو بالكامل)"""
+    start = month_start(start) if start else None
+    months = {}
+    for model, columns in MONTHLY_ROLLUP_SOURCES.items():
+        query = db.session.query(
+            model.date, *[db.func.sum(getattr(model, field)) for _, field in columns]
+        ).group_by(model.date)
+        if start:
+            query = query.filter(model.date >= start)
+        for row in query:
+            totals = months.setdefault(month_start(row[0]), {})
+            for (name, _), value in zip(columns, row[1:]):
+                totals[name] = totals.get(name, Decimal('0')) + _as_decimal(value)
+
+    delete = MonthlyRollup.__table__.delete()
+    if start:
+        delete = delete.where(MonthlyRollup.month >= start)
+    db.session.execute(delete)
+    db.session.add_all([MonthlyRollup(month=month, **totals) for month, totals in months.items()])
+    db.session.commit()
+    return len(months)
+
+def monthly_report(months=REPORT_MONTHS, today=None):
+    """آخر N شهراً من جدول التجميع مع تعبئة الأشهر الفارغة بالأصفار"""
+    newest = month_start(today or date.today())
+    oldest = add_months(newest, -(months - 1))
+    rows = {
+        row.month: row for row in
+        MonthlyRollup.query.filter(MonthlyRollup.month >= oldest, MonthlyRollup.month <= newest)
+    }
+    empty = {name: Decimal('0') for columns in MONTHLY_ROLLUP_SOURCES.values() for name, _ in columns}
+    return [rows.get(month) or MonthlyRollup(month=month, **empty)
+            for month in (add_months(newest, -offset) for offset in range(months))]
+
+@app.cli.command('rebuild-monthly-rollup')
+@click.option('--since', default=None, help='أول شهر لإعادة البناء بصيغة YYYY-MM')
+def rebuild_monthly_rollup_command(since):
+    """إعادة بناء جدول monthly_rollup من الفواتير والمصروفات"""
+    start = date.fromisoformat(f'{since}-01') if since else None
+    count = rebuild_monthly_rollup(start)
+    print(f'✅ تمت إعادة بناء {count} شهر')
+
+# ===== البحث النصي الكامل =====
+
+# البحث في القوائم عبر فهرس search_documents بدل LIKE '%...%' الذي يمسح الجدول
+search_index = DocumentIndex(db, SearchDocument)
+search_index.register(Customer, ('name', 'email', 'phone', 'tax_number', 'address'))
+search_index.register(Supplier, ('name', 'email', 'phone', 'tax_number', 'address'))
+search_index.register(Product, ('name', 'category', 'description'))
+
+@app.cli.command('rebuild-search-index')
+@click.option('--chunk-size', type=int, default=1000, help='عدد السجلات في كل دفعة')
+def rebuild_search_index_command(chunk_size):
+    """إعادة بناء فهرس البحث للعملاء والموردين والمنتجات"""
+    result = search_index.reindex(chunk_size=chunk_size)
+    print('✅ تمت إعادة بناء فهرس البحث: ' + '، '.join(f'{table} {count}' for table, count in result.items()))
+
+# ===== كشف استعلامات N+1 (وضع التطوير) =====
+
+_IN_LIST_PATTERN = re.compile(r'IN \((?:[^()]*)\)', re.IGNORECASE)
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+def query_fingerprint(statement):
+    """بصمة الاستعلام: نفس الاستعلام بمعاملات مختلفة له نفس البصمة"""
+    statement = _WHITESPACE_PATTERN.sub(' ', statement).strip()
+    return _IN_LIST_PATTERN.sub('IN (...)', statement)
+
+def n_plus_one_enabled():
+    detection = app.config.get('N_PLUS_ONE_DETECTION')
+    return app.debug if detection is None else detection
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def count_statement(conn, cursor, statement, parameters, context, executemany):
+    if not has_request_context():
+        return
+    counts = g.get('query_fingerprints')
+    if counts is not None:
+        fingerprint = query_fingerprint(statement)
+        counts[fingerprint] = counts.get(fingerprint, 0) + 1
+
+@app.before_request
+def start_query_tracking():
+    if n_plus_one_enabled():
+        g.query_fingerprints = {}
+
+@app.after_request
+def report_n_plus_one(response):
+    counts = g.pop('query_fingerprints', None)
+    if counts:
+        threshold = app.config['N_PLUS_ONE_THRESHOLD']
+        for fingerprint, count in counts.items():
+            if count >= threshold:
+                app.logger.warning('N+1 محتمل في %s: نفس الاستعلام نُفّذ %d مرة: %s',
+                                   request.endpoint, count, fingerprint[:300])
+        response.headers['X-Query-Count'] = str(sum(counts.values()))
+    return response
+
+# ===== ترقيم الصفحات بالمؤشر (Keyset Pagination) =====
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 200
+PAGE_SIZE_CHOICES = (25, 50, 100, 200)
+COUNT_CACHE_TTL = 60  # ثانية
+
+# ذاكرة مؤقتة لعدد السجلات لكل (جدول، مرشحات) داخل العملية
+_count_cache = {}
+
+class ListFilter:
+    """مرشح قائمة يُقرأ من معاملات الرابط"""
+
+    def __init__(self, name, label, apply, kind='text', options=None):
+        self.name = name
+        self.label = label
+        self.apply = apply
+        self.kind = kind
+        self.options = options or []
+
+    def parse(self, raw):
+        if self.kind == 'date':
+            return date.fromisoformat(raw)
+        if self.kind == 'select' and raw not in dict(self.options):
+            raise ValueError(raw)
+        return raw
+
+class KeysetPage:
+    """صفحة نتائج مع مؤشرات الصفحة التالية والسابقة"""
+
+    page_size_choices = PAGE_SIZE_CHOICES
+
+    def __init__(self, items, per_page, sort, order, sort_choices, filters, args,
+                 total, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.per_page = per_page
+        self.sort = sort
+        self.order = order
+        self.sort_choices = sort_choices
+        self.filters = filters
+        self.args = args
+        self.total = total
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def url(self, **changes):
+        params = dict(self.args, sort=self.sort, order=self.order, per_page=self.per_page)
+        params.update(changes)
+        params = {key: value for key, value in params.items() if value not in (None, '')}
+        return url_for(request.endpoint, **params)
+
+    @property
+    def next_url(self):
+        return self.url(after=self.next_cursor) if self.has_next else None
+
+    @property
+    def prev_url(self):
+        return self.url(before=self.prev_cursor) if self.has_prev else None
+
+def encode_cursor(values):
+    encoded = []
+    for value in values:
+        if isinstance(value, (date, datetime)):
+            value = value.isoformat()
+        elif isinstance(value, Decimal):
+            value = str(value)
+        encoded.append(value)
+    raw = json.dumps(encoded, ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, columns):
+    # مؤشر تالف يعيد المستخدم للصفحة الأولى بدلاً من خطأ 500
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw.decode('utf-8'))
+        if len(values) != len(columns):
+            return None
+        decoded = []
+        for column, value in zip(columns, values):
+            python_type = column.type.python_type
+            if python_type is datetime:
+                value = datetime.fromisoformat(value)
+            elif python_type is date:
+                value = date.fromisoformat(value)
+            elif python_type is Decimal:
+                value = Decimal(value)
+            elif python_type is int:
+                value = int(value)
+            decoded.append(value)
+        return decoded
+    except (ValueError, TypeError, NotImplementedError):
+        return None
+
+def keyset_condition(sort_column, id_column, values, descending):
+    value, last_id = values
+    if descending:
+        return or_(sort_column < value, and_(sort_column == value, id_column < last_id))
+    return or_(sort_column > value, and_(sort_column == value, id_column > last_id))
+
+def cached_count(model, active_filters, query):
+    key = (model.__tablename__, tuple(sorted(active_filters.items())))
+    now = time.monotonic()
+    cached = _count_cache.get(key)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    total = query.order_by(None).with_entities(db.func.count(model.id)).scalar() or 0
+    _count_cache[key] = (now + COUNT_CACHE_TTL, total)
+    return total
+
+def invalidate_count_cache(model):
+    for key in [key for key in _count_cache if key[0] == model.__tablename__]:
+        _count_cache.pop(key, None)
+
+def paginate_list(model, sort_fields, default_sort, default_order='asc', filters=(), options=()):
+    """ترقيم قائمة بالمؤشر على (عمود الفرز، المعرف) مع الفرز والترشيح"""
+    args = request.args
+
+    per_page = args.get('per_page', DEFAULT_PAGE_SIZE, type=int) or DEFAULT_PAGE_SIZE
+    per_page = max(1, min(per_page, MAX_PAGE_SIZE))
+
+    sort = args.get('sort', default_sort)
+    if sort not in sort_fields:
+        sort = default_sort
+    order = args.get('order', default_order)
+    if order not in ('asc', 'desc'):
+        order = default_order
+    descending = order == 'desc'
+
+    query = model.query
+    active_filters = {}
+    for list_filter in filters:
+        raw = (args.get(list_filter.name) or '').strip()
+        if not raw:
+            continue
+        try:
+            value = list_filter.parse(raw)
+        except ValueError:
+            continue
+        query = list_filter.apply(query, value)
+        active_filters[list_filter.name] = raw
+
+    total = cached_count(model, active_filters, query)
+
+    sort_column = sort_fields[sort][0]
+    columns = (sort_column, model.id)
+    after = decode_cursor(args.get('after'), columns)
+    before = decode_cursor(args.get('before'), columns) if after is None else None
+
+    if before is not None:
+        # نقرأ الصفحة السابقة بالاتجاه المعاكس ثم نعكس النتائج
+        page_query = query.filter(keyset_condition(sort_column, model.id, before, not descending))
+        ordering = (sort_column.asc(), model.id.asc()) if descending else (sort_column.desc(), model.id.desc())
+    else:
+        page_query = query
+        if after is not None:
+            page_query = page_query.filter(keyset_condition(sort_column, model.id, after, descending))
+        ordering = (sort_column.desc(), model.id.desc()) if descending else (sort_column.asc(), model.id.asc())
+
+    # خيارات التحميل المسبق للعلاقات تُطبّق على استعلام الصفحة فقط وليس على العدّ
+    rows = page_query.options(*options).order_by(*ordering).limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    if before is not None:
+        rows.reverse()
+        has_next, has_prev = True, has_more
+    else:
+        has_next, has_prev = has_more, after is not None
+
+    def cursor_of(row):
+        return encode_cursor((getattr(row, sort_column.key), row.id))
+
+    return KeysetPage(
+        items=rows,
+        per_page=per_page,
+        sort=sort,
+        order=order,
+        sort_choices=[(key, label) for key, (_, label) in sort_fields.items()],
+        filters=[(list_filter, active_filters.get(list_filter.name, '')) for list_filter in filters],
+        args=active_filters,
+        total=total,
+        next_cursor=cursor_of(rows[-1]) if rows and has_next else None,
+        prev_cursor=cursor_of(rows[0]) if rows and has_prev else None
+    )
+
+INVOICE_STATUS_OPTIONS = [('pending', 'معلقة'), ('paid', 'مدفوعة'), ('cancelled', 'ملغية')]
+
+def date_range_filters(model):
+    return [
+        ListFilter('date_from', 'من تاريخ', lambda query, value: query.filter(model.date >= value), kind='date'),
+        ListFilter('date_to', 'إلى تاريخ', lambda query, value: query.filter(model.date <= value), kind='date'),
+    ]
+
 # ===== المسارات الأساسية =====
 
 @app.route('/')
@@ -192,131 +893,7 @@ def home():
     if current_user.is_authenticated:
         return redirect(url_for('dashboard'))
     
-    return render_template_string('''
-    <!DOCTYPE html>
-    <html dir="rtl" lang="ar">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>نظام المحاسبة الاحترافي الكامل</title>
-        <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.rtl.min.css" rel="stylesheet">
-        <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css" rel="stylesheet">
-        <style>
-            body {
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                min-height: 100vh;
-                color: white;
-                display: flex;
-                align-items: center;
-                justify-content: center;
-                font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            }
-            .main-card {
-                background: rgba(255,255,255,0.95);
-                color: #2c3e50;
-                border-radius: 20px;
-                padding: 50px;
-                text-align: center;
-                max-width: 700px;
-                box-shadow: 0 20px 40px rgba(0,0,0,0.1);
-                backdrop-filter: blur(10px);
-            }
-            .feature-grid {
-                display: grid;
-                grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-                gap: 20px;
-                margin: 30px 0;
-            }
-            .feature-card {
-                background: linear-gradient(45deg, #f8f9fa, #e9ecef);
-                padding: 20px;
-                border-radius: 15px;
-                border: 1px solid #dee2e6;
-            }
-            .feature-icon {
-                font-size: 2rem;
-                color: #667eea;
-                margin-bottom: 10px;
-            }
-            .btn-main {
-                background: linear-gradient(45deg, #667eea, #764ba2);
-                border: none;
-                padding: 15px 40px;
-                font-size: 1.2rem;
-                border-radius: 50px;
-                color: white;
-                transition: all 0.3s ease;
-            }
-            .btn-main:hover {
-                transform: translateY(-2px);
-                box-shadow: 0 10px 20px rgba(0,0,0,0.2);
-                color: white;
-            }
-        </style>
-    </head>
-    <body>
-        <div class="main-card">
-            <h1 class="mb-4">
-                <i class="fas fa-calculator text-primary"></i>
-                نظام المحاسبة الاحترافي الكامل
-            </h1>
-            <p class="lead mb-4">حل شامل ومتكامل لإدارة جميع العمليات المحاسبية والمالية</p>
-            
-            <div class="alert alert-success">
-                <h5><i class="fas fa-check-circle"></i> النظام يعمل بنجاح على Python 3.13</h5>
-                <p class="mb-0">متوافق مع أحدث التقنيات ومحسن للأداء العالي</p>
-            </div>
-            
-            <div class="feature-grid">
-                <div class="feature-card">
-                    <div class="feature-icon"><i class="fas fa-shopping-cart"></i></div>
-                    <h6>المبيعات</h6>
-                    <small>إدارة فواتير المبيعات والعملاء</small>
-                </div>
-                <div class="feature-card">
-                    <div class="feature-icon"><i class="fas fa-truck"></i></div>
-                    <h6>المشتريات</h6>
-                    <small>إدارة المشتريات والموردين</small>
-                </div>
-                <div class="feature-card">
-                    <div class="feature-icon"><i class="fas fa-receipt"></i></div>
-                    <h6>المصروفات</h6>
-                    <small>تسجيل ومتابعة المصروفات</small>
-                </div>
-                <div class="feature-card">
-                    <div class="feature-icon"><i class="fas fa-users"></i></div>
-                    <h6>الموظفين</h6>
-                    <small>إدارة الموارد البشرية</small>
-                </div>
-                <div class="feature-card">
-                    <div class="feature-icon"><i class="fas fa-boxes"></i></div>
-                    <h6>المخزون</h6>
-                    <small>إدارة المنتجات والمخزون</small>
-                </div>
-                <div class="feature-card">
-                    <div class="feature-icon"><i class="fas fa-chart-line"></i></div>
-                    <h6>التقارير</h6>
-                    <small>تقارير مالية شاملة</small>
-                </div>
-            </div>
-            
-            <div class="mt-4">
-                <a href="{{ url_for('login') }}" class="btn btn-main">
-                    <i class="fas fa-sign-in-alt me-2"></i>
-                    دخول النظام
-                </a>
-            </div>
-            
-            <div class="mt-4 pt-4 border-top">
-                <small class="text-muted">
-                    <i class="fas fa-user"></i> المستخدم: admin | 
-                    <i class="fas fa-key"></i> كلمة المرور: admin123
-                </small>
-            </div>
-        </div>
-    </body>
-    </html>
-    ''')
+    return render_template('complete/home.html')
 
 @app.route('/login', methods=['GET', 'POST'])
 def login():
@@ -332,83 +909,7 @@ def login():
         else:
             flash('اسم المستخدم أو كلمة المرور غير صحيحة', 'error')
 
-    return render_template_string('''
-    <!DOCTYPE html>
-    <html dir="rtl" lang="ar">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>تسجيل الدخول - نظام المحاسبة</title>
-        <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.rtl.min.css" rel="stylesheet">
-        <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css" rel="stylesheet">
-        <style>
-            body {
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                min-height: 100vh;
-                display: flex;
-                align-items: center;
-            }
-            .login-card {
-                background: rgba(255,255,255,0.95);
-                border-radius: 20px;
-                box-shadow: 0 20px 40px rgba(0,0,0,0.1);
-                backdrop-filter: blur(10px);
-            }
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="row justify-content-center">
-                <div class="col-md-6 col-lg-4">
-                    <div class="card login-card">
-                        <div class="card-body p-5">
-                            <div class="text-center mb-4">
-                                <i class="fas fa-calculator fa-3x text-primary mb-3"></i>
-                                <h3>تسجيل الدخول</h3>
-                                <p class="text-muted">نظام المحاسبة الاحترافي</p>
-                            </div>
-
-                            {% with messages = get_flashed_messages(with_categories=true) %}
-                                {% if messages %}
-                                    {% for category, message in messages %}
-                                        <div class="alert alert-danger">
-                                            <i class="fas fa-exclamation-triangle me-2"></i>{{ message }}
-                                        </div>
-                                    {% endfor %}
-                                {% endif %}
-                            {% endwith %}
-
-                            <form method="POST">
-                                <div class="mb-3">
-                                    <label class="form-label">
-                                        <i class="fas fa-user me-2"></i>اسم المستخدم
-                                    </label>
-                                    <input type="text" class="form-control" name="username" required>
-                                </div>
-                                <div class="mb-4">
-                                    <label class="form-label">
-                                        <i class="fas fa-lock me-2"></i>كلمة المرور
-                                    </label>
-                                    <input type="password" class="form-control" name="password" required>
-                                </div>
-                                <button type="submit" class="btn btn-primary w-100 mb-3">
-                                    <i class="fas fa-sign-in-alt me-2"></i>دخول
-                                </button>
-                            </form>
-
-                            <div class="text-center">
-                                <a href="{{ url_for('home') }}" class="btn btn-outline-secondary">
-                                    <i class="fas fa-arrow-right me-2"></i>العودة
-                                </a>
-                            </div>
-                        </div>
-                    </div>
-                </div>
-            </div>
-        </div>
-    </body>
-    </html>
-    ''')
+    return render_template('complete/login.html')
 
 @app.route('/logout')
 @login_required
@@ -420,475 +921,33 @@ def logout():
 @app.route('/dashboard')
 @login_required
 def dashboard():
-    # إحصائيات سريعة
-    total_customers = Customer.query.count()
-    total_suppliers = Supplier.query.count()
-    total_products = Product.query.count()
-    total_employees = Employee.query.count()
-
-    # إحصائيات مالية
-    total_sales = db.session.query(db.func.sum(SalesInvoice.total)).scalar() or 0
-    total_purchases = db.session.query(db.func.sum(PurchaseInvoice.total)).scalar() or 0
-    total_expenses = db.session.query(db.func.sum(Expense.amount)).scalar() or 0
+    # إحصائيات سريعة ومالية من صف dashboard_stats
+    stats = get_dashboard_stats()
 
     # المنتجات منخفضة المخزون
     low_stock_products = Product.query.filter(Product.quantity <= Product.min_quantity).limit(5).all()
 
-    return render_template_string('''
-    <!DOCTYPE html>
-    <html dir="rtl" lang="ar">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>لوحة التحكم - نظام المحاسبة</title>
-        <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.rtl.min.css" rel="stylesheet">
-        <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css" rel="stylesheet">
-        <style>
-            body { background-color: #f8f9fa; }
-            .navbar { background: linear-gradient(45deg, #667eea, #764ba2) !important; }
-            .stat-card {
-                background: linear-gradient(45deg, #667eea, #764ba2);
-                color: white;
-                border-radius: 15px;
-                padding: 20px;
-                margin-bottom: 20px;
-                transition: transform 0.3s ease;
-            }
-            .stat-card:hover { transform: translateY(-5px); }
-            .menu-card {
-                background: white;
-                border-radius: 15px;
-                padding: 20px;
-                margin-bottom: 20px;
-                box-shadow: 0 5px 15px rgba(0,0,0,0.1);
-                transition: transform 0.3s ease;
-            }
-            .menu-card:hover { transform: translateY(-3px); }
-            .menu-icon { font-size: 2rem; color: #667eea; margin-bottom: 10px; }
-        </style>
-    </head>
-    <body>
-        <nav class="navbar navbar-expand-lg navbar-dark">
-            <div class="container">
-                <a class="navbar-brand" href="{{ url_for('dashboard') }}">
-                    <i class="fas fa-calculator me-2"></i>نظام المحاسبة الاحترافي
-                </a>
-                <div class="navbar-nav ms-auto">
-                    <span class="navbar-text me-3">
-                        <i class="fas fa-user me-1"></i>{{ current_user.full_name }}
-                    </span>
-                    <a class="nav-link" href="{{ url_for('logout') }}">
-                        <i class="fas fa-sign-out-alt me-1"></i>خروج
-                    </a>
-                </div>
-            </div>
-        </nav>
-
-        <div class="container mt-4">
-            <div class="row">
-                <div class="col-12">
-                    <h2><i class="fas fa-tachometer-alt me-2"></i>لوحة التحكم</h2>
-                    <p class="text-muted">مرحباً {{ current_user.full_name }}، إليك نظرة سريعة على النظام</p>
-                </div>
-            </div>
-
-            <!-- الإحصائيات السريعة -->
-            <div class="row">
-                <div class="col-md-3">
-                    <div class="stat-card text-center">
-                        <i class="fas fa-users fa-2x mb-2"></i>
-                        <h3>{{ total_customers }}</h3>
-                        <p>العملاء</p>
-                    </div>
-                </div>
-                <div class="col-md-3">
-                    <div class="stat-card text-center">
-                        <i class="fas fa-truck fa-2x mb-2"></i>
-                        <h3>{{ total_suppliers }}</h3>
-                        <p>الموردين</p>
-                    </div>
-                </div>
-                <div class="col-md-3">
-                    <div class="stat-card text-center">
-                        <i class="fas fa-boxes fa-2x mb-2"></i>
-                        <h3>{{ total_products }}</h3>
-                        <p>المنتجات</p>
-                    </div>
-                </div>
-                <div class="col-md-3">
-                    <div class="stat-card text-center">
-                        <i class="fas fa-user-tie fa-2x mb-2"></i>
-                        <h3>{{ total_employees }}</h3>
-                        <p>الموظفين</p>
-                    </div>
-                </div>
-            </div>
-
-            <!-- الإحصائيات المالية -->
-            <div class="row">
-                <div class="col-md-4">
-                    <div class="card text-center" style="background: linear-gradient(45deg, #28a745, #20c997); color: white;">
-                        <div class="card-body">
-                            <i class="fas fa-chart-line fa-2x mb-2"></i>
-                            <h4>{{ "%.2f"|format(total_sales) }} ر.س</h4>
-                            <p>إجمالي المبيعات</p>
-                        </div>
-                    </div>
-                </div>
-                <div class="col-md-4">
-                    <div class="card text-center" style="background: linear-gradient(45deg, #dc3545, #fd7e14); color: white;">
-                        <div class="card-body">
-                            <i class="fas fa-shopping-cart fa-2x mb-2"></i>
-                            <h4>{{ "%.2f"|format(total_purchases) }} ر.س</h4>
-                            <p>إجمالي المشتريات</p>
-                        </div>
-                    </div>
-                </div>
-                <div class="col-md-4">
-                    <div class="card text-center" style="background: linear-gradient(45deg, #6f42c1, #e83e8c); color: white;">
-                        <div class="card-body">
-                            <i class="fas fa-receipt fa-2x mb-2"></i>
-                            <h4>{{ "%.2f"|format(total_expenses) }} ر.س</h4>
-                            <p>إجمالي المصروفات</p>
-                        </div>
-                    </div>
-                </div>
-            </div>
-
-            <!-- القوائم الرئيسية -->
-            <div class="row mt-4">
-                <div class="col-12">
-                    <h4><i class="fas fa-th-large me-2"></i>الوظائف الرئيسية</h4>
-                </div>
-            </div>
-
-            <div class="row">
-                <div class="col-md-3">
-                    <div class="menu-card text-center">
-                        <div class="menu-icon"><i class="fas fa-shopping-cart"></i></div>
-                        <h6>المبيعات</h6>
-                        <p class="text-muted small">إدارة فواتير المبيعات</p>
-                        <a href="{{ url_for('sales') }}" class="btn btn-primary btn-sm">دخول</a>
-                    </div>
-                </div>
-                <div class="col-md-3">
-                    <div class="menu-card text-center">
-                        <div class="menu-icon"><i class="fas fa-truck"></i></div>
-                        <h6>المشتريات</h6>
-                        <p class="text-muted small">إدارة فواتير المشتريات</p>
-                        <a href="{{ url_for('purchases') }}" class="btn btn-primary btn-sm">دخول</a>
-                    </div>
-                </div>
-                <div class="col-md-3">
-                    <div class="menu-card text-center">
-                        <div class="menu-icon"><i class="fas fa-receipt"></i></div>
-                        <h6>المصروفات</h6>
-                        <p class="text-muted small">تسجيل المصروفات</p>
-                        <a href="{{ url_for('expenses') }}" class="btn btn-primary btn-sm">دخول</a>
-                    </div>
-                </div>
-                <div class="col-md-3">
-                    <div class="menu-card text-center">
-                        <div class="menu-icon"><i class="fas fa-users"></i></div>
-                        <h6>العملاء</h6>
-                        <p class="text-muted small">إدارة العملاء</p>
-                        <a href="{{ url_for('customers') }}" class="btn btn-primary btn-sm">دخول</a>
-                    </div>
-                </div>
-            </div>
-
-            <div class="row">
-                <div class="col-md-3">
-                    <div class="menu-card text-center">
-                        <div class="menu-icon"><i class="fas fa-industry"></i></div>
-                        <h6>الموردين</h6>
-                        <p class="text-muted small">إدارة الموردين</p>
-                        <a href="{{ url_for('suppliers') }}" class="btn btn-primary btn-sm">دخول</a>
-                    </div>
-                </div>
-                <div class="col-md-3">
-                    <div class="menu-card text-center">
-                        <div class="menu-icon"><i class="fas fa-boxes"></i></div>
-                        <h6>المنتجات</h6>
-                        <p class="text-muted small">إدارة المخزون</p>
-                        <a href="{{ url_for('products') }}" class="btn btn-primary btn-sm">دخول</a>
-                    </div>
-                </div>
-                <div class="col-md-3">
-                    <div class="menu-card text-center">
-                        <div class="menu-icon"><i class="fas fa-user-tie"></i></div>
-                        <h6>الموظفين</h6>
-                        <p class="text-muted small">إدارة الموظفين</p>
-                        <a href="{{ url_for('employees') }}" class="btn btn-primary btn-sm">دخول</a>
-                    </div>
-                </div>
-                <div class="col-md-3">
-                    <div class="menu-card text-center">
-                        <div class="menu-icon"><i class="fas fa-chart-bar"></i></div>
-                        <h6>التقارير</h6>
-                        <p class="text-muted small">التقارير المالية</p>
-                        <a href="{{ url_for('reports') }}" class="btn btn-primary btn-sm">دخول</a>
-                    </div>
-                </div>
-            </div>
-
-            {% if low_stock_products %}
-            <div class="row mt-4">
-                <div class="col-12">
-                    <div class="alert alert-warning">
-                        <h6><i class="fas fa-exclamation-triangle me-2"></i>تنبيه: منتجات منخفضة المخزون</h6>
-                        <ul class="mb-0">
-                            {% for product in low_stock_products %}
-                            <li>{{ product.name }} - الكمية المتبقية: {{ product.quantity }}</li>
-                            {% endfor %}
-                        </ul>
-                    </div>
-                </div>
-            </div>
-            {% endif %}
-        </div>
-    </body>
-    </html>
-    ''', total_customers=total_customers, total_suppliers=total_suppliers,
-         total_products=total_products, total_employees=total_employees,
-         total_sales=total_sales, total_purchases=total_purchases,
-         total_expenses=total_expenses, low_stock_products=low_stock_products)
-
-# ===== إدارة العملاء =====
-
-@app.route('/customers')
-@login_required
-def customers():
-    customers = Customer.query.all()
-    return render_template_string('''
-    <!DOCTYPE html>
-    <html dir="rtl" lang="ar">
-    <head>
-        <meta charset="UTF-8">
-        <title>إدارة العملاء</title>
-        <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.rtl.min.css" rel="stylesheet">
-        <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css" rel="stylesheet">
-        <style>body { background-color: #f8f9fa; } .navbar { background: linear-gradient(45deg, #667eea, #764ba2) !important; }</style>
-    </head>
-    <body>
-        <nav class="navbar navbar-expand-lg navbar-dark">
-            <div class="container">
-                <a class="navbar-brand" href="{{ url_for('dashboard') }}">
-                    <i class="fas fa-calculator me-2"></i>نظام المحاسبة
-                </a>
-                <div class="navbar-nav ms-auto">
-                    <a class="nav-link" href="{{ url_for('dashboard') }}">الرئيسية</a>
-                    <a class="nav-link" href="{{ url_for('logout') }}">خروج</a>
-                </div>
-            </div>
-        </nav>
-        <div class="container mt-4">
-            <div class="d-flex justify-content-between align-items-center mb-4">
-                <h2><i class="fas fa-users me-2"></i>إدارة العملاء</h2>
-                <button class="btn btn-primary" data-bs-toggle="modal" data-bs-target="#addModal">
-                    <i class="fas fa-plus me-2"></i>إضافة عميل
-                </button>
-            </div>
-            <div class="card">
-                <div class="card-body">
-                    <table class="table table-striped">
-                        <thead>
-                            <tr><th>الرقم</th><th>الاسم</th><th>الهاتف</th><th>البريد</th><th>الإجراءات</th></tr>
-                        </thead>
-                        <tbody>
-                            {% for customer in customers %}
-                            <tr>
-                                <td>{{ customer.id }}</td>
-                                <td>{{ customer.name }}</td>
-                                <td>{{ customer.phone or '-' }}</td>
-                                <td>{{ customer.email or '-' }}</td>
-                                <td>
-                                    <button class="btn btn-sm btn-outline-primary"><i class="fas fa-edit"></i></button>
-                                    <button class="btn btn-sm btn-outline-danger"><i class="fas fa-trash"></i></button>
-                                </td>
-                            </tr>
-                            {% endfor %}
-                        </tbody>
-                    </table>
-                </div>
-            </div>
-        </div>
-
-        <!-- Modal -->
-        <div class="modal fade" id="addModal">
-            <div class="modal-dialog">
-                <div class="modal-content">
-                    <div class="modal-header">
-                        <h5 class="modal-title">إضافة عميل جديد</h5>
-                        <button type="button" class="btn-close" data-bs-dismiss="modal"></button>
-                    </div>
-                    <form method="POST" action="{{ url_for('add_customer') }}">
-                        <div class="modal-body">
-                            <div class="mb-3">
-                                <label class="form-label">اسم العميل *</label>
-                                <input type="text" class="form-control" name="name" required>
-                            </div>
-                            <div class="mb-3">
-                                <label class="form-label">الهاتف</label>
-                                <input type="text" class="form-control" name="phone">
-                            </div>
-                            <div class="mb-3">
-                                <label class="form-label">البريد الإلكتروني</label>
-                                <input type="email" class="form-control" name="email">
-                            </div>
-                            <div class="mb-3">
-                                <label class="form-label">العنوان</label>
-                                <textarea class="form-control" name="address" rows="2"></textarea>
-                            </div>
-                        </div>
-                        <div class="modal-footer">
-                            <button type="button" class="btn btn-secondary" data-bs-dismiss="modal">إلغاء</button>
-                            <button type="submit" class="btn btn-primary">حفظ</button>
-                        </div>
-                    </form>
-                </div>
-            </div>
-        </div>
-        <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js"></script>
-    </body>
-    </html>
-    ''', customers=customers)
-
-@app.route('/add_customer', methods=['POST'])
-@login_required
-def add_customer():
-    customer = Customer(
-        name=request.form['name'],
-        phone=request.form.get('phone'),
-        email=request.form.get('email'),
-        address=request.form.get('address')
-    )
-    db.session.add(customer)
-    db.session.commit()
-    flash('تم إضافة العميل بنجاح', 'success')
-    return redirect(url_for('customers'))
+    return render_template('complete/dashboard.html',
+                           total_customers=stats.total_customers, total_suppliers=stats.total_suppliers,
+                           total_products=stats.total_products, total_employees=stats.total_employees,
+                           total_sales=stats.total_sales, total_purchases=stats.total_purchases,
+                           total_expenses=stats.total_expenses, low_stock_products=low_stock_products)
 
 # ===== إدارة المنتجات =====
 
 @app.route('/products')
 @login_required
 def products():
-    products = Product.query.all()
-    return render_template_string('''
-    <!DOCTYPE html>
-    <html dir="rtl" lang="ar">
-    <head>
-        <meta charset="UTF-8">
-        <title>إدارة المنتجات</title>
-        <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.rtl.min.css" rel="stylesheet">
-        <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css" rel="stylesheet">
-        <style>body { background-color: #f8f9fa; } .navbar { background: linear-gradient(45deg, #667eea, #764ba2) !important; }</style>
-    </head>
-    <body>
-        <nav class="navbar navbar-expand-lg navbar-dark">
-            <div class="container">
-                <a class="navbar-brand" href="{{ url_for('dashboard') }}">
-                    <i class="fas fa-calculator me-2"></i>نظام المحاسبة
-                </a>
-                <div class="navbar-nav ms-auto">
-                    <a class="nav-link" href="{{ url_for('dashboard') }}">الرئيسية</a>
-                    <a class="nav-link" href="{{ url_for('logout') }}">خروج</a>
-                </div>
-            </div>
-        </nav>
-        <div class="container mt-4">
-            <div class="d-flex justify-content-between align-items-center mb-4">
-                <h2><i class="fas fa-boxes me-2"></i>إدارة المنتجات</h2>
-                <button class="btn btn-primary" data-bs-toggle="modal" data-bs-target="#addModal">
-                    <i class="fas fa-plus me-2"></i>إضافة منتج
-                </button>
-            </div>
-            <div class="card">
-                <div class="card-body">
-                    <table class="table table-striped">
-                        <thead>
-                            <tr><th>الرقم</th><th>اسم المنتج</th><th>السعر</th><th>الكمية</th><th>الفئة</th><th>الحالة</th><th>الإجراءات</th></tr>
-                        </thead>
-                        <tbody>
-                            {% for product in products %}
-                            <tr>
-                                <td>{{ product.id }}</td>
-                                <td>{{ product.name }}</td>
-                                <td>{{ "%.2f"|format(product.price) }} ر.س</td>
-                                <td>
-                                    <span class="badge {% if product.quantity <= product.min_quantity %}bg-danger{% else %}bg-success{% endif %}">
-                                        {{ product.quantity }}
-                                    </span>
-                                </td>
-                                <td>{{ product.category or '-' }}</td>
-                                <td>
-                                    {% if product.quantity <= product.min_quantity %}
-                                        <span class="badge bg-warning">مخزون منخفض</span>
-                                    {% else %}
-                                        <span class="badge bg-success">متوفر</span>
-                                    {% endif %}
-                                </td>
-                                <td>
-                                    <button class="btn btn-sm btn-outline-primary"><i class="fas fa-edit"></i></button>
-                                    <button class="btn btn-sm btn-outline-danger"><i class="fas fa-trash"></i></button>
-                                </td>
-                            </tr>
-                            {% endfor %}
-                        </tbody>
-                    </table>
-                </div>
-            </div>
-        </div>
-
-        <!-- Modal -->
-        <div class="modal fade" id="addModal">
-            <div class="modal-dialog">
-                <div class="modal-content">
-                    <div class="modal-header">
-                        <h5 class="modal-title">إضافة منتج جديد</h5>
-                        <button type="button" class="btn-close" data-bs-dismiss="modal"></button>
-                    </div>
-                    <form method="POST" action="{{ url_for('add_product') }}">
-                        <div class="modal-body">
-                            <div class="mb-3">
-                                <label class="form-label">اسم المنتج *</label>
-                                <input type="text" class="form-control" name="name" required>
-                            </div>
-                            <div class="row">
-                                <div class="col-md-6">
-                                    <div class="mb-3">
-                                        <label class="form-label">السعر *</label>
-                                        <input type="number" step="0.01" class="form-control" name="price" required>
-                                    </div>
-                                </div>
-                                <div class="col-md-6">
-                                    <div class="mb-3">
-                                        <label class="form-label">الكمية *</label>
-                                        <input type="number" class="form-control" name="quantity" required>
-                                    </div>
-                                </div>
-                            </div>
-                            <div class="mb-3">
-                                <label class="form-label">الفئة</label>
-                                <input type="text" class="form-control" name="category">
-                            </div>
-                            <div class="mb-3">
-                                <label class="form-label">الوصف</label>
-                                <textarea class="form-control" name="description" rows="2"></textarea>
-                            </div>
-                        </div>
-                        <div class="modal-footer">
-                            <button type="button" class="btn btn-secondary" data-bs-dismiss="modal">إلغاء</button>
-                            <button type="submit" class="btn btn-primary">حفظ</button>
-                        </div>
-                    </form>
-                </div>
-            </div>
-        </div>
-        <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js"></script>
-    </body>
-    </html>
-    ''', products=products)
+    page = paginate_list(
+        Product,
+        sort_fields={'name': (Product.name, 'الاسم'), 'price': (Product.price, 'السعر')},
+        default_sort='name',
+        filters=[
+            ListFilter('q', 'بحث', lambda query, value: query.filter(search_index.filter(Product, value))),
+            ListFilter('category', 'الفئة', lambda query, value: query.filter(Product.category == value)),
+        ]
+    )
+    return render_template('complete/products.html', products=page.items, page=page)
 
 @app.route('/add_product', methods=['POST'])
 @login_required
@@ -902,6 +961,7 @@ def add_product():
     )
     db.session.add(product)
     db.session.commit()
+    invalidate_count_cache(Product)
     flash('تم إضافة المنتج بنجاح', 'success')
     return redirect(url_for('products'))
 
@@ -910,127 +970,22 @@ def add_product():
 @app.route('/sales')
 @login_required
 def sales():
-    sales = SalesInvoice.query.all()
-    customers = Customer.query.all()
-    return render_template_string('''
-    <!DOCTYPE html>
-    <html dir="rtl" lang="ar">
-    <head>
-        <meta charset="UTF-8">
-        <title>إدارة المبيعات</title>
-        <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.rtl.min.css" rel="stylesheet">
-        <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css" rel="stylesheet">
-        <style>body { background-color: #f8f9fa; } .navbar { background: linear-gradient(45deg, #667eea, #764ba2) !important; }</style>
-    </head>
-    <body>
-        <nav class="navbar navbar-expand-lg navbar-dark">
-            <div class="container">
-                <a class="navbar-brand" href="{{ url_for('dashboard') }}">
-                    <i class="fas fa-calculator me-2"></i>نظام المحاسبة
-                </a>
-                <div class="navbar-nav ms-auto">
-                    <a class="nav-link" href="{{ url_for('dashboard') }}">الرئيسية</a>
-                    <a class="nav-link" href="{{ url_for('logout') }}">خروج</a>
-                </div>
-            </div>
-        </nav>
-        <div class="container mt-4">
-            <div class="d-flex justify-content-between align-items-center mb-4">
-                <h2><i class="fas fa-shopping-cart me-2"></i>إدارة المبيعات</h2>
-                <button class="btn btn-primary" data-bs-toggle="modal" data-bs-target="#addModal">
-                    <i class="fas fa-plus me-2"></i>فاتورة جديدة
-                </button>
-            </div>
-            <div class="card">
-                <div class="card-body">
-                    <table class="table table-striped">
-                        <thead>
-                            <tr><th>رقم الفاتورة</th><th>العميل</th><th>التاريخ</th><th>المبلغ</th><th>الحالة</th><th>الإجراءات</th></tr>
-                        </thead>
-                        <tbody>
-                            {% for sale in sales %}
-                            <tr>
-                                <td>{{ sale.invoice_number }}</td>
-                                <td>{{ sale.customer.name if sale.customer else 'عميل نقدي' }}</td>
-                                <td>{{ sale.date.strftime('%Y-%m-%d') }}</td>
-                                <td>{{ "%.2f"|format(sale.total) }} ر.س</td>
-                                <td>
-                                    <span class="badge {% if sale.status == 'paid' %}bg-success{% elif sale.status == 'pending' %}bg-warning{% else %}bg-danger{% endif %}">
-                                        {% if sale.status == 'paid' %}مدفوعة{% elif sale.status == 'pending' %}معلقة{% else %}ملغية{% endif %}
-                                    </span>
-                                </td>
-                                <td>
-                                    <button class="btn btn-sm btn-outline-info"><i class="fas fa-eye"></i></button>
-                                    <button class="btn btn-sm btn-outline-primary"><i class="fas fa-edit"></i></button>
-                                </td>
-                            </tr>
-                            {% endfor %}
-                        </tbody>
-                    </table>
-                </div>
-            </div>
-        </div>
-
-        <!-- Modal -->
-        <div class="modal fade" id="addModal">
-            <div class="modal-dialog modal-lg">
-                <div class="modal-content">
-                    <div class="modal-header">
-                        <h5 class="modal-title">فاتورة مبيعات جديدة</h5>
-                        <button type="button" class="btn-close" data-bs-dismiss="modal"></button>
-                    </div>
-                    <form method="POST" action="{{ url_for('add_sale') }}">
-                        <div class="modal-body">
-                            <div class="row">
-                                <div class="col-md-6">
-                                    <div class="mb-3">
-                                        <label class="form-label">رقم الفاتورة *</label>
-                                        <input type="text" class="form-control" name="invoice_number" value="INV-{{ range(1000, 9999) | random }}" required>
-                                    </div>
-                                </div>
-                                <div class="col-md-6">
-                                    <div class="mb-3">
-                                        <label class="form-label">العميل</label>
-                                        <select class="form-control" name="customer_id">
-                                            <option value="">عميل نقدي</option>
-                                            {% for customer in customers %}
-                                            <option value="{{ customer.id }}">{{ customer.name }}</option>
-                                            {% endfor %}
-                                        </select>
-                                    </div>
-                                </div>
-                            </div>
-                            <div class="row">
-                                <div class="col-md-6">
-                                    <div class="mb-3">
-                                        <label class="form-label">المبلغ الفرعي *</label>
-                                        <input type="number" step="0.01" class="form-control" name="subtotal" required>
-                                    </div>
-                                </div>
-                                <div class="col-md-6">
-                                    <div class="mb-3">
-                                        <label class="form-label">الضريبة</label>
-                                        <input type="number" step="0.01" class="form-control" name="tax_amount" value="0">
-                                    </div>
-                                </div>
-                            </div>
-                            <div class="mb-3">
-                                <label class="form-label">ملاحظات</label>
-                                <textarea class="form-control" name="notes" rows="2"></textarea>
-                            </div>
-                        </div>
-                        <div class="modal-footer">
-                            <button type="button" class="btn btn-secondary" data-bs-dismiss="modal">إلغاء</button>
-                            <button type="submit" class="btn btn-primary">حفظ</button>
-                        </div>
-                    </form>
-                </div>
-            </div>
-        </div>
-        <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js"></script>
-    </body>
-    </html>
-    ''', sales=sales, customers=customers)
+    page = paginate_list(
+        SalesInvoice,
+        sort_fields={'date': (SalesInvoice.date, 'التاريخ'), 'total': (SalesInvoice.total, 'المبلغ')},
+        default_sort='date',
+        default_order='desc',
+        filters=[
+            ListFilter('q', 'رقم الفاتورة', lambda query, value: query.filter(SalesInvoice.invoice_number.startswith(value))),
+            ListFilter('status', 'الحالة', lambda query, value: query.filter(SalesInvoice.status == value),
+                       kind='select', options=INVOICE_STATUS_OPTIONS),
+        ] + date_range_filters(SalesInvoice),
+        # العميل علاقة many-to-one: ربط في نفس الاستعلام بدلاً من استعلام لكل صف
+        options=[joinedload(SalesInvoice.customer)]
+    )
+    # قائمة العملاء للنموذج: المعرف والاسم فقط
+    customers = db.session.query(Customer.id, Customer.name).order_by(Customer.name).all()
+    return render_template('complete/sales.html', sales=page.items, page=page, customers=customers)
 
 @app.route('/add_sale', methods=['POST'])
 @login_required
@@ -1048,6 +1003,7 @@ def add_sale():
     )
     db.session.add(sale)
     db.session.commit()
+    invalidate_count_cache(SalesInvoice)
     flash('تم إضافة فاتورة المبيعات بنجاح', 'success')
     return redirect(url_for('sales'))
 
@@ -1056,128 +1012,19 @@ def add_sale():
 @app.route('/expenses')
 @login_required
 def expenses():
-    expenses = Expense.query.all()
-    return render_template_string('''
-    <!DOCTYPE html>
-    <html dir="rtl" lang="ar">
-    <head>
-        <meta charset="UTF-8">
-        <title>إدارة المصروفات</title>
-        <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.rtl.min.css" rel="stylesheet">
-        <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css" rel="stylesheet">
-        <style>body { background-color: #f8f9fa; } .navbar { background: linear-gradient(45deg, #667eea, #764ba2) !important; }</style>
-    </head>
-    <body>
-        <nav class="navbar navbar-expand-lg navbar-dark">
-            <div class="container">
-                <a class="navbar-brand" href="{{ url_for('dashboard') }}">
-                    <i class="fas fa-calculator me-2"></i>نظام المحاسبة
-                </a>
-                <div class="navbar-nav ms-auto">
-                    <a class="nav-link" href="{{ url_for('dashboard') }}">الرئيسية</a>
-                    <a class="nav-link" href="{{ url_for('logout') }}">خروج</a>
-                </div>
-            </div>
-        </nav>
-        <div class="container mt-4">
-            <div class="d-flex justify-content-between align-items-center mb-4">
-                <h2><i class="fas fa-receipt me-2"></i>إدارة المصروفات</h2>
-                <button class="btn btn-primary" data-bs-toggle="modal" data-bs-target="#addModal">
-                    <i class="fas fa-plus me-2"></i>إضافة مصروف
-                </button>
-            </div>
-            <div class="card">
-                <div class="card-body">
-                    <table class="table table-striped">
-                        <thead>
-                            <tr><th>التاريخ</th><th>الوصف</th><th>الفئة</th><th>المبلغ</th><th>طريقة الدفع</th><th>الإجراءات</th></tr>
-                        </thead>
-                        <tbody>
-                            {% for expense in expenses %}
-                            <tr>
-                                <td>{{ expense.date.strftime('%Y-%m-%d') }}</td>
-                                <td>{{ expense.description }}</td>
-                                <td><span class="badge bg-info">{{ expense.category }}</span></td>
-                                <td>{{ "%.2f"|format(expense.amount) }} ر.س</td>
-                                <td>
-                                    {% if expense.payment_method == 'cash' %}نقدي
-                                    {% elif expense.payment_method == 'bank_transfer' %}تحويل بنكي
-                                    {% elif expense.payment_method == 'credit_card' %}بطاقة ائتمان
-                                    {% else %}{{ expense.payment_method }}
-                                    {% endif %}
-                                </td>
-                                <td>
-                                    <button class="btn btn-sm btn-outline-primary"><i class="fas fa-edit"></i></button>
-                                    <button class="btn btn-sm btn-outline-danger"><i class="fas fa-trash"></i></button>
-                                </td>
-                            </tr>
-                            {% endfor %}
-                        </tbody>
-                    </table>
-                </div>
-            </div>
-        </div>
-
-        <!-- Modal -->
-        <div class="modal fade" id="addModal">
-            <div class="modal-dialog">
-                <div class="modal-content">
-                    <div class="modal-header">
-                        <h5 class="modal-title">إضافة مصروف جديد</h5>
-                        <button type="button" class="btn-close" data-bs-dismiss="modal"></button>
-                    </div>
-                    <form method="POST" action="{{ url_for('add_expense') }}">
-                        <div class="modal-body">
-                            <div class="mb-3">
-                                <label class="form-label">وصف المصروف *</label>
-                                <input type="text" class="form-control" name="description" required>
-                            </div>
-                            <div class="row">
-                                <div class="col-md-6">
-                                    <div class="mb-3">
-                                        <label class="form-label">المبلغ *</label>
-                                        <input type="number" step="0.01" class="form-control" name="amount" required>
-                                    </div>
-                                </div>
-                                <div class="col-md-6">
-                                    <div class="mb-3">
-                                        <label class="form-label">الفئة *</label>
-                                        <select class="form-control" name="category" required>
-                                            <option value="">اختر الفئة</option>
-                                            <option value="مرافق">مرافق</option>
-                                            <option value="صيانة">صيانة</option>
-                                            <option value="مواصلات">مواصلات</option>
-                                            <option value="مكتبية">مكتبية</option>
-                                            <option value="أخرى">أخرى</option>
-                                        </select>
-                                    </div>
-                                </div>
-                            </div>
-                            <div class="mb-3">
-                                <label class="form-label">طريقة الدفع</label>
-                                <select class="form-control" name="payment_method">
-                                    <option value="cash">نقدي</option>
-                                    <option value="bank_transfer">تحويل بنكي</option>
-                                    <option value="credit_card">بطاقة ائتمان</option>
-                                </select>
-                            </div>
-                            <div class="mb-3">
-                                <label class="form-label">رقم الإيصال</label>
-                                <input type="text" class="form-control" name="receipt_number">
-                            </div>
-                        </div>
-                        <div class="modal-footer">
-                            <button type="button" class="btn btn-secondary" data-bs-dismiss="modal">إلغاء</button>
-                            <button type="submit" class="btn btn-primary">حفظ</button>
-                        </div>
-                    </form>
-                </div>
-            </div>
-        </div>
-        <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js"></script>
-    </body>
-    </html>
-    ''', expenses=expenses)
+    page = paginate_list(
+        Expense,
+        sort_fields={'date': (Expense.date, 'التاريخ'), 'amount': (Expense.amount, 'المبلغ')},
+        default_sort='date',
+        default_order='desc',
+        filters=[
+            ListFilter('q', 'الوصف', lambda query, value: query.filter(Expense.description.contains(value))),
+            ListFilter('category', 'الفئة', lambda query, value: query.filter(Expense.category == value)),
+            ListFilter('payment_method', 'طريقة الدفع', lambda query, value: query.filter(Expense.payment_method == value),
+                       kind='select', options=[('cash', 'نقدي'), ('bank_transfer', 'تحويل بنكي'), ('check', 'شيك')]),
+        ] + date_range_filters(Expense)
+    )
+    return render_template('complete/expenses.html', expenses=page.items, page=page)
 
 @app.route('/add_expense', methods=['POST'])
 @login_required
@@ -1191,248 +1038,26 @@ def add_expense():
     )
     db.session.add(expense)
     db.session.commit()
+    invalidate_count_cache(Expense)
     flash('تم إضافة المصروف بنجاح', 'success')
     return redirect(url_for('expenses'))
 
-# ===== إدارة الموردين =====
-
-@app.route('/suppliers')
-@login_required
-def suppliers():
-    suppliers = Supplier.query.all()
-    return render_template_string('''
-    <!DOCTYPE html>
-    <html dir="rtl" lang="ar">
-    <head>
-        <meta charset="UTF-8">
-        <title>إدارة الموردين</title>
-        <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.rtl.min.css" rel="stylesheet">
-        <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css" rel="stylesheet">
-        <style>body { background-color: #f8f9fa; } .navbar { background: linear-gradient(45deg, #667eea, #764ba2) !important; }</style>
-    </head>
-    <body>
-        <nav class="navbar navbar-expand-lg navbar-dark">
-            <div class="container">
-                <a class="navbar-brand" href="{{ url_for('dashboard') }}">
-                    <i class="fas fa-calculator me-2"></i>نظام المحاسبة
-                </a>
-                <div class="navbar-nav ms-auto">
-                    <a class="nav-link" href="{{ url_for('dashboard') }}">الرئيسية</a>
-                    <a class="nav-link" href="{{ url_for('logout') }}">خروج</a>
-                </div>
-            </div>
-        </nav>
-        <div class="container mt-4">
-            <div class="d-flex justify-content-between align-items-center mb-4">
-                <h2><i class="fas fa-industry me-2"></i>إدارة الموردين</h2>
-                <button class="btn btn-primary" data-bs-toggle="modal" data-bs-target="#addModal">
-                    <i class="fas fa-plus me-2"></i>إضافة مورد
-                </button>
-            </div>
-            <div class="card">
-                <div class="card-body">
-                    <table class="table table-striped">
-                        <thead>
-                            <tr><th>الرقم</th><th>اسم المورد</th><th>الهاتف</th><th>البريد</th><th>الرقم الضريبي</th><th>الإجراءات</th></tr>
-                        </thead>
-                        <tbody>
-                            {% for supplier in suppliers %}
-                            <tr>
-                                <td>{{ supplier.id }}</td>
-                                <td>{{ supplier.name }}</td>
-                                <td>{{ supplier.phone or '-' }}</td>
-                                <td>{{ supplier.email or '-' }}</td>
-                                <td>{{ supplier.tax_number or '-' }}</td>
-                                <td>
-                                    <button class="btn btn-sm btn-outline-primary"><i class="fas fa-edit"></i></button>
-                                    <button class="btn btn-sm btn-outline-danger"><i class="fas fa-trash"></i></button>
-                                </td>
-                            </tr>
-                            {% endfor %}
-                        </tbody>
-                    </table>
-                </div>
-            </div>
-        </div>
-
-        <!-- Modal -->
-        <div class="modal fade" id="addModal">
-            <div class="modal-dialog">
-                <div class="modal-content">
-                    <div class="modal-header">
-                        <h5 class="modal-title">إضافة مورد جديد</h5>
-                        <button type="button" class="btn-close" data-bs-dismiss="modal"></button>
-                    </div>
-                    <form method="POST" action="{{ url_for('add_supplier') }}">
-                        <div class="modal-body">
-                            <div class="mb-3">
-                                <label class="form-label">اسم المورد *</label>
-                                <input type="text" class="form-control" name="name" required>
-                            </div>
-                            <div class="mb-3">
-                                <label class="form-label">الهاتف</label>
-                                <input type="text" class="form-control" name="phone">
-                            </div>
-                            <div class="mb-3">
-                                <label class="form-label">البريد الإلكتروني</label>
-                                <input type="email" class="form-control" name="email">
-                            </div>
-                            <div class="mb-3">
-                                <label class="form-label">الرقم الضريبي</label>
-                                <input type="text" class="form-control" name="tax_number">
-                            </div>
-                            <div class="mb-3">
-                                <label class="form-label">العنوان</label>
-                                <textarea class="form-control" name="address" rows="2"></textarea>
-                            </div>
-                        </div>
-                        <div class="modal-footer">
-                            <button type="button" class="btn btn-secondary" data-bs-dismiss="modal">إلغاء</button>
-                            <button type="submit" class="btn btn-primary">حفظ</button>
-                        </div>
-                    </form>
-                </div>
-            </div>
-        </div>
-        <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js"></script>
-    </body>
-    </html>
-    ''', suppliers=suppliers)
-
-@app.route('/add_supplier', methods=['POST'])
-@login_required
-def add_supplier():
-    supplier = Supplier(
-        name=request.form['name'],
-        phone=request.form.get('phone'),
-        email=request.form.get('email'),
-        tax_number=request.form.get('tax_number'),
-        address=request.form.get('address')
-    )
-    db.session.add(supplier)
-    db.session.commit()
-    flash('تم إضافة المورد بنجاح', 'success')
-    return redirect(url_for('suppliers'))
-
 # ===== إدارة الموظفين =====
 
 @app.route('/employees')
 @login_required
 def employees():
-    employees = Employee.query.all()
-    return render_template_string('''
-    <!DOCTYPE html>
-    <html dir="rtl" lang="ar">
-    <head>
-        <meta charset="UTF-8">
-        <title>إدارة الموظفين</title>
-        <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.rtl.min.css" rel="stylesheet">
-        <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css" rel="stylesheet">
-        <style>body { background-color: #f8f9fa; } .navbar { background: linear-gradient(45deg, #667eea, #764ba2) !important; }</style>
-    </head>
-    <body>
-        <nav class="navbar navbar-expand-lg navbar-dark">
-            <div class="container">
-                <a class="navbar-brand" href="{{ url_for('dashboard') }}">
-                    <i class="fas fa-calculator me-2"></i>نظام المحاسبة
-                </a>
-                <div class="navbar-nav ms-auto">
-                    <a class="nav-link" href="{{ url_for('dashboard') }}">الرئيسية</a>
-                    <a class="nav-link" href="{{ url_for('logout') }}">خروج</a>
-                </div>
-            </div>
-        </nav>
-        <div class="container mt-4">
-            <div class="d-flex justify-content-between align-items-center mb-4">
-                <h2><i class="fas fa-user-tie me-2"></i>إدارة الموظفين</h2>
-                <button class="btn btn-primary" data-bs-toggle="modal" data-bs-target="#addModal">
-                    <i class="fas fa-plus me-2"></i>إضافة موظف
-                </button>
-            </div>
-            <div class="card">
-                <div class="card-body">
-                    <table class="table table-striped">
-                        <thead>
-                            <tr><th>الرقم</th><th>اسم الموظف</th><th>المنصب</th><th>الراتب</th><th>تاريخ التوظيف</th><th>الحالة</th><th>الإجراءات</th></tr>
-                        </thead>
-                        <tbody>
-                            {% for employee in employees %}
-                            <tr>
-                                <td>{{ employee.id }}</td>
-                                <td>{{ employee.name }}</td>
-                                <td>{{ employee.position }}</td>
-                                <td>{{ "%.2f"|format(employee.salary) }} ر.س</td>
-                                <td>{{ employee.hire_date.strftime('%Y-%m-%d') }}</td>
-                                <td>
-                                    <span class="badge {% if employee.status == 'active' %}bg-success{% else %}bg-danger{% endif %}">
-                                        {% if employee.status == 'active' %}نشط{% else %}غير نشط{% endif %}
-                                    </span>
-                                </td>
-                                <td>
-                                    <button class="btn btn-sm btn-outline-primary"><i class="fas fa-edit"></i></button>
-                                    <button class="btn btn-sm btn-outline-info"><i class="fas fa-eye"></i></button>
-                                </td>
-                            </tr>
-                            {% endfor %}
-                        </tbody>
-                    </table>
-                </div>
-            </div>
-        </div>
-
-        <!-- Modal -->
-        <div class="modal fade" id="addModal">
-            <div class="modal-dialog">
-                <div class="modal-content">
-                    <div class="modal-header">
-                        <h5 class="modal-title">إضافة موظف جديد</h5>
-                        <button type="button" class="btn-close" data-bs-dismiss="modal"></button>
-                    </div>
-                    <form method="POST" action="{{ url_for('add_employee') }}">
-                        <div class="modal-body">
-                            <div class="mb-3">
-                                <label class="form-label">اسم الموظف *</label>
-                                <input type="text" class="form-control" name="name" required>
-                            </div>
-                            <div class="row">
-                                <div class="col-md-6">
-                                    <div class="mb-3">
-                                        <label class="form-label">المنصب *</label>
-                                        <input type="text" class="form-control" name="position" required>
-                                    </div>
-                                </div>
-                                <div class="col-md-6">
-                                    <div class="mb-3">
-                                        <label class="form-label">الراتب *</label>
-                                        <input type="number" step="0.01" class="form-control" name="salary" required>
-                                    </div>
-                                </div>
-                            </div>
-                            <div class="mb-3">
-                                <label class="form-label">الهاتف</label>
-                                <input type="text" class="form-control" name="phone">
-                            </div>
-                            <div class="mb-3">
-                                <label class="form-label">البريد الإلكتروني</label>
-                                <input type="email" class="form-control" name="email">
-                            </div>
-                            <div class="mb-3">
-                                <label class="form-label">تاريخ التوظيف *</label>
-                                <input type="date" class="form-control" name="hire_date" required>
-                            </div>
-                        </div>
-                        <div class="modal-footer">
-                            <button type="button" class="btn btn-secondary" data-bs-dismiss="modal">إلغاء</button>
-                            <button type="submit" class="btn btn-primary">حفظ</button>
-                        </div>
-                    </form>
-                </div>
-            </div>
-        </div>
-        <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js"></script>
-    </body>
-    </html>
-    ''', employees=employees)
+    page = paginate_list(
+        Employee,
+        sort_fields={'name': (Employee.name, 'الاسم'), 'hire_date': (Employee.hire_date, 'تاريخ التعيين')},
+        default_sort='name',
+        filters=[
+            ListFilter('q', 'بحث', lambda query, value: query.filter(Employee.name.contains(value))),
+            ListFilter('status', 'الحالة', lambda query, value: query.filter(Employee.status == value),
+                       kind='select', options=[('active', 'نشط'), ('inactive', 'غير نشط')]),
+        ]
+    )
+    return render_template('complete/employees.html', employees=page.items, page=page)
 
 @app.route('/add_employee', methods=['POST'])
 @login_required
@@ -1448,6 +1073,7 @@ def add_employee():
     )
     db.session.add(employee)
     db.session.commit()
+    invalidate_count_cache(Employee)
     flash('تم إضافة الموظف بنجاح', 'success')
     return redirect(url_for('employees'))
 
@@ -1456,127 +1082,21 @@ def add_employee():
 @app.route('/purchases')
 @login_required
 def purchases():
-    purchases = PurchaseInvoice.query.all()
-    suppliers = Supplier.query.all()
-    return render_template_string('''
-    <!DOCTYPE html>
-    <html dir="rtl" lang="ar">
-    <head>
-        <meta charset="UTF-8">
-        <title>إدارة المشتريات</title>
-        <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.rtl.min.css" rel="stylesheet">
-        <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css" rel="stylesheet">
-        <style>body { background-color: #f8f9fa; } .navbar { background: linear-gradient(45deg, #667eea, #764ba2) !important; }</style>
-    </head>
-    <body>
-        <nav class="navbar navbar-expand-lg navbar-dark">
-            <div class="container">
-                <a class="navbar-brand" href="{{ url_for('dashboard') }}">
-                    <i class="fas fa-calculator me-2"></i>نظام المحاسبة
-                </a>
-                <div class="navbar-nav ms-auto">
-                    <a class="nav-link" href="{{ url_for('dashboard') }}">الرئيسية</a>
-                    <a class="nav-link" href="{{ url_for('logout') }}">خروج</a>
-                </div>
-            </div>
-        </nav>
-        <div class="container mt-4">
-            <div class="d-flex justify-content-between align-items-center mb-4">
-                <h2><i class="fas fa-truck me-2"></i>إدارة المشتريات</h2>
-                <button class="btn btn-primary" data-bs-toggle="modal" data-bs-target="#addModal">
-                    <i class="fas fa-plus me-2"></i>فاتورة جديدة
-                </button>
-            </div>
-            <div class="card">
-                <div class="card-body">
-                    <table class="table table-striped">
-                        <thead>
-                            <tr><th>رقم الفاتورة</th><th>المورد</th><th>التاريخ</th><th>المبلغ</th><th>الحالة</th><th>الإجراءات</th></tr>
-                        </thead>
-                        <tbody>
-                            {% for purchase in purchases %}
-                            <tr>
-                                <td>{{ purchase.invoice_number }}</td>
-                                <td>{{ purchase.supplier.name if purchase.supplier else '-' }}</td>
-                                <td>{{ purchase.date.strftime('%Y-%m-%d') }}</td>
-                                <td>{{ "%.2f"|format(purchase.total) }} ر.س</td>
-                                <td>
-                                    <span class="badge {% if purchase.status == 'received' %}bg-success{% elif purchase.status == 'pending' %}bg-warning{% else %}bg-danger{% endif %}">
-                                        {% if purchase.status == 'received' %}مستلمة{% elif purchase.status == 'pending' %}معلقة{% else %}ملغية{% endif %}
-                                    </span>
-                                </td>
-                                <td>
-                                    <button class="btn btn-sm btn-outline-info"><i class="fas fa-eye"></i></button>
-                                    <button class="btn btn-sm btn-outline-primary"><i class="fas fa-edit"></i></button>
-                                </td>
-                            </tr>
-                            {% endfor %}
-                        </tbody>
-                    </table>
-                </div>
-            </div>
-        </div>
-
-        <!-- Modal -->
-        <div class="modal fade" id="addModal">
-            <div class="modal-dialog modal-lg">
-                <div class="modal-content">
-                    <div class="modal-header">
-                        <h5 class="modal-title">فاتورة مشتريات جديدة</h5>
-                        <button type="button" class="btn-close" data-bs-dismiss="modal"></button>
-                    </div>
-                    <form method="POST" action="{{ url_for('add_purchase') }}">
-                        <div class="modal-body">
-                            <div class="row">
-                                <div class="col-md-6">
-                                    <div class="mb-3">
-                                        <label class="form-label">رقم الفاتورة *</label>
-                                        <input type="text" class="form-control" name="invoice_number" value="PUR-{{ range(1000, 9999) | random }}" required>
-                                    </div>
-                                </div>
-                                <div class="col-md-6">
-                                    <div class="mb-3">
-                                        <label class="form-label">المورد *</label>
-                                        <select class="form-control" name="supplier_id" required>
-                                            <option value="">اختر المورد</option>
-                                            {% for supplier in suppliers %}
-                                            <option value="{{ supplier.id }}">{{ supplier.name }}</option>
-                                            {% endfor %}
-                                        </select>
-                                    </div>
-                                </div>
-                            </div>
-                            <div class="row">
-                                <div class="col-md-6">
-                                    <div class="mb-3">
-                                        <label class="form-label">المبلغ الفرعي *</label>
-                                        <input type="number" step="0.01" class="form-control" name="subtotal" required>
-                                    </div>
-                                </div>
-                                <div class="col-md-6">
-                                    <div class="mb-3">
-                                        <label class="form-label">الضريبة</label>
-                                        <input type="number" step="0.01" class="form-control" name="tax_amount" value="0">
-                                    </div>
-                                </div>
-                            </div>
-                            <div class="mb-3">
-                                <label class="form-label">ملاحظات</label>
-                                <textarea class="form-control" name="notes" rows="2"></textarea>
-                            </div>
-                        </div>
-                        <div class="modal-footer">
-                            <button type="button" class="btn btn-secondary" data-bs-dismiss="modal">إلغاء</button>
-                            <button type="submit" class="btn btn-primary">حفظ</button>
-                        </div>
-                    </form>
-                </div>
-            </div>
-        </div>
-        <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js"></script>
-    </body>
-    </html>
-    ''', purchases=purchases, suppliers=suppliers)
+    page = paginate_list(
+        PurchaseInvoice,
+        sort_fields={'date': (PurchaseInvoice.date, 'التاريخ'), 'total': (PurchaseInvoice.total, 'المبلغ')},
+        default_sort='date',
+        default_order='desc',
+        filters=[
+            ListFilter('q', 'رقم الفاتورة', lambda query, value: query.filter(PurchaseInvoice.invoice_number.startswith(value))),
+            ListFilter('status', 'الحالة', lambda query, value: query.filter(PurchaseInvoice.status == value),
+                       kind='select', options=INVOICE_STATUS_OPTIONS),
+        ] + date_range_filters(PurchaseInvoice),
+        options=[joinedload(PurchaseInvoice.supplier)]
+    )
+    # قائمة الموردين للنموذج: المعرف والاسم فقط
+    suppliers = db.session.query(Supplier.id, Supplier.name).order_by(Supplier.name).all()
+    return render_template('complete/purchases.html', purchases=page.items, page=page, suppliers=suppliers)
 
 @app.route('/add_purchase', methods=['POST'])
 @login_required
@@ -1594,163 +1114,429 @@ def add_purchase():
     )
     db.session.add(purchase)
     db.session.commit()
+    invalidate_count_cache(PurchaseInvoice)
     flash('تم إضافة فاتورة المشتريات بنجاح', 'success')
     return redirect(url_for('purchases'))
 
+# ===== الاستيراد الجماعي من CSV =====
+
+MAX_IMPORT_BATCH_SIZE = 10000
+MAX_IMPORT_ERRORS = 1000  # أخطاء الصفوف المحفوظة في النتيجة (الباقي يُعدّ فقط)
+
+def _csv_value(row, name):
+    return (row.get(name) or '').strip()
+
+def _csv_required(row, name):
+    value = _csv_value(row, name)
+    if not value:
+        raise ValueError(f'الحقل {name} مطلوب')
+    return value
+
+def _csv_decimal(row, name, default=None):
+    value = _csv_value(row, name)
+    if not value:
+        if default is None:
+            raise ValueError(f'الحقل {name} مطلوب')
+        return default
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        raise ValueError(f'قيمة رقمية غير صالحة في {name}: {value}')
+
+def _csv_int(row, name, required=False):
+    value = _csv_required(row, name) if required else _csv_value(row, name)
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f'رقم غير صالح في {name}: {value}')
+
+def _csv_date(row, name='date'):
+    value = _csv_value(row, name)
+    if not value:
+        return date.today()
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'تاريخ غير صالح في {name}: {value} (الصيغة YYYY-MM-DD)')
+
+def _csv_choice(row, name, choices, default):
+    value = _csv_value(row, name) or default
+    if value not in choices:
+        raise ValueError(f'قيمة غير مسموحة في {name}: {value}')
+    return value
+
+def _parse_invoice_row(row, party_field, party_required):
+    subtotal = _csv_decimal(row, 'subtotal')
+    tax_amount = _csv_decimal(row, 'tax_amount', Decimal('0'))
+    return {
+        'invoice_number': _csv_required(row, 'invoice_number'),
+        party_field: _csv_int(row, party_field, party_required),
+        'date': _csv_date(row),
+        'subtotal': subtotal,
+        'tax_amount': tax_amount,
+        'total': _csv_decimal(row, 'total', subtotal + tax_amount),
+        'status': _csv_choice(row, 'status', dict(INVOICE_STATUS_OPTIONS), 'pending'),
+        'notes': _csv_value(row, 'notes') or None,
+    }
+
+def _parse_expense_row(row):
+    return {
+        'description': _csv_required(row, 'description'),
+        'amount': _csv_decimal(row, 'amount'),
+        'category': _csv_required(row, 'category'),
+        'date': _csv_date(row),
+        'payment_method': _csv_choice(row, 'payment_method', ('cash', 'bank_transfer', 'check'), 'cash'),
+        'receipt_number': _csv_value(row, 'receipt_number') or None,
+        'notes': _csv_value(row, 'notes') or None,
+    }
+
+class CsvImportSpec:
+    """وصف استيراد جدول: المحلل والأعمدة المطلوبة والتحقق من التكرار والمراجع"""
+
+    def __init__(self, model, parse, required_columns, endpoint, unique=None, references=None):
+        self.model = model
+        self.parse = parse
+        self.required_columns = set(required_columns)
+        self.endpoint = endpoint
+        self.unique = unique
+        self.references = references or {}
+
+IMPORT_SPECS = {
+    'sales': CsvImportSpec(
+        SalesInvoice, lambda row: _parse_invoice_row(row, 'customer_id', False),
+        ('invoice_number', 'subtotal'), 'sales',
+        unique='invoice_number', references={'customer_id': Customer}
+    ),
+    'purchases': CsvImportSpec(
+        PurchaseInvoice, lambda row: _parse_invoice_row(row, 'supplier_id', True),
+        ('invoice_number', 'supplier_id', 'subtotal'), 'purchases',
+        unique='invoice_number', references={'supplier_id': Supplier}
+    ),
+    'expenses': CsvImportSpec(
+        Expense, _parse_expense_row, ('description', 'amount', 'category'), 'expenses'
+    ),
+}
+
+def _record_import_error(result, line, message):
+    result['failed'] += 1
+    if len(result['errors']) < MAX_IMPORT_ERRORS:
+        result['errors'].append({'line': line, 'error': message})
+
+def _insert_import_rows(model, rows):
+    """إدراج دفعة بـ executemany وتحديث العدادات التي لا تمر عبر أحداث ORM"""
+    connection = db.session.connection()
+    connection.execute(model.__table__.insert(), rows)
+
+    stat, field = DASHBOARD_COUNTERS[model]
+    _apply_dashboard_delta(connection, stat,
+                           len(rows) if field is None else sum(_as_decimal(row[field]) for row in rows))
+
+    months = {}
+    for name, source in MONTHLY_ROLLUP_SOURCES.get(model, ()):
+        for row in rows:
+            totals = months.setdefault(month_start(row['date']), {})
+            totals[name] = totals.get(name, Decimal('0')) + _as_decimal(row[source])
+    for month, deltas in months.items():
+        _apply_monthly_delta(connection, month, deltas)
+
+def _import_chunk(spec, chunk, seen, result):
+    valid = []
+    for line, row in chunk:
+        result['rows'] += 1
+        try:
+            values = spec.parse(row)
+        except ValueError as error:
+            _record_import_error(result, line, str(error))
+            continue
+        if spec.unique:
+            key = values[spec.unique]
+            if key in seen:
+                _record_import_error(result, line, f'{spec.unique} مكرر في الملف: {key}')
+                continue
+            seen.add(key)
+        valid.append((line, values))
+
+    # التحقق من التكرار والمراجع باستعلام واحد لكل دفعة
+    if spec.unique and valid:
+        column = getattr(spec.model, spec.unique)
+        existing = {value for (value,) in db.session.query(column).filter(
+            column.in_([values[spec.unique] for _, values in valid]))}
+        for line, values in valid:
+            if values[spec.unique] in existing:
+                _record_import_error(result, line, f'{spec.unique} موجود مسبقاً: {values[spec.unique]}')
+        valid = [(line, values) for line, values in valid if values[spec.unique] not in existing]
+
+    for field, reference in spec.references.items():
+        ids = {values[field] for _, values in valid if values[field] is not None}
+        if not ids:
+            continue
+        known = {value for (value,) in db.session.query(reference.id).filter(reference.id.in_(ids))}
+        for line, values in valid:
+            if values[field] is not None and values[field] not in known:
+                _record_import_error(result, line, f'{field} غير موجود: {values[field]}')
+        valid = [(line, values) for line, values in valid
+                 if values[field] is None or values[field] in known]
+
+    if not valid:
+        return
+
+    try:
+        _insert_import_rows(spec.model, [values for _, values in valid])
+        db.session.commit()
+        result['inserted'] += len(valid)
+    except SQLAlchemyError:
+        # فشل الدفعة (مثلاً إدراج متزامن لنفس الرقم): إعادة المحاولة صفاً صفاً لتحديد الصف المعطوب
+        db.session.rollback()
+        for line, values in valid:
+            try:
+                _insert_import_rows(spec.model, [values])
+                db.session.commit()
+                result['inserted'] += 1
+            except SQLAlchemyError as error:
+                db.session.rollback()
+                _record_import_error(result, line, str(getattr(error, 'orig', error)))
+
+def import_csv(kind, stream, batch_size=None):
+    """استيراد ملف CSV بالتدفق على دفعات، كل دفعة في معاملة واحدة"""
+    spec = IMPORT_SPECS[kind]
+    batch_size = max(1, min(batch_size or app.config['IMPORT_BATCH_SIZE'], MAX_IMPORT_BATCH_SIZE))
+
+    reader = csv.DictReader(stream)
+    missing = spec.required_columns - set(reader.fieldnames or ())
+    if missing:
+        raise ValueError(f'أعمدة مفقودة في الملف: {", ".join(sorted(missing))}')
+
+    result = {'rows': 0, 'inserted': 0, 'failed': 0, 'errors': []}
+    seen = set()
+    rows = ((reader.line_num, row) for row in reader)
+    try:
+        while True:
+            chunk = list(islice(rows, batch_size))
+            if not chunk:
+                break
+            _import_chunk(spec, chunk, seen, result)
+    finally:
+        invalidate_count_cache(spec.model)
+    return result
+
+@app.route('/import/<kind>', methods=['POST'])
+@login_required
+def import_records(kind):
+    spec = IMPORT_SPECS.get(kind)
+    if spec is None:
+        abort(404)
+    wants_json = request.accept_mimetypes.best == 'application/json'
+
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        if wants_json:
+            return jsonify({'error': 'يرجى اختيار ملف CSV'}), 400
+        flash('يرجى اختيار ملف CSV', 'error')
+        return redirect(url_for(spec.endpoint))
+
+    stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+    try:
+        result = import_csv(kind, stream, request.form.get('batch_size', type=int))
+    except (ValueError, csv.Error) as error:
+        if wants_json:
+            return jsonify({'error': str(error)}), 400
+        flash(f'تعذر استيراد الملف: {error}', 'error')
+        return redirect(url_for(spec.endpoint))
+
+    if wants_json:
+        return jsonify(result)
+    flash(f"تم استيراد {result['inserted']} من أصل {result['rows']} سجل", 'success')
+    for error in result['errors'][:10]:
+        flash(f"السطر {error['line']}: {error['error']}", 'error')
+    return redirect(url_for(spec.endpoint))
+
+@app.cli.command('import-csv')
+@click.argument('kind', type=click.Choice(sorted(IMPORT_SPECS)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--batch-size', type=int, default=None, help='عدد الصفوف في كل معاملة')
+def import_csv_command(kind, path, batch_size):
+    """استيراد فواتير المبيعات أو المشتريات أو المصروفات من ملف CSV"""
+    start = time.perf_counter()
+    with open(path, encoding='utf-8-sig', newline='') as stream:
+        result = import_csv(kind, stream, batch_size)
+    elapsed = time.perf_counter() - start
+    print(f"✅ تم استيراد {result['inserted']} من أصل {result['rows']} سجل "
+          f"في {elapsed:.1f} ثانية ({result['inserted'] / max(elapsed, 1e-9):.0f} سجل/ثانية)")
+    for error in result['errors'][:20]:
+        print(f"❌ السطر {error['line']}: {error['error']}")
+    if result['failed'] > 20:
+        print(f"... و{result['failed'] - 20} خطأ آخر")
+
+# ===== التصدير بالتدفق (CSV / Excel) =====
+
+EXPORT_BATCH_SIZE = 2000  # صفوف تُقرأ من المؤشر وتُرسل في كل دفعة
+
+class ExportSpec:
+    """وصف تصدير جدول: الأعمدة بعناوينها والجداول المرتبطة"""
+
+    def __init__(self, model, columns, joins=()):
+        self.model = model
+        self.columns = columns
+        self.joins = joins
+
+EXPORT_SPECS = {
+    'sales': ExportSpec(SalesInvoice, [
+        ('رقم الفاتورة', SalesInvoice.invoice_number), ('التاريخ', SalesInvoice.date),
+        ('العميل', Customer.name), ('المبلغ قبل الضريبة', SalesInvoice.subtotal),
+        ('الضريبة', SalesInvoice.tax_amount), ('الإجمالي', SalesInvoice.total),
+        ('الحالة', SalesInvoice.status), ('ملاحظات', SalesInvoice.notes),
+    ], joins=[(Customer, SalesInvoice.customer_id == Customer.id)]),
+    'purchases': ExportSpec(PurchaseInvoice, [
+        ('رقم الفاتورة', PurchaseInvoice.invoice_number), ('التاريخ', PurchaseInvoice.date),
+        ('المورد', Supplier.name), ('المبلغ قبل الضريبة', PurchaseInvoice.subtotal),
+        ('الضريبة', PurchaseInvoice.tax_amount), ('الإجمالي', PurchaseInvoice.total),
+        ('الحالة', PurchaseInvoice.status), ('ملاحظات', PurchaseInvoice.notes),
+    ], joins=[(Supplier, PurchaseInvoice.supplier_id == Supplier.id)]),
+    'expenses': ExportSpec(Expense, [
+        ('الوصف', Expense.description), ('التاريخ', Expense.date), ('المبلغ', Expense.amount),
+        ('الفئة', Expense.category), ('طريقة الدفع', Expense.payment_method),
+        ('رقم الإيصال', Expense.receipt_number), ('ملاحظات', Expense.notes),
+    ]),
+    'payments': ExportSpec(Payment, [
+        ('التاريخ', Payment.date), ('النوع', Payment.type), ('المبلغ', Payment.amount),
+        ('الوصف', Payment.description), ('طريقة الدفع', Payment.payment_method),
+        ('رقم المرجع', Payment.reference_number), ('العميل', Customer.name), ('المورد', Supplier.name),
+    ], joins=[(Customer, Payment.customer_id == Customer.id), (Supplier, Payment.supplier_id == Supplier.id)]),
+}
+
+def export_date_range(args):
+    """نطاق نصف مفتوح من year أو date_from/date_to (شامل لتاريخ النهاية)"""
+    year = args.get('year', type=int)
+    if year:
+        return date(year, 1, 1), date(year + 1, 1, 1)
+    start = end = None
+    if args.get('date_from'):
+        start = date.fromisoformat(args['date_from'])
+    if args.get('date_to'):
+        end = date.fromisoformat(args['date_to']) + timedelta(days=1)
+    return start, end
+
+def export_rows(spec, start=None, end=None):
+    """قراءة الصفوف كـ tuples عبر مؤشر خادم (stream_results) دون ملء خريطة الهوية"""
+    query = db.session.query(*[column for _, column in spec.columns]).select_from(spec.model)
+    for model, condition in spec.joins:
+        query = query.outerjoin(model, condition)
+    if start:
+        query = query.filter(spec.model.date >= start)
+    if end:
+        query = query.filter(spec.model.date < end)
+    return query.order_by(spec.model.date, spec.model.id).yield_per(EXPORT_BATCH_SIZE)
+
+def generate_csv(headers, rows):
+    # العنوان يُرسل قبل تنفيذ الاستعلام، ثم دفعة نصية لكل EXPORT_BATCH_SIZE صف
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(headers)
+    yield '\ufeff' + buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    for count, row in enumerate(rows, start=1):
+        writer.writerow([safe_cell(value) for value in row])
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def generate_xlsx(headers, rows, title):
+    # مصنف للكتابة فقط: الصفوف تُكتب إلى ملف مؤقت والذاكرة ثابتة، ثم يُرسل الملف على أجزاء
+    # (zip لا يكتمل قبل آخر صف: أول بايت بعد انتهاء الاستعلام، CSV للتدفق المبكر)
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title)
+    sheet.append(headers)
+    for row in rows:
+        sheet.append([safe_cell(value) for value in row])
+    with tempfile.TemporaryFile() as handle:
+        workbook.save(handle)
+        handle.seek(0)
+        while True:
+            chunk = handle.read(64 * 1024)
+            if not chunk:
+                break
+            yield chunk
+
+def streaming_export(headers, rows, filename, fmt, title='Sheet'):
+    """استجابة تدفق لملف CSV أو XLSX"""
+    if fmt == 'xlsx':
+        body = generate_xlsx(headers, rows, title)
+        mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    else:
+        body = generate_csv(headers, rows)
+        mimetype = 'text/csv; charset=utf-8'
+    return Response(stream_with_context(body), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename={filename}.{fmt}',
+        'X-Accel-Buffering': 'no',
+    })
+
+@app.route('/export/<kind>')
+@login_required
+def export_records(kind):
+    spec = EXPORT_SPECS.get(kind)
+    fmt = request.args.get('format', 'csv')
+    if spec is None or fmt not in ('csv', 'xlsx'):
+        abort(404)
+    try:
+        start, end = export_date_range(request.args)
+    except ValueError:
+        abort(400)
+    rows = export_rows(spec, start, end)
+    suffix = f'-{start.isoformat()}' if start else ''
+    return streaming_export([label for label, _ in spec.columns], rows, f'{kind}{suffix}', fmt, kind)
+
 # ===== التقارير =====
 
 @app.route('/reports')
 @login_required
 def reports():
-    # إحصائيات شاملة
-    total_sales = db.session.query(db.func.sum(SalesInvoice.total)).scalar() or 0
-    total_purchases = db.session.query(db.func.sum(PurchaseInvoice.total)).scalar() or 0
-    total_expenses = db.session.query(db.func.sum(Expense.amount)).scalar() or 0
+    # إحصائيات شاملة من صف dashboard_stats
+    stats = get_dashboard_stats()
+    total_sales = stats.total_sales
+    total_purchases = stats.total_purchases
+    total_expenses = stats.total_expenses
     net_profit = total_sales - total_purchases - total_expenses
 
-    # إحصائيات شهرية
-    from sqlalchemy import extract
-    current_month_sales = db.session.query(db.func.sum(SalesInvoice.total)).filter(
-        extract('month', SalesInvoice.date) == datetime.now().month,
-        extract('year', SalesInvoice.date) == datetime.now().year
-    ).scalar() or 0
-
-    current_month_expenses = db.session.query(db.func.sum(Expense.amount)).filter(
-        extract('month', Expense.date) == datetime.now().month,
-        extract('year', Expense.date) == datetime.now().year
-    ).scalar() or 0
-
-    return render_template_string('''
-    <!DOCTYPE html>
-    <html dir="rtl" lang="ar">
-    <head>
-        <meta charset="UTF-8">
-        <title>التقارير المالية</title>
-        <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.rtl.min.css" rel="stylesheet">
-        <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css" rel="stylesheet">
-        <style>
-            body { background-color: #f8f9fa; }
-            .navbar { background: linear-gradient(45deg, #667eea, #764ba2) !important; }
-            .report-card {
-                background: linear-gradient(45deg, #28a745, #20c997);
-                color: white;
-                border-radius: 15px;
-                padding: 20px;
-                margin-bottom: 20px;
-            }
-            .report-card.expense {
-                background: linear-gradient(45deg, #dc3545, #fd7e14);
-            }
-            .report-card.profit {
-                background: linear-gradient(45deg, #6f42c1, #e83e8c);
-            }
-        </style>
-    </head>
-    <body>
-        <nav class="navbar navbar-expand-lg navbar-dark">
-            <div class="container">
-                <a class="navbar-brand" href="{{ url_for('dashboard') }}">
-                    <i class="fas fa-calculator me-2"></i>نظام المحاسبة
-                </a>
-                <div class="navbar-nav ms-auto">
-                    <a class="nav-link" href="{{ url_for('dashboard') }}">الرئيسية</a>
-                    <a class="nav-link" href="{{ url_for('logout') }}">خروج</a>
-                </div>
-            </div>
-        </nav>
-        <div class="container mt-4">
-            <h2><i class="fas fa-chart-bar me-2"></i>التقارير المالية</h2>
-            <p class="text-muted">تقارير شاملة عن الوضع المالي للشركة</p>
-
-            <!-- التقارير الإجمالية -->
-            <div class="row mt-4">
-                <div class="col-md-3">
-                    <div class="report-card text-center">
-                        <i class="fas fa-chart-line fa-2x mb-2"></i>
-                        <h4>{{ "%.2f"|format(total_sales) }} ر.س</h4>
-                        <p>إجمالي المبيعات</p>
-                    </div>
-                </div>
-                <div class="col-md-3">
-                    <div class="report-card expense text-center">
-                        <i class="fas fa-shopping-cart fa-2x mb-2"></i>
-                        <h4>{{ "%.2f"|format(total_purchases) }} ر.س</h4>
-                        <p>إجمالي المشتريات</p>
-                    </div>
-                </div>
-                <div class="col-md-3">
-                    <div class="report-card expense text-center">
-                        <i class="fas fa-receipt fa-2x mb-2"></i>
-                        <h4>{{ "%.2f"|format(total_expenses) }} ر.س</h4>
-                        <p>إجمالي المصروفات</p>
-                    </div>
-                </div>
-                <div class="col-md-3">
-                    <div class="report-card profit text-center">
-                        <i class="fas fa-coins fa-2x mb-2"></i>
-                        <h4>{{ "%.2f"|format(net_profit) }} ر.س</h4>
-                        <p>صافي الربح</p>
-                    </div>
-                </div>
-            </div>
-
-            <!-- التقارير الشهرية -->
-            <div class="row mt-4">
-                <div class="col-12">
-                    <h4><i class="fas fa-calendar-alt me-2"></i>تقرير الشهر الحالي</h4>
-                </div>
-            </div>
-            <div class="row">
-                <div class="col-md-6">
-                    <div class="card">
-                        <div class="card-body text-center">
-                            <i class="fas fa-chart-line fa-2x text-success mb-2"></i>
-                            <h4>{{ "%.2f"|format(current_month_sales) }} ر.س</h4>
-                            <p>مبيعات الشهر الحالي</p>
-                        </div>
-                    </div>
-                </div>
-                <div class="col-md-6">
-                    <div class="card">
-                        <div class="card-body text-center">
-                            <i class="fas fa-receipt fa-2x text-danger mb-2"></i>
-                            <h4>{{ "%.2f"|format(current_month_expenses) }} ر.س</h4>
-                            <p>مصروفات الشهر الحالي</p>
-                        </div>
-                    </div>
-                </div>
-            </div>
-
-            <!-- أزرار التقارير -->
-            <div class="row mt-4">
-                <div class="col-12">
-                    <div class="card">
-                        <div class="card-body">
-                            <h5><i class="fas fa-download me-2"></i>تصدير التقارير</h5>
-                            <div class="btn-group" role="group">
-                                <button class="btn btn-outline-primary">
-                                    <i class="fas fa-file-excel me-2"></i>تصدير Excel
-                                </button>
-                                <button class="btn btn-outline-danger">
-                                    <i class="fas fa-file-pdf me-2"></i>تصدير PDF
-                                </button>
-                                <button class="btn btn-outline-success">
-                                    <i class="fas fa-print me-2"></i>طباعة
-                                </button>
-                            </div>
-                        </div>
-                    </div>
-                </div>
-            </div>
-        </div>
-    </body>
-    </html>
-    ''', total_sales=total_sales, total_purchases=total_purchases,
-         total_expenses=total_expenses, net_profit=net_profit,
-         current_month_sales=current_month_sales, current_month_expenses=current_month_expenses)
+    # إحصائيات شهرية من جدول monthly_rollup
+    months = min(max(request.args.get('months', REPORT_MONTHS, type=int) or REPORT_MONTHS, 1),
+                 MAX_REPORT_MONTHS)
+    monthly = monthly_report(months)
+    current_month = monthly[0]
+
+    return render_template('complete/reports.html',
+                           total_sales=total_sales, total_purchases=total_purchases,
+                           total_expenses=total_expenses, net_profit=net_profit,
+                           current_month_sales=current_month.sales_total,
+                           current_month_expenses=current_month.expenses_total,
+                           monthly=monthly)
 
 # ===== API =====
 
+@app.route('/api/database')
+@login_required
+def api_database():
+    # حالة المحرك ومقاييس مجمع الاتصالات لمراقبة الأداء
+    engine = db.engine
+    stats = {
+        'dialect': engine.dialect.name,
+        'pool_class': type(engine.pool).__name__,
+        'pool': pool_metrics.snapshot(engine.pool),
+    }
+    if engine.dialect.name == 'sqlite':
+        with engine.connect() as connection:
+            stats['pragmas'] = {
+                name: connection.exec_driver_sql(f'PRAGMA {name}').scalar()
+                for name in ('journal_mode', 'synchronous', 'busy_timeout', 'cache_size')
+            }
+    return jsonify(stats)
+
 @app.route('/api/status')
 def api_status():
     return jsonify({
@@ -1775,135 +1561,15 @@ def api_status():
 @app.route('/customers')
 @login_required
 def customers():
-    customers = Customer.query.all()
-    return render_template_string('''
-    <!DOCTYPE html>
-    <html dir="rtl" lang="ar">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>إدارة العملاء - نظام المحاسبة</title>
-        <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.rtl.min.css" rel="stylesheet">
-        <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css" rel="stylesheet">
-        <style>
-            body { background-color: #f8f9fa; }
-            .navbar { background: linear-gradient(45deg, #667eea, #764ba2) !important; }
-        </style>
-    </head>
-    <body>
-        <nav class="navbar navbar-expand-lg navbar-dark">
-            <div class="container">
-                <a class="navbar-brand" href="{{ url_for('dashboard') }}">
-                    <i class="fas fa-calculator me-2"></i>نظام المحاسبة
-                </a>
-                <div class="navbar-nav ms-auto">
-                    <a class="nav-link" href="{{ url_for('dashboard') }}">
-                        <i class="fas fa-home me-1"></i>الرئيسية
-                    </a>
-                    <a class="nav-link" href="{{ url_for('logout') }}">
-                        <i class="fas fa-sign-out-alt me-1"></i>خروج
-                    </a>
-                </div>
-            </div>
-        </nav>
-
-        <div class="container mt-4">
-            <div class="row">
-                <div class="col-12">
-                    <div class="d-flex justify-content-between align-items-center mb-4">
-                        <h2><i class="fas fa-users me-2"></i>إدارة العملاء</h2>
-                        <button class="btn btn-primary" data-bs-toggle="modal" data-bs-target="#addCustomerModal">
-                            <i class="fas fa-plus me-2"></i>إضافة عميل جديد
-                        </button>
-                    </div>
-                </div>
-            </div>
-
-            <div class="card">
-                <div class="card-body">
-                    <div class="table-responsive">
-                        <table class="table table-striped">
-                            <thead>
-                                <tr>
-                                    <th>الرقم</th>
-                                    <th>اسم العميل</th>
-                                    <th>البريد الإلكتروني</th>
-                                    <th>الهاتف</th>
-                                    <th>الرقم الضريبي</th>
-                                    <th>تاريخ الإضافة</th>
-                                    <th>الإجراءات</th>
-                                </tr>
-                            </thead>
-                            <tbody>
-                                {% for customer in customers %}
-                                <tr>
-                                    <td>{{ customer.id }}</td>
-                                    <td>{{ customer.name }}</td>
-                                    <td>{{ customer.email or '-' }}</td>
-                                    <td>{{ customer.phone or '-' }}</td>
-                                    <td>{{ customer.tax_number or '-' }}</td>
-                                    <td>{{ customer.created_at.strftime('%Y-%m-%d') }}</td>
-                                    <td>
-                                        <button class="btn btn-sm btn-outline-primary">
-                                            <i class="fas fa-edit"></i>
-                                        </button>
-                                        <button class="btn btn-sm btn-outline-danger">
-                                            <i class="fas fa-trash"></i>
-                                        </button>
-                                    </td>
-                                </tr>
-                                {% endfor %}
-                            </tbody>
-                        </table>
-                    </div>
-                </div>
-            </div>
-        </div>
-
-        <!-- Modal إضافة عميل -->
-        <div class="modal fade" id="addCustomerModal" tabindex="-1">
-            <div class="modal-dialog">
-                <div class="modal-content">
-                    <div class="modal-header">
-                        <h5 class="modal-title">إضافة عميل جديد</h5>
-                        <button type="button" class="btn-close" data-bs-dismiss="modal"></button>
-                    </div>
-                    <form method="POST" action="{{ url_for('add_customer') }}">
-                        <div class="modal-body">
-                            <div class="mb-3">
-                                <label class="form-label">اسم العميل *</label>
-                                <input type="text" class="form-control" name="name" required>
-                            </div>
-                            <div class="mb-3">
-                                <label class="form-label">البريد الإلكتروني</label>
-                                <input type="email" class="form-control" name="email">
-                            </div>
-                            <div class="mb-3">
-                                <label class="form-label">رقم الهاتف</label>
-                                <input type="text" class="form-control" name="phone">
-                            </div>
-                            <div class="mb-3">
-                                <label class="form-label">العنوان</label>
-                                <textarea class="form-control" name="address" rows="3"></textarea>
-                            </div>
-                            <div class="mb-3">
-                                <label class="form-label">الرقم الضريبي</label>
-                                <input type="text" class="form-control" name="tax_number">
-                            </div>
-                        </div>
-                        <div class="modal-footer">
-                            <button type="button" class="btn btn-secondary" data-bs-dismiss="modal">إلغاء</button>
-                            <button type="submit" class="btn btn-primary">حفظ</button>
-                        </div>
-                    </form>
-                </div>
-            </div>
-        </div>
-
-        <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js"></script>
-    </body>
-    </html>
-    ''', customers=customers)
+    page = paginate_list(
+        Customer,
+        sort_fields={'name': (Customer.name, 'الاسم')},
+        default_sort='name',
+        filters=[
+            ListFilter('q', 'بحث', lambda query, value: query.filter(search_index.filter(Customer, value))),
+        ]
+    )
+    return render_template('complete/customers.html', customers=page.items, page=page)
 
 @app.route('/add_customer', methods=['POST'])
 @login_required
@@ -1924,6 +1590,7 @@ def add_customer():
 
     db.session.add(customer)
     db.session.commit()
+    invalidate_count_cache(Customer)
 
     flash('تم إضافة العميل بنجاح', 'success')
     return redirect(url_for('customers'))
@@ -1933,135 +1600,15 @@ def add_customer():
 @app.route('/suppliers')
 @login_required
 def suppliers():
-    suppliers = Supplier.query.all()
-    return render_template_string('''
-    <!DOCTYPE html>
-    <html dir="rtl" lang="ar">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>إدارة الموردين - نظام المحاسبة</title>
-        <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.rtl.min.css" rel="stylesheet">
-        <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css" rel="stylesheet">
-        <style>
-            body { background-color: #f8f9fa; }
-            .navbar { background: linear-gradient(45deg, #667eea, #764ba2) !important; }
-        </style>
-    </head>
-    <body>
-        <nav class="navbar navbar-expand-lg navbar-dark">
-            <div class="container">
-                <a class="navbar-brand" href="{{ url_for('dashboard') }}">
-                    <i class="fas fa-calculator me-2"></i>نظام المحاسبة
-                </a>
-                <div class="navbar-nav ms-auto">
-                    <a class="nav-link" href="{{ url_for('dashboard') }}">
-                        <i class="fas fa-home me-1"></i>الرئيسية
-                    </a>
-                    <a class="nav-link" href="{{ url_for('logout') }}">
-                        <i class="fas fa-sign-out-alt me-1"></i>خروج
-                    </a>
-                </div>
-            </div>
-        </nav>
-
-        <div class="container mt-4">
-            <div class="row">
-                <div class="col-12">
-                    <div class="d-flex justify-content-between align-items-center mb-4">
-                        <h2><i class="fas fa-industry me-2"></i>إدارة الموردين</h2>
-                        <button class="btn btn-primary" data-bs-toggle="modal" data-bs-target="#addSupplierModal">
-                            <i class="fas fa-plus me-2"></i>إضافة مورد جديد
-                        </button>
-                    </div>
-                </div>
-            </div>
-
-            <div class="card">
-                <div class="card-body">
-                    <div class="table-responsive">
-                        <table class="table table-striped">
-                            <thead>
-                                <tr>
-                                    <th>الرقم</th>
-                                    <th>اسم المورد</th>
-                                    <th>البريد الإلكتروني</th>
-                                    <th>الهاتف</th>
-                                    <th>الرقم الضريبي</th>
-                                    <th>تاريخ الإضافة</th>
-                                    <th>الإجراءات</th>
-                                </tr>
-                            </thead>
-                            <tbody>
-                                {% for supplier in suppliers %}
-                                <tr>
-                                    <td>{{ supplier.id }}</td>
-                                    <td>{{ supplier.name }}</td>
-                                    <td>{{ supplier.email or '-' }}</td>
-                                    <td>{{ supplier.phone or '-' }}</td>
-                                    <td>{{ supplier.tax_number or '-' }}</td>
-                                    <td>{{ supplier.created_at.strftime('%Y-%m-%d') }}</td>
-                                    <td>
-                                        <button class="btn btn-sm btn-outline-primary">
-                                            <i class="fas fa-edit"></i>
-                                        </button>
-                                        <button class="btn btn-sm btn-outline-danger">
-                                            <i class="fas fa-trash"></i>
-                                        </button>
-                                    </td>
-                                </tr>
-                                {% endfor %}
-                            </tbody>
-                        </table>
-                    </div>
-                </div>
-            </div>
-        </div>
-
-        <!-- Modal إضافة مورد -->
-        <div class="modal fade" id="addSupplierModal" tabindex="-1">
-            <div class="modal-dialog">
-                <div class="modal-content">
-                    <div class="modal-header">
-                        <h5 class="modal-title">إضافة مورد جديد</h5>
-                        <button type="button" class="btn-close" data-bs-dismiss="modal"></button>
-                    </div>
-                    <form method="POST" action="{{ url_for('add_supplier') }}">
-                        <div class="modal-body">
-                            <div class="mb-3">
-                                <label class="form-label">اسم المورد *</label>
-                                <input type="text" class="form-control" name="name" required>
-                            </div>
-                            <div class="mb-3">
-                                <label class="form-label">البريد الإلكتروني</label>
-                                <input type="email" class="form-control" name="email">
-                            </div>
-                            <div class="mb-3">
-                                <label class="form-label">رقم الهاتف</label>
-                                <input type="text" class="form-control" name="phone">
-                            </div>
-                            <div class="mb-3">
-                                <label class="form-label">العنوان</label>
-                                <textarea class="form-control" name="address" rows="3"></textarea>
-                            </div>
-                            <div class="mb-3">
-                                <label class="form-label">الرقم الضريبي</label>
-                                <input type="text" class="form-control" name="tax_number">
-                            </div>
-                        </div>
-                        <div class="modal-footer">
-                            <button type="button" class="btn btn-secondary" data-bs-dismiss="modal">إلغاء</button>
-                            <button type="submit" class="btn btn-primary">حفظ</button>
-                        </div>
-                    </form>
-                </div>
-            </div>
-        </div>
-
-        <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js"></script>
-    </body>
-    </html>
-    ''', suppliers=suppliers)
+    page = paginate_list(
+        Supplier,
+        sort_fields={'name': (Supplier.name, 'الاسم')},
+        default_sort='name',
+        filters=[
+            ListFilter('q', 'بحث', lambda query, value: query.filter(search_index.filter(Supplier, value))),
+        ]
+    )
+    return render_template('complete/suppliers.html', suppliers=page.items, page=page)
 
 @app.route('/add_supplier', methods=['POST'])
 @login_required
@@ -2082,6 +1629,7 @@ def add_supplier():
 
     db.session.add(supplier)
     db.session.commit()
+    invalidate_count_cache(Supplier)
 
     flash('تم إضافة المورد بنجاح', 'success')
     return redirect(url_for('suppliers'))
@@ -2092,6 +1640,7 @@ if __name__ == '__main__':
 
     # تهيئة قاعدة البيانات
     init_db()
+    precompile_templates()
 
     print('✅ تم تهيئة قاعدة البيانات')
     print('🌐 الرابط: http://localhost:5000')
@@ -2101,5 +1650,9 @@ if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=False)
 
-# للنشر على Render
+# للنشر على Render: gunicorn --preload يهيئ قاعدة البيانات مرة واحدة قبل إنشاء العمال
 init_db()
+precompile_templates()
+# اتصالات العملية الرئيسية لا تورث للعمال (كل عامل ينشئ مجمعه)
+with app.app_context():
+    db.engine.dispose()
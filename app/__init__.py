@@ -69,7 +69,9 @@ def create_app(config_class=None):
 def init_extensions(app):
     """تهيئة جميع الإضافات"""
     
-    # قاعدة البيانات
+    # قاعدة البيانات (إعدادات المحرك حسب النوع: WAL لـ SQLite ومجمع اتصالات لـ PostgreSQL)
+    from app.performance.db_engine import init_engine_profile
+    init_engine_profile(app)
     db.init_app(app)
     
     # نظام تسجيل الدخول
@@ -93,6 +95,38 @@ def init_extensions(app):
     # تحديد معدل الطلبات
     limiter.init_app(app)
     
+    # كشف استعلامات N+1 في وضع التطوير
+    from app.monitoring.query_detector import n_plus_one_detector
+    n_plus_one_detector.init_app(app)
+    
+    # كتابة سجل المراجعة مجمعة لكل معاملة
+    from app.models.audit_writer import audit_writer
+    audit_writer.init_app(app)
+    
+    # لقطة الإعدادات لكل عملية (تعاد عند تغير الإصدار)
+    from app.models.system_settings import settings_snapshot
+    settings_snapshot.init_app(app)
+    
+    # ذاكرة صلاحيات المستخدمين
+    from app.security.permission_cache import permission_cache
+    permission_cache.init_app(app)
+    
+    # فهرس البحث النصي الكامل (FTS5 / tsvector)
+    from app.search import search_index
+    search_index.init_app(app)
+    
+    # تقييم مخاطر العملاء الدوري على دفعات
+    from app.models.customer_risk import customer_risk_scorer
+    customer_risk_scorer.init_app(app)
+    
+    # لقطات المخزون الدورية
+    from app.models.inventory import inventory_snapshot_job
+    inventory_snapshot_job.init_app(app)
+    
+    # تدوير مفتاح التشفير (يبدأ يدوياً من scripts/rotate_encryption_key.py)
+    from app.security.rotation import key_rotation_job
+    key_rotation_job.init_app(app)
+    
     @login_manager.user_loader
     def load_user(user_id):
         from app.models.user_enhanced import User
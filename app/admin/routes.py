@@ -7,6 +7,7 @@ Administration Routes
 
 from flask import render_template, redirect, url_for, flash, request, jsonify, current_app
 from flask_login import login_required, current_user
+from sqlalchemy.orm import joinedload
 from app import db
 from app.admin import admin_bp
 from app.auth.forms import UserManagementForm, RoleManagementForm
@@ -14,6 +15,7 @@ from app.models.user_enhanced import User
 from app.models.roles_permissions import Role, Permission, UserRole, RolePermission, LoginHistory
 from app.security.decorators import permission_required
 from app.security.validators import sanitize_input
+from app.search import search_index
 from datetime import datetime, timedelta
 
 @admin_bp.before_request
@@ -45,7 +47,8 @@ def dashboard():
     ).order_by(User.created_at.desc()).limit(10).all()
     
     # آخر عمليات تسجيل الدخول
-    recent_logins = LoginHistory.query.filter_by(success=True)\
+    recent_logins = LoginHistory.query.options(joinedload(LoginHistory.user))\
+        .filter_by(success=True)\
         .order_by(LoginHistory.login_at.desc()).limit(10).all()
     
     # محاولات الدخول الفاشلة
@@ -72,12 +75,7 @@ def users():
     # البحث
     search = request.args.get('search', '').strip()
     if search:
-        query = query.filter(
-            (User.username.contains(search)) |
-            (User.email.contains(search)) |
-            (User.first_name.contains(search)) |
-            (User.last_name.contains(search))
-        )
+        query = query.filter(search_index.filter(User, search))
     
     # فلترة حسب الحالة
     status = request.args.get('status')
@@ -364,8 +362,8 @@ def login_history():
     page = request.args.get('page', 1, type=int)
     per_page = 50
     
-    # فلترة السجلات
-    query = LoginHistory.query
+    # فلترة السجلات (المستخدم يُحمّل مع السجل بدلاً من استعلام لكل صف)
+    query = LoginHistory.query.options(joinedload(LoginHistory.user))
     
     # فلترة حسب المستخدم
     user_id = request.args.get('user_id', type=int)
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+تصدير السجلات والتنبيهات بالتدفق
+Streaming Log and Alert Exports
+"""
+
+import io
+import csv
+import tempfile
+from flask import Response, stream_with_context
+from spreadsheet_cells import safe_cell as _cell
+
+EXPORT_BATCH_SIZE = 2000  # صفوف تُقرأ من المؤشر وتُرسل في كل دفعة
+
+def iter_rows(query, columns):
+    """قراءة الأعمدة كـ tuples عبر مؤشر خادم (stream_results) دون ملء خريطة الهوية"""
+    return query.with_entities(*columns).yield_per(EXPORT_BATCH_SIZE)
+
+def generate_csv(headers, rows):
+    """CSV على دفعات: العنوان يُرسل قبل تنفيذ الاستعلام"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(headers)
+    yield '\ufeff' + buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    for count, row in enumerate(rows, start=1):
+        writer.writerow([_cell(value) for value in row])
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def generate_xlsx(headers, rows, title):
+    """مصنف للكتابة فقط: ذاكرة ثابتة، ثم يُرسل الملف على أجزاء"""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title)
+    sheet.append(headers)
+    for row in rows:
+        sheet.append([_cell(value) for value in row])
+    with tempfile.TemporaryFile() as handle:
+        workbook.save(handle)
+        handle.seek(0)
+        while True:
+            chunk = handle.read(64 * 1024)
+            if not chunk:
+                break
+            yield chunk
+
+def streaming_export(query, columns, filename, fmt='csv'):
+    """استجابة تدفق لملف CSV أو XLSX من استعلام وقائمة (عنوان، عمود)"""
+    headers = [label for label, _ in columns]
+    rows = iter_rows(query, [column for _, column in columns])
+    if fmt == 'xlsx':
+        body = generate_xlsx(headers, rows, filename[:31])
+        mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    else:
+        fmt = 'csv'
+        body = generate_csv(headers, rows)
+        mimetype = 'text/csv; charset=utf-8'
+    return Response(stream_with_context(body), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename={filename}.{fmt}',
+        'X-Accel-Buffering': 'no',
+    })
@@ -5,14 +5,17 @@
 Logging and Monitoring Routes
 """
 
-from flask import render_template, request, jsonify, flash, redirect, url_for
+from flask import render_template, request, jsonify
 from flask_login import login_required, current_user
 from datetime import datetime, timedelta
+from sqlalchemy.orm import joinedload
 from app.logging import logging_bp
+from app.logging.exporter import streaming_export
 from app.models.system_monitoring import SystemLog, PerformanceMetric, SystemAlert, SystemHealth, UserActivity
 from app.models.user_enhanced import User
 from app.monitoring.health_checker import health_checker
 from app.notifications.alert_manager import alert_manager
+from app.search import search_index
 from app.decorators import admin_required
 from app import db
 import json
@@ -75,7 +78,7 @@ def logs():
         query = query.filter(SystemLog.logger_name == logger_name)
     
     if search:
-        query = query.filter(SystemLog.message.contains(search))
+        query = query.filter(search_index.filter(SystemLog, search))
     
     # ترتيب وتقسيم الصفحات
     logs = query.order_by(SystemLog.timestamp.desc()).paginate(
@@ -190,8 +193,8 @@ def activities():
     user_id = request.args.get('user_id', type=int)
     action = request.args.get('action')
     
-    # بناء الاستعلام
-    query = UserActivity.query
+    # بناء الاستعلام (المستخدم يُحمّل مع النشاط بدلاً من استعلام لكل صف)
+    query = UserActivity.query.options(joinedload(UserActivity.user))
     
     if user_id:
         query = query.filter(UserActivity.user_id == user_id)
@@ -347,15 +350,76 @@ def api_cleanup():
 @admin_required
 def export_logs():
     """تصدير السجلات"""
-    # TODO: تطبيق تصدير السجلات إلى CSV/Excel
-    flash('ميزة التصدير قيد التطوير', 'info')
-    return redirect(url_for('logging.logs'))
+    level = request.args.get('level')
+    logger_name = request.args.get('logger')
+    search = request.args.get('search')
+    
+    # نفس مرشحات صفحة السجلات
+    query = SystemLog.query
+    
+    if level:
+        query = query.filter(SystemLog.level == level.upper())
+    
+    if logger_name:
+        query = query.filter(SystemLog.logger_name == logger_name)
+    
+    if search:
+        query = query.filter(search_index.filter(SystemLog, search))
+    
+    columns = [
+        ('timestamp', SystemLog.timestamp),
+        ('level', SystemLog.level),
+        ('logger', SystemLog.logger_name),
+        ('message', SystemLog.message),
+        ('module', SystemLog.module),
+        ('function', SystemLog.function),
+        ('line', SystemLog.line_number),
+        ('request_id', SystemLog.request_id),
+        ('method', SystemLog.method),
+        ('url', SystemLog.url),
+        ('user_id', SystemLog.user_id),
+        ('ip_address', SystemLog.ip_address),
+        ('exception_type', SystemLog.exception_type),
+        ('exception_message', SystemLog.exception_message),
+    ]
+    
+    return streaming_export(query.order_by(SystemLog.timestamp.desc()), columns,
+                            f"logs-{datetime.utcnow():%Y%m%d}", request.args.get('format', 'csv'))
 
 @logging_bp.route('/export/alerts')
 @login_required
 @admin_required
 def export_alerts():
     """تصدير التنبيهات"""
-    # TODO: تطبيق تصدير التنبيهات إلى CSV/Excel
-    flash('ميزة التصدير قيد التطوير', 'info')
-    return redirect(url_for('logging.alerts'))
+    status = request.args.get('status')
+    alert_type = request.args.get('type')
+    severity = request.args.get('severity')
+    
+    # نفس مرشحات صفحة التنبيهات
+    query = SystemAlert.query
+    
+    if status:
+        query = query.filter(SystemAlert.status == status)
+    
+    if alert_type:
+        query = query.filter(SystemAlert.alert_type == alert_type)
+    
+    if severity:
+        query = query.filter(SystemAlert.severity == severity)
+    
+    columns = [
+        ('created_at', SystemAlert.created_at),
+        ('type', SystemAlert.alert_type),
+        ('severity', SystemAlert.severity),
+        ('status', SystemAlert.status),
+        ('title', SystemAlert.title),
+        ('message', SystemAlert.message),
+        ('acknowledged_at', SystemAlert.acknowledged_at),
+        ('acknowledged_by_id', SystemAlert.acknowledged_by_id),
+        ('resolved_at', SystemAlert.resolved_at),
+        ('resolved_by_id', SystemAlert.resolved_by_id),
+        ('resolution_notes', SystemAlert.resolution_notes),
+    ]
+    
+    return streaming_export(query.order_by(SystemAlert.created_at.desc()), columns,
+                            f"alerts-{datetime.utcnow():%Y%m%d}", request.args.get('format', 'csv'))
@@ -7,7 +7,8 @@ Professional Database Models
 
 # النماذج الأساسية المحسنة
 from app.models.base import BaseModel, AuditMixin, EncryptedMixin
-from app.models.user import User, Role, Permission, UserRole, RolePermission
+from app.models.user_enhanced import User
+from app.models.roles_permissions import Role, Permission, UserRole, RolePermission
 from app.models.audit_log import AuditLog
 
 # النماذج المحسنة الجديدة
@@ -15,7 +16,11 @@ from app.models.customer import Customer
 from app.models.invoice import Invoice
 from app.models.invoice_item import InvoiceItem
 from app.models.payment import Payment
-from app.models.system_settings import SystemSettings
+from app.models.customer_balance import CustomerBalance
+from app.models.inventory import InventoryMovement, InventorySnapshot
+from app.models.system_settings import SystemSettings, SettingsVersion, settings_snapshot
+from app.models.sequence import NumberSequence, SequenceAllocator, sequence_allocator
+from app.models.key_rotation import KeyRotationCheckpoint
 
 # النماذج الموجودة (سيتم تحديثها لاحقاً)
 try:
@@ -75,7 +80,16 @@ __all__ = [
     'Invoice',
     'InvoiceItem',
     'Payment',
+    'CustomerBalance',
+    'InventoryMovement',
+    'InventorySnapshot',
     'SystemSettings',
+    'SettingsVersion',
+    'settings_snapshot',
+    'NumberSequence',
+    'SequenceAllocator',
+    'sequence_allocator',
+    'KeyRotationCheckpoint',
 
     # النماذج الموجودة (قد تكون None إذا لم تكن موجودة)
     'Supplier',
@@ -39,7 +39,7 @@ class AuditLog(BaseModel):
     tags = db.Column(JSON, nullable=True)
     
     # العلاقات
-    user = db.relationship('User', backref='audit_logs', lazy='select')
+    user = db.relationship('User', foreign_keys=[user_id], backref='audit_logs', lazy='select')
     
     # فهارس محسنة
     __table_args__ = (
@@ -98,11 +98,16 @@ class AuditLog(BaseModel):
     @classmethod
     def log_action(cls, table_name, record_id, action, old_values=None, 
                    new_values=None, details=None, user_id=None, severity='info', 
-                   category=None, tags=None):
-        """تسجيل حدث في سجل المراجعة"""
+                   category=None, tags=None, buffered=None):
+        """تسجيل حدث في سجل المراجعة
+        
+        يكتب مع معاملة الجلسة الحالية عبر audit_writer؛ buffered=False للكتابة
+        فوراً حتى لو تم التراجع عن المعاملة (الأحداث الأمنية).
+        """
         
         from flask import request, session
         from flask_login import current_user
+        from app.models.audit_writer import audit_writer
         
         # الحصول على معلومات المستخدم
         if not user_id and current_user and current_user.is_authenticated:
@@ -119,7 +124,7 @@ class AuditLog(BaseModel):
             session_id = session.get('_id') if session else None
         
         # إنشاء سجل المراجعة
-        log_entry = cls(
+        values = dict(
             table_name=table_name,
             record_id=record_id,
             action=action,
@@ -132,13 +137,13 @@ class AuditLog(BaseModel):
             user_agent=user_agent,
             severity=severity,
             category=category,
-            tags=tags or []
+            tags=tags or [],
+            is_deleted=False
         )
         
-        db.session.add(log_entry)
-        db.session.commit()
+        audit_writer.record(values, buffered)
         
-        return log_entry
+        return values
     
     @classmethod
     def log_login(cls, user_id, success=True, details=None):
@@ -153,7 +158,8 @@ class AuditLog(BaseModel):
             details=details,
             user_id=user_id if success else None,
             severity=severity,
-            category='authentication'
+            category='authentication',
+            buffered=False
         )
     
     @classmethod
@@ -214,7 +220,8 @@ class AuditLog(BaseModel):
             details=details,
             severity=severity,
             category='security',
-            tags=['security', event_type]
+            tags=['security', event_type],
+            buffered=False
         )
     
     @classmethod
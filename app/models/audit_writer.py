@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+كاتب سجل المراجعة المجمّع
+Buffered Audit Log Writer
+"""
+
+import os
+import queue
+import atexit
+import logging
+import threading
+from datetime import datetime, timezone
+from sqlalchemy import event, insert
+from app import db
+
+logger = logging.getLogger('accounting_system')
+
+BUFFER_KEY = 'audit_events'
+
+class AuditWriter:
+    """تجميع أحداث المراجعة لكل معاملة وكتابتها دفعة واحدة
+
+    - inline (الافتراضي): الأحداث تكتب بجملة INSERT واحدة (executemany) في نهاية
+      flush أو قبل commit داخل نفس المعاملة، وتلغى مع التراجع عنها
+    - queue: الأحداث تسلم بعد commit إلى خيط خلفي يكتبها على دفعات
+
+    الأحداث دون معاملة مفتوحة في الجلسة (أو buffered=False مثل الأحداث الأمنية) لا تنتظر commit.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.mode = 'inline'
+        self.batch_size = 500
+        self._queue = None
+        self._thread = None
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """تهيئة الكاتب؛ AUDIT_WRITE_MODE = inline أو queue"""
+        self.app = app
+        self.mode = app.config.get('AUDIT_WRITE_MODE', os.environ.get('AUDIT_WRITE_MODE', 'inline'))
+        self.batch_size = app.config.get('AUDIT_BATCH_SIZE', 500)
+        if self.mode == 'queue' and self._thread is None:
+            self._queue = queue.Queue(maxsize=app.config.get('AUDIT_QUEUE_SIZE', 10000))
+            self._thread = threading.Thread(target=self._worker, name='audit-writer', daemon=True)
+            self._thread.start()
+            atexit.register(self.shutdown)
+
+    # ===== التسجيل =====
+
+    def record(self, values, buffered=None):
+        """إضافة حدث (قاموس أعمدة audit_logs)
+
+        buffered=None: ينتظر commit إذا كانت في الجلسة تغييرات معلقة أو معاملة تحمل اتصالاً
+        (بعد flush تبدو الجلسة نظيفة لكنها ما زالت تحمل قفل الكتابة)، وإلا يكتب فوراً
+        لأنه قد لا يأتي commit بعده.
+        
+        الكتابة الفورية داخل معاملة مفتوحة تستخدم اتصال الجلسة نفسه: اتصال ثانٍ ينتظر قفل
+        SQLite الذي تحمله الجلسة حتى "database is locked".
+        """
+        # وقت الحدث نفسه وليس وقت الكتابة المؤجلة
+        now = datetime.now(timezone.utc)
+        values.setdefault('created_at', now)
+        values.setdefault('updated_at', now)
+        session = db.session()
+        connected = _holds_connection(session)
+        if buffered is None:
+            buffered = connected or bool(session.new or session.deleted or session.dirty)
+        if buffered:
+            if not session.in_transaction():
+                session.begin()  # حتى يلغي rollback الأحداث المعلقة
+            session.info.setdefault(BUFFER_KEY, []).append(values)
+        elif connected:
+            self._insert(session.connection(), [values])
+        elif self._queue is not None:
+            self._enqueue([values])
+        else:
+            self._write_now([values])
+
+    def pending(self):
+        """الأحداث المنتظرة في المعاملة الحالية"""
+        return list(db.session.info.get(BUFFER_KEY, ()))
+
+    # ===== الكتابة =====
+
+    def _insert(self, connection, rows):
+        from app.models.audit_log import AuditLog
+        connection.execute(insert(AuditLog.__table__), rows)
+
+    def _write_now(self, rows):
+        """كتابة في معاملة مستقلة عن جلسة الطلب"""
+        with db.engine.begin() as connection:
+            self._insert(connection, rows)
+
+    def _drain(self, session):
+        """كتابة الأحداث المجمعة بنفس اتصال المعاملة (وضع inline)"""
+        if self.mode == 'queue':
+            return
+        rows = session.info.pop(BUFFER_KEY, None)
+        if rows:
+            self._insert(session.connection(), rows)
+
+    def _handoff(self, session):
+        """تسليم أحداث المعاملة المنتهية للخيط الخلفي (وضع queue)"""
+        rows = session.info.pop(BUFFER_KEY, None)
+        if rows and self._queue is not None:
+            self._enqueue(rows)
+
+    def _enqueue(self, rows):
+        for row in rows:
+            try:
+                self._queue.put_nowait(row)
+            except queue.Full:
+                # الطابور ممتلئ: كتابة مباشرة بدلاً من فقدان الحدث
+                logger.warning('طابور سجل المراجعة ممتلئ؛ كتابة مباشرة')
+                self._write_now([row])
+
+    def _worker(self):
+        while True:
+            row = self._queue.get()
+            if row is None:
+                return
+            rows = [row]
+            while len(rows) < self.batch_size:
+                try:
+                    row = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if row is None:
+                    self._flush_batch(rows)
+                    return
+                rows.append(row)
+            self._flush_batch(rows)
+
+    def _flush_batch(self, rows):
+        with self.app.app_context():
+            try:
+                self._write_now(rows)
+            except Exception as e:
+                logger.error(f"Audit batch write failed ({len(rows)} events): {str(e)}")
+
+    def shutdown(self, timeout=5):
+        """كتابة ما تبقى في الطابور قبل الإغلاق"""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+
+def _holds_connection(session):
+    """هل للجلسة معاملة مفتوحة مرتبطة باتصال (بعد flush أو استعلام)"""
+    transaction = session.get_transaction()
+    return transaction is not None and bool(transaction._connections)
+
+# إنشاء مثيل عام
+audit_writer = AuditWriter()
+
+@event.listens_for(db.session, 'after_flush')
+def write_audit_after_flush(session, flush_context):
+    """أحداث المراجعة الناتجة عن أحداث النماذج أثناء flush"""
+    audit_writer._drain(session)
+
+@event.listens_for(db.session, 'before_commit')
+def write_audit_before_commit(session):
+    """أحداث سجلت خارج flush (مثل تسجيل الدخول) في نفس المعاملة"""
+    audit_writer._drain(session)
+
+@event.listens_for(db.session, 'after_commit')
+def hand_off_audit_after_commit(session):
+    audit_writer._handoff(session)
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def discard_audit_after_rollback(session, previous_transaction):
+    """أحداث معاملة تم التراجع عنها لا تسجل"""
+    session.info.pop(BUFFER_KEY, None)
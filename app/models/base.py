@@ -52,33 +52,18 @@ class BaseModel(db.Model):
         return db.relationship('User', foreign_keys=[cls.deleted_by_id], post_update=True)
     
     def to_dict(self, include_relationships=False):
-        """تحويل النموذج إلى قاموس"""
-        result = {}
+        """تحويل النموذج إلى قاموس (بدالة مولدة مسبقاً لكل نموذج)"""
+        from app.performance.serializers import serializer_registry
         
-        for column in self.__table__.columns:
-            value = getattr(self, column.name)
-            
-            # تحويل التواريخ إلى نص
-            if isinstance(value, datetime):
-                value = value.isoformat()
-            
-            result[column.name] = value
-        
-        # إضافة العلاقات إذا طُلب ذلك
-        if include_relationships:
-            for relationship in self.__mapper__.relationships:
-                related_obj = getattr(self, relationship.key)
-                
-                if related_obj is not None:
-                    if hasattr(related_obj, 'to_dict'):
-                        if relationship.uselist:
-                            result[relationship.key] = [obj.to_dict() for obj in related_obj]
-                        else:
-                            result[relationship.key] = related_obj.to_dict()
-                    else:
-                        result[relationship.key] = str(related_obj)
+        if not include_relationships:
+            return serializer_registry.serialize(self)
         
-        return result
+        # العلاقات الديناميكية (استعلامات) لا تضمن لأنها قد تكون غير محدودة
+        relationships = tuple(
+            relationship.key for relationship in self.__mapper__.relationships
+            if relationship.lazy != 'dynamic'
+        )
+        return serializer_registry.serialize(self, relationships=relationships)
     
     def soft_delete(self, user_id=None):
         """حذف ناعم للسجل"""
@@ -128,23 +113,16 @@ class AuditMixin:
     """خليط للمراجعة والتتبع"""
     
     def log_change(self, action, details=None, user_id=None):
-        """تسجيل التغيير في سجل المراجعة"""
+        """تسجيل التغيير في سجل المراجعة (يكتب مع معاملة الجلسة دون commit إضافي)"""
         from app.models.audit_log import AuditLog
-        from flask_login import current_user
         
-        if not user_id and current_user and current_user.is_authenticated:
-            user_id = current_user.id
-        
-        log_entry = AuditLog(
+        AuditLog.log_action(
             table_name=self.__tablename__,
             record_id=self.id,
             action=action,
-            details=details or {},
+            details=details,
             user_id=user_id
         )
-        
-        db.session.add(log_entry)
-        db.session.commit()
 
 class TimestampMixin:
     """خليط للطوابع الزمنية"""
@@ -187,8 +165,11 @@ class SearchableMixin:
     
     @classmethod
     def search(cls, expression, page=1, per_page=20):
-        """البحث في النموذج"""
-        # يمكن تحسينه لاحقاً باستخدام Elasticsearch أو مكتبة بحث أخرى
+        """البحث في النموذج (مرتب بالصلة عبر فهرس البحث إذا كان النموذج مسجلاً فيه)"""
+        from app.search import search_index
+        
+        if search_index.is_registered(cls):
+            return search_index.search(cls, expression, page=page, per_page=per_page)
         return cls.query.filter(
             cls.name.contains(expression) if hasattr(cls, 'name') else False
         ).paginate(page=page, per_page=per_page, error_out=False)
@@ -244,28 +225,24 @@ class EncryptedMixin:
     @staticmethod
     def encrypt_field(value):
         """تشفير حقل"""
-        from cryptography.fernet import Fernet
-        import os
-        
-        key = os.environ.get('ENCRYPTION_KEY')
-        if not key:
-            return value  # إرجاع القيمة كما هي إذا لم يكن هناك مفتاح
-        
-        f = Fernet(key.encode())
-        return f.encrypt(value.encode()).decode()
+        from app.security.keyring import key_ring
+        return key_ring.encrypt(value)
     
     @staticmethod
     def decrypt_field(encrypted_value):
-        """فك تشفير حقل"""
-        from cryptography.fernet import Fernet
-        import os
-        
-        key = os.environ.get('ENCRYPTION_KEY')
-        if not key:
-            return encrypted_value  # إرجاع القيمة كما هي إذا لم يكن هناك مفتاح
-        
-        f = Fernet(key.encode())
-        return f.decrypt(encrypted_value.encode()).decode()
+        """فك تشفير حقل (مع ذاكرة الجلسة)"""
+        from app.security.keyring import key_ring
+        return key_ring.decrypt(encrypted_value)
+    
+    @classmethod
+    def bulk_decrypt(cls, instances, field):
+        """فك تشفير حقل مشفر لقائمة سجلات في مرور واحد (للقوائم والتقارير)
+        
+        field هو اسم الخاصية مثل 'credit_limit' والعمود المخزن هو '_credit_limit'.
+        القيم تحفظ في ذاكرة الجلسة فيصبح الوصول اللاحق للخاصية بلا تكلفة فك تشفير.
+        """
+        from app.security.keyring import key_ring
+        return key_ring.decrypt_many(getattr(instance, '_' + field) for instance in instances)
 
 # دالة مساعدة لإنشاء فهارس مركبة
 def create_composite_index(table_name, columns, unique=False):
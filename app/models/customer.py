@@ -8,10 +8,10 @@ Enhanced Customer Model
 from sqlalchemy import Index, event
 from sqlalchemy.ext.hybrid import hybrid_property
 from app import db
-from app.models.base import BaseModel, AuditMixin, EncryptedMixin
+from app.models.base import BaseModel, AuditMixin, EncryptedMixin, SearchableMixin
 from app.security.validators import validate_email_format, validate_phone_number
 
-class Customer(BaseModel, AuditMixin, EncryptedMixin):
+class Customer(BaseModel, AuditMixin, EncryptedMixin, SearchableMixin):
     """نموذج العملاء مع ميزات أمان متقدمة"""
     
     __tablename__ = 'customers'
@@ -59,6 +59,7 @@ class Customer(BaseModel, AuditMixin, EncryptedMixin):
     # معلومات الأمان
     verification_status = db.Column(db.String(20), default='pending', nullable=False)
     risk_level = db.Column(db.String(20), default='low', nullable=False)
+    risk_scored_at = db.Column(db.DateTime, nullable=True, index=True)  # آخر تقييم من customer_risk_scorer
     
     # العلاقات
     invoices = db.relationship('Invoice', backref='customer_rel', lazy='dynamic', cascade='all, delete-orphan')
@@ -230,16 +231,11 @@ class Customer(BaseModel, AuditMixin, EncryptedMixin):
         
         return True, 'يمكن الشراء'
     
-    def get_current_debt(self):
-        """الحصول على الدين الحالي"""
-        from app.models.invoice import Invoice
+    def get_current_debt(self, connection=None):
+        """الحصول على الدين الحالي من صف customer_balances"""
+        from app.models.customer_balance import CustomerBalance
         
-        unpaid_invoices = Invoice.query.filter_by(
-            customer_name=self.name,
-            status='unpaid'
-        ).all()
-        
-        return sum(invoice.total_amount for invoice in unpaid_invoices)
+        return CustomerBalance.get_open_amount(self.id, connection)
     
     def get_total_paid(self):
         """الحصول على إجمالي المدفوعات"""
@@ -269,7 +265,7 @@ class Customer(BaseModel, AuditMixin, EncryptedMixin):
         
         db.session.commit()
     
-    def calculate_risk_level(self):
+    def calculate_risk_level(self, connection=None):
         """حساب مستوى المخاطر تلقائياً"""
         risk_score = 0
         
@@ -277,7 +273,7 @@ class Customer(BaseModel, AuditMixin, EncryptedMixin):
         if not self.is_verified():
             risk_score += 2
         
-        if self.get_current_debt() > self.credit_limit:
+        if self.get_current_debt(connection) > self.credit_limit:
             risk_score += 3
         
         if self.purchase_count == 0:
@@ -331,15 +327,7 @@ class Customer(BaseModel, AuditMixin, EncryptedMixin):
         return f'<Customer {self.name}>'
 
 # الأحداث التلقائية
-@event.listens_for(Customer, 'before_insert')
-def calculate_risk_before_insert(mapper, connection, target):
-    """حساب مستوى المخاطر قبل الإدراج"""
-    target.calculate_risk_level()
-
-@event.listens_for(Customer, 'before_update')
-def calculate_risk_before_update(mapper, connection, target):
-    """حساب مستوى المخاطر قبل التحديث"""
-    target.calculate_risk_level()
+# مستوى المخاطر لا يحسب عند الحفظ: يقيّمه customer_risk_scorer على دفعات (app/models/customer_risk.py)
 
 @event.listens_for(Customer, 'after_insert')
 def log_customer_creation(mapper, connection, target):
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+أرصدة العملاء المحدثة تلقائياً
+Maintained Customer Balance Ledger
+"""
+
+from datetime import datetime
+from sqlalchemy import event, func, select, update, insert, delete, case, inspect, literal, and_, or_, DateTime
+from sqlalchemy.dialects import postgresql, sqlite
+from app import db
+from app.models.invoice import Invoice
+from app.models.payment import Payment
+
+# الفواتير التي لا تدخل في رصيد العميل: المسودات لم تصدر بعد، والملغاة والمرفوضة لا تستحق
+EXCLUDED_INVOICE_STATUSES = ('draft', 'cancelled', 'rejected')
+
+class CustomerBalance(db.Model):
+    """رصيد مفتوح ومتأخر لكل عميل تحدثه أحداث الفواتير والمدفوعات
+
+    الفحص الائتماني يقرأ صفاً واحداً بدلاً من جمع فواتير العميل.
+    """
+    __tablename__ = 'customer_balances'
+
+    customer_id = db.Column(db.Integer, db.ForeignKey('customers.id', ondelete='CASCADE'), primary_key=True)
+    open_amount = db.Column(db.Float, default=0.0, nullable=False)
+    overdue_amount = db.Column(db.Float, default=0.0, nullable=False, index=True)
+    last_activity_at = db.Column(db.DateTime, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<CustomerBalance {self.customer_id}: {self.open_amount:.2f}>'
+
+    @classmethod
+    def get_open_amount(cls, customer_id, connection=None):
+        """الرصيد المفتوح للعميل بقراءة صف واحد"""
+        if customer_id is None:
+            return 0.0
+        executor = connection if connection is not None else db.session
+        value = executor.execute(select(cls.open_amount).where(cls.customer_id == customer_id)).scalar()
+        return value or 0.0
+
+    @classmethod
+    def rebuild(cls, customer_ids=None, commit=True):
+        """إعادة بناء الأرصدة من الفواتير والمدفوعات (بعد الاستيراد أو الإصلاح)
+
+        commit=False يترك الكتابة ضمن معاملة المستدعي (مثل Invoice.recalculate_totals).
+        """
+        table = cls.__table__
+        invoices = Invoice.__table__
+        payments = Payment.__table__
+        now = datetime.utcnow()
+
+        invoice_rows = select(
+            invoices.c.customer_id.label('customer_id'),
+            invoices.c.remaining_amount.label('open_amount'),
+            case((invoices.c.due_date < now, invoices.c.remaining_amount), else_=0.0).label('overdue_amount'),
+            invoices.c.date.label('activity_at')
+        ).where(_open_invoice_condition(invoices))
+        payment_rows = select(
+            payments.c.customer_id,
+            case((_unallocated_payment_condition(payments), _payment_sign(payments) * payments.c.amount), else_=0.0),
+            literal(0.0),
+            payments.c.date
+        ).where(payments.c.customer_id.isnot(None), payments.c.is_deleted == False)
+        if customer_ids is not None:
+            invoice_rows = invoice_rows.where(invoices.c.customer_id.in_(customer_ids))
+            payment_rows = payment_rows.where(payments.c.customer_id.in_(customer_ids))
+
+        movements = invoice_rows.union_all(payment_rows).subquery('movements')
+        totals = select(
+            movements.c.customer_id,
+            func.sum(movements.c.open_amount),
+            func.sum(movements.c.overdue_amount),
+            func.max(movements.c.activity_at),
+            literal(now, DateTime)
+        ).group_by(movements.c.customer_id)
+
+        stale = delete(table)
+        if customer_ids is not None:
+            stale = stale.where(table.c.customer_id.in_(customer_ids))
+        db.session.execute(stale)
+        db.session.execute(insert(table).from_select(
+            ['customer_id', 'open_amount', 'overdue_amount', 'last_activity_at', 'updated_at'], totals
+        ))
+        if commit:
+            db.session.commit()
+
+    @classmethod
+    def refresh_overdue(cls, now=None):
+        """تحديث المبالغ المتأخرة بعد مرور تواريخ الاستحقاق (مهمة دورية يومية)
+
+        الأحداث تحسب التأخر لحظة الكتابة فقط، لذلك تتحول الفواتير المستحقة لاحقاً هنا
+        بجملة UPDATE واحدة لكل العملاء. تشغل من cron:
+        python scripts/run_periodic_job.py overdue-balances
+        """
+        now = now or datetime.utcnow()
+        table = cls.__table__
+        invoices = Invoice.__table__
+        overdue = select(func.coalesce(func.sum(invoices.c.remaining_amount), 0.0)).where(
+            invoices.c.customer_id == table.c.customer_id,
+            invoices.c.due_date < now,
+            _open_invoice_condition(invoices)
+        ).scalar_subquery()
+        result = db.session.execute(update(table).values(overdue_amount=overdue, updated_at=now))
+        db.session.commit()
+        return result.rowcount
+
+# ===== شروط المساهمة في الرصيد =====
+
+def _open_invoice_condition(invoices):
+    return and_(
+        invoices.c.customer_id.isnot(None),
+        invoices.c.is_deleted == False,
+        invoices.c.status.notin_(EXCLUDED_INVOICE_STATUSES)
+    )
+
+def _unallocated_payment_condition(payments):
+    # الدفعات المرتبطة بفاتورة تظهر في remaining_amount للفاتورة نفسها
+    return and_(
+        payments.c.invoice_id.is_(None),
+        payments.c.status == 'completed',
+        payments.c.payment_type.in_(('received', 'refund'))
+    )
+
+def _payment_sign(payments):
+    return case((payments.c.payment_type == 'refund', 1.0), else_=-1.0)
+
+def _invoice_contribution(values, now):
+    """(العميل، المفتوح، المتأخر، التاريخ) لحالة فاتورة واحدة"""
+    if values['customer_id'] is None or values['is_deleted'] or values['status'] in EXCLUDED_INVOICE_STATUSES:
+        return None
+    remaining = values['remaining_amount'] or 0.0
+    due_date = values['due_date']
+    overdue = remaining if due_date is not None and due_date < now else 0.0
+    return values['customer_id'], remaining, overdue, values['date']
+
+def _payment_contribution(values, now):
+    """الدفعات غير المخصصة لفاتورة تخفض الرصيد؛ جميعها تحدث تاريخ آخر نشاط"""
+    if values['customer_id'] is None or values['is_deleted']:
+        return None
+    amount = 0.0
+    if (values['invoice_id'] is None and values['status'] == 'completed'
+            and values['payment_type'] in ('received', 'refund')):
+        sign = 1.0 if values['payment_type'] == 'refund' else -1.0
+        amount = sign * (values['amount'] or 0.0)
+    return values['customer_id'], amount, 0.0, values['date']
+
+# ===== تطبيق الفروقات =====
+
+def _apply_balance_delta(connection, customer_id, open_delta, overdue_delta, activity_at):
+    """إضافة فرق ذري إلى صف العميل وإنشاؤه عند أول حركة"""
+    table = CustomerBalance.__table__
+    now = datetime.utcnow()
+    latest = table.c.last_activity_at
+    if activity_at is not None:
+        latest = case(
+            (or_(table.c.last_activity_at.is_(None), table.c.last_activity_at < activity_at), activity_at),
+            else_=table.c.last_activity_at
+        )
+    changes = {
+        'open_amount': table.c.open_amount + open_delta,
+        'overdue_amount': table.c.overdue_amount + overdue_delta,
+        'last_activity_at': latest,
+        'updated_at': now,
+    }
+    row = {'customer_id': customer_id, 'open_amount': open_delta, 'overdue_amount': overdue_delta,
+           'last_activity_at': activity_at, 'updated_at': now}
+
+    dialect = {'postgresql': postgresql, 'sqlite': sqlite}.get(connection.dialect.name)
+    if dialect is not None:
+        # upsert ذري لا يتعارض مع أول حركة متزامنة لنفس العميل
+        connection.execute(dialect.insert(table).values(**row).on_conflict_do_update(
+            index_elements=[table.c.customer_id], set_=changes
+        ))
+        return
+    result = connection.execute(update(table).where(table.c.customer_id == customer_id).values(**changes))
+    if result.rowcount == 0:
+        connection.execute(insert(table).values(**row))
+
+def _state(target, keys, previous):
+    """قيم الأعمدة الحالية أو السابقة (قبل التعديل) من تاريخ السمات"""
+    state = inspect(target)
+    values = {}
+    for key in keys:
+        history = state.attrs[key].history
+        if previous and history.deleted:
+            values[key] = history.deleted[0]
+        else:
+            values[key] = getattr(target, key)
+    return values
+
+def _register_balance_source(model, keys, contribution):
+    """ربط أحداث النموذج بدفتر الأرصدة"""
+    # تحميل القيمة القديمة قبل أي تعديل حتى يمكن طرح المساهمة السابقة
+    for key in keys:
+        event.listen(getattr(model, key), 'set', lambda *args: None, active_history=True)
+
+    def apply(connection, old, new):
+        deltas = {}
+        for sign, item in ((-1, old), (1, new)):
+            if item is not None:
+                customer_id, open_amount, overdue, activity_at = item
+                current = deltas.setdefault(customer_id, [0.0, 0.0, None])
+                current[0] += sign * open_amount
+                current[1] += sign * overdue
+                if sign > 0:
+                    current[2] = activity_at
+        for customer_id, (open_delta, overdue_delta, activity_at) in deltas.items():
+            if open_delta or overdue_delta or activity_at is not None:
+                _apply_balance_delta(connection, customer_id, open_delta, overdue_delta, activity_at)
+
+    @event.listens_for(model, 'after_insert')
+    def balance_after_insert(mapper, connection, target):
+        apply(connection, None, contribution(_state(target, keys, False), datetime.utcnow()))
+
+    @event.listens_for(model, 'after_update')
+    def balance_after_update(mapper, connection, target):
+        now = datetime.utcnow()
+        old = contribution(_state(target, keys, True), now)
+        new = contribution(_state(target, keys, False), now)
+        if old != new:
+            apply(connection, old, new)
+
+    @event.listens_for(model, 'after_delete')
+    def balance_after_delete(mapper, connection, target):
+        apply(connection, contribution(_state(target, keys, True), datetime.utcnow()), None)
+
+_register_balance_source(
+    Invoice,
+    ('customer_id', 'remaining_amount', 'status', 'is_deleted', 'due_date', 'date'),
+    _invoice_contribution
+)
+_register_balance_source(
+    Payment,
+    ('customer_id', 'invoice_id', 'amount', 'status', 'payment_type', 'is_deleted', 'date'),
+    _payment_contribution
+)
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+تقييم مخاطر العملاء على دفعات
+Batch Customer Risk Scoring
+"""
+
+import time
+import logging
+import threading
+from datetime import datetime
+import numpy as np
+import schedule
+from sqlalchemy import select, update, or_
+from app import db
+from app.models.customer import Customer
+from app.models.customer_balance import CustomerBalance
+from app.security.keyring import key_ring
+
+logger = logging.getLogger('accounting_system')
+
+RISK_LEVEL_NAMES = np.array(['low', 'medium', 'high', 'critical'])
+# أقل درجة لكل مستوى بعد المنخفض: متوسط 1، عالي 3، حرج 5
+RISK_THRESHOLDS = np.array([1, 3, 5])
+
+def score_customers(verified, debt, credit_limit, purchase_count, total_purchases):
+    """مستويات المخاطر لمصفوفات العملاء بنفس قواعد Customer.calculate_risk_level"""
+    score = (
+        np.where(verified, 0, 2)
+        + np.where(debt > credit_limit, 3, 0)
+        + (purchase_count == 0)
+        + (total_purchases < 1000)
+    )
+    return RISK_LEVEL_NAMES[np.searchsorted(RISK_THRESHOLDS, score, side='right')]
+
+class CustomerRiskScorer:
+    """مهمة دورية تقيّم العملاء الذين تغيرت مدخلاتهم منذ آخر تقييم"""
+
+    def __init__(self, app=None):
+        self.app = None
+        self.batch_size = 5000
+        self._scheduler = schedule.Scheduler()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """تهيئة المهمة وجدولتها كل RISK_SCORING_INTERVAL_MINUTES دقيقة (0 افتراضياً: معطلة)
+
+        المؤقت يعمل داخل كل عملية تنشئ التطبيق (كل عامل gunicorn)، لذلك التشغيل المعتاد
+        من cron: python scripts/run_periodic_job.py risk-scoring
+        """
+        self.app = app
+        self.batch_size = app.config.get('RISK_SCORING_BATCH_SIZE', 5000)
+        interval = int(app.config.get('RISK_SCORING_INTERVAL_MINUTES', 0))
+        if interval:
+            self._scheduler.every(interval).minutes.do(self._run_scheduled)
+
+            def run_scheduler():
+                while True:
+                    self._scheduler.run_pending()
+                    time.sleep(30)
+
+            threading.Thread(target=run_scheduler, daemon=True).start()
+
+    def _run_scheduled(self):
+        with self.app.app_context():
+            try:
+                result = self.run()
+                if result['scored']:
+                    logger.info('تقييم المخاطر: %d عميل، تغير %d', result['scored'], result['changed'])
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Risk scoring failed: {str(e)}")
+
+    def _pending_condition(self, customers, balances):
+        # عميل جديد، أو عُدّلت بياناته، أو تغير رصيده بعد آخر تقييم
+        return or_(
+            customers.c.risk_scored_at.is_(None),
+            customers.c.updated_at > customers.c.risk_scored_at,
+            balances.c.updated_at > customers.c.risk_scored_at
+        )
+
+    def run(self, full=False):
+        """تقييم العملاء على دفعات بترتيب المعرف وكتابة النتائج بجمل UPDATE مجمعة"""
+        customers = Customer.__table__
+        balances = CustomerBalance.__table__
+        # قبل القراءة: أي تعديل أثناء التشغيل يبقى أحدث من risk_scored_at فيقيّم لاحقاً
+        started_at = datetime.utcnow()
+
+        query = select(
+            customers.c.id,
+            customers.c.credit_limit,
+            customers.c.verification_status,
+            customers.c.purchase_count,
+            customers.c.total_purchases,
+            customers.c.risk_level,
+            balances.c.open_amount
+        ).select_from(
+            customers.outerjoin(balances, balances.c.customer_id == customers.c.id)
+        ).where(customers.c.is_deleted == False).order_by(customers.c.id).limit(self.batch_size)
+        if not full:
+            query = query.where(self._pending_condition(customers, balances))
+
+        result = {'scored': 0, 'changed': 0, 'levels': {str(name): 0 for name in RISK_LEVEL_NAMES}}
+        last_id = 0
+        while True:
+            rows = db.session.execute(query.where(customers.c.id > last_id)).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            ids = np.fromiter((row.id for row in rows), dtype=np.int64, count=len(rows))
+            levels = score_customers(
+                verified=np.fromiter((row.verification_status == 'verified' for row in rows), dtype=bool, count=len(rows)),
+                debt=np.fromiter((row.open_amount or 0.0 for row in rows), dtype=float, count=len(rows)),
+                credit_limit=self._credit_limits(rows),
+                purchase_count=np.fromiter((row.purchase_count or 0 for row in rows), dtype=np.int64, count=len(rows)),
+                total_purchases=np.fromiter((row.total_purchases or 0.0 for row in rows), dtype=float, count=len(rows))
+            )
+            current = np.array([row.risk_level for row in rows], dtype=object)
+            changed = levels != current
+
+            self._write(customers, ids, levels, changed, started_at)
+            db.session.commit()
+
+            result['scored'] += len(rows)
+            result['changed'] += int(changed.sum())
+            for name, count in zip(*np.unique(levels, return_counts=True)):
+                result['levels'][str(name)] += int(count)
+
+        return result
+
+    def _credit_limits(self, rows):
+        """فك تشفير حدود الائتمان للدفعة في مرور واحد"""
+        values = key_ring.decrypt_many(row.credit_limit for row in rows)
+        key_ring.clear_memo()
+        return np.fromiter((float(value) if value else 0.0 for value in values), dtype=float, count=len(values))
+
+    def _write(self, customers, ids, levels, changed, started_at):
+        """جملة لكل مستوى تغير، وجملة واحدة لختم وقت التقييم"""
+        # updated_at يبقى كما هو: التقييم ليس تعديلاً من المستخدم
+        for name in np.unique(levels[changed]):
+            level_ids = ids[changed & (levels == name)].tolist()
+            db.session.execute(
+                update(customers).where(customers.c.id.in_(level_ids))
+                .values(risk_level=str(name), updated_at=customers.c.updated_at)
+            )
+        db.session.execute(
+            update(customers).where(customers.c.id.in_(ids.tolist()))
+            .values(risk_scored_at=started_at, updated_at=customers.c.updated_at)
+        )
+
+# إنشاء مثيل عام
+customer_risk_scorer = CustomerRiskScorer()
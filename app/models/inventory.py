@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+دفتر حركات المخزون ولقطاته الدورية
+Inventory Movement Ledger and Stock Snapshots
+"""
+
+import time
+import logging
+import threading
+from datetime import datetime
+import schedule
+from sqlalchemy import Index, event, select, insert, update, func, bindparam, table, column, literal, DateTime
+from app import db
+
+logger = logging.getLogger('accounting_system')
+
+PENDING_KEY = 'inventory_movements'
+
+# جدول المنتجات بالأعمدة التي يحتاجها الدفتر فقط
+products = table('products', column('id'), column('quantity'), column('track_inventory'))
+
+class InventoryMovement(db.Model):
+    """حركة مخزون واحدة (سجل إضافة فقط): الكمية موجبة للإدخال وسالبة للإخراج"""
+    __tablename__ = 'inventory_movements'
+
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    quantity = db.Column(db.Float, nullable=False)
+    movement_type = db.Column(db.String(20), nullable=False)  # sale, sale_reversal, adjustment
+    source_type = db.Column(db.String(50), nullable=True)
+    source_id = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index('idx_inventory_movement_product_date', 'product_id', 'created_at'),
+        Index('idx_inventory_movement_source', 'source_type', 'source_id'),
+    )
+
+    MOVEMENT_TYPES = {
+        'sale': 'بيع',
+        'sale_reversal': 'إلغاء بيع',
+        'adjustment': 'تسوية',
+    }
+
+    def __repr__(self):
+        return f'<InventoryMovement {self.product_id}: {self.quantity:+g}>'
+
+class InventorySnapshot(db.Model):
+    """كمية كل منتج في لحظة محددة لحساب المخزون التاريخي دون جمع كل الحركات"""
+    __tablename__ = 'inventory_snapshots'
+
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id', ondelete='CASCADE'), primary_key=True)
+    taken_at = db.Column(db.DateTime, primary_key=True)
+    quantity = db.Column(db.Float, nullable=False)
+
+    def __repr__(self):
+        return f'<InventorySnapshot {self.product_id}@{self.taken_at}: {self.quantity:g}>'
+
+    @classmethod
+    def take(cls, now=None):
+        """لقطة لكل المنتجات المتتبعة بجملة INSERT ... SELECT واحدة"""
+        now = now or datetime.utcnow()
+        result = db.session.execute(insert(cls.__table__).from_select(
+            ['product_id', 'taken_at', 'quantity'],
+            select(products.c.id, literal(now, DateTime), products.c.quantity)
+            .where(products.c.track_inventory == True)
+        ))
+        db.session.commit()
+        return result.rowcount
+
+    @classmethod
+    def stock_as_of(cls, product_id, moment):
+        """الكمية في لحظة سابقة: أقرب لقطة (أو الكمية الحالية) مع الحركات بينها وبين اللحظة فقط"""
+        snapshots = cls.__table__
+        movements = InventoryMovement.__table__
+        now = datetime.utcnow()
+
+        before = db.session.execute(
+            select(snapshots.c.taken_at, snapshots.c.quantity)
+            .where(snapshots.c.product_id == product_id, snapshots.c.taken_at <= moment)
+            .order_by(snapshots.c.taken_at.desc()).limit(1)
+        ).first()
+        after = db.session.execute(
+            select(snapshots.c.taken_at, snapshots.c.quantity)
+            .where(snapshots.c.product_id == product_id, snapshots.c.taken_at > moment)
+            .order_by(snapshots.c.taken_at).limit(1)
+        ).first()
+        if after is None:
+            # الكمية الحالية لقطة محدثة دائماً
+            current = db.session.execute(select(products.c.quantity).where(products.c.id == product_id)).scalar()
+            after = (now, current or 0.0)
+
+        def moved(start, end):
+            return db.session.execute(
+                select(func.coalesce(func.sum(movements.c.quantity), 0.0)).where(
+                    movements.c.product_id == product_id,
+                    movements.c.created_at > start,
+                    movements.c.created_at <= end
+                )
+            ).scalar()
+
+        if before is not None and (after is None or moment - before[0] <= after[0] - moment):
+            return before[1] + moved(before[0], moment)
+        return after[1] - moved(moment, after[0])
+
+# ===== تسجيل الحركات مع كل flush =====
+
+def queue_movement(session, product_id, quantity, movement_type, source_type=None, source_id=None):
+    """إضافة حركة إلى قائمة الجلسة؛ تكتب كلها مع تحديث الكميات في نهاية flush"""
+    if product_id is None or not quantity:
+        return
+    session.info.setdefault(PENDING_KEY, []).append({
+        'product_id': product_id,
+        'quantity': quantity,
+        'movement_type': movement_type,
+        'source_type': source_type,
+        'source_id': source_id,
+    })
+
+@event.listens_for(db.session, 'after_flush')
+def write_pending_movements(session, flush_context):
+    """كتابة حركات الـ flush بجملة إدراج واحدة وتحديث ذري للكميات لكل منتج"""
+    pending = session.info.pop(PENDING_KEY, None)
+    if not pending:
+        return
+    connection = session.connection()
+
+    product_ids = {item['product_id'] for item in pending}
+    tracked = set(connection.execute(
+        select(products.c.id).where(products.c.id.in_(product_ids), products.c.track_inventory == True)
+    ).scalars())
+    pending = [item for item in pending if item['product_id'] in tracked]
+    if not pending:
+        return
+
+    now = datetime.utcnow()
+    deltas = {}
+    for item in pending:
+        item['created_at'] = now
+        deltas[item['product_id']] = deltas.get(item['product_id'], 0.0) + item['quantity']
+
+    connection.execute(insert(InventoryMovement.__table__), pending)
+    # quantity = quantity + :delta بدلاً من كتابة قيمة محسوبة في Python، فلا تضيع الطلبات المتزامنة
+    changes = [{'product': product_id, 'delta': delta} for product_id, delta in deltas.items() if delta]
+    if changes:
+        connection.execute(
+            update(products).where(products.c.id == bindparam('product'))
+            .values(quantity=products.c.quantity + bindparam('delta')),
+            changes
+        )
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def discard_pending_movements(session, previous_transaction):
+    """حذف حركات flush فشل"""
+    session.info.pop(PENDING_KEY, None)
+
+# ===== اللقطات الدورية =====
+
+class InventorySnapshotJob:
+    """مهمة دورية تأخذ لقطة للمخزون كل INVENTORY_SNAPSHOT_INTERVAL_HOURS ساعة"""
+
+    def __init__(self, app=None):
+        self.app = None
+        self._scheduler = schedule.Scheduler()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """تهيئة المهمة وجدولتها (0 افتراضياً: معطلة)
+
+        المؤقت يعمل داخل كل عملية تنشئ التطبيق (كل عامل gunicorn)، لذلك التشغيل المعتاد
+        من cron: python scripts/run_periodic_job.py inventory-snapshot
+        """
+        self.app = app
+        interval = int(app.config.get('INVENTORY_SNAPSHOT_INTERVAL_HOURS', 0))
+        if interval:
+            self._scheduler.every(interval).hours.do(self._run_scheduled)
+
+            def run_scheduler():
+                while True:
+                    self._scheduler.run_pending()
+                    time.sleep(60)
+
+            threading.Thread(target=run_scheduler, daemon=True).start()
+
+    def _run_scheduled(self):
+        with self.app.app_context():
+            try:
+                count = InventorySnapshot.take()
+                logger.info('لقطة المخزون: %d منتج', count)
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Inventory snapshot failed: {str(e)}")
+
+# إنشاء مثيل عام
+inventory_snapshot_job = InventorySnapshotJob()
@@ -5,13 +5,15 @@
 Enhanced Invoice Model
 """
 
-from datetime import datetime, timedelta
-from sqlalchemy import Index, event, func
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import Index, event, func, select, update, case, literal, inspect
 from sqlalchemy.ext.hybrid import hybrid_property
 from app import db
-from app.models.base import BaseModel, AuditMixin, EncryptedMixin
+from app.models.base import BaseModel, AuditMixin, EncryptedMixin, SearchableMixin
+from app.models.invoice_item import InvoiceItem
+from app.models.sequence import next_document_number
 
-class Invoice(BaseModel, AuditMixin, EncryptedMixin):
+class Invoice(BaseModel, AuditMixin, EncryptedMixin, SearchableMixin):
     """نموذج الفواتير مع ميزات أمان ومالية متقدمة"""
     
     __tablename__ = 'invoices'
@@ -151,33 +153,35 @@ class Invoice(BaseModel, AuditMixin, EncryptedMixin):
             self._digital_signature = None
             self.signature_timestamp = None
     
-    def generate_invoice_number(self):
-        """إنشاء رقم فاتورة تلقائي"""
+    def generate_invoice_number(self, connection=None):
+        """إنشاء رقم فاتورة تلقائي من عداد number_sequences"""
         if not self.invoice_number:
-            year = datetime.now().year
-            month = datetime.now().month
-            
-            # البحث عن آخر رقم فاتورة في الشهر
-            last_invoice = Invoice.query.filter(
-                func.extract('year', Invoice.date) == year,
-                func.extract('month', Invoice.date) == month
-            ).order_by(Invoice.id.desc()).first()
-            
-            if last_invoice and last_invoice.invoice_number:
-                try:
-                    last_number = int(last_invoice.invoice_number.split('-')[-1])
-                    next_number = last_number + 1
-                except:
-                    next_number = 1
-            else:
-                next_number = 1
-            
-            self.invoice_number = f"INV-{year}{month:02d}-{next_number:06d}"
-    
-    def calculate_amounts(self):
+            self.invoice_number = next_document_number('INV', connection=connection)
+    
+    def items_subtotal(self, connection=None):
+        """مجموع عناصر الفاتورة باستعلام تجميعي واحد بدلاً من تحميل كل عنصر"""
+        items = InvoiceItem.__table__
+        subtotal = 0.0
+        if self.id is not None:
+            query = select(func.coalesce(func.sum(items.c.total_amount), 0.0)).where(items.c.invoice_id == self.id)
+            executor = connection if connection is not None else db.session
+            subtotal = executor.execute(query).scalar() or 0.0
+        
+        # العناصر المضافة أو المحذوفة التي لم تكتب بعد في قاعدة البيانات
+        history = inspect(self).attrs.invoice_items.history
+        for item in history.added:
+            if item.id is None:
+                # before_insert للعنصر لم يعمل بعد (يعمل بعد إدراج الفاتورة) فيحسب مبلغه هنا
+                item.apply_defaults()
+                item.calculate_amounts()
+                subtotal += item.total_amount
+        subtotal -= sum(item.total_amount or 0.0 for item in history.deleted if item.id is not None)
+        return subtotal
+    
+    def calculate_amounts(self, connection=None):
         """حساب المبالغ تلقائياً"""
         # حساب المجموع الفرعي من العناصر
-        self.subtotal = sum(item.total_amount for item in self.invoice_items)
+        self.subtotal = self.items_subtotal(connection)
         
         # حساب الخصم
         if self.discount_rate > 0:
@@ -196,6 +200,51 @@ class Invoice(BaseModel, AuditMixin, EncryptedMixin):
         # تحديث حالة الدفع
         self.update_payment_status()
     
+    @classmethod
+    def recalculate_totals(cls, invoice_ids=None, tax_rate=None, chunk_size=5000):
+        """إعادة حساب مبالغ فواتير كثيرة بجملة UPDATE مجمعة واحدة
+        
+        invoice_ids: الفواتير المطلوبة (الافتراضي جميع الفواتير غير المحذوفة)
+        tax_rate: نسبة ضريبة جديدة تطبق على الفواتير نفسها قبل الحساب
+        
+        التحديث يتجاوز أحداث before_update وسجل المراجعة، لذلك تعاد أرصدة العملاء المتأثرين
+        من المصدر في نفس المعاملة؛ يعيد عدد الصفوف المحدثة ولا يحفظ المعاملة.
+        """
+        from app.models.customer_balance import CustomerBalance
+        
+        invoices = cls.__table__
+        if invoice_ids is None:
+            batches = [invoices.c.is_deleted == False]
+        else:
+            invoice_ids = list(invoice_ids)
+            batches = [invoices.c.id.in_(invoice_ids[i:i + chunk_size])
+                       for i in range(0, len(invoice_ids), chunk_size)]
+        
+        updated = 0
+        customer_ids = set()
+        for condition in batches:
+            updated += db.session.execute(
+                _recalculate_statement(invoices, condition, tax_rate, db.session.connection().dialect)
+            ).rowcount
+            if invoice_ids is not None:
+                customer_ids.update(db.session.execute(
+                    select(invoices.c.customer_id).where(condition, invoices.c.customer_id.isnot(None)).distinct()
+                ).scalars())
+        
+        # remaining_amount تغير دون أحداث after_update التي تحدث customer_balances
+        if invoice_ids is None:
+            CustomerBalance.rebuild(commit=False)
+        elif customer_ids:
+            CustomerBalance.rebuild(sorted(customer_ids), commit=False)
+        
+        # النسخ المحملة في الجلسة أصبحت قديمة
+        for obj in list(db.session.identity_map.values()):
+            if isinstance(obj, cls):
+                db.session.expire(obj, TOTAL_COLUMNS)
+            elif isinstance(obj, CustomerBalance):
+                db.session.expire(obj)
+        return updated
+    
     def update_payment_status(self):
         """تحديث حالة الدفع"""
         if self.paid_amount <= 0:
@@ -257,14 +306,14 @@ class Invoice(BaseModel, AuditMixin, EncryptedMixin):
             self.status = 'approved'
             self.approved_by_id = user_id
             self.approved_at = datetime.utcnow()
-            db.session.commit()
-            
             # تسجيل الاعتماد
             self.log_change('approve', {
                 'approved_by': user_id,
                 'invoice_number': self.invoice_number,
                 'total_amount': self.total_amount
             })
+            
+            db.session.commit()
     
     def reject(self, user_id, reason=None):
         """رفض الفاتورة"""
@@ -276,14 +325,14 @@ class Invoice(BaseModel, AuditMixin, EncryptedMixin):
             if reason:
                 self.notes = f"{self.notes or ''}\nسبب الرفض: {reason}"
             
-            db.session.commit()
-            
             # تسجيل الرفض
             self.log_change('reject', {
                 'rejected_by': user_id,
                 'reason': reason,
                 'invoice_number': self.invoice_number
             })
+            
+            db.session.commit()
     
     def cancel(self, user_id, reason=None):
         """إلغاء الفاتورة"""
@@ -293,14 +342,14 @@ class Invoice(BaseModel, AuditMixin, EncryptedMixin):
             if reason:
                 self.notes = f"{self.notes or ''}\nسبب الإلغاء: {reason}"
             
-            db.session.commit()
-            
             # تسجيل الإلغاء
             self.log_change('cancel', {
                 'cancelled_by': user_id,
                 'reason': reason,
                 'invoice_number': self.invoice_number
             })
+            
+            db.session.commit()
     
     def add_payment(self, amount, payment_method='cash', reference=None):
         """إضافة دفعة"""
@@ -325,8 +374,6 @@ class Invoice(BaseModel, AuditMixin, EncryptedMixin):
         if self.payment_status == 'paid':
             self.status = 'completed'
         
-        db.session.commit()
-        
         # تسجيل الدفعة
         self.log_change('payment_received', {
             'amount': amount,
@@ -334,6 +381,8 @@ class Invoice(BaseModel, AuditMixin, EncryptedMixin):
             'invoice_number': self.invoice_number
         })
         
+        db.session.commit()
+        
         return payment
     
     def get_status_display(self):
@@ -379,18 +428,77 @@ class Invoice(BaseModel, AuditMixin, EncryptedMixin):
     def __repr__(self):
         return f'<Invoice {self.invoice_number}>'
 
+# ===== إعادة الحساب الجماعية =====
+
+# الأعمدة التي تكتبها إعادة الحساب
+TOTAL_COLUMNS = ['subtotal', 'discount_amount', 'tax_rate', 'tax_amount', 'total_amount',
+                 'remaining_amount', 'payment_status', 'updated_at']
+
+def _totals_values(invoices, subtotal, tax_rate=None):
+    """نفس حسابات calculate_amounts كتعابير SQL"""
+    rate = invoices.c.tax_rate if tax_rate is None else literal(float(tax_rate))
+    discount = case(
+        (invoices.c.discount_rate > 0, subtotal * invoices.c.discount_rate / 100.0),
+        else_=invoices.c.discount_amount
+    )
+    taxable = subtotal - discount
+    tax = taxable * rate / 100.0
+    total = taxable + tax + invoices.c.shipping_cost
+    values = {
+        'subtotal': subtotal,
+        'discount_amount': discount,
+        'tax_amount': tax,
+        'total_amount': total,
+        'remaining_amount': total - invoices.c.paid_amount,
+        'payment_status': case(
+            (invoices.c.paid_amount <= 0, 'unpaid'),
+            (invoices.c.paid_amount > total, 'overpaid'),
+            (invoices.c.paid_amount >= total, 'paid'),
+            else_='partial'
+        ),
+        'updated_at': datetime.now(timezone.utc),
+    }
+    if tax_rate is not None:
+        values['tax_rate'] = rate
+    return values
+
+def _supports_update_from(dialect):
+    if dialect.name == 'sqlite':
+        return dialect.dbapi.sqlite_version_info >= (3, 33)
+    return dialect.name in ('postgresql', 'mysql', 'mariadb')
+
+def _recalculate_statement(invoices, condition, tax_rate, dialect):
+    """UPDATE ... FROM مع مجاميع العناصر المجمعة، أو استعلام فرعي مرتبط كبديل"""
+    items = InvoiceItem.__table__
+    if _supports_update_from(dialect):
+        # LEFT JOIN حتى تصفّر الفواتير التي لا عناصر لها
+        sums = select(
+            invoices.c.id.label('invoice_id'),
+            func.coalesce(func.sum(items.c.total_amount), 0.0).label('subtotal')
+        ).select_from(
+            invoices.outerjoin(items, items.c.invoice_id == invoices.c.id)
+        ).where(condition).group_by(invoices.c.id).subquery('item_sums')
+        return update(invoices).where(invoices.c.id == sums.c.invoice_id).values(
+            **_totals_values(invoices, sums.c.subtotal, tax_rate)
+        )
+    
+    subtotal = select(func.coalesce(func.sum(items.c.total_amount), 0.0)).where(
+        items.c.invoice_id == invoices.c.id
+    ).scalar_subquery()
+    return update(invoices).where(condition).values(**_totals_values(invoices, subtotal, tax_rate))
+
 # الأحداث التلقائية
 @event.listens_for(Invoice, 'before_insert')
 def generate_invoice_number_before_insert(mapper, connection, target):
     """إنشاء رقم فاتورة قبل الإدراج"""
-    target.generate_invoice_number()
+    target.generate_invoice_number(connection)
     target.set_due_date()
-    target.calculate_amounts()
+    target.calculate_amounts(connection)
 
 @event.listens_for(Invoice, 'before_update')
 def calculate_amounts_before_update(mapper, connection, target):
     """حساب المبالغ قبل التحديث"""
-    target.calculate_amounts()
+    target.calculate_amounts(connection)
 
 @event.listens_for(Invoice, 'after_insert')
 def log_invoice_creation(mapper, connection, target):
@@ -5,10 +5,12 @@
 Invoice Items Model
 """
 
-from sqlalchemy import Index, event
+from sqlalchemy import Index, event, inspect
 from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import object_session
 from app import db
 from app.models.base import BaseModel, AuditMixin
+from app.models.inventory import queue_movement
 
 class InvoiceItem(BaseModel, AuditMixin):
     """نموذج عناصر الفاتورة"""
@@ -110,6 +112,13 @@ class InvoiceItem(BaseModel, AuditMixin):
             self.tax_amount = net_amount * (self.tax_rate / 100)
             self.total_amount = net_amount + self.tax_amount
     
+    def apply_defaults(self):
+        """قيم الأعمدة الافتراضية التي لم تعين بعد (تطبق عادة عند INSERT)"""
+        for column in self.__table__.columns:
+            default = column.default
+            if default is not None and default.is_scalar and getattr(self, column.key) is None:
+                setattr(self, column.key, default.arg)
+    
     def update_from_product(self):
         """تحديث البيانات من المنتج المرتبط"""
         if self.product:
@@ -118,12 +127,7 @@ class InvoiceItem(BaseModel, AuditMixin):
             self.sku = self.product.sku
             self.unit_price = self.product.price
             self.unit = self.product.unit or 'قطعة'
-            
-            # تحديث الكمية في المخزون
-            if self.product.track_inventory:
-                self.product.quantity -= self.quantity
-                if self.product.quantity < 0:
-                    self.product.quantity = 0
+            # المخزون يخصم عند حفظ العنصر عبر دفتر الحركات (app.models.inventory)
     
     def validate_data(self):
         """التحقق من صحة البيانات"""
@@ -224,25 +228,44 @@ def calculate_amounts_before_update(mapper, connection, target):
     """حساب المبالغ قبل التحديث"""
     target.calculate_amounts()
 
+# تحميل القيم القديمة قبل التعديل حتى تحسب حركة المخزون العكسية
+event.listen(InvoiceItem.quantity, 'set', lambda *args: None, active_history=True)
+event.listen(InvoiceItem.product_id, 'set', lambda *args: None, active_history=True)
+
 @event.listens_for(InvoiceItem, 'after_insert')
 def update_product_inventory_after_insert(mapper, connection, target):
-    """تحديث المخزون بعد الإدراج"""
-    if target.product and target.product.track_inventory:
-        target.product.quantity -= target.quantity
-        if target.product.quantity < 0:
-            target.product.quantity = 0
+    """تسجيل حركة خصم المخزون بعد الإدراج"""
+    queue_movement(object_session(target), target.product_id, -target.quantity, 'sale', 'invoice_item', target.id)
 
 @event.listens_for(InvoiceItem, 'after_update')
 def update_product_inventory_after_update(mapper, connection, target):
-    """تحديث المخزون بعد التحديث"""
-    # هذا يحتاج معالجة أكثر تعقيداً لتتبع التغييرات في الكمية
-    pass
+    """تسجيل فرق المخزون عند تغيير الكمية أو المنتج"""
+    state = inspect(target)
+    quantity = state.attrs.quantity.history
+    product = state.attrs.product_id.history
+    if not quantity.has_changes() and not product.has_changes():
+        return
+    old_quantity = quantity.deleted[0] if quantity.deleted else target.quantity
+    old_product = product.deleted[0] if product.deleted else target.product_id
+    session = object_session(target)
+    if old_product == target.product_id:
+        queue_movement(session, target.product_id, old_quantity - target.quantity, 'adjustment', 'invoice_item', target.id)
+    else:
+        queue_movement(session, old_product, old_quantity, 'sale_reversal', 'invoice_item', target.id)
+        queue_movement(session, target.product_id, -target.quantity, 'sale', 'invoice_item', target.id)
 
 @event.listens_for(InvoiceItem, 'after_delete')
 def restore_product_inventory_after_delete(mapper, connection, target):
-    """استعادة المخزون بعد الحذف"""
-    if target.product and target.product.track_inventory:
-        target.product.quantity += target.quantity
+    """تسجيل حركة استعادة المخزون بعد الحذف"""
+    state = inspect(target)
+    product = state.attrs.product_id.history
+    quantity = state.attrs.quantity.history
+    queue_movement(
+        object_session(target),
+        product.deleted[0] if product.deleted else target.product_id,
+        quantity.deleted[0] if quantity.deleted else target.quantity,
+        'sale_reversal', 'invoice_item', target.id
+    )
 
 @event.listens_for(InvoiceItem, 'after_insert')
 def log_item_creation(mapper, connection, target):
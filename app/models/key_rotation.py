@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+نقاط استئناف تدوير مفتاح التشفير
+Encryption Key Rotation Checkpoints
+"""
+
+from datetime import datetime
+from app import db
+
+class KeyRotationCheckpoint(db.Model):
+    """تقدم إعادة التشفير لكل جدول: آخر معرف تمت معالجته للمفتاح الأساسي الحالي"""
+    __tablename__ = 'key_rotation_checkpoints'
+
+    table_name = db.Column(db.String(64), primary_key=True)
+    key_fingerprint = db.Column(db.String(16), nullable=False)  # بصمة المفتاح الأساسي لهذه الجولة
+    last_id = db.Column(db.Integer, default=0, nullable=False)
+    rotated = db.Column(db.Integer, default=0, nullable=False)
+    skipped = db.Column(db.Integer, default=0, nullable=False)
+    started_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        return {
+            'table': self.table_name,
+            'key_fingerprint': self.key_fingerprint,
+            'last_id': self.last_id,
+            'rotated': self.rotated,
+            'skipped': self.skipped,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+    def __repr__(self):
+        return f'<KeyRotationCheckpoint {self.table_name}@{self.last_id}>'
@@ -10,6 +10,7 @@ from sqlalchemy import Index, event
 from sqlalchemy.ext.hybrid import hybrid_property
 from app import db
 from app.models.base import BaseModel, AuditMixin, EncryptedMixin
+from app.models.sequence import next_document_number
 
 class Payment(BaseModel, AuditMixin, EncryptedMixin):
     """نموذج المدفوعات مع ميزات أمان متقدمة"""
@@ -183,28 +184,11 @@ class Payment(BaseModel, AuditMixin, EncryptedMixin):
         else:
             self._transaction_id = None
     
-    def generate_payment_number(self):
-        """إنشاء رقم دفعة تلقائي"""
+    def generate_payment_number(self, connection=None):
+        """إنشاء رقم دفعة تلقائي من عداد number_sequences"""
         if not self.payment_number:
-            year = datetime.now().year
-            month = datetime.now().month
-            
-            # البحث عن آخر رقم دفعة في الشهر
-            last_payment = Payment.query.filter(
-                Payment.date >= datetime(year, month, 1)
-            ).order_by(Payment.id.desc()).first()
-            
-            if last_payment and last_payment.payment_number:
-                try:
-                    last_number = int(last_payment.payment_number.split('-')[-1])
-                    next_number = last_number + 1
-                except:
-                    next_number = 1
-            else:
-                next_number = 1
-            
             prefix = 'PAY' if self.payment_type == 'paid' else 'REC'
-            self.payment_number = f"{prefix}-{year}{month:02d}-{next_number:06d}"
+            self.payment_number = next_document_number(prefix, connection=connection)
     
     def calculate_net_amount(self):
         """حساب المبلغ الصافي"""
@@ -262,28 +246,28 @@ class Payment(BaseModel, AuditMixin, EncryptedMixin):
             # في التطبيق الحقيقي، هنا سيتم التكامل مع بوابة الدفع
             
             self.status = 'completed'
-            db.session.commit()
-            
             # تسجيل المعالجة
             self.log_change('process', {
                 'processed_by': user_id,
                 'payment_number': self.payment_number,
                 'amount': self.amount
             })
+            
+            db.session.commit()
     
     def verify(self, user_id, verification_status='verified'):
         """التحقق من الدفعة"""
         self.verification_status = verification_status
         self.verified_by_id = user_id
         self.verified_at = datetime.utcnow()
-        db.session.commit()
-        
         # تسجيل التحقق
         self.log_change('verify', {
             'verified_by': user_id,
             'verification_status': verification_status,
             'payment_number': self.payment_number
         })
+        
+        db.session.commit()
     
     def cancel(self, user_id, reason=None):
         """إلغاء الدفعة"""
@@ -293,14 +277,14 @@ class Payment(BaseModel, AuditMixin, EncryptedMixin):
             if reason:
                 self.notes = f"{self.notes or ''}\nسبب الإلغاء: {reason}"
             
-            db.session.commit()
-            
             # تسجيل الإلغاء
             self.log_change('cancel', {
                 'cancelled_by': user_id,
                 'reason': reason,
                 'payment_number': self.payment_number
             })
+            
+            db.session.commit()
     
     def refund(self, amount=None, reason=None):
         """استرداد الدفعة"""
@@ -328,8 +312,6 @@ class Payment(BaseModel, AuditMixin, EncryptedMixin):
             if refund_amount >= self.amount:
                 self.status = 'refunded'
             
-            db.session.commit()
-            
             # تسجيل الاسترداد
             self.log_change('refund', {
                 'refund_amount': refund_amount,
@@ -337,6 +319,8 @@ class Payment(BaseModel, AuditMixin, EncryptedMixin):
                 'payment_number': self.payment_number
             })
             
+            db.session.commit()
+            
             return refund_payment
     
     def get_payment_type_display(self):
@@ -412,7 +396,7 @@ class Payment(BaseModel, AuditMixin, EncryptedMixin):
 @event.listens_for(Payment, 'before_insert')
 def generate_payment_number_before_insert(mapper, connection, target):
     """إنشاء رقم دفعة قبل الإدراج"""
-    target.generate_payment_number()
+    target.generate_payment_number(connection)
     target.calculate_net_amount()
 
 @event.listens_for(Payment, 'before_update')
@@ -9,6 +9,7 @@ from datetime import datetime
 from sqlalchemy import Index, event, func
 from app import db
 from app.models.base import BaseModel, AuditMixin
+from app.security.permission_cache import permission_cache
 
 class Role(BaseModel, AuditMixin):
     """نموذج الأدوار"""
@@ -412,3 +413,23 @@ def log_role_permission_removal(mapper, connection, target):
         'role_id': target.role_id,
         'permission_id': target.permission_id
     })
+
+# إبطال ذاكرة الصلاحيات بعد commit
+def invalidate_user_permissions(mapper, connection, target):
+    """تغيير أدوار مستخدم يبطل صلاحياته فقط (والمستخدم السابق إذا تغير user_id)"""
+    session = db.inspect(target).session
+    if session is not None:
+        permission_cache.queue(session, target.user_id)
+        for user_id in db.inspect(target).attrs.user_id.history.deleted:
+            permission_cache.queue(session, user_id)
+
+def invalidate_all_permissions(mapper, connection, target):
+    """تغيير دور أو صلاحياته يمس كل من يحمله"""
+    session = db.inspect(target).session
+    if session is not None:
+        permission_cache.queue(session)
+
+for operation in ('after_insert', 'after_update', 'after_delete'):
+    event.listen(UserRole, operation, invalidate_user_permissions)
+    for model in (Role, Permission, RolePermission):
+        event.listen(model, operation, invalidate_all_permissions)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+مخصص أرقام المستندات (الفواتير والمدفوعات)
+Document Number Sequence Allocator
+"""
+
+import os
+import threading
+from datetime import datetime
+from sqlalchemy import select, update, insert
+from sqlalchemy.exc import IntegrityError
+from flask import current_app, has_app_context
+from app import db
+
+class NumberSequence(db.Model):
+    """عداد لكل بادئة وفترة: صف واحد يحدّث ذرياً بدلاً من البحث عن آخر رقم"""
+    __tablename__ = 'number_sequences'
+
+    prefix = db.Column(db.String(20), primary_key=True)
+    period = db.Column(db.String(10), primary_key=True, default='')  # مثل 202510 أو '' بدون فترة
+    last_value = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<NumberSequence {self.prefix}/{self.period}: {self.last_value}>'
+
+class SequenceAllocator:
+    """تخصيص أرقام متسلسلة بتكلفة O(1) لكل رقم
+
+    الوضعان:
+    - gapless: الزيادة داخل معاملة المستند نفسها؛ التراجع يعيد الرقم فلا فجوات،
+      لكن المعاملات المتزامنة على نفس البادئة تنتظر بعضها حتى الإنهاء.
+    - block: كل عملية تحجز كتلة أرقام في معاملة مستقلة قصيرة وتوزعها من الذاكرة؛
+      لا انتظار بين العمال، مع فجوات عند التراجع أو إعادة التشغيل.
+    """
+
+    MODES = ('gapless', 'block')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._blocks = {}  # (prefix, period) -> [التالي، آخر رقم محجوز]
+        self._pid = os.getpid()
+
+    def _settings(self):
+        config = current_app.config if has_app_context() else {}
+        mode = config.get('NUMBER_SEQUENCE_MODE', os.environ.get('NUMBER_SEQUENCE_MODE', 'gapless'))
+        block_size = config.get('NUMBER_SEQUENCE_BLOCK_SIZE', os.environ.get('NUMBER_SEQUENCE_BLOCK_SIZE', 50))
+        if mode not in self.MODES:
+            raise ValueError(f'وضع ترقيم غير معروف: {mode}')
+        return mode, max(1, int(block_size))
+
+    def allocate(self, prefix, period='', connection=None):
+        """الرقم التالي للبادئة والفترة
+
+        connection: اتصال المعاملة الحالية (مثل وسيط before_insert) ليبقى الرقم
+        ضمن نفس المعاملة في وضع gapless.
+        """
+        mode, block_size = self._settings()
+        connection = connection if connection is not None else db.session.connection()
+
+        # SQLite يسمح بكاتب واحد فقط؛ الحجز من اتصال ثانٍ سينتظر المعاملة الحالية
+        if mode == 'gapless' or connection.dialect.name == 'sqlite':
+            return self._increment(connection, prefix, period, 1)
+        return self._from_block(prefix, period, block_size)
+
+    def _from_block(self, prefix, period, block_size):
+        with self._lock:
+            # العملية الابنة بعد fork لا ترث كتل الأب
+            if self._pid != os.getpid():
+                self._blocks.clear()
+                self._pid = os.getpid()
+
+            key = (prefix, period)
+            block = self._blocks.get(key)
+            if block is None or block[0] > block[1]:
+                with db.engine.begin() as connection:
+                    last = self._increment(connection, prefix, period, block_size)
+                block = [last - block_size + 1, last]
+                self._blocks[key] = block
+
+            value = block[0]
+            block[0] += 1
+            return value
+
+    def _increment(self, connection, prefix, period, step):
+        """زيادة ذرية للعداد وإرجاع القيمة الجديدة؛ ينشئ الصف عند أول استخدام"""
+        table = NumberSequence.__table__
+        condition = (table.c.prefix == prefix) & (table.c.period == period)
+        values = {'last_value': table.c.last_value + step, 'updated_at': datetime.utcnow()}
+
+        for _ in range(2):
+            if connection.dialect.update_returning:
+                value = connection.execute(
+                    update(table).where(condition).values(**values).returning(table.c.last_value)
+                ).scalar()
+                if value is not None:
+                    return value
+            elif connection.execute(update(table).where(condition).values(**values)).rowcount:
+                # الصف مقفل بالتحديث حتى نهاية المعاملة فالقراءة متسقة
+                return connection.execute(select(table.c.last_value).where(condition)).scalar()
+
+            row = {'prefix': prefix, 'period': period, 'last_value': step, 'updated_at': datetime.utcnow()}
+            if connection.dialect.name == 'sqlite':
+                # كاتب واحد في SQLite: لا سباق على إنشاء الصف
+                connection.execute(insert(table).values(**row))
+                return step
+            try:
+                with connection.begin_nested():
+                    connection.execute(insert(table).values(**row))
+                return step
+            except IntegrityError:
+                # أنشأ عامل آخر الصف في نفس اللحظة: أعد محاولة التحديث
+                continue
+
+        raise RuntimeError(f'تعذر تخصيص رقم للتسلسل {prefix}/{period}')
+
+    def reset_cache(self):
+        """نسيان الكتل المحجوزة في هذه العملية"""
+        with self._lock:
+            self._blocks.clear()
+
+def period_key(moment=None):
+    """مفتاح الفترة الشهرية YYYYMM"""
+    moment = moment or datetime.now()
+    return f'{moment.year}{moment.month:02d}'
+
+def next_document_number(prefix, moment=None, connection=None, width=6):
+    """رقم مستند بالصيغة PREFIX-YYYYMM-000001"""
+    period = period_key(moment)
+    value = sequence_allocator.allocate(prefix, period, connection)
+    return f'{prefix}-{period}-{value:0{width}d}'
+
+# إنشاء مثيل عام
+sequence_allocator = SequenceAllocator()
@@ -99,7 +99,11 @@ class SystemLog(db.Model):
     @classmethod
     def cleanup_old_logs(cls, days=30):
         """تنظيف السجلات القديمة"""
+        from app.search import search_index
+        
         cutoff_date = datetime.utcnow() - timedelta(days=days)
+        # الحذف الجماعي لا يمر بأحداث الفهرس: مستندات البحث تحذف في نفس المعاملة
+        search_index.discard(cls, cls.timestamp < cutoff_date)
         deleted_count = cls.query.filter(cls.timestamp < cutoff_date).delete()
         db.session.commit()
         return deleted_count
@@ -121,7 +125,7 @@ class PerformanceMetric(db.Model):
     source = db.Column(db.String(100))  # اسم الوظيفة أو المسار
     
     # بيانات إضافية
-    metadata = db.Column(JSON)
+    metadata_ = db.Column('metadata', JSON)
     
     # فهارس
     __table_args__ = (
@@ -141,7 +145,7 @@ class PerformanceMetric(db.Model):
             unit=unit,
             category=category,
             source=source,
-            metadata=metadata if metadata else None
+            metadata_=metadata if metadata else None
         )
         db.session.add(metric)
         return metric
@@ -280,7 +284,7 @@ class SystemHealth(db.Model):
     error_message = db.Column(db.Text)
     
     # معلومات إضافية
-    metadata = db.Column(JSON)
+    metadata_ = db.Column('metadata', JSON)
     
     def __repr__(self):
         return f'<SystemHealth {self.check_name}: {self.status}>'
@@ -294,7 +298,7 @@ class SystemHealth(db.Model):
             response_time=response_time,
             details=details,
             error_message=error_message,
-            metadata=metadata if metadata else None
+            metadata_=metadata if metadata else None
         )
         db.session.add(health_check)
         return health_check
@@ -401,7 +405,8 @@ class UserActivity(db.Model):
         """الأنشطة الحديثة"""
         cutoff_time = datetime.utcnow() - timedelta(hours=hours)
         
-        return cls.query.filter(cls.timestamp > cutoff_time)\
+        return cls.query.options(db.joinedload(cls.user))\
+                       .filter(cls.timestamp > cutoff_time)\
                        .order_by(cls.timestamp.desc())\
                        .limit(limit).all()
     
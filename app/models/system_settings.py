@@ -5,12 +5,21 @@
 System Settings Model
 """
 
+import copy
+import logging
+import threading
+from types import MappingProxyType
 from datetime import datetime
-from sqlalchemy import Index, event
+from sqlalchemy import Index, event, select, update, insert
 from sqlalchemy.ext.hybrid import hybrid_property
 from app import db
 from app.models.base import BaseModel, AuditMixin, EncryptedMixin
 
+logger = logging.getLogger('accounting_system')
+
+PENDING_KEY = 'settings_changed'
+COMMITTED_KEY = 'settings_version_bumped'
+
 class SystemSettings(BaseModel, AuditMixin, EncryptedMixin):
     """نموذج إعدادات النظام مع تشفير القيم الحساسة"""
     
@@ -103,6 +112,11 @@ class SystemSettings(BaseModel, AuditMixin, EncryptedMixin):
             self._value = string_value
             self._encrypted_value = None
     
+    @value.expression
+    def value(cls):
+        """القيمة غير المشفرة في الاستعلامات (يسمح أيضاً بـ SystemSettings(value=...))"""
+        return cls._value
+    
     def _convert_to_string(self, value):
         """تحويل القيمة إلى نص للتخزين"""
         if value is None:
@@ -230,11 +244,8 @@ class SystemSettings(BaseModel, AuditMixin, EncryptedMixin):
     
     @classmethod
     def get_setting(cls, key, default=None):
-        """الحصول على قيمة إعداد"""
-        setting = cls.query.filter_by(key=key).first()
-        if setting:
-            return setting.value
-        return default
+        """الحصول على قيمة إعداد (من لقطة الإعدادات دون استعلام)"""
+        return settings_snapshot.get(key, default)
     
     @classmethod
     def set_setting(cls, key, value, category='general', title=None, description=None, 
@@ -257,21 +268,16 @@ class SystemSettings(BaseModel, AuditMixin, EncryptedMixin):
             # إنشاء إعداد جديد
             setting = cls(
                 key=key,
-                value=value,
                 category=category,
                 title=title or key,
                 description=description,
                 data_type=data_type,
-                is_sensitive=is_sensitive
+                is_sensitive=is_sensitive,
+                # القيمة بعد النوع والحساسية لأن الـ setter يعتمد عليهما
+                value=value
             )
+            # الإنشاء يسجله log_setting_creation بعد الإدراج (بمعرف السجل)
             db.session.add(setting)
-            
-            # تسجيل الإنشاء
-            setting.log_change('create', {
-                'key': key,
-                'category': category,
-                'data_type': data_type
-            })
         
         db.session.commit()
         return setting
@@ -341,12 +347,12 @@ class SystemSettings(BaseModel, AuditMixin, EncryptedMixin):
             if not cls.query.filter_by(key=key).first():
                 setting = cls(
                     key=key,
-                    value=value,
                     category=category,
                     title=title,
                     data_type=data_type,
                     is_sensitive=is_sensitive,
-                    is_system=True
+                    is_system=True,
+                    value=value
                 )
                 db.session.add(setting)
         
@@ -374,7 +380,98 @@ class SystemSettings(BaseModel, AuditMixin, EncryptedMixin):
     def __repr__(self):
         return f'<SystemSettings {self.key}>'
 
-# الأحداث التلقائية
+class SettingsVersion(db.Model):
+    """عداد إصدار الإعدادات (صف واحد) يزداد في نفس معاملة أي تغيير في الإعدادات"""
+    __tablename__ = 'settings_version'
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<SettingsVersion {self.version}>'
+
+class SettingsSnapshot:
+    """قيم الإعدادات المفكوكة في قاموس ثابت لكل عملية
+
+    القراءة بحث في القاموس فقط. قبل كل طلب يقرأ صف settings_version (مفتاح أساسي)
+    وإذا تغير الإصدار تعاد قراءة الإعدادات كلها، فترى العمليات الأخرى التغيير في
+    طلبها التالي. العملية التي كتبت التغيير تعيد التحميل مباشرة بعد commit.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._lock = threading.Lock()
+        self._values = None
+        self._version = None
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """فحص الإصدار قبل كل طلب"""
+        self.app = app
+        app.before_request(self.refresh)
+
+    @property
+    def version(self):
+        return self._version
+
+    def get(self, key, default=None):
+        """قيمة إعداد؛ قيم JSON تنسخ حتى لا تعدل اللقطة المشتركة"""
+        values = self._values
+        if values is None:
+            values = self.load()
+        value = values.get(key, default)
+        if isinstance(value, (dict, list)):
+            return copy.deepcopy(value)
+        return value
+
+    def current_version(self):
+        """الإصدار المحفوظ في قاعدة البيانات"""
+        return db.session.execute(
+            select(SettingsVersion.version).where(SettingsVersion.id == 1)
+        ).scalar() or 0
+
+    def refresh(self):
+        """إعادة التحميل إذا تغير الإصدار منذ آخر تحميل"""
+        if self._values is not None and self.current_version() == self._version:
+            return
+        self.load()
+
+    def load(self):
+        """قراءة الإصدار ثم كل الإعدادات (أي كتابة بينهما تعيد التحميل لاحقاً فقط)"""
+        with self._lock:
+            version = self.current_version()
+            values = {setting.key: setting.value for setting in SystemSettings.query.all()}
+            self._values = MappingProxyType(values)
+            self._version = version
+            logger.debug('Settings snapshot loaded: version %s, %d keys', version, len(values))
+            return self._values
+
+    def invalidate(self):
+        """إسقاط اللقطة المحلية؛ تحمل عند أول قراءة"""
+        self._values = None
+
+    def bump(self, connection):
+        """زيادة عداد الإصدار داخل المعاملة الحالية"""
+        result = connection.execute(
+            update(SettingsVersion.__table__).where(SettingsVersion.id == 1)
+            .values(version=SettingsVersion.version + 1)
+        )
+        if result.rowcount == 0:
+            connection.execute(insert(SettingsVersion.__table__).values(id=1, version=1))
+
+# إنشاء مثيل عام
+settings_snapshot = SettingsSnapshot()
+
+def mark_settings_changed(mapper, connection, target):
+    session = db.inspect(target).session
+    if session is not None:
+        session.info[PENDING_KEY] = True
+
+for operation in ('after_insert', 'after_update', 'after_delete'):
+    event.listen(SystemSettings, operation, mark_settings_changed)
+
 @event.listens_for(SystemSettings, 'after_insert')
 def log_setting_creation(mapper, connection, target):
     """تسجيل إنشاء إعداد جديد"""
@@ -392,3 +489,20 @@ def log_setting_update(mapper, connection, target):
         'key': target.key,
         'category': target.category
     })
+
+@event.listens_for(db.session, 'after_flush')
+def bump_settings_version(session, flush_context):
+    """زيادة الإصدار مرة واحدة لكل flush يغير الإعدادات"""
+    if session.info.pop(PENDING_KEY, False):
+        settings_snapshot.bump(session.connection())
+        session.info[COMMITTED_KEY] = True
+
+@event.listens_for(db.session, 'after_commit')
+def reload_settings_after_commit(session):
+    if session.info.pop(COMMITTED_KEY, False):
+        settings_snapshot.invalidate()
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def discard_settings_change(session, previous_transaction):
+    session.info.pop(PENDING_KEY, None)
+    session.info.pop(COMMITTED_KEY, None)
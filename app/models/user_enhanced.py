@@ -18,6 +18,8 @@ from sqlalchemy import Index, event, func
 from sqlalchemy.ext.hybrid import hybrid_property
 from app import db
 from app.models.base import BaseModel, AuditMixin, EncryptedMixin
+from app.models.roles_permissions import Permission
+from app.security.permission_cache import permission_cache
 
 class User(UserMixin, BaseModel, AuditMixin, EncryptedMixin):
     """نموذج المستخدم مع نظام مصادقة متقدم"""
@@ -70,8 +72,8 @@ class User(UserMixin, BaseModel, AuditMixin, EncryptedMixin):
     session_expires_at = db.Column(db.DateTime, nullable=True)
     
     # العلاقات
-    roles = db.relationship('UserRole', backref='user', lazy='dynamic', cascade='all, delete-orphan')
-    login_history = db.relationship('LoginHistory', backref='user', lazy='dynamic', cascade='all, delete-orphan')
+    roles = db.relationship('UserRole', backref='user', foreign_keys='UserRole.user_id', lazy='dynamic', cascade='all, delete-orphan')
+    login_history = db.relationship('LoginHistory', backref='user', foreign_keys='LoginHistory.user_id', lazy='dynamic', cascade='all, delete-orphan')
     
     # فهارس محسنة
     __table_args__ = (
@@ -158,22 +160,22 @@ class User(UserMixin, BaseModel, AuditMixin, EncryptedMixin):
         """قفل الحساب لفترة محددة"""
         self.locked_until = datetime.utcnow() + timedelta(minutes=duration_minutes)
         self.failed_login_attempts = 0
-        db.session.commit()
-        
         # تسجيل قفل الحساب
         self.log_change('account_locked', {
             'locked_until': self.locked_until.isoformat(),
             'duration_minutes': duration_minutes
         })
+        
+        db.session.commit()
     
     def unlock_account(self):
         """إلغاء قفل الحساب"""
         self.locked_until = None
         self.failed_login_attempts = 0
-        db.session.commit()
-        
         # تسجيل إلغاء القفل
         self.log_change('account_unlocked', {})
+        
+        db.session.commit()
     
     def record_login_attempt(self, success=True, ip_address=None):
         """تسجيل محاولة تسجيل الدخول"""
@@ -243,11 +245,11 @@ class User(UserMixin, BaseModel, AuditMixin, EncryptedMixin):
             backup_codes = [secrets.token_hex(4).upper() for _ in range(10)]
             self.backup_codes = backup_codes
             
-            db.session.commit()
-            
             # تسجيل إعداد المصادقة الثنائية
             self.log_change('two_factor_setup', {})
             
+            db.session.commit()
+            
             return secret, backup_codes
         
         return self.two_factor_secret, self.backup_codes
@@ -255,20 +257,20 @@ class User(UserMixin, BaseModel, AuditMixin, EncryptedMixin):
     def enable_two_factor(self):
         """تفعيل المصادقة الثنائية"""
         self.two_factor_enabled = True
-        db.session.commit()
-        
         # تسجيل تفعيل المصادقة الثنائية
         self.log_change('two_factor_enabled', {})
+        
+        db.session.commit()
     
     def disable_two_factor(self):
         """إلغاء تفعيل المصادقة الثنائية"""
         self.two_factor_enabled = False
         self.two_factor_secret = None
         self.backup_codes = None
-        db.session.commit()
-        
         # تسجيل إلغاء المصادقة الثنائية
         self.log_change('two_factor_disabled', {})
+        
+        db.session.commit()
     
     def verify_two_factor_token(self, token):
         """التحقق من رمز المصادقة الثنائية"""
@@ -320,11 +322,11 @@ class User(UserMixin, BaseModel, AuditMixin, EncryptedMixin):
         """إنشاء رمز إعادة تعيين كلمة المرور"""
         self.reset_token = secrets.token_urlsafe(32)
         self.reset_token_expires = datetime.utcnow() + timedelta(hours=1)
-        db.session.commit()
-        
         # تسجيل طلب إعادة التعيين
         self.log_change('password_reset_requested', {})
         
+        db.session.commit()
+        
         return self.reset_token
     
     def verify_reset_token(self, token):
@@ -349,10 +351,10 @@ class User(UserMixin, BaseModel, AuditMixin, EncryptedMixin):
         # إلغاء جميع الجلسات
         self.invalidate_session()
         
-        db.session.commit()
-        
         # تسجيل إعادة تعيين كلمة المرور
         self.log_change('password_reset_completed', {})
+        
+        db.session.commit()
     
     def generate_email_verification_token(self):
         """إنشاء رمز تأكيد البريد الإلكتروني"""
@@ -367,18 +369,18 @@ class User(UserMixin, BaseModel, AuditMixin, EncryptedMixin):
             self.is_verified = True
             self.email_verified_at = datetime.utcnow()
             self.email_verification_token = None
-            db.session.commit()
-            
             # تسجيل تأكيد البريد
             self.log_change('email_verified', {})
             
+            db.session.commit()
+            
             return True
         
         return False
     
     def has_role(self, role_name):
         """فحص إذا كان المستخدم لديه دور معين"""
-        return self.roles.join(Role).filter(Role.name == role_name).first() is not None
+        return role_name in permission_cache.get(self.id).roles
     
     def has_permission(self, permission_name):
         """فحص إذا كان المستخدم لديه صلاحية معينة"""
@@ -386,11 +388,8 @@ class User(UserMixin, BaseModel, AuditMixin, EncryptedMixin):
         if self.is_admin:
             return True
         
-        # البحث في صلاحيات الأدوار
-        return db.session.query(Permission).join(RolePermission).join(Role).join(UserRole).filter(
-            UserRole.user_id == self.id,
-            Permission.name == permission_name
-        ).first() is not None
+        # الصلاحيات محلولة مسبقاً في ذاكرة الصلاحيات
+        return permission_name in permission_cache.get(self.id).permissions
     
     def get_roles(self):
         """الحصول على جميع أدوار المستخدم"""
@@ -401,9 +400,10 @@ class User(UserMixin, BaseModel, AuditMixin, EncryptedMixin):
         if self.is_admin:
             return Permission.query.all()
         
-        return db.session.query(Permission).join(RolePermission).join(Role).join(UserRole).filter(
-            UserRole.user_id == self.id
-        ).distinct().all()
+        names = permission_cache.get(self.id).permissions
+        if not names:
+            return []
+        return Permission.query.filter(Permission.name.in_(names)).all()
     
     def to_dict(self, include_sensitive=False):
         """تحويل إلى قاموس مع إخفاء البيانات الحساسة"""
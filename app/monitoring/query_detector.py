@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+كاشف استعلامات N+1
+N+1 Query Detector
+"""
+
+import re
+import logging
+from flask import g, request, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('accounting_system')
+
+_IN_LIST_PATTERN = re.compile(r'IN \((?:[^()]*)\)', re.IGNORECASE)
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+def query_fingerprint(statement):
+    """بصمة الاستعلام: نفس الاستعلام بمعاملات مختلفة له نفس البصمة"""
+    statement = _WHITESPACE_PATTERN.sub(' ', statement).strip()
+    return _IN_LIST_PATTERN.sub('IN (...)', statement)
+
+class NPlusOneDetector:
+    """يعدّ بصمات الاستعلامات لكل طلب ويحذّر من الأنماط المتكررة"""
+
+    def __init__(self, app=None):
+        self.app = None
+        self.threshold = 5
+        self._listening = False
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """تهيئة الكاشف (يعمل في وضع التطوير افتراضياً)"""
+        enabled = app.config.get('N_PLUS_ONE_DETECTION')
+        if enabled is None:
+            enabled = app.debug
+        if not enabled:
+            return
+
+        self.app = app
+        self.threshold = app.config.get('N_PLUS_ONE_THRESHOLD', 5)
+
+        if not self._listening:
+            event.listen(Engine, 'before_cursor_execute', self._count_statement)
+            self._listening = True
+
+        app.before_request(self._start_request)
+        app.after_request(self._report_request)
+
+    def _count_statement(self, conn, cursor, statement, parameters, context, executemany):
+        if not has_request_context():
+            return
+        counts = g.get('query_fingerprints')
+        if counts is not None:
+            fingerprint = query_fingerprint(statement)
+            counts[fingerprint] = counts.get(fingerprint, 0) + 1
+
+    def _start_request(self):
+        g.query_fingerprints = {}
+
+    def _report_request(self, response):
+        counts = g.pop('query_fingerprints', None)
+        if counts:
+            for fingerprint, count in self.find_repeated(counts):
+                logger.warning('N+1 محتمل في %s: نفس الاستعلام نُفّذ %d مرة: %s',
+                               request.endpoint, count, fingerprint[:300])
+            response.headers['X-Query-Count'] = str(sum(counts.values()))
+        return response
+
+    def find_repeated(self, counts):
+        """البصمات التي تكررت عدداً يساوي الحد أو يتجاوزه"""
+        return sorted(
+            ((fingerprint, count) for fingerprint, count in counts.items() if count >= self.threshold),
+            key=lambda item: item[1],
+            reverse=True
+        )
+
+# إنشاء مثيل عام
+n_plus_one_detector = NPlusOneDetector()
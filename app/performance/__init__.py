@@ -10,7 +10,10 @@ from flask import Blueprint
 # إنشاء blueprint لتحسين الأداء
 performance_bp = Blueprint('performance', __name__, url_prefix='/performance')
 
-# استيراد المسارات
-from . import routes
+# استيراد المسارات (اختيارية)
+try:
+    from . import routes
+except ImportError:
+    routes = None
 
 __all__ = ['performance_bp']
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+مفاتيح التخزين المؤقت الثابتة وترميز القيم
+Stable Cache Keys and Value Codec
+"""
+
+import json
+import zlib
+import struct
+import pickle
+import hashlib
+from datetime import date, time
+from decimal import Decimal
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+# ===== المفاتيح =====
+
+def _canonical(value):
+    """تمثيل ثابت بين العمليات للأنواع التي لا يعرفها JSON"""
+    if isinstance(value, Decimal):
+        return {'__decimal__': str(value)}
+    if isinstance(value, (date, time)):
+        return {'__date__': value.isoformat()}
+    if isinstance(value, (set, frozenset)):
+        # ترتيب العناصر بترميزها لأن ترتيب المجموعة يتبع hash()
+        return {'__set__': sorted(json.dumps(item, sort_keys=True, default=_canonical) for item in value)}
+    if isinstance(value, bytes):
+        return {'__bytes__': value.hex()}
+    # سجلات قاعدة البيانات تعرف بجدولها ومعرفها
+    if hasattr(value, '__tablename__') and hasattr(value, 'id'):
+        return {'__model__': [value.__tablename__, value.id]}
+    # repr الافتراضي يحتوي عنوان الذاكرة فيختلف بين العمليات
+    if type(value).__repr__ is object.__repr__:
+        raise TypeError(f'Cannot derive a stable cache key from {type(value).__name__}')
+    return {'__repr__': [type(value).__qualname__, repr(value)]}
+
+def make_key(prefix, func, args, kwargs):
+    """مفتاح ثابت بين العمليات: blake2b على ترميز JSON مرتب للوسائط
+
+    hash() المدمج عشوائي لكل عملية (PYTHONHASHSEED) فلا تتشارك العمليات المدخلات.
+    """
+    encoded = json.dumps(
+        [func.__module__, func.__qualname__, args, kwargs],
+        sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=_canonical
+    ).encode('utf-8')
+    return f"{prefix}:{func.__name__}:{hashlib.blake2b(encoded, digest_size=16).hexdigest()}"
+
+# ===== المسلسلات =====
+
+class PickleSerializer:
+    """أي كائن بايثون"""
+    tag = b'p'
+
+    def dumps(self, value):
+        return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def loads(self, data):
+        return pickle.loads(data)
+
+def _check_json_types(value):
+    """TypeError للقيم التي لا تعود من JSON بنفس نوعها (فتكتب بـ pickle)
+
+    مفاتيح القاموس غير النصية تعود نصوصاً (json) والـ tuple يعود list (json وorjson).
+    """
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if not isinstance(key, str):
+                raise TypeError(f'JSON cache values need str keys, got {type(key).__name__}')
+            _check_json_types(item)
+    elif isinstance(value, tuple):
+        raise TypeError('JSON cache values cannot hold tuples')
+    elif isinstance(value, list):
+        for item in value:
+            _check_json_types(item)
+
+class JSONSerializer:
+    """قيم بصيغة JSON (نتائج to_dict)؛ orjson إذا كان متوفراً"""
+    tag = b'j'
+
+    def dumps(self, value):
+        _check_json_types(value)
+        if orjson is not None:
+            # التواريخ ترفض (TypeError) بدل تحويلها لنص، فتكتب بـ pickle وتعود بنوعها
+            return orjson.dumps(value, option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS)
+        return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def loads(self, data):
+        if orjson is not None:
+            return orjson.loads(data)
+        return json.loads(data)
+
+class MsgpackSerializer:
+    """قيم بصيغة JSON بترميز ثنائي أصغر"""
+    tag = b'm'
+
+    def dumps(self, value):
+        # strict_types: الـ tuple يرفض بدل أن يعود list
+        return msgpack.packb(value, use_bin_type=True, strict_types=True)
+
+    def loads(self, data):
+        return msgpack.unpackb(data, raw=False)
+
+SERIALIZERS = {
+    'pickle': PickleSerializer,
+    'json': JSONSerializer,
+    'orjson': JSONSerializer,
+    'msgpack': MsgpackSerializer,
+}
+
+# ===== الترميز =====
+
+# رأس القيمة: بايت المسلسل ثم بايت الأعلام
+COMPRESSED_ZLIB = 0x01
+COMPRESSED_LZ4 = 0x02
+ENVELOPE = 0x04
+
+ENVELOPE_HEADER = struct.Struct('!dd')
+
+class CacheCodec:
+    """ترميز قيم Redis: مسلسل قابل للاختيار مع ضغط فوق حد معين
+
+    كل قيمة تبدأ ببايت المسلسل وبايت الأعلام، فتقرأ القيم المكتوبة بإعدادات سابقة
+    بعد تغيير CACHE_SERIALIZER أو CACHE_COMPRESSION. القيم التي لا يدعمها المسلسل
+    المختار (مثل datetime في msgpack) تكتب بـ pickle.
+    """
+
+    def __init__(self, serializer='pickle', compression='zlib', threshold=1024, level=6):
+        if serializer == 'msgpack' and msgpack is None:
+            raise ImportError('msgpack is not installed (CACHE_SERIALIZER=msgpack)')
+        if compression == 'lz4' and lz4_frame is None:
+            raise ImportError('lz4 is not installed (CACHE_COMPRESSION=lz4)')
+        self.serializer = SERIALIZERS[serializer]()
+        self.fallback = PickleSerializer()
+        self.compression = compression if compression in ('zlib', 'lz4') else None
+        self.threshold = threshold
+        self.level = level
+        self._by_tag = {cls.tag: cls() for cls in SERIALIZERS.values()}
+
+    def dumps(self, value, envelope=None):
+        """بايتات القيمة؛ envelope=(soft_expires_at, delta) يحفظ بيانات CachedValue في الرأس"""
+        serializer = self.serializer
+        try:
+            payload = serializer.dumps(value)
+        except (TypeError, ValueError):
+            serializer = self.fallback
+            payload = serializer.dumps(value)
+
+        flags = 0
+        if self.compression and len(payload) >= self.threshold:
+            if self.compression == 'lz4':
+                compressed, flag = lz4_frame.compress(payload), COMPRESSED_LZ4
+            else:
+                compressed, flag = zlib.compress(payload, self.level), COMPRESSED_ZLIB
+            if len(compressed) < len(payload):
+                payload, flags = compressed, flag
+
+        header = serializer.tag + bytes((flags | (ENVELOPE if envelope else 0),))
+        if envelope:
+            header += ENVELOPE_HEADER.pack(*envelope)
+        return header + payload
+
+    def loads(self, data):
+        """(value, envelope)؛ ValueError لبيانات غير معروفة (مثل pickle خام من إصدار سابق)"""
+        serializer = self._by_tag.get(data[:1])
+        if serializer is None or len(data) < 2:
+            raise ValueError('Unknown cache payload format')
+        flags = data[1]
+        offset = 2
+        envelope = None
+        if flags & ENVELOPE:
+            envelope = ENVELOPE_HEADER.unpack_from(data, offset)
+            offset += ENVELOPE_HEADER.size
+        payload = data[offset:]
+        if flags & COMPRESSED_LZ4:
+            if lz4_frame is None:
+                raise ValueError('lz4 payload but lz4 is not installed')
+            payload = lz4_frame.decompress(payload)
+        elif flags & COMPRESSED_ZLIB:
+            payload = zlib.decompress(payload)
+        return serializer.loads(payload), envelope
@@ -6,21 +6,43 @@ Cache Manager
 """
 
 import redis
-import pickle
+import math
+import time
+import uuid
+import random
 import json
 import logging
-from datetime import datetime, timedelta
+import threading
+from collections import namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FlightTimeout
 from functools import wraps
-from flask import current_app, request
+from flask import current_app, request, has_app_context
 from app import db
+from app.performance.memory_cache import MemoryCache
+from app.performance.cache_codec import CacheCodec, make_key
 
 logger = logging.getLogger('accounting_system')
 
+# قيمة محسوبة مع نهاية عمرها المرن ومدة حسابها (للانتهاء المبكر الاحتمالي)
+CachedValue = namedtuple('CachedValue', ['value', 'soft_expires_at', 'delta'])
+
+# حذف قفل Redis فقط إذا كان ما زال لنا
+RELEASE_LOCK = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+
 class CacheManager:
     """مدير التخزين المؤقت"""
     
     def __init__(self, app=None):
         self.redis_client = None
+        self.memory_cache = MemoryCache()
+        self.codec = CacheCodec()
+        self.stale_ttl = 300
+        self.lock_timeout = 30
+        self.early_expiry_beta = 1.0
+        self.refresh_workers = 2
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+        self._refresher = None
         self.app = app
         if app is not None:
             self.init_app(app)
@@ -29,6 +51,13 @@ class CacheManager:
         """تهيئة مدير التخزين المؤقت"""
         self.app = app
         
+        # ترميز قيم Redis: المسلسل والضغط فوق حد معين
+        self.codec = CacheCodec(
+            serializer=app.config.get('CACHE_SERIALIZER', 'pickle'),
+            compression=app.config.get('CACHE_COMPRESSION', 'zlib'),
+            threshold=int(app.config.get('CACHE_COMPRESS_THRESHOLD', 1024))
+        )
+        
         # إعداد Redis
         redis_url = app.config.get('REDIS_URL', 'redis://localhost:6379/0')
         try:
@@ -40,26 +69,28 @@ class CacheManager:
             logger.warning(f"Redis not available, using memory cache: {str(e)}")
             self.redis_client = None
         
-        # إعداد التخزين المؤقت في الذاكرة كبديل
-        self.memory_cache = {}
-        self.cache_expiry = {}
+        # إعداد التخزين المؤقت في الذاكرة كبديل (محدود بعدد المدخلات وبالحجم)
+        self.memory_cache = MemoryCache(
+            max_bytes=int(app.config.get('CACHE_MEMORY_MAX_BYTES', 64 * 1024 * 1024)),
+            max_entries=int(app.config.get('CACHE_MEMORY_MAX_ENTRIES', 10000))
+        )
+        
+        # الحماية من تدافع إعادة الحساب
+        self.stale_ttl = int(app.config.get('CACHE_STALE_TTL', 300))
+        self.lock_timeout = float(app.config.get('CACHE_LOCK_TIMEOUT', 30))
+        self.early_expiry_beta = float(app.config.get('CACHE_EARLY_EXPIRY_BETA', 1.0))
+        self.refresh_workers = int(app.config.get('CACHE_REFRESH_WORKERS', 2))
     
     def get(self, key):
         """الحصول على قيمة من التخزين المؤقت"""
         try:
             if self.redis_client:
-                value = self.redis_client.get(key)
-                if value:
-                    return pickle.loads(value)
+                data = self.redis_client.get(key)
+                if data:
+                    return self._decode(key, data)
             else:
                 # استخدام التخزين المؤقت في الذاكرة
-                if key in self.memory_cache:
-                    if key in self.cache_expiry and datetime.now() > self.cache_expiry[key]:
-                        # انتهت صلاحية التخزين المؤقت
-                        del self.memory_cache[key]
-                        del self.cache_expiry[key]
-                        return None
-                    return self.memory_cache[key]
+                return self.memory_cache.get(key)
             
             return None
         except Exception as e:
@@ -70,27 +101,37 @@ class CacheManager:
         """تعيين قيمة في التخزين المؤقت"""
         try:
             if self.redis_client:
-                self.redis_client.setex(key, timeout, pickle.dumps(value))
+                self.redis_client.setex(key, timeout, self._encode(value))
             else:
                 # استخدام التخزين المؤقت في الذاكرة
-                self.memory_cache[key] = value
-                self.cache_expiry[key] = datetime.now() + timedelta(seconds=timeout)
+                return self.memory_cache.set(key, value, timeout)
             
             return True
         except Exception as e:
             logger.error(f"Cache set error: {str(e)}")
             return False
     
+    def _encode(self, value):
+        if isinstance(value, CachedValue):
+            return self.codec.dumps(value.value, (value.soft_expires_at, value.delta))
+        return self.codec.dumps(value)
+    
+    def _decode(self, key, data):
+        try:
+            value, envelope = self.codec.loads(data)
+        except ValueError:
+            # قيمة بصيغة سابقة (pickle خام): تعامل كأنها غير موجودة وتعاد كتابتها
+            logger.debug(f"Cache payload format not recognized, ignoring: {key}")
+            return None
+        return CachedValue(value, *envelope) if envelope else value
+    
     def delete(self, key):
         """حذف قيمة من التخزين المؤقت"""
         try:
             if self.redis_client:
                 self.redis_client.delete(key)
             else:
-                if key in self.memory_cache:
-                    del self.memory_cache[key]
-                if key in self.cache_expiry:
-                    del self.cache_expiry[key]
+                self.memory_cache.delete(key)
             
             return True
         except Exception as e:
@@ -108,23 +149,164 @@ class CacheManager:
                 else:
                     self.redis_client.flushdb()
             else:
-                if pattern:
-                    # مسح المفاتيح المطابقة للنمط
-                    import fnmatch
-                    keys_to_delete = [k for k in self.memory_cache.keys() if fnmatch.fnmatch(k, pattern)]
-                    for key in keys_to_delete:
-                        del self.memory_cache[key]
-                        if key in self.cache_expiry:
-                            del self.cache_expiry[key]
-                else:
-                    self.memory_cache.clear()
-                    self.cache_expiry.clear()
+                # مسح المفاتيح المطابقة للنمط عبر فهرس البادئات
+                self.memory_cache.clear(pattern)
             
             return True
         except Exception as e:
             logger.error(f"Cache clear error: {str(e)}")
             return False
     
+    # ===== الحساب مرة واحدة (الحماية من التدافع) =====
+    
+    def get_or_compute(self, key, compute, timeout=3600, stale_ttl=None):
+        """القيمة المخزنة أو حسابها مرة واحدة مهما كان عدد الطلبات المتزامنة
+        
+        - بعد timeout تبقى القيمة stale_ttl ثانية إضافية تعاد فيها القديمة بينما
+          يحدثها طلب واحد في الخلفية
+        - قبل timeout قد يبدأ التحديث مبكراً باحتمال يزداد كلما اقترب الانتهاء
+          وطالت مدة الحساب (XFetch)، فلا تنتهي المفاتيح الساخنة كلها معاً
+        - عند عدم وجود قيمة: يحسب طلب واحد لكل مفتاح في العملية (والبقية تنتظره)،
+          ومع Redis قفل SET NX يمنع العمليات الأخرى من الحساب في نفس الوقت
+        
+        التحديث في الخلفية يعمل في سياق التطبيق فقط: يجب ألا تعتمد compute على
+        request أو g أو current_user (والمفتاح لا يتضمنها أصلاً فتتشارك الطلبات القيمة).
+        """
+        if stale_ttl is None:
+            stale_ttl = self.stale_ttl
+        
+        entry = self.get(key)
+        if isinstance(entry, CachedValue):
+            remaining = entry.soft_expires_at - time.time()
+            if remaining > 0 and not self._expires_early(entry, remaining):
+                return entry.value
+            # قديمة أو انتهاء مبكر: تعاد الحالية ويحدثها طلب واحد في الخلفية
+            self._refresh_async(key, compute, timeout, stale_ttl)
+            return entry.value
+        
+        return self._compute_once(key, compute, timeout, stale_ttl)
+    
+    def _expires_early(self, entry, remaining):
+        """الانتهاء المبكر الاحتمالي: delta * beta * -ln(rand) >= الوقت المتبقي"""
+        if not entry.delta or not self.early_expiry_beta:
+            return False
+        return entry.delta * self.early_expiry_beta * -math.log(1.0 - random.random()) >= remaining
+    
+    def _store(self, key, value, delta, timeout, stale_ttl):
+        self.set(key, CachedValue(value, time.time() + timeout, delta), timeout + stale_ttl)
+    
+    def _compute_and_store(self, key, compute, timeout, stale_ttl):
+        start = time.perf_counter()
+        value = compute()
+        self._store(key, value, time.perf_counter() - start, timeout, stale_ttl)
+        return value
+    
+    def _begin_flight(self, key):
+        """(Future, leader): أول طلب للمفتاح يقود الحساب وغيره ينتظر نفس النتيجة"""
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                return flight, False
+            flight = self._flights[key] = Future()
+            return flight, True
+    
+    def _end_flight(self, key, flight):
+        with self._flights_lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+    
+    def _compute_once(self, key, compute, timeout, stale_ttl):
+        flight, leader = self._begin_flight(key)
+        if not leader:
+            try:
+                return flight.result(timeout=self.lock_timeout)
+            except FlightTimeout:
+                logger.warning(f"Cache flight timed out, computing directly: {key}")
+                return compute()
+        
+        try:
+            value = self._compute_distributed(key, compute, timeout, stale_ttl)
+            flight.set_result(value)
+            return value
+        except BaseException as e:
+            flight.set_exception(e)
+            raise
+        finally:
+            self._end_flight(key, flight)
+    
+    def _compute_distributed(self, key, compute, timeout, stale_ttl, wait=True):
+        """الحساب تحت قفل Redis إن وجد؛ من لم يحصل على القفل ينتظر قيمة صاحبه"""
+        lock_key = f"lock:{key}"
+        token = self._acquire_lock(lock_key)
+        if token is False:
+            if not wait:
+                # عملية أخرى تحدث القيمة؛ تبقى الحالية (وإن حذفت ننتظر صاحب القفل كما في الحساب الأول)
+                entry = self.get(key)
+                if isinstance(entry, CachedValue):
+                    return entry.value
+            deadline = time.monotonic() + self.lock_timeout
+            while time.monotonic() < deadline:
+                time.sleep(0.05)
+                entry = self.get(key)
+                if isinstance(entry, CachedValue):
+                    return entry.value
+            logger.warning(f"Cache lock wait timed out, computing directly: {key}")
+        
+        try:
+            return self._compute_and_store(key, compute, timeout, stale_ttl)
+        finally:
+            if token:
+                self._release_lock(lock_key, token)
+    
+    def _acquire_lock(self, lock_key):
+        """رمز القفل، أو False إذا كان مأخوذاً، أو None بدون Redis"""
+        if not self.redis_client:
+            return None
+        token = uuid.uuid4().hex
+        try:
+            if self.redis_client.set(lock_key, token, nx=True, px=int(self.lock_timeout * 1000)):
+                return token
+            return False
+        except Exception as e:
+            logger.error(f"Cache lock error: {str(e)}")
+            return None
+    
+    def _release_lock(self, lock_key, token):
+        try:
+            self.redis_client.eval(RELEASE_LOCK, 1, lock_key, token)
+        except Exception as e:
+            logger.error(f"Cache unlock error: {str(e)}")
+    
+    def _refresh_async(self, key, compute, timeout, stale_ttl):
+        """تحديث في الخلفية إذا لم يكن هناك تحديث جار للمفتاح"""
+        flight, leader = self._begin_flight(key)
+        if not leader:
+            return
+        
+        app = current_app._get_current_object() if has_app_context() else self.app
+        
+        def refresh():
+            try:
+                if app is not None:
+                    with app.app_context():
+                        value = self._compute_distributed(key, compute, timeout, stale_ttl, wait=False)
+                else:
+                    value = self._compute_distributed(key, compute, timeout, stale_ttl, wait=False)
+                flight.set_result(value)
+            except Exception as e:
+                logger.error(f"Cache refresh failed for {key}: {str(e)}")
+                flight.set_exception(e)
+            finally:
+                self._end_flight(key, flight)
+        
+        if self._refresher is None:
+            with self._flights_lock:
+                if self._refresher is None:
+                    self._refresher = ThreadPoolExecutor(
+                        max_workers=self.refresh_workers, thread_name_prefix='cache-refresh'
+                    )
+        self._refresher.submit(refresh)
+    
     def get_stats(self):
         """الحصول على إحصائيات التخزين المؤقت"""
         try:
@@ -139,11 +321,16 @@ class CacheManager:
                     'misses': info.get('keyspace_misses', 0)
                 }
             else:
+                stats = self.memory_cache.stats()
                 return {
                     'type': 'memory',
                     'connected': True,
-                    'total_keys': len(self.memory_cache),
-                    'expired_keys': len([k for k, exp in self.cache_expiry.items() if datetime.now() > exp])
+                    'total_keys': stats['entries'],
+                    'used_memory': stats['size_bytes'],
+                    'hits': stats['hits'],
+                    'misses': stats['misses'],
+                    'evictions': stats['evictions'],
+                    'expired_keys': stats['expirations']
                 }
         except Exception as e:
             logger.error(f"Cache stats error: {str(e)}")
@@ -157,24 +344,32 @@ class CacheManager:
 cache_manager = CacheManager()
 
 # ديكوريتر للتخزين المؤقت
-def cached(timeout=3600, key_prefix=''):
-    """ديكوريتر للتخزين المؤقت للوظائف"""
+def cached(timeout=3600, key_prefix='', stale_ttl=None):
+    """ديكوريتر للتخزين المؤقت للوظائف (مع الحماية من التدافع)
+    
+    المفتاح من الوسائط فقط والتحديث قد يجري في الخلفية خارج الطلب: الوظيفة يجب ألا
+    تعتمد على request أو g أو current_user (تمرر القيم التي تحتاجها كوسائط).
+    """
     def decorator(func):
+        warned = False
+        
         @wraps(func)
         def wrapper(*args, **kwargs):
-            # إنشاء مفتاح التخزين المؤقت
-            cache_key = f"{key_prefix}:{func.__name__}:{hash(str(args) + str(sorted(kwargs.items())))}"
-            
-            # محاولة الحصول على القيمة من التخزين المؤقت
-            cached_result = cache_manager.get(cache_key)
-            if cached_result is not None:
-                return cached_result
-            
-            # تنفيذ الوظيفة وحفظ النتيجة
-            result = func(*args, **kwargs)
-            cache_manager.set(cache_key, result, timeout)
+            nonlocal warned
+            # مفتاح ثابت بين العمليات (blake2b على ترميز مرتب للوسائط)
+            try:
+                cache_key = make_key(key_prefix, func, args, kwargs)
+            except TypeError as e:
+                # وسائط بلا تمثيل ثابت (مثل self بـ repr الافتراضي): تنفيذ دون تخزين
+                if not warned:
+                    warned = True
+                    logger.warning(f"Cache key unavailable for {func.__qualname__}, calling uncached: {str(e)}")
+                return func(*args, **kwargs)
             
-            return result
+            # القيمة المخزنة أو تنفيذ الوظيفة مرة واحدة لكل المتزامنين
+            return cache_manager.get_or_compute(
+                cache_key, lambda: func(*args, **kwargs), timeout, stale_ttl
+            )
         
         return wrapper
     return decorator
@@ -205,29 +400,22 @@ class QueryCache:
     """تخزين مؤقت لاستعلامات قاعدة البيانات"""
     
     @staticmethod
-    def get_cached_query(query_key, query_func, timeout=1800):
-        """تنفيذ استعلام مع تخزين مؤقت"""
-        cached_result = cache_manager.get(f"query:{query_key}")
-        
-        if cached_result is not None:
-            return cached_result
-        
-        # تنفيذ الاستعلام
-        result = query_func()
-        
-        # تحويل النتيجة لتنسيق قابل للتخزين المؤقت
-        if hasattr(result, 'all'):
-            # SQLAlchemy Query object
-            serializable_result = [item.to_dict() if hasattr(item, 'to_dict') else str(item) for item in result.all()]
-        elif hasattr(result, 'to_dict'):
-            # SQLAlchemy Model object
-            serializable_result = result.to_dict()
-        else:
-            serializable_result = result
-        
-        cache_manager.set(f"query:{query_key}", serializable_result, timeout)
+    def get_cached_query(query_key, query_func, timeout=1800, stale_ttl=None):
+        """تنفيذ استعلام مع تخزين مؤقت (مرة واحدة لكل المتزامنين)"""
+        def compute():
+            # تنفيذ الاستعلام
+            result = query_func()
+            
+            # تحويل النتيجة لتنسيق قابل للتخزين المؤقت
+            if hasattr(result, 'all'):
+                # SQLAlchemy Query object
+                return [item.to_dict() if hasattr(item, 'to_dict') else str(item) for item in result.all()]
+            elif hasattr(result, 'to_dict'):
+                # SQLAlchemy Model object
+                return result.to_dict()
+            return result
         
-        return serializable_result
+        return cache_manager.get_or_compute(f"query:{query_key}", compute, timeout, stale_ttl)
     
     @staticmethod
     def invalidate_query_cache(pattern):
@@ -353,18 +541,11 @@ def cleanup_expired_cache():
     """تنظيف التخزين المؤقت المنتهي الصلاحية"""
     try:
         if not cache_manager.redis_client:
-            # تنظيف التخزين المؤقت في الذاكرة
-            expired_keys = []
-            for key, expiry in cache_manager.cache_expiry.items():
-                if datetime.now() > expiry:
-                    expired_keys.append(key)
-            
-            for key in expired_keys:
-                del cache_manager.memory_cache[key]
-                del cache_manager.cache_expiry[key]
+            # تنظيف التخزين المؤقت في الذاكرة (الكتابة تنظف رأس الكومة أصلاً)
+            expired_count = cache_manager.memory_cache.purge_expired()
             
-            logger.info(f"Cleaned up {len(expired_keys)} expired cache entries")
-            return len(expired_keys)
+            logger.info(f"Cleaned up {expired_count} expired cache entries")
+            return expired_count
         
         return 0
     
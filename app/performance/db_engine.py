@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+إعدادات محرك قاعدة البيانات ومقاييس مجمع الاتصالات
+Database Engine Profile and Connection Pool Metrics
+"""
+
+import time
+import sqlite3
+import threading
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+class PoolMetrics:
+    """عدادات مجمع الاتصالات: السحب والإرجاع وزمن الانتظار"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """تصفير العدادات"""
+        with self._lock:
+            self.checkouts = 0
+            self.checkins = 0
+            self.timeouts = 0
+            self.total_wait = 0.0
+            self.max_wait = 0.0
+            self.peak_checked_out = 0
+
+    def record_checkout(self, wait, checked_out):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            self.peak_checked_out = max(self.peak_checked_out, checked_out)
+
+    def record_checkin(self):
+        with self._lock:
+            self.checkins += 1
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self, pool=None):
+        """لقطة من العدادات مع حالة المجمع الحالية"""
+        with self._lock:
+            stats = {
+                'checkouts': self.checkouts,
+                'checkins': self.checkins,
+                'timeouts': self.timeouts,
+                'avg_wait_ms': round(self.total_wait / self.checkouts * 1000, 3) if self.checkouts else 0,
+                'max_wait_ms': round(self.max_wait * 1000, 3),
+                'peak_checked_out': self.peak_checked_out,
+            }
+        if isinstance(pool, QueuePool):
+            stats.update(size=pool.size(), checked_out=pool.checkedout(), overflow=pool.overflow())
+        return stats
+
+pool_metrics = PoolMetrics()
+
+class MonitoredQueuePool(QueuePool):
+    """QueuePool يقيس زمن انتظار الحصول على اتصال"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            pool_metrics.record_timeout()
+            raise
+        pool_metrics.record_checkout(time.perf_counter() - start, self.checkedout())
+        return connection
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        pool_metrics.record_checkin()
+
+def sqlite_pragmas(config):
+    """أوامر PRAGMA لاتصالات SQLite"""
+    return (
+        'journal_mode=WAL',
+        'synchronous=NORMAL',
+        f"busy_timeout={config.get('SQLITE_BUSY_TIMEOUT', 5000)}",
+        f"mmap_size={config.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)}",
+        f"cache_size={config.get('SQLITE_CACHE_SIZE', -64000)}",  # سالب = كيلوبايت
+        'temp_store=MEMORY',
+    )
+
+def engine_options(config):
+    """خيارات المحرك حسب نوع قاعدة البيانات (مجمع لكل عامل gunicorn)"""
+    url = config['SQLALCHEMY_DATABASE_URI']
+    if url.startswith('sqlite'):
+        if url in ('sqlite://', 'sqlite:///') or ':memory:' in url:
+            return {}
+        return {
+            'poolclass': MonitoredQueuePool,
+            'pool_size': config.get('DB_POOL_SIZE', 5),
+            'max_overflow': config.get('DB_MAX_OVERFLOW', 10),
+            'pool_timeout': config.get('DB_POOL_TIMEOUT', 30),
+        }
+    return {
+        'poolclass': MonitoredQueuePool,
+        'pool_size': config.get('DB_POOL_SIZE', 5),
+        'max_overflow': config.get('DB_MAX_OVERFLOW', 10),
+        'pool_timeout': config.get('DB_POOL_TIMEOUT', 30),
+        'pool_recycle': config.get('DB_POOL_RECYCLE', 1800),
+        'pool_pre_ping': True,
+    }
+
+# مستمع connect واحد لكل العملية (create_app قد يستدعى أكثر من مرة، مثلاً في الاختبارات)
+_pragmas = ()
+_listening = False
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    for pragma in _pragmas:
+        cursor.execute(f'PRAGMA {pragma}')
+    cursor.close()
+
+def init_engine_profile(app):
+    """تطبيق إعدادات المحرك قبل db.init_app"""
+    global _pragmas, _listening
+    url = app.config['SQLALCHEMY_DATABASE_URI']
+    # بعض المنصات تعطي postgres:// الذي لا يقبله SQLAlchemy 2
+    if url.startswith('postgres://'):
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'postgresql://' + url[len('postgres://'):]
+
+    options = engine_options(app.config)
+    options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+    # أوامر PRAGMA من آخر تطبيق مهيأ (تطبيق واحد لكل عملية)
+    _pragmas = sqlite_pragmas(app.config)
+    if not _listening:
+        event.listen(Engine, 'connect', _set_sqlite_pragmas)
+        _listening = True
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ذاكرة تخزين مؤقت محدودة في العملية
+Bounded In-Process Cache
+"""
+
+import time
+import heapq
+import pickle
+import fnmatch
+import threading
+from collections import OrderedDict
+
+# تكلفة تقديرية لكل مدخل فوق حجم القيمة (المفتاح، كائن المدخل، روابط القاموس والفهارس)
+ENTRY_OVERHEAD = 200
+
+class MemoryCache:
+    """ذاكرة LRU محدودة بعدد المدخلات وبميزانية بايت مع انتهاء صلاحية بكومة زمنية
+
+    - القيم تخزن مسلسلة بـ pickle: الحجم معروف بدقة والقيمة المعادة نسخة مستقلة
+      (نفس سلوك Redis)
+    - الإخراج بترتيب الاستخدام الأقدم عند تجاوز عدد المدخلات أو الميزانية
+    - انتهاء الصلاحية: كومة (expires_at, key) تفرغ من رأسها عند كل كتابة، O(log n)
+    - فهرس بادئات على حدود ":" لمسح الأنماط مثل user:5:* دون المرور على كل المفاتيح
+    - كل العمليات تحت قفل واحد (آمنة لعمال gunicorn متعددي الخيوط)
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, max_entries=10000, clock=time.monotonic):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()   # key -> (payload, size, expires_at)
+        self._expiry = []               # كومة (expires_at, key)
+        self._prefixes = {}             # 'user:5:' -> {keys}
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    # ===== القراءة والكتابة =====
+
+    def get(self, key, default=None):
+        """القيمة أو default إذا لم توجد أو انتهت صلاحيتها"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            if entry[2] is not None and entry[2] <= self._clock():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            payload = entry[0]
+        return pickle.loads(payload)
+
+    def set(self, key, value, timeout=None):
+        """تخزين قيمة؛ timeout بالثواني (None أو 0 بدون انتهاء)"""
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        size = len(payload) + len(key) + ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            # أكبر من الميزانية كلها: لا تخزن (ولا تترك قيمة قديمة)
+            self.delete(key)
+            return False
+
+        with self._lock:
+            now = self._clock()
+            expires_at = now + timeout if timeout else None
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (payload, size, expires_at)
+            self.size += size
+            self._index(key)
+            if expires_at is not None:
+                heapq.heappush(self._expiry, (expires_at, key))
+            self._purge_expired(now)
+            self._evict()
+            self._compact()
+        return True
+
+    def delete(self, key):
+        """حذف مفتاح؛ True إذا كان موجوداً"""
+        with self._lock:
+            if key not in self._entries:
+                return False
+            self._remove(key)
+            return True
+
+    def clear(self, pattern=None):
+        """مسح الكل أو المفاتيح المطابقة لنمط fnmatch؛ يعيد عدد المحذوف"""
+        with self._lock:
+            if pattern is None:
+                count = len(self._entries)
+                self._entries.clear()
+                self._expiry.clear()
+                self._prefixes.clear()
+                self.size = 0
+                return count
+
+            keys = [key for key in self._candidates(pattern) if fnmatch.fnmatchcase(key, pattern)]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def purge_expired(self):
+        """حذف كل المدخلات المنتهية الآن؛ يعيد عددها"""
+        with self._lock:
+            before = self.expirations
+            self._purge_expired(self._clock())
+            return self.expirations - before
+
+    def stats(self):
+        """إحصائيات الذاكرة"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'size_bytes': self.size,
+                'max_bytes': self.max_bytes,
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
+
+    # ===== داخلي (يستدعى تحت القفل) =====
+
+    def _remove(self, key):
+        payload, size, expires_at = self._entries.pop(key)
+        self.size -= size
+        self._unindex(key)
+        # مدخل الكومة يبقى ويتجاهل عند خروجه (انظر _compact)
+
+    def _compact(self):
+        """إعادة بناء الكومة إذا كثرت مدخلاتها الميتة (مفاتيح حذفت أو أعيدت كتابتها)"""
+        if len(self._expiry) > 2 * len(self._entries) + 64:
+            entries = self._entries
+            self._expiry = list({(at, key) for at, key in self._expiry
+                                 if key in entries and entries[key][2] == at})
+            heapq.heapify(self._expiry)
+
+    def _purge_expired(self, now):
+        expiry = self._expiry
+        while expiry and expiry[0][0] <= now:
+            expires_at, key = heapq.heappop(expiry)
+            entry = self._entries.get(key)
+            # تجاهل مدخلات الكومة لمفاتيح حذفت أو أعيدت كتابتها
+            if entry is not None and entry[2] == expires_at:
+                self._remove(key)
+                self.expirations += 1
+
+    def _evict(self):
+        while self._entries and (self.size > self.max_bytes or len(self._entries) > self.max_entries):
+            key = next(iter(self._entries))
+            self._remove(key)
+            self.evictions += 1
+
+    @staticmethod
+    def _key_prefixes(key):
+        """بادئات المفتاح المنتهية بـ ':' مثل user: و user:5: للمفتاح user:5:profile"""
+        end = key.find(':')
+        while end != -1:
+            yield key[:end + 1]
+            end = key.find(':', end + 1)
+
+    def _index(self, key):
+        for prefix in self._key_prefixes(key):
+            self._prefixes.setdefault(prefix, set()).add(key)
+
+    def _unindex(self, key):
+        for prefix in self._key_prefixes(key):
+            keys = self._prefixes.get(prefix)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._prefixes[prefix]
+
+    def _candidates(self, pattern):
+        """المفاتيح التي قد تطابق النمط: مجموعة أطول بادئة ثابتة مفهرسة"""
+        wildcard = min((i for i in (pattern.find(c) for c in '*?[') if i != -1), default=len(pattern))
+        literal = pattern[:wildcard]
+        if wildcard == len(pattern):
+            return [literal] if literal in self._entries else []
+        end = literal.rfind(':')
+        if end == -1:
+            return list(self._entries)
+        return list(self._prefixes.get(literal[:end + 1], ()))
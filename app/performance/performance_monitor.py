@@ -14,6 +14,7 @@ from flask import request, g, current_app
 from app import db
 from app.models.system_monitoring import PerformanceMetric
 from app.performance.cache_manager import cache_manager
+from app.performance.db_engine import pool_metrics
 
 logger = logging.getLogger('accounting_system')
 
@@ -97,6 +98,17 @@ class PerformanceMonitor:
                     category='request',
                     source=request.endpoint
                 )
+                
+                # زمن انتظار مجمع الاتصالات
+                pool_stats = self.get_pool_stats()
+                PerformanceMetric.record_metric(
+                    name='db_pool_avg_wait',
+                    value=pool_stats['avg_wait_ms'],
+                    unit='ms',
+                    category='database',
+                    source='connection_pool',
+                    **pool_stats
+                )
                 db.session.commit()
         
         except Exception as e:
@@ -207,6 +219,7 @@ class PerformanceMonitor:
                 },
                 'cpu_usage': current_cpu,
                 'cache_stats': cache_stats,
+                'database_pool': self.get_pool_stats(),
                 'uptime': self._get_system_uptime()
             }
         
@@ -214,6 +227,10 @@ class PerformanceMonitor:
             logger.error(f"Failed to get performance stats: {str(e)}")
             return {}
     
+    def get_pool_stats(self):
+        """مقاييس مجمع اتصالات قاعدة البيانات"""
+        return pool_metrics.snapshot(db.engine.pool)
+    
     def get_slow_requests(self, limit=50):
         """الحصول على الطلبات البطيئة"""
         return sorted(self.slow_queries, key=lambda x: x['timestamp'], reverse=True)[:limit]
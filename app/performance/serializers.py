@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+مسلسلات النماذج المولدة مسبقاً
+Precompiled Model Serializers
+"""
+
+import json
+import threading
+from datetime import date, time
+from decimal import Decimal
+from sqlalchemy import inspect, Date, DateTime, Time, Numeric
+from flask import current_app
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _iso(value):
+    return value.isoformat() if value is not None else None
+
+def _number(value):
+    return float(value) if value is not None else None
+
+def _default(value):
+    """الأنواع التي لا يعرفها مرمز JSON"""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    raise TypeError(f'Type is not JSON serializable: {type(value).__name__}')
+
+def _converter(column):
+    """اسم دالة التحويل لنوع العمود (None إذا كانت القيمة صالحة لـ JSON كما هي)"""
+    if isinstance(column.type, (DateTime, Date, Time)):
+        return '_iso'
+    if isinstance(column.type, Numeric) and column.type.asdecimal:
+        return '_number'
+    return None
+
+class SerializerRegistry:
+    """دالة تسلسل مولدة لكل نموذج (ولكل إسقاط أعمدة) عند أول استخدام
+
+    الدالة المولدة تقرأ القيم المحملة من obj.__dict__ مباشرة مع تحويل التواريخ
+    وDecimal، وتعود إلى getattr إذا كان هناك عمود غير محمل (منتهي أو مؤجل).
+    الأعمدة المربوطة بخاصية باسم مختلف (الحقول المشفرة) تقرأ عبر الخاصية العامة
+    كما كان يفعل to_dict.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._serializers = {}
+
+    def get(self, model, fields=None, relationships=()):
+        """دالة تسلسل للنموذج؛ fields لإسقاط أعمدة محددة، relationships لعلاقات متداخلة"""
+        key = (model, tuple(fields) if fields is not None else None, tuple(relationships))
+        serializer = self._serializers.get(key)
+        if serializer is None:
+            with self._lock:
+                serializer = self._serializers.get(key)
+                if serializer is None:
+                    serializer = self._serializers[key] = self._compile(model, key[1], key[2])
+        return serializer
+
+    def serialize(self, instance, fields=None, relationships=()):
+        """تسلسل سجل واحد"""
+        return self.get(type(instance), fields, relationships)(instance)
+
+    def serialize_many(self, instances, fields=None, relationships=()):
+        """تسلسل قائمة سجلات (دالة واحدة لكل نوع)"""
+        result = []
+        model = serializer = None
+        for instance in instances:
+            if type(instance) is not model:
+                model = type(instance)
+                serializer = self.get(model, fields, relationships)
+            result.append(serializer(instance))
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._serializers.clear()
+
+    def _compile(self, model, fields, relationships):
+        mapper = inspect(model)
+        columns = []
+        for prop in mapper.column_attrs:
+            column = prop.columns[0]
+            if fields is None or column.name in fields:
+                columns.append((column.name, prop.key, _converter(column)))
+        if fields is not None:
+            unknown = set(fields) - {name for name, _, _ in columns}
+            if unknown:
+                raise ValueError(f"أعمدة غير موجودة في {model.__name__}: {', '.join(sorted(unknown))}")
+
+        namespace = {'_iso': _iso, '_number': _number}
+        fast, slow = [], []
+        for name, key, converter in columns:
+            if key == name:
+                value, fallback = f'd[{key!r}]', f'getattr(obj, {key!r})'
+            else:
+                # الخاصية العامة (مثل الحقول المشفرة)
+                value = fallback = f'getattr(obj, {name!r})'
+            if converter:
+                value, fallback = f'{converter}({value})', f'{converter}({fallback})'
+            fast.append(f'        {name!r}: {value},')
+            slow.append(f'    {name!r}: {fallback},')
+
+        nested = []
+        for index, name in enumerate(relationships):
+            relationship = mapper.relationships[name]
+            helper = f'_rel{index}'
+            namespace[helper] = self._relationship_serializer(relationship)
+            nested.append(f'    data[{name!r}] = {helper}(getattr(obj, {name!r}))')
+
+        source = '\n'.join(
+            ['def _columns(obj):', '    d = obj.__dict__', '    try:', '        return {']
+            + fast
+            + ['        }', '    except KeyError:', '        return _load(obj)', '',
+               'def _load(obj):', '    return {']
+            + slow
+            + ['    }', '', 'def serialize(obj):', '    data = _columns(obj)']
+            + nested
+            + ['    return data']
+        )
+        exec(compile(source, f'<serializer {model.__name__}>', 'exec'), namespace)
+        serializer = namespace['serialize']
+        serializer.__name__ = f'serialize_{model.__name__}'
+        serializer.columns = tuple(name for name, _, _ in columns)
+        return serializer
+
+    def _relationship_serializer(self, relationship):
+        """العلاقات تسلسل بأعمدتها فقط (مستوى واحد دون تكرار)"""
+        registry = self
+
+        if relationship.lazy == 'dynamic':
+            def serialize_query(query):
+                return registry.serialize_many(query)
+            return serialize_query
+
+        if relationship.uselist:
+            def serialize_list(items):
+                return registry.serialize_many(items) if items is not None else []
+            return serialize_list
+
+        def serialize_one(item):
+            return registry.serialize(item) if item is not None else None
+        return serialize_one
+
+# إنشاء مثيل عام
+serializer_registry = SerializerRegistry()
+
+def dumps(data):
+    """ترميز JSON إلى bytes (orjson إن وجد)"""
+    if orjson is not None:
+        return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=_default).encode('utf-8')
+
+def json_response(data, status=200):
+    """استجابة JSON مرمزة مباشرة إلى bytes"""
+    return current_app.response_class(dumps(data), status=status, mimetype='application/json')
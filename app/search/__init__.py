@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+نظام البحث النصي الكامل
+Full-Text Search System
+"""
+
+from app.search.arabic import normalize_arabic, search_text, tokenize
+from app.search.index import SearchDocument, SearchIndex, search_index
+
+__all__ = [
+    'normalize_arabic',
+    'search_text',
+    'tokenize',
+    'SearchDocument',
+    'SearchIndex',
+    'search_index'
+]
@@ -0,0 +1,12 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+توحيد النص العربي للبحث
+Arabic Text Normalization for Search
+
+التنفيذ في full_text_search المشترك مع النظام الكامل.
+"""
+
+from full_text_search import normalize_arabic, tokenize, search_text
+
+__all__ = ['normalize_arabic', 'tokenize', 'search_text']
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+فهرس البحث النصي الكامل
+Full-Text Search Index
+"""
+
+from app import db
+from full_text_search import SearchDocumentMixin, DocumentIndex
+
+class SearchDocument(SearchDocumentMixin, db.Model):
+    """مستند البحث في قاعدة بيانات حزمة app (الجدول والفهرس في full_text_search)"""
+
+class SearchIndex(DocumentIndex):
+    """فهرس حزمة app مع نماذجها الافتراضية"""
+
+    def __init__(self, app=None):
+        super().__init__(db, SearchDocument)
+        self.app = None
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """تسجيل النماذج الافتراضية"""
+        self.app = app
+        from app.models import Customer, Invoice, Supplier, Product
+        from app.models.user_enhanced import User
+        from app.models.system_monitoring import SystemLog
+
+        self.register(Customer, ('name', 'company_name', 'email', 'phone', 'tax_number', 'city'))
+        self.register(Invoice, ('invoice_number', 'customer_name', 'reference_number', 'po_number', 'notes'))
+        self.register(User, ('username', 'email', 'first_name', 'last_name'))
+        self.register(SystemLog, ('message',))
+        # نماذج اختيارية قد لا تكون موجودة في هذه النسخة
+        for model in (Supplier, Product):
+            if model is not None:
+                self.register(model, ('name', 'description', 'sku', 'email', 'phone', 'tax_number'))
+
+# إنشاء مثيل عام
+search_index = SearchIndex()
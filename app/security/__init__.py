@@ -32,13 +32,21 @@ from app.security.encryption import (
     generate_csrf_token
 )
 
-from app.security.monitoring import (
-    SecurityMonitor,
-    detect_suspicious_activity,
-    log_security_event,
-    check_ip_reputation,
-    rate_limit_exceeded
-)
+# وحدة المراقبة اختيارية (غير موجودة في كل النسخ)
+try:
+    from app.security.monitoring import (
+        SecurityMonitor,
+        detect_suspicious_activity,
+        log_security_event,
+        check_ip_reputation,
+        rate_limit_exceeded
+    )
+except ImportError:
+    SecurityMonitor = None
+    detect_suspicious_activity = None
+    log_security_event = None
+    check_ip_reputation = None
+    rate_limit_exceeded = None
 
 __all__ = [
     # Decorators
@@ -10,7 +10,7 @@ import secrets
 import hashlib
 import base64
 from datetime import datetime, timedelta
-from cryptography.fernet import Fernet
+from cryptography.fernet import Fernet, MultiFernet
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -22,6 +22,8 @@ class EncryptionManager:
     def __init__(self, app=None):
         self.app = app
         self._encryption_key = None
+        self._fernet = None
+        self._previous_keys = []
         self._salt = None
         
         if app:
@@ -43,6 +45,11 @@ class EncryptionManager:
             )
         
         self._encryption_key = encryption_key.encode() if isinstance(encryption_key, str) else encryption_key
+        self._fernet = None
+        
+        # مفاتيح قديمة لفك التشفير فقط أثناء تدوير المفتاح
+        previous = app.config.get('ENCRYPTION_PREVIOUS_KEYS') or os.environ.get('ENCRYPTION_PREVIOUS_KEYS', '')
+        self._previous_keys = [key.strip().encode() for key in previous.split(',') if key.strip()]
         
         # الحصول على الملح
         salt = app.config.get('SECURITY_PASSWORD_SALT') or os.environ.get('SECURITY_PASSWORD_SALT')
@@ -56,8 +63,10 @@ class EncryptionManager:
         self._salt = salt.encode() if isinstance(salt, str) else salt
     
     def get_fernet(self):
-        """الحصول على كائن Fernet للتشفير"""
-        return Fernet(self._encryption_key)
+        """الحصول على كائن التشفير (ينشأ مرة واحدة؛ يفك بالمفاتيح القديمة ويشفر بالأساسي)"""
+        if self._fernet is None:
+            self._fernet = MultiFernet([Fernet(key) for key in [self._encryption_key] + self._previous_keys])
+        return self._fernet
     
     def encrypt_data(self, data):
         """تشفير البيانات"""
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+حلقة مفاتيح تشفير الحقول
+Field Encryption Key Ring
+"""
+
+import os
+import hashlib
+import threading
+from cryptography.fernet import Fernet, MultiFernet, InvalidToken
+from flask import has_app_context
+from app import db
+
+MEMO_KEY = 'decrypted_fields'
+
+class KeyRing:
+    """كائنات Fernet مخزنة لكل مفتاح مع ذاكرة لفك التشفير في جلسة قاعدة البيانات
+
+    ENCRYPTION_KEY هو المفتاح الأساسي للتشفير، وENCRYPTION_PREVIOUS_KEYS (مفصولة
+    بفواصل) مفاتيح قديمة لفك التشفير فقط حتى تكتمل إعادة التشفير (مثل MultiFernet).
+
+    كل نص مشفر بـ Fernet فريد (IV عشوائي)، لذلك يمكن ربط النص المشفر بقيمته
+    المفكوكة بأمان طوال عمر الجلسة.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ciphers = {}
+
+    def keys(self):
+        """المفاتيح بالترتيب: الأساسي أولاً ثم القديمة"""
+        primary = os.environ.get('ENCRYPTION_KEY')
+        if not primary:
+            return ()
+        previous = os.environ.get('ENCRYPTION_PREVIOUS_KEYS', '')
+        return (primary,) + tuple(key.strip() for key in previous.split(',') if key.strip())
+
+    def _build(self, keys):
+        fernets = [Fernet(key.encode()) for key in keys]
+        return fernets[0], MultiFernet(fernets)
+
+    def _entry(self):
+        keys = self.keys()
+        if not keys:
+            return None
+        entry = self._ciphers.get(keys)
+        if entry is None:
+            with self._lock:
+                entry = self._ciphers.setdefault(keys, self._build(keys))
+        return entry
+
+    def cipher(self):
+        """كائن MultiFernet للمفاتيح الحالية، أو None إذا لم يكن هناك مفتاح"""
+        entry = self._entry()
+        return entry[1] if entry else None
+
+    def primary_fingerprint(self):
+        """بصمة قصيرة للمفتاح الأساسي (لا تكشف المفتاح) لتمييز جولات التدوير"""
+        keys = self.keys()
+        return hashlib.sha256(keys[0].encode()).hexdigest()[:16] if keys else None
+
+    def rotate(self, token):
+        """إعادة تشفير نص بالمفتاح الأساسي؛ None إذا كان مشفراً به أصلاً"""
+        primary, cipher = self._entry()
+        try:
+            primary.decrypt(token.encode())
+            return None
+        except InvalidToken:
+            return cipher.rotate(token.encode()).decode()
+
+    def _memo(self):
+        """ذاكرة الجلسة الحالية (تنتهي مع الجلسة في نهاية الطلب)"""
+        if not has_app_context():
+            return None
+        return db.session.info.setdefault(MEMO_KEY, {})
+
+    def encrypt(self, value):
+        """تشفير نص"""
+        cipher = self.cipher()
+        if cipher is None:
+            return value  # إرجاع القيمة كما هي إذا لم يكن هناك مفتاح
+        token = cipher.encrypt(value.encode()).decode()
+        memo = self._memo()
+        if memo is not None:
+            memo[token] = value
+        return token
+
+    def decrypt(self, token):
+        """فك تشفير نص مع الاستفادة من ذاكرة الجلسة"""
+        cipher = self.cipher()
+        if cipher is None or token is None:
+            return token
+        memo = self._memo()
+        if memo is not None:
+            value = memo.get(token)
+            if value is None:
+                value = memo[token] = cipher.decrypt(token.encode()).decode()
+            return value
+        return cipher.decrypt(token.encode()).decode()
+
+    def decrypt_many(self, tokens):
+        """فك تشفير قائمة نصوص في مرور واحد بنفس الترتيب (None يبقى None)"""
+        tokens = list(tokens)
+        cipher = self.cipher()
+        if cipher is None:
+            return tokens
+        memo = self._memo()
+        if memo is None:
+            memo = {}
+        decrypt = cipher.decrypt
+        for token in set(tokens):
+            if token and token not in memo:
+                memo[token] = decrypt(token.encode()).decode()
+        return [memo[token] if token else token for token in tokens]
+
+    def clear_memo(self):
+        """مسح القيم المفكوكة من الجلسة الحالية"""
+        if has_app_context():
+            db.session.info.pop(MEMO_KEY, None)
+
+# إنشاء مثيل عام
+key_ring = KeyRing()
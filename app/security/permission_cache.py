@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ذاكرة صلاحيات المستخدمين
+User Permission Cache
+"""
+
+import time
+import logging
+import threading
+from collections import OrderedDict, namedtuple
+from sqlalchemy import event, select
+from app import db, cache
+
+logger = logging.getLogger('accounting_system')
+
+PENDING_KEY = 'permission_invalidations'
+ALL_USERS = '*'
+
+# أدوار وصلاحيات المستخدم بعد حلها من الجداول الأربعة
+Grants = namedtuple('Grants', ['roles', 'permissions'])
+
+class PermissionCache:
+    """أدوار وصلاحيات كل مستخدم كـ frozenset في ذاكرة LRU محلية فوق الذاكرة المشتركة
+
+    فحص الصلاحية في الطلب العادي بحث في القاموس المحلي دون أي استعلام.
+    أحداث الـ mapper على UserRole وRolePermission وRole وPermission تحدد ما يجب
+    إبطاله، ويتم الإبطال بعد commit حتى لا يعيد طلب آخر تحميل بيانات لم تحفظ بعد.
+    العمليات الأخرى ترى التغيير عند انتهاء عمر المدخل المحلي (PERMISSION_CACHE_TTL)
+    لأن مفتاح المدخل المشترك يحتوي الجيل العام وإصدار المستخدم ويتغيران عند الإبطال.
+    
+    التحميل الذي يسبقه إبطال لا يكتب نتيجته القديمة: الكتابة المشتركة تذهب إلى مفتاح
+    الإصدار المقروء قبل التحميل (لم يعد يقرأ)، والمحلية تتخطى إذا تغير عداد الإبطال.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.max_size = 1024
+        self.ttl = 30
+        self.shared_timeout = 3600
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._invalidations = 0
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """تهيئة حجم الذاكرة وأعمار المدخلات"""
+        self.app = app
+        self.max_size = int(app.config.get('PERMISSION_CACHE_SIZE', 1024))
+        self.ttl = int(app.config.get('PERMISSION_CACHE_TTL', 30))
+        self.shared_timeout = int(app.config.get('PERMISSION_CACHE_SHARED_TIMEOUT', 3600))
+
+    # ===== القراءة =====
+
+    def get(self, user_id):
+        """أدوار وصلاحيات المستخدم (Grants)"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                return entry[1]
+            invalidations = self._invalidations
+
+        key = self._shared_key(user_id)
+        grants = self._shared_get(key)
+        if grants is None:
+            grants = self.load(user_id)
+            # إبطال أثناء التحميل يغير المفتاح؛ لا تعاد كتابة الأدوار الملغاة
+            if key is not None and self._shared_key(user_id) == key:
+                self._shared_set(key, grants)
+
+        with self._lock:
+            if self._invalidations == invalidations:
+                self._entries[user_id] = (now + self.ttl, grants)
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return grants
+
+    def load(self, user_id):
+        """استعلام واحد لأسماء الأدوار والصلاحيات"""
+        from app.models.roles_permissions import Role, Permission, UserRole, RolePermission
+
+        rows = db.session.execute(
+            select(Role.name, Permission.name)
+            .select_from(UserRole)
+            .join(Role, Role.id == UserRole.role_id)
+            .outerjoin(RolePermission, RolePermission.role_id == Role.id)
+            .outerjoin(Permission, Permission.id == RolePermission.permission_id)
+            .where(UserRole.user_id == user_id)
+        ).all()
+        return Grants(
+            frozenset(role for role, _ in rows),
+            frozenset(permission for _, permission in rows if permission is not None)
+        )
+
+    # ===== الذاكرة المشتركة =====
+
+    def _version_key(self, user_id):
+        return f'permissions:version:{user_id}'
+
+    def _shared_key(self, user_id):
+        """مفتاح المدخل بالجيل العام وإصدار المستخدم؛ None إذا تعذرت القراءة"""
+        try:
+            generation, version = cache.get_many('permissions:generation', self._version_key(user_id))
+        except Exception as e:
+            logger.warning(f"Permission cache read error: {str(e)}")
+            return None
+        return f'permissions:{generation or 0}:{user_id}:{version or 0}'
+
+    def _shared_get(self, key):
+        if key is None:
+            return None
+        try:
+            value = cache.get(key)
+            return Grants(*value) if value is not None else None
+        except Exception as e:
+            logger.warning(f"Permission cache read error: {str(e)}")
+            return None
+
+    def _shared_set(self, key, grants):
+        try:
+            cache.set(key, tuple(grants), timeout=self.shared_timeout)
+        except Exception as e:
+            logger.warning(f"Permission cache write error: {str(e)}")
+
+    def _bump(self, key):
+        # عداد بلا انتهاء؛ زيادتان متزامنتان قد تكتبان نفس القيمة وكلاهما يغير المفتاح
+        cache.set(key, (cache.get(key) or 0) + 1, timeout=0)
+
+    # ===== الإبطال =====
+
+    def invalidate(self, user_id=ALL_USERS):
+        """إبطال مستخدم واحد، أو الجميع (تغيير دور أو صلاحياته)"""
+        try:
+            if user_id == ALL_USERS:
+                self._bump('permissions:generation')
+            else:
+                self._bump(self._version_key(user_id))
+        except Exception as e:
+            logger.warning(f"Permission cache invalidation error: {str(e)}")
+
+        # بعد تغيير المفتاح المشترك: قراءة جارية من المفتاح القديم لا تحفظ محلياً
+        with self._lock:
+            self._invalidations += 1
+            if user_id == ALL_USERS:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+    def queue(self, session, user_id=ALL_USERS):
+        """تأجيل الإبطال إلى ما بعد commit الجلسة"""
+        session.info.setdefault(PENDING_KEY, set()).add(user_id)
+
+# إنشاء مثيل عام
+permission_cache = PermissionCache()
+
+@event.listens_for(db.session, 'after_commit')
+def apply_pending_invalidations(session):
+    """تطبيق الإبطال بعد حفظ التغييرات"""
+    pending = session.info.pop(PENDING_KEY, None)
+    if pending:
+        if ALL_USERS in pending:
+            permission_cache.invalidate()
+        else:
+            for user_id in pending:
+                permission_cache.invalidate(user_id)
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def discard_pending_invalidations(session, previous_transaction):
+    session.info.pop(PENDING_KEY, None)
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+تدوير مفتاح تشفير الحقول دون إيقاف النظام
+Online Encryption Key Rotation
+"""
+
+import time
+import logging
+import threading
+from datetime import datetime
+from cryptography.fernet import InvalidToken
+from sqlalchemy import select, update, bindparam, or_, table, column, inspect
+from app import db
+from app.models.key_rotation import KeyRotationCheckpoint
+from app.security.keyring import key_ring
+
+logger = logging.getLogger('accounting_system')
+
+# الأعمدة المشفرة بـ EncryptedMixin في كل جدول
+ENCRYPTED_COLUMNS = {
+    'customers': ('credit_limit', 'bank_account', 'iban'),
+    'payments': ('account_number', 'card_last_four', 'card_type', 'transaction_id'),
+    'invoices': ('digital_signature',),
+    'users': ('two_factor_secret',),  # backup_codes عمود JSON غير مشفر
+    'system_settings': ('encrypted_value',),
+}
+
+# كل رموز Fernet تبدأ بإصدار 0x80 بترميز base64
+FERNET_PREFIX = 'gAAAAA'
+
+class KeyRotationJob:
+    """إعادة تشفير الأعمدة بالمفتاح الأساسي على دفعات مرتبة بالمعرف
+
+    - كل دفعة في معاملة مستقلة مع حفظ نقطة الاستئناف في key_rotation_checkpoints
+    - التحديث مشروط بالقيمة القديمة فلا يلغي تعديلاً متزامناً من التطبيق
+    - بعد كل دفعة ينتظر بحيث لا يتجاوز وقت العمل نسبة KEY_ROTATION_DUTY_CYCLE
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.chunk_size = 500
+        self.duty_cycle = 0.25
+        self.min_pause = 0.05
+        self._thread = None
+        self._stop = threading.Event()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """تهيئة إعدادات المهمة"""
+        self.app = app
+        self.chunk_size = app.config.get('KEY_ROTATION_CHUNK_SIZE', 500)
+        self.duty_cycle = float(app.config.get('KEY_ROTATION_DUTY_CYCLE', 0.25))
+        # _throttle يقسم على النسبة
+        if not 0 < self.duty_cycle <= 1:
+            raise ValueError(f'KEY_ROTATION_DUTY_CYCLE must be in (0, 1], got {self.duty_cycle}')
+        self.min_pause = app.config.get('KEY_ROTATION_MIN_PAUSE', 0.05)
+
+    # ===== التشغيل في الخلفية =====
+
+    def start(self, tables=None, restart=False):
+        """تشغيل المهمة في خيط خلفي؛ False إذا كانت تعمل بالفعل"""
+        if self.is_running():
+            return False
+        self._stop.clear()
+
+        def worker():
+            with self.app.app_context():
+                try:
+                    self.run(tables, restart)
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error(f"Key rotation failed: {str(e)}")
+
+        self._thread = threading.Thread(target=worker, name='key-rotation', daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        """إيقاف المهمة بعد الدفعة الحالية (تستأنف لاحقاً من نقطة الحفظ)"""
+        self._stop.set()
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def status(self):
+        """حالة كل جدول للمفتاح الأساسي الحالي"""
+        fingerprint = key_ring.primary_fingerprint()
+        checkpoints = {cp.table_name: cp for cp in KeyRotationCheckpoint.query.all()}
+        result = []
+        for table_name in ENCRYPTED_COLUMNS:
+            checkpoint = checkpoints.get(table_name)
+            if checkpoint is None or checkpoint.key_fingerprint != fingerprint:
+                result.append({'table': table_name, 'key_fingerprint': fingerprint, 'last_id': 0,
+                               'rotated': 0, 'skipped': 0, 'started_at': None, 'finished_at': None})
+            else:
+                result.append(checkpoint.to_dict())
+        return {'running': self.is_running(), 'tables': result}
+
+    # ===== التنفيذ =====
+
+    def run(self, tables=None, restart=False):
+        """إعادة تشفير الجداول بالترتيب؛ يستأنف من آخر نقطة محفوظة"""
+        fingerprint = key_ring.primary_fingerprint()
+        if fingerprint is None:
+            raise RuntimeError('ENCRYPTION_KEY غير معرف')
+        if len(key_ring.keys()) < 2:
+            logger.warning('لا توجد مفاتيح قديمة في ENCRYPTION_PREVIOUS_KEYS؛ لا شيء لإعادة تشفيره')
+
+        existing = set(inspect(db.engine).get_table_names())
+        for table_name in tables or ENCRYPTED_COLUMNS:
+            if self._stop.is_set():
+                break
+            if table_name in existing:
+                self._rotate_table(table_name, fingerprint, restart)
+        return self.status()
+
+    def _columns(self, table_name):
+        # بعض الأعمدة غير موجودة في كل نسخ المخطط
+        present = {info['name'] for info in inspect(db.engine).get_columns(table_name)}
+        return [name for name in ENCRYPTED_COLUMNS[table_name] if name in present]
+
+    def _checkpoint(self, table_name, fingerprint, restart):
+        checkpoint = db.session.get(KeyRotationCheckpoint, table_name)
+        if checkpoint is None:
+            checkpoint = KeyRotationCheckpoint(table_name=table_name)
+            db.session.add(checkpoint)
+        if restart or checkpoint.key_fingerprint != fingerprint:
+            # مفتاح أساسي جديد: جولة جديدة من البداية
+            checkpoint.key_fingerprint = fingerprint
+            checkpoint.last_id = 0
+            checkpoint.rotated = 0
+            checkpoint.skipped = 0
+            checkpoint.started_at = datetime.utcnow()
+            checkpoint.finished_at = None
+        db.session.commit()
+        return checkpoint
+
+    def _rotate_table(self, table_name, fingerprint, restart):
+        columns = self._columns(table_name)
+        if not columns:
+            return
+        checkpoint = self._checkpoint(table_name, fingerprint, restart)
+        if checkpoint.finished_at is not None:
+            return
+
+        target = table(table_name, column('id'), *[column(name) for name in columns])
+        query = select(target).where(
+            or_(*[target.c[name].isnot(None) for name in columns])
+        ).order_by(target.c.id).limit(self.chunk_size)
+
+        while not self._stop.is_set():
+            began = time.perf_counter()
+            rows = db.session.execute(query.where(target.c.id > checkpoint.last_id)).all()
+            if not rows:
+                checkpoint.finished_at = datetime.utcnow()
+                db.session.commit()
+                logger.info('اكتمل تدوير المفتاح لجدول %s: %d قيمة', table_name, checkpoint.rotated)
+                return
+
+            rotated, skipped = self._rotate_rows(target, columns, rows)
+            checkpoint.last_id = rows[-1].id
+            checkpoint.rotated += rotated
+            checkpoint.skipped += skipped
+            db.session.commit()
+
+            self._throttle(time.perf_counter() - began)
+
+    def _rotate_rows(self, target, columns, rows):
+        """إعادة تشفير دفعة وكتابتها بجملة UPDATE واحدة لكل عمود"""
+        skipped = 0
+        changes = {name: [] for name in columns}
+        for row in rows:
+            values = row._mapping
+            for name in columns:
+                token = values[name]
+                if not token:
+                    continue
+                if not token.startswith(FERNET_PREFIX):
+                    skipped += 1  # قيمة محفوظة بدون تشفير
+                    continue
+                try:
+                    new_token = key_ring.rotate(token)
+                except InvalidToken:
+                    skipped += 1  # مشفرة بمفتاح غير موجود في الحلقة
+                    continue
+                if new_token is not None:
+                    changes[name].append({'row_id': row.id, 'old_token': token, 'new_token': new_token})
+
+        rotated = 0
+        for name, params in changes.items():
+            if params:
+                db.session.execute(
+                    update(target)
+                    .where(target.c.id == bindparam('row_id'), target.c[name] == bindparam('old_token'))
+                    .values({name: bindparam('new_token')}),
+                    params
+                )
+                rotated += len(params)
+        return rotated, skipped
+
+    def _throttle(self, elapsed):
+        """انتظار يحافظ على نسبة العمل المحددة حتى لا يتأثر زمن استجابة الطلبات"""
+        pause = max(self.min_pause, elapsed * (1 - self.duty_cycle) / self.duty_cycle)
+        self._stop.wait(pause)
+
+# إنشاء مثيل عام
+key_rotation_job = KeyRotationJob()
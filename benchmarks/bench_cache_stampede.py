@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+قياس تدافع إعادة الحساب على مفتاح ساخن: التخزين المؤقت السابق مقابل get_or_compute
+Cache stampede benchmark: previous get/set caching vs single-flight get_or_compute
+"""
+
+import os
+import sys
+import time
+import threading
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.performance.cache_manager import CacheManager
+
+class Backend:
+    """استعلام تجميعي بطيء (مثل أرقام لوحة التحكم) يعد مرات استدعائه"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        return {'total_sales': 12345.0, 'invoices': 678}
+
+def legacy(manager, key, compute, timeout):
+    """سلوك cached() السابق: كل من يجد المفتاح منتهياً يعيد الحساب"""
+    value = manager.get(key)
+    if value is not None:
+        return value
+    value = compute()
+    manager.set(key, value, timeout)
+    return value
+
+def run(name, lookup, threads, duration, slow):
+    latencies = []
+    lock = threading.Lock()
+    stop = time.monotonic() + duration
+
+    def worker():
+        local = []
+        while time.monotonic() < stop:
+            start = time.perf_counter()
+            lookup()
+            local.append(time.perf_counter() - start)
+            time.sleep(0.001)
+        with lock:
+            latencies.extend(local)
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+
+    latencies.sort()
+    return {
+        'name': name,
+        'requests': len(latencies),
+        'p50': latencies[len(latencies) // 2] * 1000,
+        'p99': latencies[int(len(latencies) * 0.99)] * 1000,
+        'max': latencies[-1] * 1000,
+        'slow': sum(1 for latency in latencies if latency >= slow),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=20.0)
+    parser.add_argument('--ttl', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.1, help='زمن الاستعلام بالثواني')
+    args = parser.parse_args()
+
+    scenarios = (
+        ('previous get/set', lambda manager, backend: legacy(manager, 'dashboard', backend, args.ttl)),
+        ('single-flight', lambda manager, backend: manager.get_or_compute('dashboard', backend, args.ttl, stale_ttl=0)),
+        ('single-flight + stale', lambda manager, backend: manager.get_or_compute('dashboard', backend, args.ttl, stale_ttl=30)),
+    )
+
+    print(f'{args.threads} threads, {args.duration:g}s, ttl {args.ttl}s, backend {args.latency * 1000:g}ms (memory backend)')
+    for name, lookup in scenarios:
+        manager, backend = CacheManager(), Backend(args.latency)
+        result = run(name, lambda: lookup(manager, backend), args.threads, args.duration, args.latency / 2)
+        print(f'{name:<22}: backend calls {backend.calls:5d}  requests {result["requests"]:7d}  '
+              f'waited on backend {result["slow"]:5d}  p99 {result["p99"]:6.2f}ms  max {result["max"]:7.2f}ms')
+
+if __name__ == '__main__':
+    main()
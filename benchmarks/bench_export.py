@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+قياس التصدير بالتدفق: زمن أول بايت وذروة الذاكرة
+Streaming export benchmark: time to first byte and peak memory
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import argparse
+import tracemalloc
+from datetime import date, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORK_DIR = tempfile.mkdtemp(prefix='export_bench_')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(WORK_DIR, 'bench.db')
+os.environ.setdefault('TEMPLATE_BYTECODE_CACHE_DIR', os.path.join(WORK_DIR, 'jinja'))
+
+from accounting_system_complete import app, db, SalesInvoice
+
+def seed(rows):
+    start = date(2024, 1, 1)
+    with app.app_context():
+        for offset in range(0, rows, 10000):
+            db.session.execute(SalesInvoice.__table__.insert(), [
+                {'invoice_number': f'EXP-{i:08d}', 'date': start + timedelta(days=i % 365),
+                 'subtotal': Decimal('100.00'), 'tax_amount': Decimal('15.00'),
+                 'total': Decimal('115.00'), 'status': 'paid'}
+                for i in range(offset, min(offset + 10000, rows))
+            ])
+        db.session.commit()
+
+def measure(client, url, trace_memory):
+    # tracemalloc يبطئ openpyxl كثيراً، لذا قياس الذاكرة اختياري
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    response = client.get(url, buffered=False)
+    chunks = iter(response.response)
+    first = next(chunks)
+    first_byte = time.perf_counter() - start
+    size = len(first) + sum(len(chunk) for chunk in chunks)
+    total = time.perf_counter() - start
+    peak = None
+    if trace_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    response.close()
+    return first_byte, total, size, peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, nargs='+', default=[20000, 100000])
+    parser.add_argument('--trace-memory', action='store_true', help='قياس ذروة ذاكرة Python')
+    args = parser.parse_args()
+
+    client = app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+    try:
+        for rows in sorted(args.rows):
+            with app.app_context():
+                db.session.execute(SalesInvoice.__table__.delete())
+                db.session.commit()
+            seed(rows)
+            for fmt in ('csv', 'xlsx'):
+                first_byte, total, size, peak = measure(client, f'/export/sales?format={fmt}', args.trace_memory)
+                memory = f', peak python memory {peak / 1e6:6.1f} MB' if peak is not None else ''
+                print(f'{rows:>8} rows {fmt:<4}: first byte {first_byte * 1000:7.1f} ms, '
+                      f'total {total:6.2f}s, {size / 1e6:6.1f} MB{memory}')
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
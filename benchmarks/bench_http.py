@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+قياس أداء مسارات النظام عبر HTTP تحت gunicorn ومقارنة نسختين من git
+End-to-end HTTP benchmark: boots the monolith under gunicorn, logs in and drives
+a weighted route mix with N concurrent clients; can compare two git revisions.
+
+أمثلة / Examples:
+    python benchmarks/bench_http.py --clients 16 --duration 30
+    python benchmarks/bench_http.py --base origin/main --head HEAD --dataset-scale 1
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.client
+from contextlib import contextmanager
+from datetime import datetime
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_MODULE = 'accounting_system_complete:app'
+USERNAME = 'admin'
+PASSWORD = 'admin123'
+
+# وزن كل مسار في مزيج الطلبات الافتراضي
+DEFAULT_MIX = {
+    'dashboard': 30,
+    'sales': 25,
+    'reports': 15,
+    'add_sale': 10,
+    'api_status': 20,
+}
+
+def _add_sale_body(client_id, sequence, rng, run_tag):
+    subtotal = rng.randint(1000, 50000) / 100
+    return urlencode({
+        'invoice_number': f'HB-{run_tag}-{client_id:03d}-{sequence:07d}',
+        'subtotal': f'{subtotal:.2f}',
+        'tax_amount': f'{subtotal * 0.15:.2f}',
+        'notes': 'http benchmark',
+    })
+
+# المسار: (الطريقة، الرابط، منشئ جسم الطلب)
+ROUTES = {
+    'dashboard': ('GET', '/dashboard', None),
+    'sales': ('GET', '/sales', None),
+    'reports': ('GET', '/reports', None),
+    'add_sale': ('POST', '/add_sale', _add_sale_body),
+    'api_status': ('GET', '/api/status', None),
+}
+
+def parse_mix(value):
+    """تحليل مزيج مثل dashboard=30,sales=25"""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in ROUTES:
+            raise argparse.ArgumentTypeError(f'مسار غير معروف: {name} (المتاح: {", ".join(ROUTES)})')
+        try:
+            mix[name] = float(weight) if weight else 1.0
+        except ValueError:
+            raise argparse.ArgumentTypeError(f'وزن غير صالح: {part}')
+    if not any(weight > 0 for weight in mix.values()):
+        raise argparse.ArgumentTypeError('يجب أن يحتوي المزيج على وزن موجب واحد على الأقل')
+    return mix
+
+def percentile(sorted_values, fraction):
+    """النسبة المئوية بطريقة الرتبة الأقرب"""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+def summarize(latencies, errors, elapsed):
+    """الإنتاجية وزمن الاستجابة p50/p95/p99 بالمللي ثانية"""
+    values = sorted(latencies)
+    ms = lambda value: round(value * 1000, 3) if value is not None else None
+    return {
+        'requests': len(values),
+        'errors': errors,
+        'throughput_rps': round(len(values) / elapsed, 2) if elapsed else 0.0,
+        'mean_ms': ms(sum(values) / len(values)) if values else None,
+        'p50_ms': ms(percentile(values, 0.50)),
+        'p95_ms': ms(percentile(values, 0.95)),
+        'p99_ms': ms(percentile(values, 0.99)),
+        'max_ms': ms(values[-1]) if values else None,
+    }
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+# ===== الخادم =====
+
+class GunicornServer:
+    """تشغيل التطبيق تحت gunicorn من مجلد مصدر معين"""
+
+    def __init__(self, source_dir, database_url, workers, threads, work_dir):
+        self.source_dir = source_dir
+        self.port = free_port()
+        self.workers = workers
+        self.threads = threads
+        self.log_path = os.path.join(work_dir, f'gunicorn-{self.port}.log')
+        self.env = dict(
+            os.environ,
+            DATABASE_URL=database_url,
+            TEMPLATE_BYTECODE_CACHE_DIR=os.path.join(work_dir, f'jinja-{self.port}'),
+            N_PLUS_ONE_DETECTION='false',
+            PYTHONDONTWRITEBYTECODE='1',
+        )
+        self.process = None
+        self._log = None
+
+    def prepare(self):
+        """تهيئة قاعدة البيانات مرة واحدة قبل تشغيل العمال لتجنب تسابق init_db"""
+        subprocess.run(
+            [sys.executable, '-c', 'import accounting_system_complete'],
+            cwd=self.source_dir, env=self.env, check=True,
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+        )
+
+    def start(self, boot_timeout):
+        self.prepare()
+        self._log = open(self.log_path, 'wb')
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', APP_MODULE,
+             '--bind', f'127.0.0.1:{self.port}',
+             '--workers', str(self.workers),
+             '--threads', str(self.threads),
+             '--timeout', '120',
+             '--preload',
+             '--log-level', 'warning'],
+            cwd=self.source_dir, env=self.env, stdout=self._log, stderr=subprocess.STDOUT
+        )
+        deadline = time.monotonic() + boot_timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f'توقف gunicorn أثناء الإقلاع، راجع {self.log_path}')
+            try:
+                conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=2)
+                conn.request('GET', '/api/status')
+                if conn.getresponse().status == 200:
+                    conn.close()
+                    return
+            except OSError:
+                time.sleep(0.2)
+        self.stop()
+        raise RuntimeError(f'لم يستجب gunicorn خلال {boot_timeout} ثانية، راجع {self.log_path}')
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        if self._log:
+            self._log.close()
+            self._log = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+# ===== العملاء =====
+
+class BenchClient(threading.Thread):
+    """عميل HTTP باتصال دائم وجلسة مسجلة الدخول"""
+
+    def __init__(self, client_id, port, mix, seed, run_tag, start_at, measure_at, stop_at):
+        super().__init__(daemon=True)
+        self.client_id = client_id
+        self.port = port
+        self.names = list(mix)
+        self.weights = [mix[name] for name in self.names]
+        self.rng = random.Random(seed * 1000 + client_id)
+        self.run_tag = run_tag
+        self.start_at = start_at
+        self.measure_at = measure_at
+        self.stop_at = stop_at
+        self.cookie = ''
+        self.conn = None
+        self.latencies = {name: [] for name in self.names}
+        self.errors = {name: 0 for name in self.names}
+        self.failure = None
+
+    def _connect(self):
+        if self.conn is not None:
+            self.conn.close()
+        self.conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+
+    def _request(self, method, path, body=None):
+        headers = {'Cookie': self.cookie} if self.cookie else {}
+        if body is not None:
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        self.conn.request(method, path, body=body, headers=headers)
+        response = self.conn.getresponse()
+        response.read()
+        set_cookie = response.getheader('Set-Cookie')
+        if set_cookie:
+            cookie = SimpleCookie()
+            cookie.load(set_cookie)
+            jar = SimpleCookie(self.cookie)
+            jar.update(cookie)
+            self.cookie = '; '.join(f'{key}={morsel.value}' for key, morsel in jar.items())
+        return response
+
+    def login(self):
+        self._connect()
+        response = self._request('POST', '/login', urlencode({'username': USERNAME, 'password': PASSWORD}))
+        if response.status != 302 or not (response.getheader('Location') or '').endswith('/dashboard'):
+            raise RuntimeError(f'فشل تسجيل الدخول (HTTP {response.status})')
+
+    def run(self):
+        try:
+            self.login()
+        except Exception as exc:
+            self.failure = exc
+            return
+
+        while time.perf_counter() < self.start_at:
+            time.sleep(0.001)
+
+        sequence = 0
+        while True:
+            now = time.perf_counter()
+            if now >= self.stop_at:
+                break
+            name = self.rng.choices(self.names, self.weights)[0]
+            method, path, body_factory = ROUTES[name]
+            body = None
+            if body_factory is not None:
+                sequence += 1
+                body = body_factory(self.client_id, sequence, self.rng, self.run_tag)
+
+            began = time.perf_counter()
+            try:
+                response = self._request(method, path, body)
+                # إعادة التوجيه إلى /login تعني أن الجلسة ضاعت
+                ok = response.status < 400 and '/login' not in (response.getheader('Location') or '')
+            except (OSError, http.client.HTTPException):
+                ok = False
+                self._connect()
+            elapsed = time.perf_counter() - began
+
+            # طلبات الإحماء لا تدخل في النتائج
+            if began >= self.measure_at:
+                if ok:
+                    self.latencies[name].append(elapsed)
+                else:
+                    self.errors[name] += 1
+
+        if self.conn is not None:
+            self.conn.close()
+
+def drive(port, mix, clients, warmup, duration, seed):
+    """تشغيل العملاء المتزامنين وجمع النتائج لكل مسار"""
+    run_tag = f'{int(time.time()) % 100000:05d}'
+    start_at = time.perf_counter() + 2.0 + clients * 0.02  # وقت لتسجيل دخول الجميع
+    measure_at = start_at + warmup
+    stop_at = measure_at + duration
+
+    workers = [BenchClient(i, port, mix, seed, run_tag, start_at, measure_at, stop_at)
+               for i in range(clients)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    failures = [worker.failure for worker in workers if worker.failure]
+    if failures:
+        raise RuntimeError(f'{len(failures)} عميل لم يبدأ: {failures[0]}')
+
+    routes = {}
+    all_latencies, all_errors = [], 0
+    for name in mix:
+        latencies = [value for worker in workers for value in worker.latencies[name]]
+        errors = sum(worker.errors[name] for worker in workers)
+        routes[name] = summarize(latencies, errors, duration)
+        all_latencies.extend(latencies)
+        all_errors += errors
+    return summarize(all_latencies, all_errors, duration), routes
+
+# ===== نسخ git =====
+
+def git(*args, cwd=REPO_DIR):
+    return subprocess.run(['git', *args], cwd=cwd, check=True,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True).stdout.strip()
+
+@contextmanager
+def checkout(revision, work_dir):
+    """مجلد مصدر لنسخة git (أو شجرة العمل الحالية إذا لم تحدد)"""
+    if revision is None:
+        yield REPO_DIR, git('rev-parse', '--short', 'HEAD') + '+worktree'
+        return
+    commit = git('rev-parse', '--short', f'{revision}^{{commit}}')
+    path = os.path.join(work_dir, f'rev-{commit}')
+    git('worktree', 'add', '--detach', path, commit)
+    try:
+        yield path, commit
+    finally:
+        git('worktree', 'remove', '--force', path)
+
+def seed_database(work_dir, scale, seed):
+    """قاعدة SQLite قالب ببيانات اصطناعية تنسخ لكل تشغيل"""
+    path = os.path.join(work_dir, 'seed.db')
+    subprocess.run(
+        [sys.executable, os.path.join(REPO_DIR, 'scripts', 'generate_dataset.py'),
+         '--scale', str(scale), '--seed', str(seed), '--database-url', f'sqlite:///{path}'],
+        cwd=REPO_DIR, check=True, stdout=subprocess.DEVNULL,
+        env=dict(os.environ, TEMPLATE_BYTECODE_CACHE_DIR=os.path.join(work_dir, 'jinja-seed'))
+    )
+    return path
+
+def run_revision(revision, args, work_dir, seed_path):
+    """قياس نسخة واحدة على قاعدة بيانات جديدة"""
+    with checkout(revision, work_dir) as (source_dir, commit):
+        if args.database_url:
+            database_url = args.database_url
+        else:
+            path = os.path.join(work_dir, f'bench-{commit}.db')
+            if seed_path:
+                shutil.copyfile(seed_path, path)
+            database_url = f'sqlite:///{path}'
+
+        print(f'▶ {commit}: {args.clients} عميل، {args.duration}s (+{args.warmup}s إحماء)', file=sys.stderr)
+        with GunicornServer(source_dir, database_url, args.workers, args.threads, work_dir) as server:
+            server.start(args.boot_timeout)
+            overall, routes = drive(server.port, args.mix, args.clients, args.warmup, args.duration, args.seed)
+
+    return {
+        'revision': commit,
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'config': {
+            'clients': args.clients,
+            'duration_s': args.duration,
+            'warmup_s': args.warmup,
+            'workers': args.workers,
+            'threads': args.threads,
+            'mix': args.mix,
+            'seed': args.seed,
+            'dataset_scale': args.dataset_scale,
+            'database': 'custom' if args.database_url else 'sqlite',
+        },
+        'overall': overall,
+        'routes': routes,
+    }
+
+def _change(base, head):
+    if not base or head is None:
+        return None
+    return round((head - base) / base * 100, 1)
+
+def compare(base, head, max_regression):
+    """التغير بالنسبة المئوية لكل مسار والتراجعات التي تتجاوز الحد"""
+    comparison, regressions = {}, []
+    for name in ['overall', *head['routes']]:
+        before = base['overall'] if name == 'overall' else base['routes'].get(name)
+        after = head['overall'] if name == 'overall' else head['routes'][name]
+        if not before:
+            continue
+        delta = {
+            'throughput_pct': _change(before['throughput_rps'], after['throughput_rps']),
+            'p50_pct': _change(before['p50_ms'], after['p50_ms']),
+            'p95_pct': _change(before['p95_ms'], after['p95_ms']),
+            'p99_pct': _change(before['p99_ms'], after['p99_ms']),
+            'errors': after['errors'] - before['errors'],
+        }
+        comparison[name] = delta
+        if (delta['p95_pct'] or 0) > max_regression or delta['errors'] > 0:
+            regressions.append(name)
+    return comparison, regressions
+
+def print_report(report):
+    print(f"\n{report['revision']}")
+    print(f"{'route':<14}{'req':>8}{'err':>6}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, stats in [*report['routes'].items(), ('overall', report['overall'])]:
+        cells = [stats[key] if stats[key] is not None else float('nan') for key in ('p50_ms', 'p95_ms', 'p99_ms')]
+        print(f"{name:<14}{stats['requests']:>8}{stats['errors']:>6}{stats['throughput_rps']:>10.1f}"
+              f"{cells[0]:>10.1f}{cells[1]:>10.1f}{cells[2]:>10.1f}")
+
+def print_comparison(comparison, regressions):
+    print(f"\n{'route':<14}{'rps Δ%':>10}{'p50 Δ%':>10}{'p95 Δ%':>10}{'p99 Δ%':>10}")
+    fmt = lambda value: f'{value:+.1f}' if value is not None else 'n/a'
+    for name, delta in comparison.items():
+        flag = '  ⚠' if name in regressions else ''
+        print(f"{name:<14}{fmt(delta['throughput_pct']):>10}{fmt(delta['p50_pct']):>10}"
+              f"{fmt(delta['p95_pct']):>10}{fmt(delta['p99_pct']):>10}{flag}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=8, help='عدد العملاء المتزامنين')
+    parser.add_argument('--duration', type=float, default=20.0, help='مدة القياس بالثواني')
+    parser.add_argument('--warmup', type=float, default=3.0, help='مدة الإحماء بالثواني')
+    parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX,
+                        help='أوزان المسارات، مثل dashboard=30,sales=25,add_sale=10')
+    parser.add_argument('--workers', type=int, default=2, help='عمال gunicorn')
+    parser.add_argument('--threads', type=int, default=4, help='خيوط كل عامل')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--dataset-scale', type=float, default=0,
+                        help='توليد بيانات اصطناعية بهذا الحجم (0 = بيانات init_db التجريبية)')
+    parser.add_argument('--database-url', help='قاعدة بيانات موجودة بدلاً من SQLite مؤقتة')
+    parser.add_argument('--base', help='نسخة git الأساس للمقارنة')
+    parser.add_argument('--head', help='نسخة git المقارنة (الافتراضي: شجرة العمل الحالية)')
+    parser.add_argument('--max-regression', type=float, default=10.0,
+                        help='أقصى زيادة مسموحة في p95 بالنسبة المئوية')
+    parser.add_argument('--boot-timeout', type=float, default=60.0)
+    parser.add_argument('--output', default='bench_http.json', help='ملف تقرير JSON')
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='http_bench_')
+    try:
+        seed_path = None
+        if args.dataset_scale and not args.database_url:
+            seed_path = seed_database(work_dir, args.dataset_scale, args.seed)
+
+        if args.base:
+            base = run_revision(args.base, args, work_dir, seed_path)
+            head = run_revision(args.head, args, work_dir, seed_path)
+            comparison, regressions = compare(base, head, args.max_regression)
+            report = {'base': base, 'head': head, 'comparison': comparison,
+                      'max_regression_pct': args.max_regression, 'regressions': regressions}
+            print_report(base)
+            print_report(head)
+            print_comparison(comparison, regressions)
+        else:
+            report = run_revision(args.head, args, work_dir, seed_path)
+            regressions = []
+            print_report(report)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    with open(args.output, 'w', encoding='utf-8') as handle:
+        json.dump(report, handle, ensure_ascii=False, indent=2)
+    print(f'\nالتقرير: {args.output}')
+
+    if regressions:
+        print(f"تراجع في: {', '.join(regressions)}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+قياس سرعة الاستيراد الجماعي لفواتير المبيعات من CSV
+Bulk CSV import throughput benchmark
+"""
+
+import os
+import sys
+import csv
+import time
+import random
+import shutil
+import tempfile
+import argparse
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORK_DIR = tempfile.mkdtemp(prefix='import_bench_')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(WORK_DIR, 'bench.db')
+os.environ.setdefault('TEMPLATE_BYTECODE_CACHE_DIR', os.path.join(WORK_DIR, 'jinja'))
+
+from accounting_system_complete import app, db, import_csv
+
+def write_csv(path, rows):
+    """ملف تذاكر نقاط البيع: رقم الفاتورة والتاريخ والمبالغ"""
+    rng = random.Random(42)
+    start = date(2024, 1, 1)
+    with open(path, 'w', newline='', encoding='utf-8') as handle:
+        writer = csv.writer(handle)
+        writer.writerow(['invoice_number', 'date', 'subtotal', 'tax_amount', 'status'])
+        for i in range(rows):
+            subtotal = rng.randint(500, 500000) / 100
+            writer.writerow([f'POS-{i:08d}', (start + timedelta(days=i % 365)).isoformat(),
+                             f'{subtotal:.2f}', f'{subtotal * 0.15:.2f}', 'paid'])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--batch-size', type=int, nargs='+', default=[1000, 5000])
+    args = parser.parse_args()
+
+    path = os.path.join(WORK_DIR, 'sales.csv')
+    write_csv(path, args.rows)
+    try:
+        with app.app_context():
+            db.session.execute(db.text('PRAGMA journal_mode=WAL'))
+            for batch_size in args.batch_size:
+                db.session.execute(db.text('DELETE FROM sales_invoice'))
+                db.session.commit()
+                start = time.perf_counter()
+                with open(path, encoding='utf-8', newline='') as stream:
+                    result = import_csv('sales', stream, batch_size)
+                elapsed = time.perf_counter() - start
+                print(f"batch {batch_size:>6}: {result['inserted']} rows in {elapsed:.2f}s "
+                      f"= {result['inserted'] / elapsed * 60:,.0f} rows/min ({result['failed']} errors)")
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+قياس تسلسل الفواتير إلى JSON: to_dict الانعكاسي مقابل المسلسلات المولدة
+Serialization benchmark: reflective to_dict vs precompiled serializers
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime, timedelta
+from sqlalchemy import inspect
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.models  # noqa: F401 - تسجيل كل النماذج قبل تهيئة الـ mappers
+from app.models.invoice import Invoice
+from app.performance.serializers import serializer_registry, dumps, orjson
+
+def build(rows):
+    """فواتير في الذاكرة بكل الأعمدة محملة كما بعد استعلام"""
+    columns = {prop.key: None for prop in inspect(Invoice).column_attrs}
+    start = datetime(2024, 1, 1, 9, 30)
+    invoices = []
+    for i in range(rows):
+        moment = start + timedelta(minutes=i)
+        values = dict(columns)
+        values.update(
+            id=i + 1, invoice_number=f'INV-{i:08d}', customer_id=i % 5000 + 1,
+            customer_name=f'عميل {i % 5000}', customer_phone='0500000000',
+            date=moment, due_date=moment + timedelta(days=30),
+            subtotal=100.0 + i % 900, tax_rate=15.0, tax_amount=15.0, discount_rate=0.0,
+            discount_amount=0.0, total_amount=115.0 + i % 900, paid_amount=0.0,
+            remaining_amount=115.0 + i % 900, status='sent', payment_status='unpaid',
+            invoice_type='sales', shipping_cost=0.0, signature_valid=False, printed_count=0,
+            emailed_count=0, currency='SAR', exchange_rate=1.0,
+            created_at=moment, updated_at=moment, is_deleted=False
+        )
+        invoices.append(Invoice(**values))
+    return invoices
+
+def reflective_to_dict(instance):
+    """تنفيذ BaseModel.to_dict السابق (للمقارنة)"""
+    result = {}
+    for column in instance.__table__.columns:
+        value = getattr(instance, column.name)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        result[column.name] = value
+    return result
+
+def legacy(invoices):
+    return json.dumps([reflective_to_dict(invoice) for invoice in invoices], ensure_ascii=False, default=str).encode('utf-8')
+
+def compiled(invoices):
+    return dumps(serializer_registry.serialize_many(invoices))
+
+def measure(func, invoices, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        payload = func(invoices)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, len(payload)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    invoices = build(args.rows)
+    assert json.loads(legacy(invoices[:50])) == json.loads(compiled(invoices[:50]))
+
+    print(f'{args.rows} invoices, encoder: {"orjson" if orjson is not None else "json"}')
+    baseline = None
+    for name, func in (('reflective to_dict + json', legacy), ('precompiled serializer', compiled)):
+        elapsed, size = measure(func, invoices, args.repeat)
+        baseline = baseline or elapsed
+        print(f'{name:<28}: {elapsed:6.2f}s  {args.rows / elapsed:>10,.0f} rows/s  '
+              f'{size / 1e6:6.1f} MB  x{baseline / elapsed:4.1f}')
+
+if __name__ == '__main__':
+    main()
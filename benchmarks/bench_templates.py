@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+قياس تكلفة عرض القوالب: render_template_string مقابل القوالب المترجمة مسبقاً
+Template render benchmark: per-request compilation vs precompiled templates
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import argparse
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('DATABASE_URL', 'sqlite:///:memory:')
+os.environ.setdefault('TEMPLATE_BYTECODE_CACHE_DIR', tempfile.mkdtemp(prefix='jinja_bench_'))
+
+from jinja2 import Environment, FileSystemBytecodeCache
+from flask import render_template_string, render_template
+from accounting_system_complete import app
+
+CONTEXTS = {
+    'complete/home.html': {},
+    'complete/login.html': {},
+    'complete/reports.html': {
+        'total_sales': Decimal('125000.50'),
+        'total_purchases': Decimal('64000.00'),
+        'total_expenses': Decimal('9100.25'),
+        'net_profit': Decimal('51900.25'),
+        'current_month_sales': Decimal('12000.00'),
+        'current_month_expenses': Decimal('800.00'),
+    },
+}
+
+def read_source(name):
+    return app.jinja_loader.get_source(app.jinja_env, name)[0]
+
+def time_renders(render, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        render()
+    return (time.perf_counter() - start) / iterations
+
+def bench_render(iterations):
+    """تكلفة العرض لكل طلب لكل قالب"""
+    results = []
+    with app.test_request_context('/'):
+        for name, context in CONTEXTS.items():
+            source = read_source(name)
+            before = time_renders(lambda: render_template_string(source, **context), iterations)
+            render_template(name, **context)  # تسخين
+            after = time_renders(lambda: render_template(name, **context), iterations)
+            results.append((name, before, after))
+    return results
+
+def bench_startup():
+    """تكلفة ترجمة جميع القوالب عند بدء العامل بذاكرة قرص باردة ودافئة"""
+    names = app.jinja_env.list_templates(filter_func=lambda name: name.startswith('complete/'))
+    cache_dir = tempfile.mkdtemp(prefix='jinja_startup_')
+
+    def compile_all():
+        env = Environment(loader=app.jinja_loader, bytecode_cache=FileSystemBytecodeCache(cache_dir))
+        env.globals.update(app.jinja_env.globals)
+        start = time.perf_counter()
+        for name in names:
+            env.get_template(name)
+        return time.perf_counter() - start
+
+    try:
+        cold = compile_all()
+        warm = compile_all()
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    return len(names), cold, warm
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'template':<28}{'string (ms)':>14}{'cached (ms)':>14}{'speedup':>10}")
+    for name, before, after in bench_render(args.iterations):
+        print(f"{name:<28}{before * 1000:>14.3f}{after * 1000:>14.3f}{before / after:>9.1f}x")
+
+    count, cold, warm = bench_startup()
+    print(f"\nstartup: {count} templates, cold bytecode cache {cold * 1000:.1f} ms, "
+          f"warm bytecode cache {warm * 1000:.1f} ms")
+
+if __name__ == '__main__':
+    main()
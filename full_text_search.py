@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+البحث النصي الكامل مع توحيد النص العربي
+Full-Text Search with Arabic Normalization
+
+مشترك بين النظام الكامل (accounting_system_complete) وحزمة app دون الاعتماد على أي منهما:
+كل تطبيق يعرّف جدول search_documents بـ SearchDocumentMixin ويمرر كائن db الخاص به إلى DocumentIndex.
+"""
+
+import re
+import logging
+import unicodedata
+from datetime import datetime
+from sqlalchemy import (
+    Column, DDL, DateTime, Float, Integer, String, Text, event, inspect, select, insert, delete, func, text,
+    tuple_, literal_column
+)
+
+logger = logging.getLogger('accounting_system')
+
+# ===== توحيد النص العربي =====
+
+# التشكيل وعلامات القرآن والتطويل
+DIACRITICS = re.compile('[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]')
+
+# الحروف التي يكتبها المستخدمون بأشكال مختلفة
+LETTERS = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ى': 'ي', 'ئ': 'ي',
+    'ة': 'ه',
+    'ؤ': 'و',
+    # الأرقام العربية الهندية والفارسية
+    '٠': '0', '١': '1', '٢': '2', '٣': '3', '٤': '4',
+    '٥': '5', '٦': '6', '٧': '7', '٨': '8', '٩': '9',
+    '۰': '0', '۱': '1', '۲': '2', '۳': '3', '۴': '4',
+    '۵': '5', '۶': '6', '۷': '7', '۸': '8', '۹': '9',
+})
+
+TOKEN = re.compile(r'\w+')
+
+# أداة التعريف مع حروف العطف والجر الملتصقة بها
+ARTICLES = ('وال', 'بال', 'كال', 'فال', 'لل', 'ال')
+
+def normalize_arabic(text):
+    """نص موحد: بدون تشكيل، ألف/ياء/تاء مربوطة موحدة، أحرف لاتينية صغيرة"""
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFKC', str(text))
+    text = DIACRITICS.sub('', text)
+    return text.translate(LETTERS).casefold()
+
+def tokenize(text):
+    """كلمات النص بعد التوحيد"""
+    return TOKEN.findall(normalize_arabic(text))
+
+def search_text(values):
+    """نص المستند المفهرس: القيم موحدة مع صيغ الكلمات بدون أداة التعريف
+
+    حتى يجد البحث عن "امل" كلمة "الأمل" (البحث بالبادئة لا يطابق وسط الكلمة).
+    """
+    text = normalize_arabic(' '.join(str(value) for value in values if value))
+    stems = []
+    for token in TOKEN.findall(text):
+        for article in ARTICLES:
+            if token.startswith(article) and len(token) - len(article) >= 2:
+                stems.append(token[len(article):])
+                break
+    return f"{text} {' '.join(stems)}" if stems else text
+
+# ===== جدول المستندات =====
+
+PENDING_KEY = 'search_documents'
+
+class SearchDocumentMixin:
+    """نص موحد لكل سجل قابل للبحث؛ الفهرس نفسه حسب قاعدة البيانات
+
+    - SQLite: جدول FTS5 خارجي المحتوى (search_documents_fts) تحدثه القوادح
+    - PostgreSQL: فهرس GIN على to_tsvector('simple', content)
+    - غير ذلك: LIKE على النص الموحد
+    """
+    __tablename__ = 'search_documents'
+
+    entity_type = Column(String(50), primary_key=True)
+    entity_id = Column(Integer, primary_key=True)
+    content = Column(Text, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<SearchDocument {self.entity_type}:{self.entity_id}>'
+
+def _install_ddl(documents):
+    """جدول FTS5 وقوادحه (SQLite) أو فهرس GIN (PostgreSQL) مع إنشاء الجدول"""
+    # SQLite: FTS5 بمحتوى خارجي مع قوادح المزامنة (حسب توثيق SQLite)
+    for statement in (
+        # الأعمدة غير المفهرسة تقرأ من search_documents فيبقى MATCH هو مصدر الصفوف دائماً
+        "CREATE VIRTUAL TABLE IF NOT EXISTS search_documents_fts USING fts5("
+        "entity_type UNINDEXED, entity_id UNINDEXED, content, "
+        "content='search_documents', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2')",
+        "CREATE TRIGGER IF NOT EXISTS search_documents_ai AFTER INSERT ON search_documents BEGIN "
+        "INSERT INTO search_documents_fts(rowid, entity_type, entity_id, content) "
+        "VALUES (new.rowid, new.entity_type, new.entity_id, new.content); END",
+        "CREATE TRIGGER IF NOT EXISTS search_documents_ad AFTER DELETE ON search_documents BEGIN "
+        "INSERT INTO search_documents_fts(search_documents_fts, rowid, entity_type, entity_id, content) "
+        "VALUES ('delete', old.rowid, old.entity_type, old.entity_id, old.content); END",
+        "CREATE TRIGGER IF NOT EXISTS search_documents_au AFTER UPDATE ON search_documents BEGIN "
+        "INSERT INTO search_documents_fts(search_documents_fts, rowid, entity_type, entity_id, content) "
+        "VALUES ('delete', old.rowid, old.entity_type, old.entity_id, old.content); "
+        "INSERT INTO search_documents_fts(rowid, entity_type, entity_id, content) "
+        "VALUES (new.rowid, new.entity_type, new.entity_id, new.content); END",
+    ):
+        event.listen(documents, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+    event.listen(documents, 'before_drop', DDL('DROP TABLE IF EXISTS search_documents_fts').execute_if(dialect='sqlite'))
+
+    # PostgreSQL: فهرس GIN على المتجه النصي
+    event.listen(documents, 'after_create', DDL(
+        "CREATE INDEX IF NOT EXISTS idx_search_documents_tsv ON search_documents "
+        "USING gin (to_tsvector('simple', content))"
+    ).execute_if(dialect='postgresql'))
+
+# ===== الفهرس =====
+
+class DocumentIndex:
+    """تسجيل النماذج القابلة للبحث ومزامنة فهرسها مع أحداث الـ mapper
+
+    db: كائن Flask-SQLAlchemy للتطبيق، document_model: نموذجه المبني على SearchDocumentMixin.
+    """
+
+    def __init__(self, db, document_model):
+        self.db = db
+        self.documents = document_model.__table__
+        self._models = {}
+        _install_ddl(self.documents)
+
+        # كتابة مستندات البحث المتغيرة في نفس معاملة البيانات
+        event.listen(db.session, 'after_flush', self._write_pending)
+        event.listen(db.session, 'after_soft_rollback', self._discard_pending)
+
+    # ===== التسجيل والمزامنة =====
+
+    def register(self, model, fields):
+        """ربط نموذج بالفهرس (الحقول غير الموجودة في النموذج تتجاهل)"""
+        entity_type = model.__tablename__
+        if entity_type in self._models:
+            return
+        fields = tuple(field for field in fields if hasattr(model, field))
+        soft_delete = hasattr(model, 'is_deleted')
+        self._models[entity_type] = (model, fields, soft_delete)
+
+        @event.listens_for(model, 'after_insert')
+        def index_after_insert(mapper, connection, target):
+            self._queue(target, entity_type)
+
+        @event.listens_for(model, 'after_update')
+        def index_after_update(mapper, connection, target):
+            attrs = inspect(target).attrs
+            if soft_delete and target.is_deleted:
+                self._queue_delete(target, entity_type)
+            elif any(attrs[field].history.has_changes() for field in fields + (('is_deleted',) if soft_delete else ())):
+                self._queue(target, entity_type)
+
+        @event.listens_for(model, 'after_delete')
+        def index_after_delete(mapper, connection, target):
+            self._queue_delete(target, entity_type)
+
+    def document(self, instance):
+        """النص الموحد للسجل"""
+        _, fields, _ = self._models[instance.__tablename__]
+        return search_text(getattr(instance, field) for field in fields)
+
+    def _queue(self, target, entity_type):
+        pending = inspect(target).session.info.setdefault(PENDING_KEY, {})
+        pending[(entity_type, target.id)] = self.document(target)
+
+    def _queue_delete(self, target, entity_type):
+        pending = inspect(target).session.info.setdefault(PENDING_KEY, {})
+        pending[(entity_type, target.id)] = None
+
+    def _write_pending(self, session, flush_context):
+        pending = session.info.pop(PENDING_KEY, None)
+        if pending:
+            self._write(session.connection(), pending)
+
+    def _discard_pending(self, session, previous_transaction):
+        session.info.pop(PENDING_KEY, None)
+
+    def _write(self, connection, pending):
+        """استبدال مستندات الـ flush بجملتين (حذف ثم إدراج متعدد)"""
+        documents = self.documents
+        keys = list(pending)
+        for offset in range(0, len(keys), 500):
+            chunk = keys[offset:offset + 500]
+            connection.execute(delete(documents).where(
+                tuple_(documents.c.entity_type, documents.c.entity_id).in_(chunk)
+            ))
+        now = datetime.utcnow()
+        rows = [
+            {'entity_type': entity_type, 'entity_id': entity_id, 'content': content, 'updated_at': now}
+            for (entity_type, entity_id), content in pending.items() if content
+        ]
+        if rows:
+            connection.execute(insert(documents), rows)
+
+    def discard(self, model, *criteria):
+        """حذف مستندات السجلات المطابقة قبل حذفها الجماعي (query.delete لا يمر بأحداث الـ mapper)
+
+        ينفذ على جلسة db فيلتزم أو يتراجع مع الحذف نفسه.
+        """
+        documents = self.documents
+        return self.db.session.execute(delete(documents).where(
+            documents.c.entity_type == model.__tablename__,
+            documents.c.entity_id.in_(select(model.id).where(*criteria))
+        )).rowcount
+
+    # ===== البحث =====
+
+    def matches(self, model, expression):
+        """استعلام فرعي (entity_id, rank) مرتب تصاعدياً بالصلة؛ None إذا لم تكن هناك كلمات"""
+        tokens = tokenize(expression)
+        if not tokens:
+            return None
+        documents = self.documents
+        entity_type = model.__tablename__
+        dialect = self.db.session.get_bind().dialect.name
+
+        if dialect == 'sqlite':
+            # كل كلمة بحث كبادئة: "كلمة"*
+            query = ' '.join(f'"{token}"*' for token in tokens)
+            return text(
+                "SELECT entity_id, bm25(search_documents_fts) AS rank FROM search_documents_fts "
+                "WHERE search_documents_fts MATCH :query AND entity_type = :entity_type"
+            ).bindparams(query=query, entity_type=entity_type).columns(
+                entity_id=Integer, rank=Float
+            ).subquery('search_matches')
+
+        if dialect == 'postgresql':
+            vector = func.to_tsvector(literal_column("'simple'"), documents.c.content)
+            query = func.to_tsquery(literal_column("'simple'"), ' & '.join(f'{token}:*' for token in tokens))
+            return select(
+                documents.c.entity_id.label('entity_id'),
+                (-func.ts_rank(vector, query)).label('rank')
+            ).where(documents.c.entity_type == entity_type, vector.op('@@')(query)).subquery('search_matches')
+
+        conditions = [documents.c.content.contains(token) for token in tokens]
+        return select(
+            documents.c.entity_id.label('entity_id'), literal_column('0').label('rank')
+        ).where(documents.c.entity_type == entity_type, *conditions).subquery('search_matches')
+
+    def filter(self, model, expression):
+        """شرط id IN (...) لإضافته إلى استعلام قائم مع الحفاظ على ترتيبه"""
+        matches = self.matches(model, expression)
+        if matches is None:
+            return True
+        return model.id.in_(select(matches.c.entity_id))
+
+    def search(self, model, expression, page=1, per_page=20):
+        """بحث مرتب بالصلة مع تقسيم الصفحات"""
+        matches = self.matches(model, expression)
+        query = select(model)
+        if matches is not None:
+            query = query.join(matches, matches.c.entity_id == model.id).order_by(matches.c.rank, model.id)
+        if self._models.get(model.__tablename__, (None, None, False))[2]:
+            query = query.where(model.is_deleted == False)
+        return self.db.paginate(query, page=page, per_page=per_page, error_out=False)
+
+    def is_registered(self, model):
+        return model.__tablename__ in self._models
+
+    # ===== إعادة البناء =====
+
+    def is_empty(self):
+        """لا مستندات بعد (قاعدة بيانات أنشئت قبل الفهرس)"""
+        return self.db.session.execute(select(self.documents.c.entity_id).limit(1)).first() is None
+
+    def reindex(self, models=None, chunk_size=1000):
+        """إعادة بناء الفهرس على دفعات بترتيب المعرف؛ يعيد عدد المستندات لكل جدول"""
+        session = self.db.session
+        documents = self.documents
+        result = {}
+        for entity_type, (model, fields, soft_delete) in self._models.items():
+            if models and entity_type not in models and model not in models:
+                continue
+            session.execute(delete(documents).where(documents.c.entity_type == entity_type))
+            session.commit()
+
+            table = model.__table__
+            columns = [table.c.id] + [getattr(model, field).expression for field in fields]
+            query = select(*columns).order_by(table.c.id).limit(chunk_size)
+            if soft_delete:
+                query = query.where(table.c.is_deleted == False)
+
+            count = 0
+            last_id = 0
+            while True:
+                rows = session.execute(query.where(table.c.id > last_id)).all()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                now = datetime.utcnow()
+                chunk = []
+                for row in rows:
+                    content = search_text(row[1:])
+                    if content:
+                        chunk.append({'entity_type': entity_type, 'entity_id': row[0],
+                                      'content': content, 'updated_at': now})
+                if chunk:
+                    session.execute(insert(documents), chunk)
+                session.commit()
+                count += len(chunk)
+            result[entity_type] = count
+            logger.info('فهرس البحث: %s - %d مستند', entity_type, count)
+
+        if session.get_bind().dialect.name == 'sqlite':
+            session.execute(text("INSERT INTO search_documents_fts(search_documents_fts) VALUES ('optimize')"))
+            session.commit()
+        return result
+
+__all__ = [
+    'normalize_arabic',
+    'tokenize',
+    'search_text',
+    'SearchDocumentMixin',
+    'DocumentIndex'
+]
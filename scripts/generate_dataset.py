@@ -0,0 +1,527 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+مولد بيانات تجريبية قابلة للتكرار لاختبارات الأداء
+Reproducible Synthetic Dataset Generator for Load Testing
+
+أمثلة:
+    python scripts/generate_dataset.py --scale 1
+    python scripts/generate_dataset.py --scale 100 --database-url sqlite:///load.db
+    python scripts/generate_dataset.py --target app --database-url postgresql://... --scale 10
+"""
+
+import os
+import sys
+import math
+import time
+import random
+import logging
+import argparse
+from datetime import date, datetime, timedelta
+
+# إضافة مسار التطبيق
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import Date, DateTime, MetaData, create_engine, event, func, select
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# الأحجام لكل وحدة من معامل الحجم (فرع مطعم تقريباً)
+PER_SCALE = {
+    'customers': 2000,
+    'suppliers': 4,
+    'employees': 12,
+    'sales_invoices': 25000,
+    'purchase_invoices': 600,
+    'expenses': 400,
+    'payments': 300,
+}
+
+TAX_RATE = 0.15
+POOL_SIZE = 65536  # حجم كتلة السحب العشوائي
+CASH_SHARE = 0.65  # نسبة فواتير العملاء النقديين بدون حساب
+
+# عدد الأصناف في التذكرة (المتوسط ≈ 4) والكمية لكل صنف
+ITEMS_PER_TICKET = (1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12)
+ITEMS_PER_TICKET_WEIGHTS = (10, 18, 20, 17, 12, 9, 6, 4, 2, 1, 0.6, 0.4)
+QUANTITIES = (1, 2, 3, 4)
+QUANTITY_WEIGHTS = (80, 15, 4, 1)
+
+# نمط الأسبوع (الخميس والجمعة أعلى) بترتيب date.weekday()
+WEEKDAY_FACTORS = (0.85, 0.85, 0.9, 1.0, 1.3, 1.45, 1.1)
+
+FIRST_NAMES = ('محمد', 'أحمد', 'عبدالله', 'خالد', 'فهد', 'سعود', 'ناصر', 'فيصل', 'عمر', 'يوسف',
+               'فاطمة', 'نورة', 'سارة', 'مريم', 'هند', 'ريم', 'لمى', 'دانة', 'جود', 'ليان')
+LAST_NAMES = ('العتيبي', 'القحطاني', 'الغامدي', 'الزهراني', 'الشهري', 'الدوسري', 'المطيري',
+              'الحربي', 'السبيعي', 'الشمري', 'العنزي', 'المالكي', 'البقمي', 'الجهني')
+CITIES = ('الرياض', 'جدة', 'مكة', 'المدينة', 'الدمام', 'الخبر', 'أبها', 'تبوك')
+MENU = {
+    'مشويات': ('شيش طاووق', 'كباب لحم', 'ريش غنم', 'مشكل مشاوي', 'دجاج مشوي', 'أوصال'),
+    'أطباق رئيسية': ('كبسة دجاج', 'كبسة لحم', 'مندي', 'مظبي', 'برياني', 'مقلوبة', 'جريش', 'مرقوق'),
+    'سندويتشات': ('شاورما دجاج', 'شاورما لحم', 'برجر', 'فلافل', 'كبدة', 'فاهيتا'),
+    'مقبلات': ('حمص', 'متبل', 'تبولة', 'فتوش', 'سمبوسة', 'ورق عنب', 'بطاطس'),
+    'مشروبات': ('شاي', 'قهوة عربية', 'عصير برتقال', 'ليمون بالنعناع', 'مياه', 'مشروب غازي', 'لبن'),
+    'حلويات': ('كنافة', 'أم علي', 'بسبوسة', 'لقيمات', 'مهلبية', 'آيس كريم'),
+}
+CATEGORY_PRICES = {  # (متوسط السعر، التشتت اللوغاريتمي)
+    'مشويات': (55, 0.35), 'أطباق رئيسية': (45, 0.3), 'سندويتشات': (18, 0.3),
+    'مقبلات': (14, 0.3), 'مشروبات': (7, 0.4), 'حلويات': (16, 0.3),
+}
+EXPENSE_CATEGORIES = (('إيجار', 'bank_transfer', 12000), ('كهرباء', 'bank_transfer', 2500),
+                      ('مياه', 'bank_transfer', 600), ('صيانة', 'cash', 900),
+                      ('نظافة', 'cash', 400), ('تسويق', 'bank_transfer', 1500), ('نقل', 'cash', 300))
+POSITIONS = (('طاهي', 6500), ('مساعد طاهي', 4200), ('كاشير', 4000), ('نادل', 3500),
+             ('مدير فرع', 11000), ('عامل نظافة', 2800), ('محاسب', 7000))
+
+def cumulative(weights):
+    total = 0.0
+    result = []
+    for weight in weights:
+        total += weight
+        result.append(total)
+    return result
+
+def zipf_weights(count, exponent):
+    """أوزان ذيل طويل: القلة الأكثر شعبية تأخذ معظم الطلبات"""
+    return [1.0 / (rank + 1) ** exponent for rank in range(count)]
+
+class DatasetGenerator:
+    """يولّد صفوفاً حتمية لمعامل حجم وبذرة معينين"""
+
+    def __init__(self, scale, seed, end, years):
+        self.scale = scale
+        self.rng = random.Random(seed)
+        self.end = end
+        self.start = date(end.year - years, end.month, end.day) + timedelta(days=1)
+        self.days = (end - self.start).days + 1
+        self.counts = {name: max(1, int(per * scale)) for name, per in PER_SCALE.items()}
+        self.counts['products'] = int(120 + 30 * math.sqrt(scale))
+
+        self.products = self._build_products()
+        self.product_cum = cumulative(zipf_weights(len(self.products), 1.07))
+        self.customer_cum = cumulative(zipf_weights(self.counts['customers'], 1.2))
+        self.day_cum = cumulative(self._day_weight(day) for day in range(self.days))
+        self.items_cum = cumulative(ITEMS_PER_TICKET_WEIGHTS)
+        self.quantity_cum = cumulative(QUANTITY_WEIGHTS)
+        self._pools = {}
+
+    def _day_weight(self, offset):
+        """موسمية سنوية + نمط أسبوعي + نمو تدريجي"""
+        day = self.start + timedelta(days=offset)
+        yearly = 1 + 0.25 * math.cos(2 * math.pi * (day.timetuple().tm_yday - 15) / 365.25)
+        growth = 1 + 0.3 * offset / self.days
+        return yearly * growth * WEEKDAY_FACTORS[day.weekday()]
+
+    def _build_products(self):
+        products = []
+        names = [(category, name) for category, items in MENU.items() for name in items]
+        for index in range(self.counts['products']):
+            category, name = names[index % len(names)]
+            if index >= len(names):
+                name = f'{name} {index // len(names) + 1}'
+            mean, sigma = CATEGORY_PRICES[category]
+            price = round(self.rng.lognormvariate(math.log(mean), sigma), 2)
+            products.append({
+                'name': name,
+                'category': category,
+                'sku': f'SKU-{index + 1:05d}',
+                'price': price,
+                'cost': round(price * self.rng.uniform(0.32, 0.45), 2),
+            })
+        # ترتيب الشعبية مستقل عن ترتيب القائمة
+        self.rng.shuffle(products)
+        return products
+
+    def person_name(self):
+        return f'{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}'
+
+    def phone(self):
+        return f'05{self.rng.randrange(10 ** 8):08d}'
+
+    def invoice_days(self, count):
+        """تواريخ الفواتير مرتبة زمنياً حسب أوزان الأيام"""
+        offsets = self.rng.choices(range(self.days), cum_weights=self.day_cum, k=count)
+        offsets.sort()
+        return [self.start + timedelta(days=offset) for offset in offsets]
+
+    def _draw(self, name, population, cum_weights):
+        # السحب على كتل كبيرة أسرع بكثير من استدعاء choices لكل صنف
+        pool = self._pools.get(name)
+        if not pool:
+            pool = self.rng.choices(population, cum_weights=cum_weights, k=POOL_SIZE)
+            pool.reverse()
+            self._pools[name] = pool
+        return pool.pop()
+
+    def ticket(self):
+        """أصناف تذكرة: (فهرس المنتج، الكمية)"""
+        size = self._draw('size', ITEMS_PER_TICKET, self.items_cum)
+        products = range(len(self.products))
+        return [
+            (self._draw('product', products, self.product_cum),
+             self._draw('quantity', QUANTITIES, self.quantity_cum))
+            for _ in range(size)
+        ]
+
+    def customer_index(self):
+        if self.rng.random() < CASH_SHARE:
+            return None
+        return self.rng.choices(range(self.counts['customers']), cum_weights=self.customer_cum)[0]
+
+    def status(self):
+        value = self.rng.random()
+        return 'paid' if value < 0.92 else 'pending' if value < 0.98 else 'cancelled'
+
+class BulkWriter:
+    """إدراج دفعات بجمل Core مترجمة وexecutemany مع معرفات صريحة"""
+
+    def __init__(self, engine, tables, batch_size, fill_required=False, now=None):
+        self.engine = engine
+        self.tables = tables
+        self.batch_size = batch_size
+        self.fill_required = fill_required
+        self.now = now
+        self.buffers = {name: [] for name in tables}
+        self.inserted = {name: 0 for name in tables}
+        self.templates = {name: self._template(table) for name, table in tables.items()}
+        self._statements = {}
+        with engine.connect() as connection:
+            self.next_ids = {
+                name: (connection.execute(select(func.max(table.c.id))).scalar() or 0) + 1
+                for name, table in tables.items()
+            }
+
+    def _template(self, table):
+        # الجداول المنعكسة لا تحمل القيم الافتراضية لـ Python، فنملأ الأعمدة الإلزامية بقيم محايدة
+        if not self.fill_required:
+            return {}
+        template = {}
+        for column in table.columns:
+            if column.nullable or column.primary_key or column.server_default is not None:
+                continue
+            try:
+                python_type = column.type.python_type
+            except NotImplementedError:
+                continue
+            neutral = {int: 0, float: 0.0, bool: False, str: '', datetime: self.now,
+                       date: self.now.date() if self.now else None, dict: {}}
+            for kind, value in neutral.items():
+                if issubclass(python_type, kind):
+                    template[column.name] = value
+                    break
+            else:
+                if python_type.__name__ == 'Decimal':
+                    template[column.name] = 0
+        return template
+
+    def allocate_id(self, name):
+        value = self.next_ids[name]
+        self.next_ids[name] += 1
+        return value
+
+    def add(self, name, row):
+        template = self.templates[name]
+        self.buffers[name].append({**template, **row} if template else row)
+        if len(self.buffers[name]) >= self.batch_size:
+            self.flush()
+
+    def _statement(self, table, keys):
+        """جملة insert مترجمة مرة واحدة لكل جدول مع ترتيب المعاملات"""
+        cached = self._statements.get(table.name)
+        if cached is None or cached[0] != keys:
+            compiled = table.insert().compile(dialect=self.engine.dialect, column_keys=list(keys))
+            order = compiled.positiontup if compiled.positional else None
+            # SQLite يخزن التواريخ نصاً بنفس صيغة SQLAlchemy
+            text_dates = set()
+            if self.engine.dialect.name == 'sqlite':
+                text_dates = {column.name for column in table.columns
+                              if isinstance(column.type, (DateTime, Date))}
+            cached = (keys, str(compiled), order, text_dates)
+            self._statements[table.name] = cached
+        return cached[1:]
+
+    def _parameters(self, rows, order, text_dates):
+        if order is None:
+            return rows
+        if not text_dates:
+            return [tuple(row[key] for key in order) for row in rows]
+        return [
+            tuple(str(row[key]) if key in text_dates and row[key] is not None else row[key] for key in order)
+            for row in rows
+        ]
+
+    def flush(self):
+        # جميع الجداول معاً للحفاظ على ترتيب المفاتيح الأجنبية
+        if not any(self.buffers.values()):
+            return
+        with self.engine.begin() as connection:
+            for name, table in self.tables.items():
+                rows = self.buffers[name]
+                if rows:
+                    # جملة Core مترجمة + executemany مباشرة على DBAPI دون معالجة كل صف في SQLAlchemy
+                    sql, order, text_dates = self._statement(table, tuple(rows[0]))
+                    connection.exec_driver_sql(sql, self._parameters(rows, order, text_dates))
+                    self.inserted[name] += len(rows)
+                    self.buffers[name] = []
+
+    def finish(self):
+        self.flush()
+        if self.engine.dialect.name == 'postgresql':
+            # المعرفات الصريحة لا تحرك التسلسلات
+            with self.engine.begin() as connection:
+                for table in self.tables.values():
+                    connection.exec_driver_sql(
+                        f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                        f"COALESCE((SELECT MAX(id) FROM {table.name}), 1))"
+                    )
+        return self.inserted
+
+def enable_fast_sqlite(engine):
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute('PRAGMA cache_size=-200000')
+        cursor.close()
+
+def generate_complete(generator, engine, tables, batch_size):
+    """النظام الكامل: العملاء والموردون والمنتجات والموظفون والفواتير والمصروفات والمدفوعات"""
+    rng = generator.rng
+    writer = BulkWriter(engine, tables, batch_size)
+    created = datetime.combine(generator.start, datetime.min.time())
+
+    customer_ids = []
+    for _ in range(generator.counts['customers']):
+        customer_id = writer.allocate_id('customer')
+        customer_ids.append(customer_id)
+        writer.add('customer', {
+            'id': customer_id, 'name': generator.person_name(), 'phone': generator.phone(),
+            'email': f'customer{customer_id}@example.com', 'address': rng.choice(CITIES),
+            'tax_number': None, 'created_at': created,
+        })
+
+    supplier_ids = []
+    for index in range(generator.counts['suppliers']):
+        supplier_id = writer.allocate_id('supplier')
+        supplier_ids.append(supplier_id)
+        writer.add('supplier', {
+            'id': supplier_id, 'name': f'مورد {rng.choice(LAST_NAMES)} {index + 1}',
+            'phone': generator.phone(), 'email': f'supplier{supplier_id}@example.com',
+            'address': rng.choice(CITIES), 'tax_number': f'3{rng.randrange(10 ** 13):013d}',
+            'created_at': created,
+        })
+
+    for product in generator.products:
+        writer.add('product', {
+            'id': writer.allocate_id('product'), 'name': product['name'], 'description': product['sku'],
+            'price': product['price'], 'cost': product['cost'], 'quantity': rng.randint(0, 400),
+            'min_quantity': 10, 'category': product['category'], 'created_at': created,
+        })
+
+    for _ in range(generator.counts['employees']):
+        position, salary = rng.choice(POSITIONS)
+        writer.add('employee', {
+            'id': writer.allocate_id('employee'), 'name': generator.person_name(), 'position': position,
+            'salary': round(salary * rng.uniform(0.9, 1.2), 2), 'phone': generator.phone(), 'email': None,
+            'hire_date': generator.start - timedelta(days=rng.randint(0, 1500)),
+            'status': 'active' if rng.random() < 0.9 else 'inactive', 'created_at': created,
+        })
+
+    # فواتير المبيعات: المبالغ محسوبة من أصناف التذكرة (لا يوجد جدول أصناف في النظام الكامل)
+    prices = [product['price'] for product in generator.products]
+    for day in generator.invoice_days(generator.counts['sales_invoices']):
+        invoice_id = writer.allocate_id('sales_invoice')
+        customer = generator.customer_index()
+        subtotal = round(sum(prices[product] * quantity for product, quantity in generator.ticket()), 2)
+        tax = round(subtotal * TAX_RATE, 2)
+        writer.add('sales_invoice', {
+            'id': invoice_id, 'invoice_number': f'S-{invoice_id:09d}',
+            'customer_id': None if customer is None else customer_ids[customer],
+            'date': day, 'subtotal': subtotal, 'tax_amount': tax, 'total': round(subtotal + tax, 2),
+            'status': generator.status(), 'notes': None, 'created_at': created,
+        })
+
+    supplier_cum = cumulative(zipf_weights(len(supplier_ids), 0.8))
+    for day in generator.invoice_days(generator.counts['purchase_invoices']):
+        invoice_id = writer.allocate_id('purchase_invoice')
+        subtotal = round(rng.lognormvariate(math.log(3500), 0.6), 2)
+        tax = round(subtotal * TAX_RATE, 2)
+        writer.add('purchase_invoice', {
+            'id': invoice_id, 'invoice_number': f'P-{invoice_id:09d}',
+            'supplier_id': rng.choices(supplier_ids, cum_weights=supplier_cum)[0],
+            'date': day, 'subtotal': subtotal, 'tax_amount': tax, 'total': round(subtotal + tax, 2),
+            'status': generator.status(), 'notes': None, 'created_at': created,
+        })
+
+    for day in generator.invoice_days(generator.counts['expenses']):
+        category, method, mean = rng.choice(EXPENSE_CATEGORIES)
+        expense_id = writer.allocate_id('expense')
+        writer.add('expense', {
+            'id': expense_id, 'description': f'{category} - {day:%Y-%m}',
+            'amount': round(rng.lognormvariate(math.log(mean), 0.35), 2), 'category': category,
+            'date': day, 'payment_method': method, 'receipt_number': f'E-{expense_id:08d}',
+            'notes': None, 'created_at': created,
+        })
+
+    for day in generator.invoice_days(generator.counts['payments']):
+        incoming = rng.random() < 0.6
+        payment_id = writer.allocate_id('payment')
+        writer.add('payment', {
+            'id': payment_id, 'type': 'incoming' if incoming else 'outgoing',
+            'amount': round(rng.lognormvariate(math.log(1500 if incoming else 4000), 0.5), 2),
+            'description': 'تحصيل من عميل' if incoming else 'سداد لمورد',
+            'payment_method': rng.choice(('cash', 'bank_transfer', 'check')),
+            'reference_number': f'PAY-{payment_id:08d}', 'date': day,
+            'customer_id': rng.choices(customer_ids, cum_weights=generator.customer_cum)[0] if incoming else None,
+            'supplier_id': None if incoming else rng.choice(supplier_ids), 'created_at': created,
+        })
+
+    return writer.finish()
+
+def generate_app(generator, engine, tables, batch_size):
+    """التطبيق المعياري: العملاء والفواتير وأصناف الفواتير والمدفوعات"""
+    rng = generator.rng
+    now = datetime.combine(generator.end, datetime.min.time())
+    writer = BulkWriter(engine, tables, batch_size, fill_required=True, now=now)
+
+    customers = []
+    for _ in range(generator.counts['customers']):
+        customer_id = writer.allocate_id('customers')
+        name = generator.person_name()
+        customers.append((customer_id, name))
+        writer.add('customers', {
+            'id': customer_id, 'name': name, 'phone': generator.phone(),
+            'email': f'customer{customer_id}@example.com', 'city': rng.choice(CITIES),
+            'country': 'السعودية', 'customer_type': 'individual' if rng.random() < 0.85 else 'company',
+            'status': 'active', 'payment_terms': 30, 'rating': 5, 'risk_level': 'low',
+            'verification_status': 'pending',
+        })
+
+    product_ids = None
+    if 'products' in tables:
+        product_ids = []
+        for product in generator.products:
+            product_id = writer.allocate_id('products')
+            product_ids.append(product_id)
+            writer.add('products', {'id': product_id, 'name': product['name']})
+
+    for day in generator.invoice_days(generator.counts['sales_invoices']):
+        invoice_id = writer.allocate_id('invoices')
+        issued = datetime.combine(day, datetime.min.time()) + timedelta(minutes=rng.randint(660, 1410))
+        customer = generator.customer_index()
+        subtotal = 0.0
+        for order, (product, quantity) in enumerate(generator.ticket()):
+            item = generator.products[product]
+            line_total = round(item['price'] * quantity, 2)
+            subtotal += line_total
+            writer.add('invoice_items', {
+                'id': writer.allocate_id('invoice_items'), 'invoice_id': invoice_id,
+                'product_id': product_ids[product] if product_ids else None,
+                'item_name': item['name'], 'sku': item['sku'], 'quantity': float(quantity),
+                'unit': 'صنف', 'unit_price': item['price'], 'total_amount': line_total,
+                'tax_rate': TAX_RATE * 100, 'tax_amount': round(line_total * TAX_RATE, 2),
+                'sort_order': order, 'created_at': issued, 'updated_at': issued,
+            })
+        subtotal = round(subtotal, 2)
+        tax = round(subtotal * TAX_RATE, 2)
+        total = round(subtotal + tax, 2)
+        status = generator.status()
+        paid = total if status == 'paid' else 0.0
+        writer.add('invoices', {
+            'id': invoice_id, 'invoice_number': f'INV-{invoice_id:09d}', 'date': issued,
+            'customer_id': None if customer is None else customers[customer][0],
+            'customer_name': 'عميل نقدي' if customer is None else customers[customer][1],
+            'subtotal': subtotal, 'tax_rate': TAX_RATE * 100, 'tax_amount': tax, 'total_amount': total,
+            'paid_amount': paid, 'remaining_amount': round(total - paid, 2),
+            'status': 'cancelled' if status == 'cancelled' else 'sent',
+            'payment_status': 'paid' if paid else 'unpaid', 'invoice_type': 'sales',
+            'currency': 'SAR', 'exchange_rate': 1.0, 'created_at': issued, 'updated_at': issued,
+        })
+        if paid and 'payments' in tables:
+            payment_id = writer.allocate_id('payments')
+            writer.add('payments', {
+                'id': payment_id, 'payment_number': f'PAY-{payment_id:09d}', 'date': issued,
+                'amount': paid, 'payment_type': 'received',
+                'payment_method': 'cash' if rng.random() < 0.55 else 'card', 'invoice_id': invoice_id,
+                'customer_id': None if customer is None else customers[customer][0],
+                'status': 'completed', 'currency': 'SAR', 'exchange_rate': 1.0,
+                'amount_in_base_currency': paid, 'net_amount': paid,
+                'created_at': issued, 'updated_at': issued,
+            })
+
+    return writer.finish()
+
+def complete_target(database_url):
+    """جداول النظام الكامل من نماذجه مباشرة"""
+    if database_url:
+        os.environ['DATABASE_URL'] = database_url
+    import accounting_system_complete as complete
+
+    context = complete.app.app_context()
+    context.push()
+    names = ('customer', 'supplier', 'product', 'employee', 'sales_invoice',
+             'purchase_invoice', 'expense', 'payment')
+    tables = {name: complete.db.metadata.tables[name] for name in names}
+
+    def after_load():
+        # الإدراج المباشر لا يمر بأحداث ORM: إعادة بناء الملخصات مرة واحدة
+        complete.rebuild_dashboard_stats()
+        complete.rebuild_monthly_rollup()
+
+    return complete.db.engine, tables, after_load
+
+def app_target(database_url):
+    """جداول التطبيق المعياري بالانعكاس من قاعدة بيانات مهيأة مسبقاً"""
+    if not database_url:
+        raise SystemExit('--database-url مطلوب مع --target app')
+    engine = create_engine(database_url)
+    metadata = MetaData()
+    metadata.reflect(bind=engine)
+    missing = {'customers', 'invoices', 'invoice_items'} - set(metadata.tables)
+    if missing:
+        raise SystemExit(f'الجداول غير موجودة: {", ".join(sorted(missing))} (شغّل تهيئة التطبيق أولاً)')
+    # ترتيب الإدراج يتبع المفاتيح الأجنبية
+    names = [name for name in ('customers', 'products', 'invoices', 'invoice_items', 'payments')
+             if name in metadata.tables]
+    return engine, {name: metadata.tables[name] for name in names}, None
+
+def main():
+    parser = argparse.ArgumentParser(description='مولد بيانات تجريبية لاختبارات الأداء')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='معامل الحجم: 1 ≈ 25 ألف فاتورة و100 ألف صنف')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--target', choices=('complete', 'app'), default='complete')
+    parser.add_argument('--database-url', default=None)
+    parser.add_argument('--years', type=int, default=2)
+    parser.add_argument('--end', type=date.fromisoformat, default=date(2025, 12, 31),
+                        help='آخر يوم في البيانات (ثابت افتراضياً لضمان التكرار)')
+    parser.add_argument('--batch-size', type=int, default=20000)
+    args = parser.parse_args()
+
+    target = complete_target if args.target == 'complete' else app_target
+    engine, tables, after_load = target(args.database_url)
+    enable_fast_sqlite(engine)
+    engine.dispose()
+
+    generator = DatasetGenerator(args.scale, args.seed, args.end, args.years)
+    logger.info(f'توليد بيانات بمعامل {args.scale} وبذرة {args.seed} من {generator.start} إلى {args.end}')
+
+    start = time.perf_counter()
+    generate = generate_complete if args.target == 'complete' else generate_app
+    inserted = generate(generator, engine, tables, args.batch_size)
+    if after_load:
+        after_load()
+    elapsed = time.perf_counter() - start
+
+    total = sum(inserted.values())
+    for name, count in inserted.items():
+        logger.info(f'{name}: {count:,}')
+    logger.info(f'✅ {total:,} صف في {elapsed:.1f} ثانية ({total / elapsed:,.0f} صف/ثانية)')
+
+if __name__ == '__main__':
+    main()
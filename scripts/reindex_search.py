@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+سكريبت إعادة بناء فهرس البحث
+Search Index Rebuild Script
+
+يستخدم بعد الترحيل أو الاستيراد المباشر إلى قاعدة البيانات أو تغيير قواعد التوحيد.
+"""
+
+import os
+import sys
+import json
+import logging
+import argparse
+
+# إضافة مسار التطبيق
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.search import search_index
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def main():
+    parser = argparse.ArgumentParser(description='إعادة بناء فهرس البحث النصي الكامل')
+    parser.add_argument('--tables', nargs='+', help='الجداول (الافتراضي: كل النماذج المسجلة)')
+    parser.add_argument('--chunk-size', type=int, default=1000, help='عدد السجلات في كل دفعة')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        logger.info('بدء إعادة بناء فهرس البحث')
+        result = search_index.reindex(args.tables, args.chunk_size)
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+سكريبت تدوير مفتاح تشفير الحقول
+Encryption Key Rotation Script
+
+الخطوات:
+    1. ENCRYPTION_KEY=<المفتاح الجديد> و ENCRYPTION_PREVIOUS_KEYS=<المفتاح القديم> ثم إعادة تشغيل التطبيق
+    2. python scripts/rotate_encryption_key.py (يمكن إيقافه واستئنافه في أي وقت)
+    3. بعد اكتمال جميع الجداول: حذف ENCRYPTION_PREVIOUS_KEYS
+"""
+
+import os
+import sys
+import json
+import signal
+import logging
+import argparse
+
+# إضافة مسار التطبيق
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.security.rotation import key_rotation_job, ENCRYPTED_COLUMNS
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def main():
+    parser = argparse.ArgumentParser(description='إعادة تشفير الأعمدة المشفرة بالمفتاح الأساسي الجديد')
+    parser.add_argument('--tables', nargs='+', choices=list(ENCRYPTED_COLUMNS), help='الجداول (الافتراضي: الكل)')
+    parser.add_argument('--chunk-size', type=int, help='عدد الصفوف في كل معاملة')
+    parser.add_argument('--duty-cycle', type=float, help='أقصى نسبة من الوقت للعمل (0-1)')
+    parser.add_argument('--restart', action='store_true', help='البدء من أول الجداول وتجاهل نقاط الاستئناف')
+    parser.add_argument('--status', action='store_true', help='عرض التقدم فقط')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        if args.chunk_size:
+            key_rotation_job.chunk_size = args.chunk_size
+        if args.duty_cycle:
+            key_rotation_job.duty_cycle = min(max(args.duty_cycle, 0.01), 1.0)
+
+        if not args.status:
+            # Ctrl+C: إنهاء الدفعة الحالية وحفظ نقطة الاستئناف
+            signal.signal(signal.SIGINT, lambda *_: key_rotation_job.stop())
+            logger.info('بدء تدوير المفتاح')
+            key_rotation_job.run(args.tables, args.restart)
+
+        print(json.dumps(key_rotation_job.status(), ensure_ascii=False, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+سكريبت تشغيل المهام الدورية
+Periodic Job Runner
+
+نقطة دخول واحدة للمهام الدورية تشغل من cron أو Render Cron Job بدلاً من مؤقت داخل
+كل عامل gunicorn، مثلاً:
+    0 1 * * *     python scripts/run_periodic_job.py overdue-balances
+    */15 * * * *  python scripts/run_periodic_job.py risk-scoring
+    0 0 * * *     python scripts/run_periodic_job.py inventory-snapshot
+"""
+
+import os
+import sys
+import json
+import logging
+import argparse
+
+# إضافة مسار التطبيق
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def refresh_overdue_balances(args):
+    """تحويل أرصدة الفواتير التي تجاوزت تاريخ استحقاقها إلى متأخرة"""
+    from app.models.customer_balance import CustomerBalance
+    return {'customers': CustomerBalance.refresh_overdue()}
+
+def score_customer_risk(args):
+    """تقييم مخاطر العملاء الذين تغيرت مدخلاتهم (أو الكل مع --full)"""
+    from app.models.customer_risk import customer_risk_scorer
+    if args.batch_size:
+        customer_risk_scorer.batch_size = args.batch_size
+    return customer_risk_scorer.run(full=args.full)
+
+def snapshot_inventory(args):
+    """لقطة كميات كل المنتجات المتتبعة"""
+    from app.models.inventory import InventorySnapshot
+    return {'products': InventorySnapshot.take()}
+
+JOBS = {
+    'overdue-balances': refresh_overdue_balances,
+    'risk-scoring': score_customer_risk,
+    'inventory-snapshot': snapshot_inventory,
+}
+
+def main():
+    parser = argparse.ArgumentParser(description='تشغيل مهمة دورية مرة واحدة')
+    parser.add_argument('job', choices=list(JOBS), help='المهمة')
+    parser.add_argument('--full', action='store_true', help='risk-scoring: إعادة تقييم كل العملاء')
+    parser.add_argument('--batch-size', type=int, help='risk-scoring: عدد العملاء في كل دفعة')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        logger.info('بدء المهمة %s', args.job)
+        result = JOBS[args.job](args)
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+
+if __name__ == '__main__':
+    main()
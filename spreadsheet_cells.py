@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+قيم خلايا ملفات التصدير (CSV / Excel)
+Spreadsheet Export Cell Values
+
+مشترك بين النظام الكامل (accounting_system_complete) وحزمة app دون الاعتماد على أي منهما.
+"""
+
+# بدايات يفسرها Excel/LibreOffice كصيغة (حقن الصيغ في CSV)
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+def safe_cell(value):
+    """قيمة الخلية كما تكتب في الملف"""
+    # القيم المركبة (JSON) تُكتب كنص
+    if isinstance(value, (dict, list)):
+        value = str(value)
+    # الأوصاف والأسماء ومدخلات المستخدمين قد تبدأ بصيغة: تُسبق بـ ' لتُعرض كنص
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+__all__ = ['FORMULA_PREFIXES', 'safe_cell']
@@ -0,0 +1,492 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبارات النظام الكامل (accounting_system_complete)
+Complete System Tests
+"""
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date, timedelta
+from decimal import Decimal
+
+os.environ.setdefault('DATABASE_URL', 'sqlite:///:memory:')
+
+import accounting_system_complete as complete
+from accounting_system_complete import app, db, User, Customer, SalesInvoice, Expense, DashboardStats, MonthlyRollup
+
+class CompleteSystemTestCase(unittest.TestCase):
+    """أساس اختبارات النظام الكامل"""
+
+    def setUp(self):
+        """إعداد الاختبار"""
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        self.app_context = app.app_context()
+        self.app_context.push()
+
+        db.drop_all()
+        db.create_all()
+        complete._count_cache.clear()
+
+        admin = User(username='admin', full_name='مدير النظام', role='admin')
+        admin.set_password('admin123')
+        db.session.add(admin)
+        db.session.commit()
+
+        self.client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+
+    def tearDown(self):
+        """تنظيف بعد الاختبار"""
+        db.session.remove()
+        self.app_context.pop()
+
+class TestKeysetPagination(CompleteSystemTestCase):
+    """اختبارات ترقيم الصفحات بالمؤشر"""
+
+    def _add_sales(self, count):
+        start = date(2024, 1, 1)
+        db.session.add_all([
+            SalesInvoice(
+                invoice_number=f'INV-{i:05d}',
+                date=start + timedelta(days=i // 3),
+                subtotal=Decimal('100.00'),
+                tax_amount=Decimal('15.00'),
+                total=Decimal('115.00'),
+                status='paid' if i % 2 else 'pending'
+            )
+            for i in range(count)
+        ])
+        db.session.commit()
+
+    def _walk(self, path):
+        """المرور على جميع الصفحات وإرجاع أرقام الفواتير بالترتيب"""
+        seen = []
+        with app.test_request_context(path):
+            page = complete.paginate_list(
+                SalesInvoice,
+                sort_fields={'date': (SalesInvoice.date, 'التاريخ')},
+                default_sort='date',
+                default_order='desc'
+            )
+            next_url = page.next_url
+        seen.extend(sale.invoice_number for sale in page.items)
+        while next_url:
+            with app.test_request_context(next_url):
+                page = complete.paginate_list(
+                    SalesInvoice,
+                    sort_fields={'date': (SalesInvoice.date, 'التاريخ')},
+                    default_sort='date',
+                    default_order='desc'
+                )
+                next_url = page.next_url
+            seen.extend(sale.invoice_number for sale in page.items)
+        return seen, page
+
+    def test_walk_all_pages_without_gaps(self):
+        """المرور على الصفحات يعيد كل السجلات مرة واحدة وبالترتيب"""
+        self._add_sales(23)
+
+        seen, last_page = self._walk('/sales?per_page=5')
+
+        expected = [sale.invoice_number for sale in
+                    SalesInvoice.query.order_by(SalesInvoice.date.desc(), SalesInvoice.id.desc())]
+        self.assertEqual(seen, expected)
+        self.assertEqual(last_page.total, 23)
+        self.assertTrue(last_page.has_prev)
+
+    def test_previous_page_cursor(self):
+        """مؤشر الصفحة السابقة يعيد نفس الصفحة الأولى"""
+        self._add_sales(12)
+        sort_fields = {'date': (SalesInvoice.date, 'التاريخ')}
+
+        with app.test_request_context('/sales?per_page=5'):
+            first = complete.paginate_list(SalesInvoice, sort_fields, 'date', 'desc')
+            next_url = first.next_url
+        with app.test_request_context(next_url):
+            second = complete.paginate_list(SalesInvoice, sort_fields, 'date', 'desc')
+            prev_url = second.prev_url
+        with app.test_request_context(prev_url):
+            back = complete.paginate_list(SalesInvoice, sort_fields, 'date', 'desc')
+
+        self.assertEqual([s.id for s in back.items], [s.id for s in first.items])
+        self.assertFalse(back.has_prev)
+
+    def test_page_size_is_clamped(self):
+        """حجم الصفحة لا يتجاوز الحد الأقصى"""
+        with app.test_request_context('/sales?per_page=100000'):
+            page = complete.paginate_list(
+                SalesInvoice, {'date': (SalesInvoice.date, 'التاريخ')}, 'date', 'desc')
+        self.assertEqual(page.per_page, complete.MAX_PAGE_SIZE)
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        """المؤشر التالف يعيد الصفحة الأولى"""
+        self._add_sales(3)
+        response = self.client.get('/sales?after=not-a-cursor')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('INV-00002'.encode(), response.data)
+
+    def test_filters_and_cached_count(self):
+        """المرشحات تعمل والعدد يُحدّث بعد الإضافة"""
+        self._add_sales(10)
+
+        response = self.client.get('/sales?status=paid')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('من أصل 5 سجل'.encode(), response.data)
+
+        self.client.post('/add_sale', data={
+            'invoice_number': 'INV-NEW', 'subtotal': '10', 'tax_amount': '0'
+        })
+        response = self.client.get('/sales')
+        self.assertIn('من أصل 11 سجل'.encode(), response.data)
+
+    def test_entity_list_pages(self):
+        """جميع صفحات القوائم تعمل مع الترقيم"""
+        db.session.add(Customer(name='عميل'))
+        db.session.commit()
+        for path in ['/customers', '/products', '/sales', '/expenses',
+                     '/suppliers', '/employees', '/purchases']:
+            response = self.client.get(f'{path}?per_page=10&order=desc')
+            self.assertEqual(response.status_code, 200, path)
+
+class TestListSearch(CompleteSystemTestCase):
+    """اختبارات البحث في القوائم عبر فهرس البحث"""
+
+    def test_search_ignores_diacritics_and_hamza(self):
+        db.session.add_all([Customer(name='شركة الأمل'), Customer(name='مؤسسة النجاح'),
+                            complete.Product(name='طابعة ليزر', price=800, category='إلكترونيات')])
+        db.session.commit()
+
+        for query in ('امل', 'شَرِكة', 'الامل'):
+            response = self.client.get('/customers', query_string={'q': query})
+            self.assertIn('شركة الأمل'.encode(), response.data, query)
+            self.assertNotIn('مؤسسة النجاح'.encode(), response.data, query)
+
+        response = self.client.get('/products', query_string={'q': 'الكترونيات'})
+        self.assertIn('طابعة ليزر'.encode(), response.data)
+
+    def test_index_follows_updates_and_rebuild(self):
+        customer = Customer(name='شركة الأمل')
+        db.session.add(customer)
+        db.session.commit()
+        customer.name = 'شركة الريان'
+        db.session.commit()
+        self.assertEqual(Customer.query.filter(complete.search_index.filter(Customer, 'امل')).count(), 0)
+        self.assertEqual(Customer.query.filter(complete.search_index.filter(Customer, 'ريان')).count(), 1)
+
+        db.session.delete(customer)
+        db.session.commit()
+        self.assertTrue(complete.search_index.is_empty())
+        db.session.add(Customer(name='عميل'))
+        db.session.commit()
+        self.assertEqual(complete.search_index.reindex(), {'customer': 1, 'supplier': 0, 'product': 0})
+
+class TestDashboardStats(CompleteSystemTestCase):
+    """اختبارات عدادات لوحة التحكم"""
+
+    def test_counters_follow_inserts_updates_and_deletes(self):
+        """العدادات تتبع الإضافة والتعديل والحذف"""
+        complete.rebuild_dashboard_stats()
+
+        self.client.post('/add_customer', data={'name': 'عميل جديد'})
+        self.client.post('/add_sale', data={
+            'invoice_number': 'INV-1', 'subtotal': '100', 'tax_amount': '15'
+        })
+        self.client.post('/add_expense', data={
+            'description': 'إيجار', 'amount': '40', 'category': 'مرافق', 'payment_method': 'cash'
+        })
+
+        stats = db.session.get(DashboardStats, 1)
+        self.assertEqual(stats.total_customers, 1)
+        self.assertEqual(stats.total_sales, Decimal('115'))
+        self.assertEqual(stats.total_expenses, Decimal('40'))
+
+        sale = SalesInvoice.query.filter_by(invoice_number='INV-1').one()
+        sale.total = Decimal('200')
+        db.session.delete(Expense.query.one())
+        db.session.commit()
+
+        stats = db.session.get(DashboardStats, 1)
+        self.assertEqual(stats.total_sales, Decimal('200'))
+        self.assertEqual(stats.total_expenses, Decimal('0'))
+
+    def test_rebuild_matches_tables(self):
+        """إعادة البناء تطابق المجاميع الفعلية"""
+        db.session.add_all([Customer(name='أ'), Customer(name='ب')])
+        db.session.commit()
+        db.session.execute(DashboardStats.__table__.delete())
+        db.session.commit()
+
+        stats = complete.get_dashboard_stats()
+        self.assertEqual(stats.total_customers, 2)
+
+        runner = app.test_cli_runner()
+        result = runner.invoke(args=['rebuild-dashboard-stats'])
+        self.assertEqual(result.exit_code, 0, result.output)
+
+class TestMonthlyRollup(CompleteSystemTestCase):
+    """اختبارات التجميع الشهري"""
+
+    def _sale(self, number, day, total):
+        return SalesInvoice(invoice_number=number, date=day, subtotal=total,
+                            tax_amount=Decimal('0'), total=total)
+
+    def test_add_months_crosses_years(self):
+        """إضافة الأشهر وطرحها عبر حدود السنة"""
+        self.assertEqual(complete.add_months(date(2024, 12, 1), 1), date(2025, 1, 1))
+        self.assertEqual(complete.add_months(date(2024, 1, 1), -13), date(2022, 12, 1))
+
+    def test_rollup_follows_inserts_updates_and_deletes(self):
+        """التجميع الشهري يتبع الإضافة ونقل التاريخ والحذف"""
+        sale = self._sale('INV-1', date(2024, 3, 31), Decimal('100'))
+        db.session.add_all([sale, self._sale('INV-2', date(2024, 3, 1), Decimal('50'))])
+        db.session.commit()
+        self.assertEqual(db.session.get(MonthlyRollup, date(2024, 3, 1)).sales_total, Decimal('150'))
+
+        sale.date = date(2024, 4, 1)
+        db.session.commit()
+        self.assertEqual(db.session.get(MonthlyRollup, date(2024, 3, 1)).sales_total, Decimal('50'))
+        self.assertEqual(db.session.get(MonthlyRollup, date(2024, 4, 1)).sales_total, Decimal('100'))
+
+        db.session.delete(sale)
+        db.session.commit()
+        self.assertEqual(db.session.get(MonthlyRollup, date(2024, 4, 1)).sales_total, Decimal('0'))
+
+    def test_rebuild_and_report(self):
+        """إعادة البناء تطابق الجداول والتقرير يعرض 24 شهراً"""
+        today = date.today()
+        db.session.add_all([
+            self._sale('INV-1', today, Decimal('70')),
+            self._sale('INV-2', complete.add_months(today, -23), Decimal('30')),
+            Expense(description='إيجار', amount=Decimal('20'), category='مرافق', date=today),
+        ])
+        db.session.commit()
+        db.session.execute(MonthlyRollup.__table__.delete())
+        db.session.commit()
+
+        self.assertEqual(complete.rebuild_monthly_rollup(), 2)
+        report = complete.monthly_report()
+        self.assertEqual(len(report), 24)
+        self.assertEqual(report[0].sales_total, Decimal('70'))
+        self.assertEqual(report[0].expenses_total, Decimal('20'))
+        self.assertEqual(report[-1].sales_total, Decimal('30'))
+
+        response = self.client.get('/reports?months=36')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('آخر 36 شهراً'.encode(), response.data)
+
+class TestNPlusOneDetection(CompleteSystemTestCase):
+    """اختبارات كشف استعلامات N+1"""
+
+    def setUp(self):
+        super().setUp()
+        app.config['N_PLUS_ONE_DETECTION'] = True
+        customers = [Customer(name=f'عميل {i}') for i in range(8)]
+        db.session.add_all(customers)
+        db.session.add_all([
+            SalesInvoice(invoice_number=f'INV-{i}', customer=customer, subtotal=Decimal('10'),
+                         tax_amount=Decimal('0'), total=Decimal('10'))
+            for i, customer in enumerate(customers)
+        ])
+        db.session.commit()
+        db.session.expunge_all()
+
+    def tearDown(self):
+        app.config['N_PLUS_ONE_DETECTION'] = None
+        super().tearDown()
+
+    def test_fingerprint_ignores_parameters(self):
+        """البصمة تتجاهل المسافات وقوائم IN"""
+        self.assertEqual(complete.query_fingerprint('SELECT *\n  FROM t WHERE id IN (?, ?)'),
+                         complete.query_fingerprint('SELECT * FROM t WHERE id IN (?)'))
+
+    def test_lazy_loading_is_reported(self):
+        """التحميل الكسول لكل صف يُسجّل كتحذير مع اسم المسار"""
+        with app.test_request_context('/sales'):
+            app.preprocess_request()
+            with self.assertLogs(app.logger, 'WARNING') as logs:
+                for sale in SalesInvoice.query.all():
+                    sale.customer.name
+                app.process_response(app.response_class())
+        self.assertIn('sales', logs.output[0])
+
+    def test_sales_page_has_no_n_plus_one(self):
+        """صفحتا المبيعات والمشتريات لا تنفذان استعلاماً لكل صف"""
+        for path in ['/sales', '/purchases']:
+            db.session.expunge_all()
+            response = self.client.get(path)
+            self.assertEqual(response.status_code, 200)
+            self.assertLess(int(response.headers['X-Query-Count']), 8, path)
+
+class TestCsvImport(CompleteSystemTestCase):
+    """اختبارات الاستيراد الجماعي من CSV"""
+
+    def test_import_reports_row_errors_without_aborting(self):
+        """الصفوف الخاطئة تُسجّل والباقي يُستورد"""
+        customer = Customer(name='عميل')
+        db.session.add(customer)
+        db.session.add(SalesInvoice(invoice_number='EXISTING', subtotal=Decimal('1'), total=Decimal('1')))
+        db.session.commit()
+        complete.rebuild_dashboard_stats()
+
+        csv_data = (
+            'invoice_number,date,customer_id,subtotal,tax_amount\n'
+            f'POS-1,2024-05-01,{customer.id},100,15\n'
+            'POS-2,2024-05-02,,50,\n'
+            'POS-3,bad-date,,10,0\n'
+            'POS-1,2024-05-03,,10,0\n'
+            'EXISTING,2024-05-03,,10,0\n'
+            'POS-4,2024-06-01,999,10,0\n'
+            'POS-5,2024-06-01,,abc,0\n'
+            'POS-6,2024-06-02,,20,3\n'
+        )
+        result = complete.import_csv('sales', io.StringIO(csv_data), batch_size=3)
+
+        self.assertEqual(result['rows'], 8)
+        self.assertEqual(result['inserted'], 3)
+        self.assertEqual([error['line'] for error in result['errors']], [4, 5, 6, 7, 8])
+        self.assertEqual(SalesInvoice.query.count(), 4)
+
+        # العدادات والتجميع الشهري تُحدّث رغم الإدراج المباشر
+        self.assertEqual(db.session.get(DashboardStats, 1).total_sales, Decimal('189'))
+        self.assertEqual(db.session.get(MonthlyRollup, date(2024, 5, 1)).sales_tax, Decimal('15'))
+        self.assertEqual(db.session.get(MonthlyRollup, date(2024, 6, 1)).sales_total, Decimal('23'))
+
+    def test_missing_columns_rejected(self):
+        """الملف بدون الأعمدة المطلوبة يُرفض"""
+        with self.assertRaises(ValueError):
+            complete.import_csv('expenses', io.StringIO('description,amount\nx,1\n'))
+
+    def test_import_endpoint(self):
+        """مسار الاستيراد يقبل ملف CSV ويعيد ملخصاً"""
+        csv_data = 'description,amount,category,date\nكهرباء,450,مرافق,2024-01-05\nماء,,مرافق,\n'
+        response = self.client.post(
+            '/import/expenses',
+            data={'file': (io.BytesIO(('\ufeff' + csv_data).encode('utf-8')), 'expenses.csv')},
+            headers={'Accept': 'application/json'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['inserted'], 1)
+        self.assertEqual(response.json['errors'][0]['line'], 3)
+        self.assertEqual(self.client.post('/import/unknown').status_code, 404)
+
+class TestStreamingExport(CompleteSystemTestCase):
+    """اختبارات التصدير بالتدفق"""
+
+    def setUp(self):
+        super().setUp()
+        customer = Customer(name='شركة الأمل')
+        db.session.add(customer)
+        db.session.add_all([
+            SalesInvoice(invoice_number=f'INV-{i}', customer=customer if i % 2 else None,
+                         date=date(2023 + i // 3, 6, 1), subtotal=Decimal('100'),
+                         tax_amount=Decimal('15'), total=Decimal('115'))
+            for i in range(6)
+        ])
+        db.session.commit()
+
+    def test_csv_export_streams_year(self):
+        """تصدير سنة كاملة بصيغة CSV مع العنوان أولاً"""
+        response = self.client.get('/export/sales?year=2024')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_streamed)
+        lines = response.get_data(as_text=True).lstrip('\ufeff').splitlines()
+        self.assertTrue(lines[0].startswith('رقم الفاتورة'))
+        self.assertEqual([line.split(',')[0] for line in lines[1:]], ['INV-3', 'INV-4', 'INV-5'])
+        self.assertIn('شركة الأمل', lines[1])
+
+    def test_xlsx_export(self):
+        """تصدير Excel يُنتج مصنفاً صالحاً"""
+        from openpyxl import load_workbook
+
+        response = self.client.get('/export/sales?format=xlsx')
+        self.assertEqual(response.status_code, 200)
+        sheet = load_workbook(io.BytesIO(response.data)).active
+        self.assertEqual(sheet.max_row, 7)
+
+    def test_export_escapes_formulas(self):
+        """الأوصاف التي تبدأ بصيغة تُصدّر كنص في CSV وExcel"""
+        from openpyxl import load_workbook
+
+        descriptions = ['=HYPERLINK("http://x")', '+1', '-2+3', '@SUM(A1)', 'قرطاسية']
+        db.session.add_all([Expense(description=text, amount=Decimal('10'), category='مكتب', date=date(2024, 1, i + 1))
+                            for i, text in enumerate(descriptions)])
+        db.session.commit()
+
+        expected = ["'" + text for text in descriptions[:-1]] + ['قرطاسية']
+        lines = self.client.get('/export/expenses').get_data(as_text=True).lstrip('\ufeff').splitlines()
+        self.assertEqual([line.rsplit(',', 6)[0].strip('"').replace('""', '"') for line in lines[1:]], expected)
+
+        sheet = load_workbook(io.BytesIO(self.client.get('/export/expenses?format=xlsx').data)).active
+        cells = [row[0] for row in sheet.iter_rows(min_row=2, values_only=True)]
+        self.assertEqual(cells, expected)
+
+    def test_unknown_export_and_bad_dates(self):
+        """نوع أو صيغة أو تاريخ غير صالح"""
+        self.assertEqual(self.client.get('/export/unknown').status_code, 404)
+        self.assertEqual(self.client.get('/export/sales?format=pdf').status_code, 404)
+        self.assertEqual(self.client.get('/export/payments?date_from=bad').status_code, 400)
+
+class TestEngineProfile(unittest.TestCase):
+    """اختبارات إعدادات محرك قاعدة البيانات"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.url = 'sqlite:///' + os.path.join(self.directory, 'profile.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_engine_options_by_database(self):
+        """الخيارات تختلف حسب نوع قاعدة البيانات"""
+        self.assertEqual(complete.engine_options('sqlite:///:memory:'), {})
+        postgres = complete.engine_options(complete.normalize_database_url('postgres://u:p@host/db'))
+        self.assertTrue(postgres['pool_pre_ping'])
+        self.assertIn('pool_recycle', postgres)
+        self.assertIs(complete.engine_options(self.url)['poolclass'], complete.MonitoredQueuePool)
+
+    def test_sqlite_pragmas_and_pool_metrics(self):
+        """ملف SQLite يعمل بوضع WAL ومقاييس المجمع تُسجّل"""
+        from sqlalchemy import create_engine
+
+        engine = create_engine(self.url, **complete.engine_options(self.url))
+        before = complete.pool_metrics.snapshot()['checkouts']
+        with engine.connect() as connection:
+            self.assertEqual(connection.exec_driver_sql('PRAGMA journal_mode').scalar(), 'wal')
+            self.assertEqual(connection.exec_driver_sql('PRAGMA synchronous').scalar(), 1)
+            self.assertEqual(connection.exec_driver_sql('PRAGMA busy_timeout').scalar(), 5000)
+        stats = complete.pool_metrics.snapshot(engine.pool)
+        engine.dispose()
+
+        self.assertEqual(stats['checkouts'], before + 1)
+        self.assertEqual(stats['checked_out'], 0)
+
+class TestDatabaseStatus(CompleteSystemTestCase):
+    """اختبارات مسار حالة قاعدة البيانات"""
+
+    def test_database_status_endpoint(self):
+        """مسار حالة قاعدة البيانات يعرض مقاييس المجمع"""
+        response = self.client.get('/api/database')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('pool', response.json)
+
+class TestTemplateCache(CompleteSystemTestCase):
+    """اختبارات ذاكرة القوالب المترجمة"""
+
+    def test_precompile_loads_all_pages(self):
+        """الترجمة المسبقة تحمّل جميع قوالب النظام"""
+        count = complete.precompile_templates()
+        self.assertGreaterEqual(count, 11)
+        self.assertIsNotNone(app.jinja_env.bytecode_cache)
+
+    def test_pages_render_from_files(self):
+        """الصفحات تُعرض من ملفات القوالب"""
+        for path in ['/dashboard', '/reports']:
+            response = self.client.get(path)
+            self.assertEqual(response.status_code, 200, path)
+
+if __name__ == '__main__':
+    unittest.main()
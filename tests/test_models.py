@@ -5,20 +5,42 @@
 Model Tests
 """
 
+import os
+import tempfile
 import unittest
-from datetime import datetime
-from app import create_app, db
+from unittest import mock
+from datetime import datetime, timedelta
+from app import db
+from tests.factory import TestConfig, create_test_app
 from app.models.user_enhanced import User
 from app.models.system_monitoring import SystemLog, PerformanceMetric, SystemAlert
+from app.models.sequence import NumberSequence, sequence_allocator, next_document_number
+from app.models.customer_risk import score_customers
+from app.models.inventory import InventoryMovement, InventorySnapshot
+from app.security.keyring import key_ring, MEMO_KEY
+from app.security.rotation import KeyRotationJob, key_rotation_job
+from app.security.permission_cache import permission_cache
+from app.models.audit_log import AuditLog
+from app.models.audit_writer import audit_writer
+from app.performance.serializers import serializer_registry, dumps
+from app.performance.memory_cache import MemoryCache
+from app.performance.cache_manager import CacheManager, CachedValue, cached
+from app.performance import cache_codec
+from app.performance.cache_codec import CacheCodec, make_key
+from app.search import SearchDocument, search_index, normalize_arabic
+from app.models.roles_permissions import Role, Permission, UserRole, RolePermission
+from app.models.invoice import Invoice
+from app.models.invoice_item import InvoiceItem
+from app.models.customer import Customer
+from app.models.customer_balance import CustomerBalance
+from app.models.system_settings import SystemSettings, SettingsSnapshot, settings_snapshot
 
 class TestModels(unittest.TestCase):
     """اختبارات النماذج"""
     
     def setUp(self):
         """إعداد الاختبار"""
-        self.app = create_app()
-        self.app.config['TESTING'] = True
-        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        self.app = create_test_app()
         
         self.app_context = self.app.app_context()
         self.app_context.push()
@@ -60,7 +82,7 @@ class TestModels(unittest.TestCase):
         user.set_password('testpassword')
         
         # التأكد من أن كلمة المرور مشفرة
-        self.assertNotEqual(user.password_hash, 'testpassword')
+        self.assertNotEqual(user._password_hash, 'testpassword')
         self.assertTrue(user.check_password('testpassword'))
     
     def test_system_log_model(self):
@@ -118,7 +140,8 @@ class TestModels(unittest.TestCase):
     
     def test_user_relationships(self):
         """اختبار علاقات المستخدم"""
-        user = User(username='testuser', email='test@example.com')
+        user = User(username='testuser', email='test@example.com', first_name='Test', last_name='User')
+        user.set_password('testpassword')
         db.session.add(user)
         db.session.commit()
         
@@ -135,6 +158,452 @@ class TestModels(unittest.TestCase):
         # اختبار العلاقة
         self.assertEqual(len(user.system_logs), 1)
         self.assertEqual(log.user, user)
+    
+    def _invoice(self, *items, **values):
+        """فاتورة بقيمها المالية الافتراضية وعناصر (الكمية، سعر الوحدة)"""
+        defaults = dict(customer_name='عميل', date=datetime.utcnow(), tax_rate=15.0, discount_rate=0.0,
+                        discount_amount=0.0, shipping_cost=0.0, paid_amount=0.0)
+        defaults.update(values)
+        invoice = Invoice(**defaults)
+        for quantity, price in items:
+            invoice.invoice_items.append(InvoiceItem(item_name='صنف', quantity=quantity, unit_price=price, tax_rate=0.0))
+        return invoice
+    
+    def test_items_subtotal_pending_items(self):
+        """اختبار المجموع الفرعي مع عناصر مضافة ومحذوفة لم تكتب بعد"""
+        invoice = self._invoice((2, 50.0))
+        # العنصر المعلق لم يمر بـ before_insert بعد
+        self.assertEqual(invoice.items_subtotal(), 100.0)
+        db.session.add(invoice)
+        db.session.commit()
+        self.assertEqual(invoice.total_amount, 115.0)
+        
+        # عنصر جديد بالقيم الافتراضية (الكمية 1) وحذف العنصر الأول قبل flush
+        invoice.invoice_items.append(InvoiceItem(item_name='إضافة', unit_price=10.0, tax_rate=0.0))
+        self.assertEqual(invoice.items_subtotal(), 110.0)
+        invoice.invoice_items.remove(invoice.invoice_items[0])
+        self.assertEqual(invoice.items_subtotal(), 10.0)
+        
+        db.session.commit()
+        self.assertEqual((invoice.subtotal, invoice.total_amount), (10.0, 11.5))
+    
+    def test_recalculate_totals(self):
+        """اختبار إعادة الحساب الجماعية بـ UPDATE ... FROM وبالاستعلام الفرعي البديل"""
+        for update_from in (True, False):
+            with self.subTest(update_from=update_from), \
+                    mock.patch('app.models.invoice._supports_update_from', return_value=update_from):
+                with_items = self._invoice((2, 50.0), (1, 20.0), paid_amount=50.0)
+                empty = self._invoice()
+                db.session.add_all([with_items, empty])
+                db.session.commit()
+                
+                # مبالغ قديمة تكتب مباشرة دون الأحداث
+                db.session.execute(Invoice.__table__.update().values(subtotal=999.0, total_amount=999.0))
+                self.assertEqual(Invoice.recalculate_totals([with_items.id, empty.id]), 2)
+                self.assertEqual((with_items.subtotal, with_items.total_amount), (120.0, 138.0))
+                self.assertEqual((with_items.remaining_amount, with_items.payment_status), (88.0, 'partial'))
+                self.assertEqual((empty.subtotal, empty.total_amount), (0.0, 0.0))
+                
+                # نسبة ضريبة جديدة تحفظ على الفواتير
+                Invoice.recalculate_totals([with_items.id], tax_rate=5)
+                self.assertEqual((with_items.tax_rate, with_items.tax_amount, with_items.total_amount), (5.0, 6.0, 126.0))
+                db.session.rollback()
+    
+    def test_customer_balance_ledger(self):
+        """اختبار رصيد العميل: المسودات مستبعدة، وإعادة الحساب الجماعية والتأخر الدوري"""
+        customer = Customer(name='عميل')
+        db.session.add(customer)
+        db.session.commit()
+        
+        invoice = self._invoice((2, 50.0), customer_id=customer.id, status='draft')
+        db.session.add(invoice)
+        db.session.commit()
+        self.assertEqual(CustomerBalance.get_open_amount(customer.id), 0.0)
+        
+        invoice.status = 'sent'
+        db.session.commit()
+        self.assertEqual(CustomerBalance.get_open_amount(customer.id), 115.0)
+        
+        # UPDATE الجماعي لا يمر بأحداث after_update
+        Invoice.recalculate_totals([invoice.id], tax_rate=0)
+        self.assertEqual(CustomerBalance.get_open_amount(customer.id), 100.0)
+        db.session.commit()
+        
+        invoice.due_date = datetime.utcnow() + timedelta(days=1)
+        db.session.commit()
+        balance = db.session.get(CustomerBalance, customer.id)
+        self.assertEqual(balance.overdue_amount, 0.0)
+        self.assertEqual(CustomerBalance.refresh_overdue(now=datetime.utcnow() + timedelta(days=2)), 1)
+        db.session.refresh(balance)
+        self.assertEqual(balance.overdue_amount, 100.0)
+    
+    def test_number_sequence_gapless(self):
+        """اختبار الترقيم المتسلسل: التراجع يعيد الرقم"""
+        moment = datetime(2025, 3, 15)
+        self.assertEqual(next_document_number('INV', moment), 'INV-202503-000001')
+        db.session.rollback()
+        
+        self.assertEqual(next_document_number('INV', moment), 'INV-202503-000001')
+        self.assertEqual(next_document_number('INV', moment), 'INV-202503-000002')
+        self.assertEqual(next_document_number('PAY', moment), 'PAY-202503-000001')
+        db.session.commit()
+        
+        counter = db.session.get(NumberSequence, ('INV', '202503'))
+        self.assertEqual(counter.last_value, 2)
+        self.assertEqual(sequence_allocator.allocate('INV', '202504'), 1)
+    
+    def test_stock_as_of_snapshot(self):
+        """اختبار المخزون التاريخي من أقرب لقطة والحركات بينها وبين اللحظة"""
+        db.session.add_all([
+            InventorySnapshot(product_id=1, taken_at=datetime(2025, 1, 1), quantity=100),
+            InventorySnapshot(product_id=1, taken_at=datetime(2025, 2, 1), quantity=70),
+            InventoryMovement(product_id=1, quantity=-10, movement_type='sale', created_at=datetime(2025, 1, 5)),
+            InventoryMovement(product_id=1, quantity=-20, movement_type='sale', created_at=datetime(2025, 1, 25)),
+        ])
+        db.session.commit()
+        
+        self.assertEqual(InventorySnapshot.stock_as_of(1, datetime(2025, 1, 10)), 90)
+        self.assertEqual(InventorySnapshot.stock_as_of(1, datetime(2025, 1, 20)), 90)
+        self.assertEqual(InventorySnapshot.stock_as_of(1, datetime(2025, 1, 28)), 70)
+    
+    def test_audit_events_follow_transaction(self):
+        """اختبار كتابة أحداث المراجعة مع commit وإلغائها مع التراجع"""
+        AuditLog.log_action('invoices', 1, 'approve', buffered=True)
+        self.assertEqual(len(audit_writer.pending()), 1)
+        db.session.rollback()
+        self.assertEqual(AuditLog.query.count(), 0)
+        
+        for record_id in range(3):
+            AuditLog.log_action('invoices', record_id, 'approve', buffered=True)
+        db.session.commit()
+        self.assertEqual(AuditLog.query.filter_by(action='approve').count(), 3)
+        self.assertEqual(audit_writer.pending(), [])
+    
+    def test_audit_after_flush_does_not_lock(self):
+        """اختبار المراجعة بعد flush: لا اتصال ثانٍ ينتظر قفل الكتابة (ملف SQLite وليس الذاكرة)"""
+        handle, path = tempfile.mkstemp(suffix='.db')
+        os.close(handle)
+        
+        class FileConfig(TestConfig):
+            SQLALCHEMY_DATABASE_URI = 'sqlite:///' + path
+            SQLITE_BUSY_TIMEOUT = 200
+        
+        file_app = create_test_app(FileConfig)
+        try:
+            with file_app.app_context():
+                db.create_all()
+                customer = Customer(name='عميل')
+                db.session.add(customer)
+                db.session.flush()
+                # الجلسة نظيفة الآن لكنها تحمل قفل الكتابة
+                customer.log_change('update', {'name': 'عميل'})
+                self.assertEqual(len(audit_writer.pending()), 1)
+                AuditLog.log_security_event('suspicious_login', {'ip': '10.0.0.1'})
+                db.session.commit()
+                self.assertEqual(AuditLog.query.filter_by(action='update').count(), 1)
+                self.assertEqual(AuditLog.query.filter_by(action='suspicious_login').count(), 1)
+                db.session.remove()
+                db.engine.dispose()
+        finally:
+            os.remove(path)
+    
+    def test_precompiled_serializer(self):
+        """اختبار المسلسل المولد: التواريخ والإسقاط والترميز إلى bytes"""
+        log = SystemLog(level='INFO', logger_name='tests', message='serialize')
+        db.session.add(log)
+        db.session.commit()
+        
+        # بعد commit تنتهي القيم المحملة فيقرأ المسلسل عبر getattr
+        data = serializer_registry.serialize(log)
+        self.assertEqual(data['message'], 'serialize')
+        self.assertEqual(data['timestamp'], log.timestamp.isoformat())
+        
+        projected = serializer_registry.serialize(log, fields=('id', 'message'))
+        self.assertEqual(projected, {'id': log.id, 'message': 'serialize'})
+        self.assertIn(b'"message":"serialize"', dumps([projected]))
+    
+    def test_search_index_arabic(self):
+        """اختبار البحث دون تأثر بالتشكيل وأشكال الهمزة وأداة التعريف"""
+        self.assertEqual(normalize_arabic('مُحَمَّد إبراهيم'), 'محمد ابراهيم')
+        
+        log = SystemLog(level='INFO', logger_name='tests', message='تم تسجيل دخول مُحَمَّد من شركة الأمل')
+        db.session.add(log)
+        db.session.commit()
+        
+        for expression in ('محمد', 'شركه امل', 'الامل'):
+            ids = db.session.scalars(db.select(SystemLog.id).where(search_index.filter(SystemLog, expression))).all()
+            self.assertEqual(ids, [log.id])
+        
+        log.message = 'رسالة أخرى'
+        db.session.commit()
+        ids = db.session.scalars(db.select(SystemLog.id).where(search_index.filter(SystemLog, 'محمد'))).all()
+        self.assertEqual(ids, [])
+        
+        # تنظيف السجلات القديمة يحذف مستنداتها في نفس المعاملة
+        log.timestamp = datetime.utcnow() - timedelta(days=60)
+        db.session.commit()
+        self.assertEqual(SystemLog.cleanup_old_logs(days=30), 1)
+        self.assertEqual(db.session.scalar(db.select(db.func.count()).select_from(SearchDocument).where(
+            SearchDocument.entity_type == 'system_logs')), 0)
+    
+    def test_permission_cache_invalidation(self):
+        """اختبار ذاكرة الصلاحيات: لا استعلامات بعد التحميل وإبطال بعد commit"""
+        user = User(username='cached', email='cached@example.com', first_name='Cached', last_name='User')
+        user.password = 'Secret123!'
+        role = Role(name='accountant', display_name='محاسب')
+        view = Permission(name='invoices.view', display_name='عرض', category='invoices')
+        edit = Permission(name='invoices.edit', display_name='تعديل', category='invoices')
+        db.session.add_all([user, role, view, edit])
+        db.session.commit()
+        db.session.add_all([UserRole(user_id=user.id, role_id=role.id),
+                            RolePermission(role_id=role.id, permission_id=view.id)])
+        db.session.commit()
+        
+        self.assertTrue(user.has_permission('invoices.view'))
+        self.assertTrue(user.has_role('accountant'))
+        self.assertFalse(user.has_permission('invoices.edit'))
+        
+        db.session.add(RolePermission(role_id=role.id, permission_id=edit.id))
+        db.session.commit()
+        self.assertTrue(user.has_permission('invoices.edit'))
+        
+        db.session.delete(UserRole.query.filter_by(user_id=user.id).one())
+        db.session.commit()
+        self.assertFalse(user.has_role('accountant'))
+        self.assertEqual(user.get_permissions(), [])
+    
+    def test_permission_cache_revoke_during_load(self):
+        """اختبار سحب دور بين تحميل الصلاحيات وكتابتها في الذاكرة"""
+        user = User(username='racing', email='racing@example.com', first_name='Racing', last_name='User')
+        user.password = 'Secret123!'
+        role = Role(name='cashier', display_name='أمين صندوق')
+        db.session.add_all([user, role])
+        db.session.commit()
+        db.session.add(UserRole(user_id=user.id, role_id=role.id))
+        db.session.commit()
+        permission_cache.invalidate()
+        
+        load = permission_cache.load
+        
+        def load_then_revoke(user_id):
+            grants = load(user_id)
+            # طلب آخر يسحب الدور ويحفظ قبل أن يكتب هذا الطلب نتيجته
+            db.session.delete(UserRole.query.filter_by(user_id=user_id).one())
+            db.session.commit()
+            return grants
+        
+        with mock.patch.object(permission_cache, 'load', side_effect=load_then_revoke):
+            self.assertIn('cashier', permission_cache.get(user.id).roles)
+        
+        # لا نسخة محلية ولا مشتركة للأدوار الملغاة
+        self.assertEqual(permission_cache.get(user.id).roles, frozenset())
+        permission_cache._entries.clear()
+        self.assertEqual(permission_cache.get(user.id).roles, frozenset())
+    
+    def test_settings_snapshot_version(self):
+        """اختبار لقطة الإعدادات: قراءة دون استعلام وإعادة التحميل عند تغير الإصدار"""
+        SystemSettings.set_setting('tax_rate', 15.0, category='financial', data_type='float')
+        version = settings_snapshot.current_version()
+        self.assertEqual(SystemSettings.get_setting('tax_rate'), 15.0)
+        self.assertEqual(settings_snapshot.version, version)
+        
+        # عملية أخرى تحمل لقطتها قبل التغيير
+        other = SettingsSnapshot()
+        self.assertEqual(other.get('tax_rate'), 15.0)
+        
+        SystemSettings.set_setting('tax_rate', 5.0)
+        self.assertEqual(settings_snapshot.current_version(), version + 1)
+        self.assertEqual(SystemSettings.get_setting('tax_rate'), 5.0)
+        self.assertEqual(other.get('tax_rate'), 15.0)
+        
+        other.refresh()
+        self.assertEqual(other.get('tax_rate'), 5.0)
+        self.assertEqual(other.get('missing', 'default'), 'default')
+        
+        # سجل المراجعة: الإنشاء بمعرف الإعداد، والتحديث من set_setting ومن الحدث
+        setting = SystemSettings.query.filter_by(key='tax_rate').one()
+        entries = AuditLog.query.filter_by(table_name='system_settings').all()
+        self.assertEqual([entry.record_id for entry in entries if entry.action == 'create'], [setting.id])
+        self.assertEqual(sum(entry.action == 'update' for entry in entries), 2)
+    
+    def test_memory_cache_bounds(self):
+        """اختبار ذاكرة التخزين المؤقت: الإخراج الأقدم، انتهاء الصلاحية، مسح البادئة"""
+        now = [0.0]
+        cache = MemoryCache(max_bytes=100000, max_entries=3, clock=lambda: now[0])
+        cache.set('user:1:a', 1, timeout=10)
+        cache.set('user:1:b', [2])
+        cache.set('user:2:a', 3)
+        cache.get('user:1:a')
+        cache.set('query:x', 4)
+        
+        # الأقدم استخداماً هو user:1:b
+        self.assertIsNone(cache.get('user:1:b'))
+        self.assertEqual(cache.stats()['evictions'], 1)
+        
+        self.assertEqual(cache.clear('user:2:*'), 1)
+        now[0] = 11
+        self.assertEqual(cache.purge_expired(), 1)
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.size, cache._entries['query:x'][1])
+        self.assertFalse(MemoryCache(max_bytes=100).set('big', 'x' * 1000))
+    
+    def test_cache_single_flight(self):
+        """اختبار الحساب مرة واحدة للطلبات المتزامنة وإعادة القيمة القديمة أثناء التحديث"""
+        import threading
+        import time
+        
+        manager = CacheManager()
+        calls = []
+        
+        def compute():
+            calls.append(1)
+            time.sleep(0.1)
+            return len(calls)
+        
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(manager.get_or_compute('hot', compute, 60)))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [1] * 8)
+        self.assertEqual(len(calls), 1)
+        
+        # بعد انتهاء العمر المرن تعاد القيمة القديمة ويحدثها طلب واحد في الخلفية
+        manager._store('hot', 1, 0.1, -1, 60)
+        self.assertEqual(manager.get_or_compute('hot', compute, 60), 1)
+        self.assertEqual(manager.get_or_compute('hot', compute, 60), 1)
+        manager._refresher.shutdown(wait=True)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(manager.get_or_compute('hot', compute, 60), 2)
+        
+        # القفل عند عملية أخرى والقيمة محذوفة: التحديث ينتظر ثم يحسب بدل إعادة None
+        manager.lock_timeout = 0.1
+        with mock.patch.object(manager, '_acquire_lock', return_value=False):
+            self.assertEqual(manager._compute_distributed('evicted', lambda: 'fresh', 60, 60, wait=False), 'fresh')
+    
+    def test_cache_keys_and_codec(self):
+        """اختبار ثبات مفاتيح التخزين المؤقت وترميز القيم مع الضغط"""
+        from decimal import Decimal
+        
+        def report(*args, **kwargs):
+            pass
+        
+        # مفتاح ثابت مهما كان PYTHONHASHSEED أو ترتيب المجموعة والوسائط المسماة
+        key = make_key('reports', report, (5, {'b', 'a'}), {'status': 'paid', 'amount': Decimal('1.50')})
+        self.assertEqual(key, make_key('reports', report, (5, {'a', 'b'}), {'amount': Decimal('1.50'), 'status': 'paid'}))
+        self.assertTrue(key.startswith('reports:report:'))
+        self.assertNotEqual(key, make_key('reports', report, (6, {'a', 'b'}), {}))
+        
+        rows = [{'id': i, 'status': 'paid', 'total_amount': 115.0} for i in range(200)]
+        codec = CacheCodec('json', 'zlib', threshold=256)
+        data = codec.dumps(rows, (10.0, 0.5))
+        self.assertEqual(codec.loads(data), (rows, (10.0, 0.5)))
+        self.assertLess(len(data), len(CacheCodec('json', 'none').dumps(rows)))
+        
+        # قيمة لا يدعمها JSON تكتب بـ pickle، وpickle الخام القديم يعامل كغير موجود
+        self.assertEqual(codec.loads(codec.dumps({'at': datetime(2024, 1, 1)}))[0], {'at': datetime(2024, 1, 1)})
+        
+        # مفاتيح رقمية وtuple تعود بنوعها مع orjson وبدونه
+        for value in ({5: 'paid'}, [{'range': (1, 10)}], ('a', 1)):
+            for fast in (True, False):
+                with self.subTest(value=value, orjson=fast), \
+                        mock.patch('app.performance.cache_codec.orjson', None if not fast else cache_codec.orjson):
+                    data = codec.dumps(value)
+                    self.assertEqual(data[:1], b'p')
+                    self.assertEqual(codec.loads(data)[0], value)
+        manager = CacheManager()
+        self.assertIsNone(manager._decode('old', b'\x80\x05N.'))
+        self.assertEqual(manager._decode('new', manager._encode(CachedValue([1], 10.0, 0.5))), CachedValue([1], 10.0, 0.5))
+    
+    def test_cached_method_without_stable_key(self):
+        """اختبار @cached على دالة صنف: self بلا مفتاح ثابت فتنفذ دون تخزين مع تحذير واحد"""
+        class Reports:
+            calls = 0
+            
+            @cached(timeout=60, key_prefix='reports')
+            def totals(self, status):
+                Reports.calls += 1
+                return {'status': status, 'total': 115.0}
+        
+        reports = Reports()
+        with self.assertLogs('accounting_system', level='WARNING') as logs:
+            self.assertEqual(reports.totals('paid'), {'status': 'paid', 'total': 115.0})
+            self.assertEqual(reports.totals('paid'), {'status': 'paid', 'total': 115.0})
+        self.assertEqual(Reports.calls, 2)
+        self.assertEqual(len(logs.records), 1)
+    
+    def test_batch_risk_scoring(self):
+        """اختبار تقييم المخاطر المتجه بنفس قواعد calculate_risk_level"""
+        import numpy as np
+        levels = score_customers(
+            verified=np.array([True, False, False, True]),
+            debt=np.array([0.0, 500.0, 10.0, 0.0]),
+            credit_limit=np.array([0.0, 100.0, 100.0, 0.0]),
+            purchase_count=np.array([3, 0, 1, 0]),
+            total_purchases=np.array([5000.0, 0.0, 2000.0, 500.0])
+        )
+        self.assertEqual(levels.tolist(), ['low', 'critical', 'medium', 'medium'])
+    
+    def test_key_ring_bulk_decrypt(self):
+        """اختبار فك التشفير الجماعي وذاكرة الجلسة"""
+        import os
+        from unittest import mock
+        from cryptography.fernet import Fernet
+        
+        with mock.patch.dict(os.environ, {'ENCRYPTION_KEY': Fernet.generate_key().decode()}):
+            tokens = [key_ring.encrypt(str(value)) for value in range(5)]
+            self.assertEqual(len(db.session.info[MEMO_KEY]), 5)
+            
+            key_ring.clear_memo()
+            self.assertEqual(key_ring.decrypt_many(tokens + [None]), ['0', '1', '2', '3', '4', None])
+            self.assertEqual(key_ring.decrypt(tokens[3]), '3')
+            self.assertIs(key_ring.cipher(), key_ring.cipher())
+    
+    def test_key_ring_rotation(self):
+        """اختبار إعادة التشفير بالمفتاح الأساسي الجديد مع بقاء القديم للقراءة"""
+        import os
+        from unittest import mock
+        from cryptography.fernet import Fernet
+        
+        old_key, new_key = Fernet.generate_key().decode(), Fernet.generate_key().decode()
+        with mock.patch.dict(os.environ, {'ENCRYPTION_KEY': old_key}):
+            token = key_ring.encrypt('SA0380000000608010167519')
+        
+        with mock.patch.dict(os.environ, {'ENCRYPTION_KEY': new_key, 'ENCRYPTION_PREVIOUS_KEYS': old_key}):
+            rotated = key_ring.rotate(token)
+            self.assertIsNotNone(rotated)
+            self.assertIsNone(key_ring.rotate(rotated))
+        
+        with mock.patch.dict(os.environ, {'ENCRYPTION_KEY': new_key}):
+            key_ring.clear_memo()
+            self.assertEqual(key_ring.decrypt(rotated), 'SA0380000000608010167519')
+    
+    def test_key_rotation_job_users(self):
+        """اختبار تدوير أعمدة المستخدمين المشفرة فقط (backup_codes عمود JSON عادي)"""
+        import os
+        from cryptography.fernet import Fernet
+        
+        for duty_cycle in (0, -0.5, 1.5):
+            with self.subTest(duty_cycle=duty_cycle):
+                self.app.config['KEY_ROTATION_DUTY_CYCLE'] = duty_cycle
+                with self.assertRaises(ValueError):
+                    KeyRotationJob(self.app)
+        
+        old_key, new_key = Fernet.generate_key().decode(), Fernet.generate_key().decode()
+        user = User(username='rotate', email='rotate@example.com', first_name='R', last_name='U',
+                    backup_codes=['A1B2C3D4', 'E5F6A7B8'])
+        user.set_password('testpassword')
+        with mock.patch.dict(os.environ, {'ENCRYPTION_KEY': old_key}):
+            user.two_factor_secret = 'JBSWY3DPEHPK3PXP'
+        db.session.add(user)
+        db.session.commit()
+        
+        with mock.patch.dict(os.environ, {'ENCRYPTION_KEY': new_key, 'ENCRYPTION_PREVIOUS_KEYS': old_key}):
+            status = key_rotation_job.run(['users'], restart=True)
+        users = next(table for table in status['tables'] if table['table'] == 'users')
+        self.assertEqual((users['rotated'], users['skipped']), (1, 0))
 
 if __name__ == '__main__':
     unittest.main()